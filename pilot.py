@@ -19,15 +19,19 @@ import time
 from os import getcwd, chdir, environ
 from shutil import rmtree
 
+from pilot.util.startupprofiler import profiler  # must be the first pilot import (--profile-startup)
 from pilot.common.exception import PilotException
 from pilot.info import infosys
 from pilot.util.auxiliary import pilot_version_banner, shell_exit_code
+from pilot.util.config import config
 from pilot.util.constants import SUCCESS, FAILURE, ERRNO_NOJOBS, PILOT_START_TIME, PILOT_END_TIME, get_pilot_version, \
     SERVER_UPDATE_NOT_DONE, PILOT_MULTIJOB_START_TIME
 from pilot.util.filehandling import get_pilot_work_dir, mkdirs, establish_logging
 from pilot.util.harvester import is_harvester_mode
 from pilot.util.https import https_setup
+from pilot.util.jobslots import JobSlots, get_number_of_slots
 from pilot.util.timing import add_to_pilot_timing
+from pilot.util.tracesender import get_trace_sender
 
 
 def main():
@@ -43,6 +47,7 @@ def main():
 
     # print the pilot version
     pilot_version_banner()
+    profiler.mark('pilot modules imported')
 
     # define threading events
     args.graceful_stop = threading.Event()
@@ -70,6 +75,12 @@ def main():
         logger.fatal(error)
         return error.get_error_code()
 
+    # define the job slots (number of jobs running at the same time)
+    # (with prefetching, the next job is downloaded while the previous job is staging out in multi-job pilots)
+    args.slots = JobSlots(get_number_of_slots(args.job_slots, infosys.queuedata.corecount),
+                          prefetch=bool(config.Pilot.prefetch_next_job) and infosys.queuedata.timefloor > 0)
+    logger.info('pilot will run up to %d job(s) at the same time' % args.slots.nslots)
+
     # set the site name for rucio  ## is it really used?
     environ['PILOT_RUCIO_SITENAME'] = infosys.queuedata.site
 
@@ -88,6 +99,9 @@ def main():
         logger.fatal('main pilot function caught exception: %s' % e)
         exit_code = None
 
+    # send any remaining traces
+    get_trace_sender().close()
+
     return exit_code
 
 
@@ -365,6 +379,28 @@ def get_args():
                             default='manytoone',
                             help='HPC mode (manytoone, jumbojobs)')
 
+    # startup profiling (the import times are recorded from the start, see pilot.util.startupprofiler)
+    arg_parser.add_argument('--profile-startup',
+                            dest='profile_startup',
+                            action='store_true',
+                            default=False,
+                            help='Report the module import times and startup milestones at the first getJob request')
+
+    # number of jobs running at the same time (0 means one single-core job per core of the queue)
+    arg_parser.add_argument('--job-slots',
+                            dest='job_slots',
+                            type=int,
+                            default=1,
+                            help='Number of single-core job slots (0: use the number of cores of the queue); '
+                                 'a multi-core job occupies one slot per core')
+
+    # number of concurrent per-file transfers (0 means use the queuedata or pilot config value)
+    arg_parser.add_argument('--transfer-threads',
+                            dest='transfer_threads',
+                            type=int,
+                            default=0,
+                            help='Number of concurrent per-file transfers (0: use the queue or pilot config value)')
+
     return arg_parser.parse_args()
 
 
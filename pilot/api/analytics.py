@@ -7,14 +7,32 @@
 # Authors:
 # - Paul Nilsson, paul.nilsson@cern.ch, 2018
 
+import os
+import threading
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # the pure Python implementations are used
+
 from .services import Services
 from pilot.common.exception import NotImplemented, NotDefined, NotSameLength, UnknownException
 from pilot.util.filehandling import get_table_from_file
-from pilot.util.math import mean, sum_square_dev, sum_dev, chi2, float_to_rounded_string
+from pilot.util.math import mean, median, sum_square_dev, sum_dev, chi2, float_to_rounded_string
+from pilot.util.timeseries import get_time_series
 
 import logging
 logger = logging.getLogger(__name__)
 
+# maximum number of (evenly spaced) points used for the pairwise slopes of the Theil-Sen estimator
+THEIL_SEN_MAX_POINTS = 1000 if np else 300
+
+# number of points at the beginning and end of the memory monitor data (allocation and de-allocation) that are
+# not fitted when tails are excluded
+HEAD = 5
+TAIL = 2
+
 
 class Analytics(Services):
     """
@@ -114,53 +132,50 @@ class Analytics(Services):
 
         return get_table_from_file(filename, header=header, separator=separator, convert_to_float=convert_to_float)
 
-    def get_fitted_data(self, filename, x_name='Time', y_name='pss+swap', precision=2, tails=True):
+    def get_fitted_data(self, filename, x_name='Time', y_name='pss+swap', precision=2, tails=True, estimator='linear',
+                        window=None):
         """
         Return a properly formatted job metrics string with analytics data.
         Currently the function returns a fit for PSS+Swap vs time, whose slope measures memory leaks.
+        Only the rows that were added to the file since the previous call are read, and the least squares fit is
+        updated in O(1) per row (see `SeriesFit`). Rows with missing values are not used.
 
         :param filename: full path to memory monitor output (string).
         :param x_name: optional string, name selector for table column.
-        :param y_name: optional string, name selector for table column.
+        :param y_name: optional string, name selector for table column (may contain '+'-sign).
         :param precision: optional precision for fitted slope parameter, default 2.
         :param tails: should tails (first and last values) be used? (boolean).
+        :param estimator: 'linear' (least squares) or 'theil-sen' (median of pairwise slopes, robust against outliers).
+        :param window: optional time window (in units of x), only the most recent data is fitted (int).
         :return: {"slope": slope, "chi2": chi2} (float strings with desired precision).
         """
 
         slope = ""
         chi2 = ""
-        table = self.get_table(filename)
-
-        if table:
-            # extract data to be fitted
-            x, y = self.extract_from_table(table, x_name, y_name)
-
-            # remove tails if desired
-            # this is useful e.g. for memory monitor data where the first and last values
-            # represent allocation and de-allocation, ie not interesting
-            if not tails and len(x) > 7 and len(y) > 7:
-                logger.debug('removing tails from data to be fitted')
-                x = x[5:]
-                x = x[:-2]
-                y = y[5:]
-                y = y[:-2]
-
-            if len(x) > 7 and len(y) > 7:
-                logger.info('fitting %s vs %s' % (y_name, x_name))
-                try:
-                    fit = self.fit(x, y)
-                    _slope = self.slope()
-                except Exception as e:
-                    logger.warning('failed to fit data, x=%s, y=%s: %s' % (str(x), str(y), e))
+        tracker = get_series_fit(filename, x_name=x_name, y_name=y_name, window=window)
+        fit, first, last = tracker.get_fit(tails=tails)
+        if last - first > HEAD + TAIL:
+            logger.info('fitting %s vs %s (%s)' % (y_name, x_name, estimator))
+            x = tracker.x[first:last]
+            y = tracker.y[first:last]
+            try:
+                if estimator == 'theil-sen':
+                    _slope, _intersect = theil_sen(x, y)
                 else:
-                    if _slope:
-                        slope = float_to_rounded_string(fit.slope(), precision=precision)
-                        chi2 = float_to_rounded_string(fit.chi2(), precision=0)  # decimals are not needed for chi2
-                        if slope != "":
-                            logger.info('current memory leak: %s B/s (using %d data points, chi2=%s)' %
-                                        (slope, len(x), chi2))
+                    _slope, _intersect = fit.slope(), fit.intersect()
+                if _slope:
+                    _chi2 = get_chi2(x, y, _slope, _intersect)
+            except Exception as e:
+                logger.warning('failed to fit data (%d points): %s' % (len(x), e))
             else:
-                logger.warning('wrong length of table data, x=%s, y=%s (must be same and length>=4)' % (str(x), str(y)))
+                if _slope:
+                    slope = float_to_rounded_string(_slope, precision=precision)
+                    chi2 = float_to_rounded_string(_chi2, precision=0)  # decimals are not needed for chi2
+                    if slope != "":
+                        logger.info('current memory leak: %s B/s (using %d data points, chi2=%s)' %
+                                    (slope, len(x), chi2))
+        else:
+            logger.warning('not enough data to fit: %d point(s) (need > %d)' % (last - first, HEAD + TAIL))
 
         return {"slope": slope, "chi2": chi2}
 
@@ -230,11 +245,19 @@ class Fit(object):
 
         # base calculations
         if self._model == 'linear':
-            self._ss = sum_square_dev(self._x)
-            self._ss2 = sum_dev(self._x, self._y)
+            if np is not None:
+                x = np.asarray(self._x, dtype=float)
+                y = np.asarray(self._y, dtype=float)
+                self._xm = float(x.mean())
+                self._ym = float(y.mean())
+                self._ss = float(((x - self._xm) ** 2).sum())
+                self._ss2 = float(((x - self._xm) * (y - self._ym)).sum())
+            else:
+                self._ss = sum_square_dev(self._x)
+                self._ss2 = sum_dev(self._x, self._y)
+                self._xm = mean(self._x)
+                self._ym = mean(self._y)
             self.set_slope()
-            self._xm = mean(self._x)
-            self._ym = mean(self._y)
             self.set_intersect()
             self.set_chi2()
         else:
@@ -265,17 +288,7 @@ class Fit(object):
         :return:
         """
 
-        y_observed = self._y
-        y_expected = []
-        #i = 0
-        for x in self._x:
-            #y_expected.append(self.value(x) - y_observed[i])
-            y_expected.append(self.value(x))
-            #i += 1
-        if y_observed and y_observed != [] and y_expected and y_expected != []:
-            self._chi2 = chi2(y_observed, y_expected)
-        else:
-            self._chi2 = None
+        self._chi2 = get_chi2(self._x, self._y, self._slope, self._intersect)
 
     def chi2(self):
         """
@@ -327,3 +340,267 @@ class Fit(object):
         """
 
         return self._intersect
+
+
+class RunningFit(object):
+    """
+    Linear least squares fit, y(x) = slope * x + intersect, from running means and co-moments (Welford's algorithm).
+    Points can be added and removed in O(1), e.g. for sliding windows. Unlike sums of powers, the co-moments do not
+    lose precision for large x values (such as time stamps).
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.xm = 0.0  # mean of x
+        self.ym = 0.0  # mean of y
+        self.sxx = 0.0  # sum of square deviations of x
+        self.sxy = 0.0  # sum of deviations (x - x mean) * (y - y mean)
+
+    def copy(self):
+        """
+        Return a copy of the fit.
+
+        :return: `RunningFit` object.
+        """
+
+        fit = RunningFit()
+        fit.n, fit.xm, fit.ym, fit.sxx, fit.sxy = self.n, self.xm, self.ym, self.sxx, self.sxy
+        return fit
+
+    def add(self, x, y):
+        """
+        Add a point.
+
+        :param x: float.
+        :param y: float.
+        :return:
+        """
+
+        self.n += 1
+        dx = x - self.xm
+        self.xm += dx / self.n
+        self.ym += (y - self.ym) / self.n
+        self.sxx += dx * (x - self.xm)
+        self.sxy += dx * (y - self.ym)
+
+    def remove(self, x, y):
+        """
+        Remove a previously added point.
+
+        :param x: float.
+        :param y: float.
+        :return:
+        """
+
+        if self.n <= 1:
+            self.__init__()
+            return
+
+        n = self.n - 1
+        xm = self.xm - (x - self.xm) / n
+        ym = self.ym - (y - self.ym) / n
+        self.sxx -= (x - xm) * (x - self.xm)
+        self.sxy -= (x - xm) * (y - self.ym)
+        self.n, self.xm, self.ym = n, xm, ym
+
+    def slope(self):
+        """
+        Return the slope (None if not defined or zero, as for `Fit`).
+
+        :return: slope (float).
+        """
+
+        return self.sxy / self.sxx if self.sxx > 0 and self.sxy else None
+
+    def intersect(self):
+        """
+        Return the intersect.
+
+        :return: intersect (float, None if the slope is not defined).
+        """
+
+        slope = self.slope()
+        return self.ym - slope * self.xm if slope is not None else None
+
+
+class SeriesFit(object):
+    """
+    Running linear fit of a time series file (see pilot.util.timeseries), updated with the new rows only.
+    The fitted points are kept in arrays for the estimators that need all points (chi2, Theil-Sen).
+    """
+
+    def __init__(self, x_name='Time', y_name='pss+swap', window=None):
+        """
+        :param x_name: column name (string).
+        :param y_name: column name, or several column names separated by '+' whose values are added (string).
+        :param window: optional time window (in units of x), older points are removed from the fit (int).
+        """
+
+        self.x_name = x_name
+        self.y_names = y_name.split('+')
+        self.window = window
+        self._lock = threading.Lock()
+        self._reset(None)
+
+    def _reset(self, generation):
+        """
+        Forget all points.
+
+        :param generation: generation of the time series.
+        :return:
+        """
+
+        self.generation = generation
+        self.consumed = 0  # number of rows of the time series that have been read
+        self.start = 0  # index of the first point in the window
+        self.x = array('d')
+        self.y = array('d')
+        self.fit = RunningFit()
+
+    def update(self, series):
+        """
+        Add the new rows of the time series to the fit.
+
+        :param series: `TimeSeries` object.
+        :return:
+        """
+
+        with self._lock:
+            if series.generation != self.generation or series.nrows < self.consumed:
+                self._reset(series.generation)
+
+            nrows = series.nrows
+            table = series.get_table([self.x_name] + self.y_names, start=self.consumed, stop=nrows)
+            self.consumed = nrows
+            if any(key not in table for key in [self.x_name] + self.y_names):
+                return
+
+            # create new list with added values (1,2,3) + (4,5,6) = (5,7,9)
+            for x, y in zip(table[self.x_name], [sum(values) for values in zip(*[table[key] for key in self.y_names])]):
+                self.x.append(x)
+                self.y.append(y)
+                self.fit.add(x, y)
+
+            if self.window:
+                while self.start < len(self.x) and self.x[self.start] < self.x[-1] - self.window:
+                    self.fit.remove(self.x[self.start], self.y[self.start])
+                    self.start += 1
+
+    def get_fit(self, tails=True):
+        """
+        Return the fit of the points in the window.
+        Without tails, the first HEAD and the last TAIL points of the time series are excluded (they represent memory
+        allocation and de-allocation), if there are enough points.
+
+        :param tails: should tails (first and last values) be used? (boolean).
+        :return: `RunningFit` object, index of the first and after the last fitted point (int).
+        """
+
+        with self._lock:
+            fit = self.fit.copy()
+            first, last = self.start, len(self.x)
+            if not tails and last - first > HEAD + TAIL:
+                for i in range(first, HEAD):
+                    fit.remove(self.x[i], self.y[i])
+                first = max(first, HEAD)
+                for i in range(last - TAIL, last):
+                    fit.remove(self.x[i], self.y[i])
+                last -= TAIL
+
+        return fit, first, last
+
+
+def get_chi2(x, y, slope, intersect):
+    """
+    Return the chi2 sum of the observed values with respect to the line y = slope * x + intersect.
+    As for pilot.util.math.chi2, 0.0 is returned if any of the expected values is zero.
+
+    :param x: list of floats.
+    :param y: list of floats (observed values).
+    :param slope: float.
+    :param intersect: float.
+    :return: chi2 (float).
+    """
+
+    if np is not None:
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        expected = slope * x + intersect
+        if (expected == 0).any():
+            return 0.0
+        return float(((y - expected) ** 2 / expected).sum())
+
+    return chi2(y, [slope * _x + intersect for _x in x])
+
+
+def theil_sen(x, y, max_points=THEIL_SEN_MAX_POINTS):
+    """
+    Theil-Sen estimator: the slope is the median of the slopes of all pairs of points, and the intersect the median of
+    y - slope * x. The estimator is not affected by outliers (e.g. memory spikes), unlike least squares.
+    For more than max_points points, the pairwise slopes are calculated for an evenly spaced subsample.
+
+    :param x: list of floats.
+    :param y: list of floats.
+    :param max_points: maximum number of points used for the pairwise slopes (int).
+    :return: slope (float), intersect (float) (None, None if all x values are equal).
+    """
+
+    n = len(x)
+    if n > max_points:
+        step = float(n - 1) / (max_points - 1)
+        indices = [int(round(i * step)) for i in range(max_points)]
+        _x = [x[i] for i in indices]
+        _y = [y[i] for i in indices]
+    else:
+        _x, _y = x, y
+
+    if np is not None:
+        _x = np.asarray(_x, dtype=float)
+        _y = np.asarray(_y, dtype=float)
+        i, j = np.triu_indices(len(_x), 1)
+        dx = _x[j] - _x[i]
+        mask = dx != 0
+        if not mask.any():
+            return None, None
+        slope = float(np.median((_y[j] - _y[i])[mask] / dx[mask]))
+        intersect = float(np.median(np.asarray(y, dtype=float) - slope * np.asarray(x, dtype=float)))
+    else:
+        slopes = [(_y[j] - _y[i]) / float(_x[j] - _x[i]) for i in range(len(_x)) for j in range(i + 1, len(_x))
+                  if _x[j] != _x[i]]
+        if not slopes:
+            return None, None
+        slope = median(slopes)
+        intersect = median([_y0 - slope * _x0 for _x0, _y0 in zip(x, y)])
+
+    return slope, intersect
+
+
+_series_fits = {}  # (path, x_name, y_name, window) -> SeriesFit
+_series_fits_lock = threading.Lock()
+
+
+def get_series_fit(path, x_name='Time', y_name='pss+swap', window=None):
+    """
+    Return the up-to-date running fit for the given time series file.
+    The object is cached, so that only new rows are read on subsequent calls.
+
+    :param path: path to the file (string).
+    :param x_name: column name (string).
+    :param y_name: column name(s), separated by '+' (string).
+    :param window: optional time window (int).
+    :return: `SeriesFit` object.
+    """
+
+    path = os.path.abspath(path)
+    key = (path, x_name, y_name, window)
+    with _series_fits_lock:
+        for _key in [_key for _key in _series_fits if _key[0] != path and not os.path.exists(_key[0])]:
+            del _series_fits[_key]
+        tracker = _series_fits.get(key)
+        if not tracker:
+            tracker = SeriesFit(x_name=x_name, y_name=y_name, window=window)
+            _series_fits[key] = tracker
+
+    tracker.update(get_time_series(path))
+
+    return tracker
@@ -23,10 +23,14 @@ except Exception:
     pass
 
 from pilot.info import infosys
+from pilot.api.replicas import get_replica_resolver, get_rse_priorities, sort_replicas
+from pilot.api.transferpool import TransferPool
 from pilot.common.exception import PilotException, ErrorCodes, SizeTooLarge, NoLocalSpace, ReplicasNotFound
-from pilot.util.filehandling import calculate_checksum
+from pilot.common.pluginregistry import get_copytool_module
+from pilot.util.checksum import get_checksums_in_parallel
+from pilot.util.config import config
 from pilot.util.math import convert_mb_to_b
-from pilot.util.parameters import get_maximum_input_sizes
+from pilot.util.parameters import get_maximum_input_sizes, convert_to_int
 from pilot.util.workernode import get_local_disk_space
 from pilot.util.timer import TimeoutException
 from pilot.util.tracereport import TraceReport
@@ -53,12 +57,14 @@ class StagingClient(object):
     # list of allowed schemas to be used for transfers from REMOTE sites
     remoteinput_allowed_schemas = ['root', 'gsiftp', 'dcap', 'davs', 'srm', 'storm', 'https']
 
-    def __init__(self, infosys_instance=None, acopytools=None, logger=None, default_copytools='rucio', trace_report=None):  # noqa: C901
+    def __init__(self, infosys_instance=None, acopytools=None, logger=None, default_copytools='rucio', trace_report=None,  # noqa: C901
+                 transfer_threads=0):
         """
             If `acopytools` is not specified then it will be automatically resolved via infosys. In this case `infosys` requires initialization.
             :param acopytools: dict of copytool names per activity to be used for transfers. Accepts also list of names or string value without activity passed.
             :param logger: logging.Logger object to use for logging (None means no logging)
             :param default_copytools: copytool name(s) to be used in case of unknown activity passed. Accepts either list of names or single string value.
+            :param transfer_threads: number of concurrent per-file transfers (e.g. from the pilot options), 0 means use the queuedata/config value.
         """
 
         super(StagingClient, self).__init__()
@@ -69,6 +75,7 @@ class StagingClient(object):
 
         self.logger = logger
         self.infosys = infosys_instance or infosys
+        self.transfer_threads = transfer_threads
 
         try:
             if isinstance(acopytools, basestring):  # Python 2
@@ -177,25 +184,7 @@ class StagingClient(object):
         :return: sorted `replicas`
         """
 
-        if not inputddms:
-            return replicas
-
-        # group replicas by ddmendpoint to properly consider priority of inputddms
-        ddmreplicas = {}
-        for pfn, xdat in replicas:
-            ddmreplicas.setdefault(xdat.get('rse'), []).append((pfn, xdat))
-
-        # process LAN first (keep fspec.inputddms priorities)
-        xreplicas = []
-        for ddm in inputddms:
-            xreplicas.extend(ddmreplicas.get(ddm) or [])
-
-        for pfn, xdat in replicas:
-            if (pfn, xdat) in xreplicas:
-                continue
-            xreplicas.append((pfn, xdat))
-
-        return replicas
+        return sort_replicas(replicas, get_rse_priorities(inputddms))
 
     def resolve_replicas(self, files):  # noqa: C901
         """
@@ -220,29 +209,20 @@ class StagingClient(object):
         if not xfiles:  # no files for replica look-up
             return files
 
-        # load replicas from Rucio
-        from rucio.client import Client
-        c = Client()
-
-        location = self.detect_client_location()
+        # load replicas from Rucio (or from the replica cache)
+        resolver = get_replica_resolver()
+        location = resolver.get_location(self.detect_client_location)
         if not location:
             raise PilotException("Failed to get client location for Rucio", code=ErrorCodes.RUCIOLOCATIONFAILED)
 
-        query = {
-            'schemes': ['srm', 'root', 'davs', 'gsiftp', 'https', 'storm'],
-            'dids': [dict(scope=e.scope, name=e.lfn) for e in xfiles],
-        }
-
-        query.update(sort='geoip', client_location=location)
-        logger.info('calling rucio.list_replicas() with query=%s' % query)
-
+        schemes = ['srm', 'root', 'davs', 'gsiftp', 'https', 'storm']
         try:
-            replicas = c.list_replicas(**query)
+            replicas = resolver.list_replicas([(e.scope, e.lfn) for e in xfiles], schemes, location)
         except Exception as e:
             raise PilotException("Failed to get replicas from Rucio: %s" % e, code=ErrorCodes.RUCIOLISTREPLICASFAILED)
 
-        replicas = list(replicas)
         logger.debug("replicas received from Rucio: %s" % replicas)
+        priorities = {}  # tuple(inputddms) -> {ddmendpoint: priority}, shared by the files with the same inputddms
 
         files_lfn = dict(((e.scope, e.lfn), e) for e in xfiles)
         logger.debug("files_lfn=%s" % files_lfn)
@@ -262,7 +242,10 @@ class StagingClient(object):
                 sorted_replicas = sorted(iter(list(r.get('pfns', {}).items())), key=lambda x: x[1]['priority'])  # Python 3
 
             # prefer replicas from inputddms first
-            xreplicas = self.sort_replicas(sorted_replicas, fdat.inputddms)
+            key = tuple(fdat.inputddms or [])
+            if key not in priorities:
+                priorities[key] = get_rse_priorities(key)
+            xreplicas = sort_replicas(sorted_replicas, priorities[key])
 
             for pfn, xdat in xreplicas:
 
@@ -274,7 +257,7 @@ class StagingClient(object):
                 ## (TEMPORARY?) consider fspec.inputddms as a primary source for local/lan source list definition
                 ## backward compartible logic -- FIX ME LATER if NEED
                 ## in case we should rely on domain value from Rucio, just remove the overwrite line below
-                rinfo['domain'] = 'lan' if rinfo['ddmendpoint'] in fdat.inputddms else 'wan'
+                rinfo['domain'] = 'lan' if rinfo['ddmendpoint'] in priorities[key] else 'wan'
 
                 if not fdat.allow_lan and rinfo['domain'] == 'lan':
                     continue
@@ -364,6 +347,48 @@ class StagingClient(object):
 
         raise NotImplemented()
 
+    def get_transfer_threads(self, copytool, files):
+        """
+            Resolve the number of concurrent per-file transfers to be used for given `files` and `copytool`.
+            Only copytools declaring `allow_concurrent_transfers` are run through the transfer pool.
+            The value given to the client (pilot option) is used primarily, then the queuedata value (transfer_threads),
+            the pilot config value (default: 1, i.e. serial transfers) is used as fall-back.
+            :param copytool: copytool module
+            :param files: list of `FileSpec` objects
+            :return: number of transfer threads (int); 1 means serial transfer
+        """
+
+        if not getattr(copytool, 'allow_concurrent_transfers', False) or len(files) < 2:
+            return 1
+
+        nthreads = self.transfer_threads
+        if not nthreads and self.infosys and self.infosys.queuedata:
+            nthreads = self.infosys.queuedata.transfer_threads
+        if not nthreads:
+            nthreads = convert_to_int(getattr(config.Pilot, 'transfer_threads', 1), default=1)
+
+        return max(1, min(nthreads, len(files)))
+
+    def transfer_concurrently(self, func, files, nthreads, **kwargs):
+        """
+            Transfer given `files` through a bounded pool of per-file transfers.
+            The number of concurrent transfers per ddmendpoint is capped by queuedata.rse_transfer_threads.
+            :param func: copytool transfer function (copy_in or copy_out)
+            :param files: list of `FileSpec` objects
+            :param nthreads: maximum number of concurrent transfers
+            :param kwargs: extra kwargs to be passed to copytool transfer handler
+            :raise: PilotException in case of controlled error
+            :return: list of processed `FileSpec` objects
+        """
+
+        rse_limits = {}
+        if self.infosys and self.infosys.queuedata:
+            rse_limits = self.infosys.queuedata.rse_transfer_threads or {}
+
+        pool = TransferPool(nthreads, rse_limits=rse_limits, logger=self.logger)
+
+        return pool.run(func, files, **kwargs)
+
     def transfer(self, files, activity='default', **kwargs):  # noqa: C901
         """
             Automatically stage passed files using copy tools related to given `activity`
@@ -433,7 +458,7 @@ class StagingClient(object):
 
                 module = self.copytool_modules[name]['module_name']
                 self.logger.info('trying to use copytool=%s for activity=%s' % (name, activity))
-                copytool = __import__('pilot.copytool.%s' % module, globals(), locals(), [module], 0)  # Python 2/3
+                copytool = get_copytool_module(module)
                 self.trace_report.update(protocol=name)
 
             except PilotException as e:
@@ -467,6 +492,9 @@ class StagingClient(object):
         remain_files = [f for f in files if f.status not in ['remote_io', 'transferred', 'no_transfer']]
 
         if remain_files:  ## failed or incomplete transfer
+            if self.mode == 'stage-in':  # the cached replicas may be outdated
+                get_replica_resolver().invalidate([(f.scope, f.lfn) for f in remain_files])
+
             # Propagate message from first error back up
             errmsg = str(caught_errors[0]) if caught_errors else ''
             if caught_errors and "Cannot authenticate" in str(caught_errors):
@@ -794,6 +822,11 @@ class StageInClient(StagingClient):
         # use bulk downloads if necessary
         # if kwargs['use_bulk_transfer']
         # return copytool.copy_in_bulk(remain_files, **kwargs)
+        nthreads = self.get_transfer_threads(copytool, remain_files)
+        if nthreads > 1:
+            self.logger.info('using %d concurrent transfers for stage-in' % nthreads)
+            return self.transfer_concurrently(copytool.copy_in, remain_files, nthreads, **kwargs)
+
         return copytool.copy_in(remain_files, **kwargs)
 
     def set_status_for_direct_access(self, files):
@@ -981,6 +1014,7 @@ class StageOutClient(StagingClient):
 
         # check if files exist before actual processing
         # populate filesize if need, calc checksum
+        pending = []  # files without checksum
         for fspec in files:
 
             if not fspec.ddmendpoint:  # ensure that output destination is properly set
@@ -1006,7 +1040,12 @@ class StageOutClient(StagingClient):
             fspec.surl = pfn
             fspec.activity = activity
             if not fspec.checksum.get('adler32'):
-                fspec.checksum['adler32'] = calculate_checksum(pfn)
+                pending.append(fspec)
+
+        # calculate the missing checksums in parallel (the values are cached for the verification after the transfer)
+        checksums = get_checksums_in_parallel([fspec.surl for fspec in pending], algorithm='adler32')
+        for fspec, checksum in zip(pending, checksums):
+            fspec.checksum['adler32'] = checksum
 
         # prepare files (resolve protocol/transfer url)
         if getattr(copytool, 'require_protocols', True) and files:
@@ -1033,6 +1072,13 @@ class StageOutClient(StagingClient):
         # add the trace report
         kwargs['trace_report'] = self.trace_report
 
+        # single files are also sent through the transfer pool, so that e.g. the log transfer respects the per-RSE
+        # limits shared with the output transfers running at the same time
+        if getattr(copytool, 'allow_concurrent_transfers', False):
+            nthreads = self.get_transfer_threads(copytool, files)
+            self.logger.info('using %d concurrent transfer(s) for stage-out' % nthreads)
+            return self.transfer_concurrently(copytool.copy_out, files, nthreads, **kwargs)
+
         return copytool.copy_out(files, **kwargs)
 
 #class StageInClientAsync(object):
@@ -9,6 +9,7 @@
 
 from os import getcwd
 from .services import Services
+from pilot.common.pluginregistry import get_user_module
 
 import logging
 logger = logging.getLogger(__name__)
@@ -38,7 +39,7 @@ class MemoryMonitoring(Services):
             self.workdir = getcwd()
 
         if self.user:
-            user_utility = __import__('pilot.user.%s.utilities' % self.user, globals(), locals(), [self.user], 0)  # Python 2/3
+            user_utility = get_user_module('utilities', self.user)
             self._cmd = user_utility.get_memory_monitor_setup(self.pid, self.workdir)
 
     def get_command(self):
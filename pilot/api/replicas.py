@@ -0,0 +1,252 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+"""
+Replica resolution with caching, used by the stage-in client of the Data API.
+
+The Rucio client and the client location (which requires UDP sockets and a DNS look-up) are created once per pilot.
+The replicas returned by Rucio are cached per (scope, lfn) for a limited time, so that consecutive jobs of a
+multi-job pilot (and the separate stage-in processes) only query Rucio for files that have not been resolved
+recently. The cache is stored in a JSON file in PILOT_HOME.
+"""
+
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+
+from pilot.util.config import config
+from pilot.util.parameters import convert_to_int
+
+import logging
+logger = logging.getLogger(__name__)
+
+CACHE_FILE = 'replica_cache.json'
+
+
+def get_rse_priorities(inputddms):
+    """
+    Return the priority map of the given ddmendpoints (RSEs): the position in the list, lower is better.
+
+    :param inputddms: ordered list of preferred ddmendpoints.
+    :return: dictionary {ddmendpoint: priority}.
+    """
+
+    priorities = {}
+    for i, ddm in enumerate(inputddms or []):
+        priorities.setdefault(ddm, i)
+
+    return priorities
+
+
+def sort_replicas(replicas, priorities):
+    """
+    Sort the replicas by the priority of their ddmendpoints; replicas from other ddmendpoints follow in the
+    original order.
+
+    :param replicas: prioritized list of replicas [(pfn, dat)].
+    :param priorities: dictionary {ddmendpoint: priority} (see get_rse_priorities()).
+    :return: sorted list of replicas.
+    """
+
+    if not priorities:
+        return list(replicas)
+
+    other = len(priorities)
+
+    return sorted(replicas, key=lambda replica: priorities.get(replica[1].get('rse'), other))  # stable sort
+
+
+class ReplicaResolver(object):
+    """
+    Rucio replica look-up with a shared client, a memoized client location and a time-limited replica cache.
+    """
+
+    def __init__(self, ttl=1800, path=None):
+        """
+        :param ttl: lifetime of the cached replicas in seconds (int). 0 disables the cache.
+        :param path: optional path to the cache file (string).
+        """
+
+        self.ttl = ttl
+        self.path = path
+        self._client = None
+        self._location = None
+        self._cache = {}  # (scope, lfn) -> (time stamp, replica dictionary)
+        self._query = None  # query parameters of the cached replicas
+        self._mtime = None  # modification time of the cache file when it was last read or written
+        self._lock = threading.Lock()
+
+    def get_client(self):
+        """
+        Return the Rucio client (created on first use).
+
+        :return: `rucio.client.Client` object.
+        """
+
+        if not self._client:
+            from rucio.client import Client
+            self._client = Client()
+
+        return self._client
+
+    def get_location(self, detect):
+        """
+        Return the client location, detected on first use (or while it is unknown).
+
+        :param detect: function returning the location dictionary.
+        :return: location dictionary (None if it could not be detected).
+        """
+
+        site = os.environ.get('PILOT_RUCIO_SITENAME', 'unknown')
+        if not self._location or self._location.get('site') != site:
+            self._location = detect()
+
+        return self._location
+
+    def _load(self):
+        """
+        Merge the cache file into the cache, if it was modified by another process (e.g. a stage-in script).
+        Must be called with the lock.
+
+        :return:
+        """
+
+        if not self.path:
+            return
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        self._mtime = mtime
+
+        try:
+            with io.open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if self._query is not None and data['query'] != self._query:
+                return
+            self._query = data['query']
+            for entry in data['replicas']:
+                did = (entry['scope'], entry['name'])
+                if did not in self._cache or self._cache[did][0] < entry['time']:
+                    self._cache[did] = (entry['time'], entry['replica'])
+        except (IOError, OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning('ignoring replica cache %s: %s' % (self.path, e))
+        else:
+            logger.debug('read %d cached replica(s) from %s' % (len(data['replicas']), self.path))
+
+    def _save(self):
+        """
+        Write the cache file. Must be called with the lock.
+
+        :return:
+        """
+
+        if not self.path:
+            return
+
+        entries = [{'scope': scope, 'name': name, 'time': t, 'replica': replica}
+                   for (scope, name), (t, replica) in self._cache.items()]
+        tmpname = None
+        try:
+            # a unique temporary file per writer, so that concurrent pilots do not write to the same file
+            fd, tmpname = tempfile.mkstemp(prefix=os.path.basename(self.path) + '.', suffix='.tmp',
+                                           dir=os.path.dirname(os.path.abspath(self.path)))
+            os.chmod(tmpname, 0o644)  # as readable as a file created with the default umask
+            with io.open(fd, 'w', encoding='utf-8') as f:
+                f.write(u'%s' % json.dumps({'query': self._query, 'replicas': entries}, default=str))
+            os.rename(tmpname, self.path)  # other processes only see complete files
+            tmpname = None
+            self._mtime = os.path.getmtime(self.path)
+        except (IOError, OSError) as e:
+            logger.warning('failed to write replica cache %s: %s' % (self.path, e))
+        if tmpname and os.path.exists(tmpname):
+            os.remove(tmpname)
+
+    def list_replicas(self, dids, schemes, location):
+        """
+        Return the replicas of the given files, from the cache or from Rucio (in one query for all missing files).
+
+        :param dids: list of (scope, lfn) tuples.
+        :param schemes: list of protocol schemes.
+        :param location: client location dictionary.
+        :raise: Exception from the Rucio client.
+        :return: list of replica dictionaries (as returned by rucio list_replicas()).
+        """
+
+        query = {'schemes': sorted(schemes), 'site': location.get('site'), 'ip': location.get('ip')}
+        now = time.time()
+        with self._lock:
+            self._load()
+            if query != self._query:  # the cached replicas were sorted for another location or other schemes
+                self._cache = {}
+                self._query = query
+            for did in [did for did, (t, _) in self._cache.items() if now - t > self.ttl]:
+                del self._cache[did]
+            cached = [self._cache[did][1] for did in dids if did in self._cache]
+            missing = [did for did in dids if did not in self._cache]
+
+        if cached:
+            logger.info('using cached replicas for %d file(s)' % len(cached))
+        if not missing:
+            return cached
+
+        _query = {'schemes': schemes,
+                  'dids': [dict(scope=scope, name=lfn) for scope, lfn in missing],
+                  'sort': 'geoip',
+                  'client_location': location}
+        logger.info('calling rucio.list_replicas() with query=%s' % _query)
+        replicas = list(self.get_client().list_replicas(**_query))
+
+        if self.ttl > 0:
+            with self._lock:
+                for replica in replicas:
+                    self._cache[(replica['scope'], replica['name'])] = (now, replica)
+                self._save()
+
+        return cached + replicas
+
+    def invalidate(self, dids):
+        """
+        Remove the given files from the cache (e.g. after a failed transfer).
+
+        :param dids: list of (scope, lfn) tuples.
+        :return:
+        """
+
+        with self._lock:
+            self._load()
+            removed = [self._cache.pop(did, None) for did in dids]
+            if any(removed):
+                self._save()
+
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def get_replica_resolver():
+    """
+    Return the pilot replica resolver (the cache file is located in PILOT_HOME, or in the current directory).
+
+    :return: `ReplicaResolver` object.
+    """
+
+    global _resolver
+    with _resolver_lock:
+        if not _resolver:
+            ttl = convert_to_int(getattr(config.Rucio, 'replica_cache_ttl', 1800), default=1800)
+            path = os.path.join(os.environ.get('PILOT_HOME', os.getcwd()), CACHE_FILE)
+            _resolver = ReplicaResolver(ttl=ttl, path=path)
+
+    return _resolver
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+"""
+Bounded pool of concurrent per-file transfers used by the Data API.
+
+Each file is handed to the copytool transfer function as a single-element list, so the copytools keep their
+serial per-file logic (status, error codes and traces) while several files are moved at the same time.
+The number of simultaneous transfers is capped per pool and per DDM endpoint (RSE). The per-RSE counters are shared
+by all pools, so that concurrent transfers (e.g. the output files and the log file) stay within the RSE limits.
+"""
+
+import copy
+import logging
+import threading
+
+_active = {}  # number of running transfers per ddmendpoint (shared by all pools)
+_condition = threading.Condition()
+
+
+class TransferPool(object):
+    """
+    Run a bounded number of per-file transfers concurrently.
+    """
+
+    def __init__(self, nthreads, rse_limits=None, logger=None):
+        """
+        :param nthreads: maximum number of concurrent transfers (int).
+        :param rse_limits: optional dictionary of maximum concurrent transfers per ddmendpoint; the 'default' key
+        applies to all endpoints not explicitly listed (dict).
+        :param logger: logging.Logger object to use for logging.
+        """
+
+        self.nthreads = max(1, nthreads)
+        self.rse_limits = rse_limits or {}
+        self.logger = logger or logging.getLogger(__name__)
+
+    def get_rse_limit(self, ddmendpoint):
+        """
+        Return the maximum number of concurrent transfers allowed for the given ddmendpoint.
+        The limit is not capped by the number of threads of this pool since the per-RSE counters are shared with
+        the other pools (a single-threaded pool must still be able to start a transfer while another pool is busy
+        with the same ddmendpoint).
+
+        :param ddmendpoint: ddmendpoint name (string).
+        :return: limit (int), None if there is no limit for the ddmendpoint.
+        """
+
+        limit = self.rse_limits.get(ddmendpoint) or self.rse_limits.get('default')
+        if not limit:
+            return None
+        try:
+            limit = int(limit)
+        except (TypeError, ValueError):
+            return None
+
+        return max(1, limit)
+
+    def run(self, func, files, **kwargs):  # noqa: C901
+        """
+        Transfer the given files concurrently with the copytool function `func` (e.g. copytool.copy_in).
+
+        Every transfer receives its own copy of the trace report (kwargs['trace_report']) since the copytools update
+        the report per file. No new transfers are started once a transfer has failed (as for the serial transfer
+        where the copytool stops at the first failure); the remaining files keep their status and can be picked up
+        by the next copytool.
+
+        :param func: copytool transfer function taking a list of `FileSpec` objects.
+        :param files: list of `FileSpec` objects.
+        :param kwargs: extra kwargs to be passed to the copytool transfer function.
+        :raise: the exception of the first failed file (in the order of `files`).
+        :return: list of processed `FileSpec` objects.
+        """
+
+        pending = list(files)
+        active = _active  # number of running transfers per ddmendpoint
+        errors = []  # list of (file index, exception)
+        cond = _condition
+        trace_report = kwargs.pop('trace_report', None)
+
+        def get_next():
+            with cond:
+                while pending and not errors:
+                    for i, fspec in enumerate(pending):
+                        limit = self.get_rse_limit(fspec.ddmendpoint)
+                        if limit is None or active.get(fspec.ddmendpoint, 0) < limit:
+                            active[fspec.ddmendpoint] = active.get(fspec.ddmendpoint, 0) + 1
+                            return pending.pop(i)
+                    cond.wait()  # all remaining files are waiting for a busy ddmendpoint
+
+        def worker():
+            while True:
+                fspec = get_next()
+                if fspec is None:
+                    break
+                error = None
+                try:
+                    func([fspec], trace_report=copy.copy(trace_report), **kwargs)
+                except Exception as e:
+                    error = e
+                    self.logger.warning('transfer of lfn=%s failed: %s' % (fspec.lfn, e))
+                with cond:
+                    active[fspec.ddmendpoint] -= 1
+                    if error is not None:
+                        errors.append((files.index(fspec), error))
+                    cond.notify_all()
+
+        nworkers = min(self.nthreads, len(files))
+        self.logger.info('starting %d transfer threads for %d files (rse limits: %s)' %
+                         (nworkers, len(files), self.rse_limits or 'none'))
+
+        threads = [threading.Thread(target=worker, name='transfer-%d' % i) for i in range(nworkers)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            if pending:
+                self.logger.warning('%d file(s) were not transferred due to previous failure' % len(pending))
+            raise sorted(errors, key=lambda x: x[0])[0][1]
+
+        return files
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+"""
+Registry of the pilot plugin modules (user, copytool and resource modules).
+
+The modules are imported on first use and the module handles are cached, so that functions that are called
+frequently (e.g. container.execute() or the monitoring checks) do not need to go through the import machinery.
+"""
+
+import os
+from importlib import import_module
+
+import logging
+logger = logging.getLogger(__name__)
+
+_modules = {}  # full module name -> module
+
+
+def get_module(name):
+    """
+    Return the given module, imported on first use.
+
+    :param name: full module name (string).
+    :raise: ImportError if the module cannot be imported.
+    :return: module.
+    """
+
+    module = _modules.get(name)
+    if module is None:
+        module = import_module(name)
+        _modules[name] = module  # import_module() is thread-safe, so at worst the same module is stored twice
+
+    return module
+
+
+def get_pilot_user():
+    """
+    Return the pilot user (experiment) name.
+
+    :return: pilot user (lower case string, default 'generic').
+    """
+
+    return os.environ.get('PILOT_USER', 'generic').lower()
+
+
+def get_user_module(name, user=None):
+    """
+    Return the given user (experiment) specific module, e.g. pilot.user.atlas.common.
+
+    :param name: module name in the user package (string), e.g. 'common'.
+    :param user: optional pilot user (string, default: from PILOT_USER).
+    :raise: ImportError if the module cannot be imported.
+    :return: module.
+    """
+
+    return get_module('pilot.user.%s.%s' % ((user or get_pilot_user()).lower(), name))
+
+
+def get_copytool_module(name):
+    """
+    Return the given copytool module, e.g. pilot.copytool.rucio.
+
+    :param name: copytool module name (string).
+    :raise: ImportError if the module cannot be imported.
+    :return: module.
+    """
+
+    return get_module('pilot.copytool.%s' % name)
+
+
+def get_resource_module(name):
+    """
+    Return the given resource module, e.g. pilot.resource.titan.
+
+    :param name: resource module name (string).
+    :raise: ImportError if the module cannot be imported.
+    :return: module.
+    """
+
+    return get_module('pilot.resource.%s' % name)
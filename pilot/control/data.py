@@ -14,6 +14,7 @@
 import copy as objectcopy
 import os
 import subprocess
+import threading
 #import tarfile
 import time
 
@@ -29,13 +30,18 @@ from pilot.api.es_data import StageInESClient
 from pilot.control.job import send_state
 from pilot.common.errorcodes import ErrorCodes
 from pilot.common.exception import ExcThread, PilotException, LogFileCreationFailure
+from pilot.common.pluginregistry import get_user_module
+from pilot.util.archive import create_archive
 from pilot.util.auxiliary import get_logger, set_pilot_state, check_for_final_server_update  #, abort_jobs_in_queues
 from pilot.util.common import should_abort
 from pilot.util.config import config
 from pilot.util.constants import PILOT_PRE_STAGEIN, PILOT_POST_STAGEIN, PILOT_PRE_STAGEOUT, PILOT_POST_STAGEOUT,\
-    LOG_TRANSFER_IN_PROGRESS, LOG_TRANSFER_DONE, LOG_TRANSFER_NOT_DONE, LOG_TRANSFER_FAILED, SERVER_UPDATE_RUNNING, MAX_KILL_WAIT_TIME
-from pilot.util.container import execute
+    LOG_TRANSFER_IN_PROGRESS, LOG_TRANSFER_DONE, LOG_TRANSFER_NOT_DONE, LOG_TRANSFER_FAILED, SERVER_UPDATE_RUNNING, MAX_KILL_WAIT_TIME, \
+    PILOT_PRE_LOG_TAR, PILOT_POST_LOG_TAR
+from pilot.util.eventbus import bus
 from pilot.util.filehandling import find_executable, remove  #, write_json, copy
+from pilot.util.math import human2bytes
+from pilot.util.parameters import convert_to_int
 from pilot.util.timing import add_to_pilot_timing
 from pilot.util.tracereport import TraceReport
 from pilot.util.queuehandling import declare_failed_by_kill, put_in_queue
@@ -184,10 +190,12 @@ def _stage_in(args, job):
 
     try:
         if job.is_eventservicemerge:
-            client = StageInESClient(job.infosys, logger=log, trace_report=trace_report)
+            client = StageInESClient(job.infosys, logger=log, trace_report=trace_report,
+                                     transfer_threads=args.transfer_threads)
             activity = 'es_events_read'
         else:
-            client = StageInClient(job.infosys, logger=log, trace_report=trace_report)
+            client = StageInClient(job.infosys, logger=log, trace_report=trace_report,
+                                   transfer_threads=args.transfer_threads)
             activity = 'pr'
         kwargs = dict(workdir=job.workdir, cwd=job.workdir, usecontainer=False, job=job, use_bulk=False)
         client.prepare_sources(job.indata)
@@ -404,7 +412,6 @@ def copytool_in(queues, traces, args):
     """
 
     while not args.graceful_stop.is_set():
-        time.sleep(0.5)
         try:
             # abort if kill signal arrived too long time ago, ie loop is stuck
             current_time = int(time.time())
@@ -446,7 +453,7 @@ def copytool_in(queues, traces, args):
                 # now create input file metadata if required by the payload
                 try:
                     pilot_user = os.environ.get('PILOT_USER', 'generic').lower()
-                    user = __import__('pilot.user.%s.metadata' % pilot_user, globals(), locals(), [pilot_user], 0)  # Python 2/3
+                    user = get_user_module('metadata', pilot_user)
                     _dir = '/srv' if job.usecontainer else job.workdir
                     file_dictionary = get_input_file_dictionary(job.indata, _dir)
                     #file_dictionary = get_input_file_dictionary(job.indata, job.workdir)
@@ -493,16 +500,14 @@ def copytool_out(queues, traces, args):
 #    while not args.graceful_stop.is_set() and cont:
     while cont:
 
-        time.sleep(0.5)
-
         # abort if kill signal arrived too long time ago, ie loop is stuck
         current_time = int(time.time())
         if args.kill_time and current_time - args.kill_time > MAX_KILL_WAIT_TIME:
             logger.warning('loop has run for too long time after first kill signal - will abort')
             break
 
-        # check for abort, print useful messages and include a 1 s sleep
-        abort = should_abort(args, label='data:copytool_out')
+        # check for abort and print useful messages (the 1 s wait is done by the queue below)
+        abort = should_abort(args, label='data:copytool_out', timeout=0)
         try:
             job = queues.data_out.get(block=True, timeout=1)
             if job:
@@ -515,6 +520,10 @@ def copytool_out(queues, traces, args):
                     declare_failed_by_kill(job, queues.failed_data_out, args.signal)
                     break
 
+                # the next job can be prefetched while the output and log files of a successful payload are staged out
+                if job.stageout == 'all':
+                    args.slots.start_stageout(job.jobid)
+
                 if _stage_out_new(job, args):
                     if args.abort_job.is_set():
                         traces.pilot['command'] = 'abort'
@@ -588,12 +597,35 @@ def filter_files_for_log(directory):
     return filtered_files
 
 
-def create_log(job, logfile, tarball_name):
+def get_output_filter(workdir, output_files, exclude=None):
+    """
+    Return a function that identifies the output files in the given workdir (in addition to the paths identified by
+    the optional exclude function), to skip them when creating the log file.
+
+    :param workdir: working directory (string).
+    :param output_files: list of output file names.
+    :param exclude: optional function returning True for paths that should be skipped.
+    :return: function (path) returning True for paths that should be skipped.
     """
 
-    :param job:
-    :param logfile:
-    :param tarball_name:
+    paths = set(os.path.join(os.path.abspath(workdir), f) for f in output_files)
+
+    def is_excluded(path):
+        return os.path.abspath(path) in paths or (exclude is not None and exclude(path))
+
+    return is_excluded
+
+
+def create_log(job, logfile, tarball_name, keep_outputs=False):
+    """
+    Create the log tarball from the job work directory.
+    Redundant files (user specific) are skipped while walking the work directory and the tarball is compressed in
+    parallel.
+
+    :param job: job object.
+    :param logfile: log file spec (FileSpec object).
+    :param tarball_name: name of the top directory in the tarball (string).
+    :param keep_outputs: skip the output files instead of removing them, e.g. while they are being staged out (Boolean).
     :raises LogFileCreationFailure: in case of log file creation problem
     :return:
     """
@@ -603,53 +635,35 @@ def create_log(job, logfile, tarball_name):
 
     # perform special cleanup (user specific) prior to log file creation
     pilot_user = os.environ.get('PILOT_USER', 'generic').lower()
-    user = __import__('pilot.user.%s.common' % pilot_user, globals(), locals(), [pilot_user], 0)  # Python 2/3
-    user.remove_redundant_files(job.workdir)
+    user = get_user_module('common', pilot_user)
+    user.remove_redundant_files(job.workdir, redundants=False)
 
     input_files = [e.lfn for e in job.indata]
     output_files = [e.lfn for e in job.outdata]
 
     # remove any present input/output files before tarring up workdir
-    for f in input_files + output_files:
+    for f in input_files + ([] if keep_outputs else output_files):
         path = os.path.join(job.workdir, f)
         if os.path.exists(path):
             log.info('removing file: %s' % path)
             remove(path)
 
-    # rename the workdir for the tarball creation
-    newworkdir = os.path.join(os.path.dirname(job.workdir), tarball_name)
-    orgworkdir = job.workdir
-    log.debug('renaming %s to %s' % (job.workdir, newworkdir))
-    os.rename(job.workdir, newworkdir)
-    job.workdir = newworkdir
+    exclude = user.get_redundant_filter(job.workdir)
+    if keep_outputs and output_files:
+        exclude = get_output_filter(job.workdir, output_files, exclude)
 
     fullpath = os.path.join(job.workdir, logfile.lfn)  # /some/path/to/dirname/log.tgz
 
     log.info('will create archive %s' % fullpath)
     try:
-        #newdirnm = "tarball_PandaJob_%s" % job.jobid
-        #tarballnm = "%s.tar.gz" % newdirnm
-        #os.rename(job.workdir, newdirnm)
-        cmd = "pwd;tar cvfz %s %s --dereference --one-file-system; echo $?" % (fullpath, tarball_name)
-        exit_code, stdout, stderr = execute(cmd)
-        #with closing(tarfile.open(name=fullpath, mode='w:gz', dereference=True)) as archive:
-        #    archive.add(os.path.basename(job.workdir), recursive=True)
+        nfiles, size, skipped = create_archive(fullpath, job.workdir, arcname=tarball_name,
+                                               exclude=exclude,
+                                               max_size=human2bytes(config.Pilot.maximum_log_content_size),
+                                               nthreads=convert_to_int(config.Pilot.log_compression_threads, default=4))
     except Exception as e:
         raise LogFileCreationFailure(e)
     else:
-        log.debug('stdout = %s' % stdout)
-    log.debug('renaming %s back to %s' % (job.workdir, orgworkdir))
-    try:
-        os.rename(job.workdir, orgworkdir)
-    except Exception as e:
-        log.debug('exception caught: %s' % e)
-    job.workdir = orgworkdir
-
-    #fullpath = os.path.join(job.workdir, logfile.lfn)  # reset fullpath since workdir has changed since above
-    #return {'scope': logfile.scope,
-    #        'name': logfile.lfn,
-    #        'guid': logfile.guid,
-    #        'bytes': os.stat(fullpath).st_size}
+        log.info('added %d files (%d B) to %s' % (nfiles, size, fullpath))
 
 
 def _do_stageout(job, xdata, activity, title):
@@ -714,6 +728,107 @@ def _do_stageout(job, xdata, activity, title):
     return not remain_files
 
 
+class OutputStageOut(threading.Thread):
+    """
+    Stage-out of the output files in a separate thread, so that the log file can be created (and transferred) while
+    the output files are being transferred.
+    """
+
+    def __init__(self, job):
+        """
+        :param job: job object.
+        """
+
+        super(OutputStageOut, self).__init__(name='stageout-outputs-%s' % job.jobid)
+        self.daemon = True
+        self.job = job
+        self.is_success = False
+
+    def run(self):
+        """
+        Stage-out the output files of the job. The result is stored in self.is_success.
+
+        :return:
+        """
+
+        try:
+            self.is_success = _do_stageout(self.job, self.job.outdata, ['pw', 'w'], title='output')
+        except Exception as e:
+            get_logger(self.job.jobid).warning('output stage-out thread caught exception: %s' % e)
+
+
+def _start_output_stageout(job, in_background=False):
+    """
+    Start the stage-out of the output files.
+
+    :param job: job object.
+    :param in_background: transfer the output files in a separate thread (Boolean).
+    :return: `OutputStageOut` object (None if the files were transferred directly), False if the transfer failed.
+    """
+
+    if in_background:
+        outputs = OutputStageOut(job)
+        outputs.start()
+        return outputs, True
+
+    if not _do_stageout(job, job.outdata, ['pw', 'w'], title='output'):
+        get_logger(job.jobid).warning('transfer of output file(s) failed')
+        return None, False
+
+    return None, True
+
+
+def _join_output_stageout(job, outputs):
+    """
+    Wait for the output stage-out thread (if any).
+
+    :param job: job object.
+    :param outputs: `OutputStageOut` object (or None).
+    :return: False if the transfer of the output files failed, True otherwise.
+    """
+
+    if not outputs:
+        return True
+
+    outputs.join()
+    if not outputs.is_success:
+        get_logger(job.jobid).warning('transfer of output file(s) failed')
+        return False
+
+    return True
+
+
+def _stage_out_log(job, args, keep_outputs=False):
+    """
+    Create the log file (consider only the 1st available log file) and transfer it.
+    The LOG_TRANSFER status of the job is left in progress; it is up to the caller to set the returned status.
+
+    :param job: job object.
+    :param args: pilot args object.
+    :param keep_outputs: keep the output files in the work directory, since they are still being transferred (Boolean).
+    :raise: LogFileCreationFailure in case the log file could not be created.
+    :return: LOG_TRANSFER_DONE or LOG_TRANSFER_FAILED.
+    """
+
+    log = get_logger(job.jobid)
+
+    job.status['LOG_TRANSFER'] = LOG_TRANSFER_IN_PROGRESS
+    logfile = job.logdata[0]
+
+    try:
+        add_to_pilot_timing(job.jobid, PILOT_PRE_LOG_TAR, time.time(), args)
+        create_log(job, logfile, 'tarball_PandaJob_%s_%s' % (job.jobid, job.infosys.pandaqueue),
+                   keep_outputs=keep_outputs)
+    finally:
+        add_to_pilot_timing(job.jobid, PILOT_POST_LOG_TAR, time.time(), args)
+
+    if not _do_stageout(job, [logfile], ['pl', 'pw', 'w'], title='log'):
+        log.warning('log transfer failed')
+        return LOG_TRANSFER_FAILED
+
+    return LOG_TRANSFER_DONE
+
+
 def _stage_out_new(job, args):
     """
     Stage-out of all output files.
@@ -739,35 +854,37 @@ def _stage_out_new(job, args):
         log.info('this job does not have any output files, only stage-out log file')
         job.stageout = 'log'
 
+    stageout_log = job.stageout in ['log', 'all'] and job.logdata
+    outputs = None
     if job.stageout != 'log':  ## do stage-out output files
-        if not _do_stageout(job, job.outdata, ['pw', 'w'], title='output'):
-            is_success = False
-            log.warning('transfer of output file(s) failed')
+        # the log file is created (and transferred) while the output files are being transferred
+        outputs, is_success = _start_output_stageout(job, in_background=bool(stageout_log))
 
-    if job.stageout in ['log', 'all'] and job.logdata:  ## do stage-out log files
-        # prepare log file, consider only 1st available log file
+    log_status = None
+    if stageout_log:  ## do stage-out log files
         status = job.get_status('LOG_TRANSFER')
         if status != LOG_TRANSFER_NOT_DONE:
             log.warning('log transfer already attempted')
+            _join_output_stageout(job, outputs)
             return False
 
-        job.status['LOG_TRANSFER'] = LOG_TRANSFER_IN_PROGRESS
-        logfile = job.logdata[0]
-
         try:
-            create_log(job, logfile, 'tarball_PandaJob_%s_%s' % (job.jobid, job.infosys.pandaqueue))
+            log_status = _stage_out_log(job, args, keep_outputs=outputs is not None)
         except LogFileCreationFailure as e:
             log.warning('failed to create tar file: %s' % e)
+            _join_output_stageout(job, outputs)
             set_pilot_state(job=job, state="failed")
             job.piloterrorcodes, job.piloterrordiags = errors.add_error_code(errors.LOGFILECREATIONFAILURE)
             return False
 
-        if not _do_stageout(job, [logfile], ['pl', 'pw', 'w'], title='log'):
+    if not _join_output_stageout(job, outputs):
+        is_success = False
+
+    # the log transfer is only reported as done once the output files have been transferred as well
+    if log_status:
+        job.status['LOG_TRANSFER'] = log_status
+        if log_status == LOG_TRANSFER_FAILED:
             is_success = False
-            log.warning('log transfer failed')
-            job.status['LOG_TRANSFER'] = LOG_TRANSFER_FAILED
-        else:
-            job.status['LOG_TRANSFER'] = LOG_TRANSFER_DONE
 
     # write time stamps to pilot timing file
     add_to_pilot_timing(job.jobid, PILOT_POST_STAGEOUT, time.time(), args)
@@ -817,21 +934,17 @@ def queue_monitoring(queues, traces, args):
     """
 
     while True:  # will abort when graceful_stop has been set
-        time.sleep(0.5)
         if traces.pilot['command'] == 'abort':
             logger.warning('data queue monitor saw the abort instruction')
             args.graceful_stop.set()
 
         # abort in case graceful_stop has been set, and less than 30 s has passed since MAXTIME was reached (if set)
         # (abort at the end of the loop)
-        abort = should_abort(args, label='data:queue_monitoring')
+        abort = should_abort(args, label='data:queue_monitoring', timeout=0)
 
-        # monitor the failed_data_in queue
-        try:
-            job = queues.failed_data_in.get(block=True, timeout=1)
-        except queue.Empty:
-            pass
-        else:
+        # monitor the failed_data_in, finished_data_out and failed_data_out queues at the same time
+        index, job = bus.get([queues.failed_data_in, queues.finished_data_out, queues.failed_data_out], timeout=1)
+        if index == 0:
             log = get_logger(job.jobid)
 
             # stage-out log file then add the job to the failed_jobs queue
@@ -849,12 +962,7 @@ def queue_monitoring(queues, traces, args):
                 #queues.failed_jobs.put(job)
                 put_in_queue(job, queues.failed_jobs)
 
-        # monitor the finished_data_out queue
-        try:
-            job = queues.finished_data_out.get(block=True, timeout=1)
-        except queue.Empty:
-            pass
-        else:
+        elif index == 1:
             log = get_logger(job.jobid)
 
             # use the payload/transform exitCode from the job report if it exists
@@ -867,12 +975,7 @@ def queue_monitoring(queues, traces, args):
                 #queues.failed_jobs.put(job)
                 put_in_queue(job, queues.failed_jobs)
 
-        # monitor the failed_data_out queue
-        try:
-            job = queues.failed_data_out.get(block=True, timeout=1)
-        except queue.Empty:
-            pass
-        else:
+        elif index == 2:
             log = get_logger(job.jobid)
 
             # attempt to upload the log in case the previous stage-out failure was not an SE error
@@ -13,6 +13,7 @@
 from __future__ import print_function  # Python 2
 
 import os
+import threading
 import time
 import hashlib
 
@@ -26,6 +27,7 @@ from re import findall
 
 from pilot.common.errorcodes import ErrorCodes
 from pilot.common.exception import ExcThread, PilotException  #, JobAlreadyRunning
+from pilot.common.pluginregistry import get_user_module
 from pilot.info import infosys, JobData, InfoService, JobInfoProvider
 from pilot.util import https
 from pilot.util.auxiliary import get_batchsystem_jobid, get_job_scheduler_id, get_pilot_id, get_logger, \
@@ -35,17 +37,21 @@ from pilot.util.common import should_abort
 from pilot.util.constants import PILOT_MULTIJOB_START_TIME, PILOT_PRE_GETJOB, PILOT_POST_GETJOB, PILOT_KILL_SIGNAL, LOG_TRANSFER_NOT_DONE, \
     LOG_TRANSFER_IN_PROGRESS, LOG_TRANSFER_DONE, LOG_TRANSFER_FAILED, SERVER_UPDATE_TROUBLE, SERVER_UPDATE_FINAL, \
     SERVER_UPDATE_UPDATING, SERVER_UPDATE_NOT_DONE
+from pilot.util.eventbus import bus
 from pilot.util.filehandling import get_files, tail, is_json, copy, remove, read_file, write_json, establish_logging, write_file
 from pilot.util.harvester import request_new_jobs, remove_job_request_file, parse_job_definition_file, \
     is_harvester_mode, get_worker_attributes_file, publish_job_report, publish_work_report, get_event_status_file, \
     publish_stageout_files
 from pilot.util.jobmetrics import get_job_metrics
-from pilot.util.monitoring import job_monitor_tasks, check_local_space
+from pilot.util.jobslots import add_job_log_handler, remove_job_log_handler
+from pilot.util.monitoring import get_monitoring_scheduler, check_local_space
 from pilot.util.monitoringtime import MonitoringTime
 from pilot.util.processes import cleanup
 from pilot.util.proxy import get_distinguished_name
-from pilot.util.queuehandling import scan_for_jobs, put_in_queue, queue_report
+from pilot.util.queuehandling import scan_for_jobs, put_in_queue, queue_report, remove_from_queue
+from pilot.util.startupprofiler import profiler
 from pilot.util.timing import add_to_pilot_timing, timing_report, get_postgetjob_time, get_time_since, time_stamp
+from pilot.util.tracesender import get_trace_sender
 from pilot.util.workernode import get_disk_space, collect_workernode_info, get_node_name, get_cpu_model
 
 import logging
@@ -117,8 +123,8 @@ def _validate_job(job):
     """
 
     pilot_user = os.environ.get('PILOT_USER', 'generic').lower()
-    user = __import__('pilot.user.%s.common' % pilot_user, globals(), locals(), [pilot_user], 0)  # Python 2/3
-    container = __import__('pilot.user.%s.container' % pilot_user, globals(), locals(), [user], 0)  # Python 2/3
+    user = get_user_module('common', pilot_user)
+    container = get_user_module('container', pilot_user)
 
     # should a container be used for the payload?
     try:
@@ -587,7 +593,7 @@ def add_timing_and_extracts(data, job, state, args):
     extracts = ""
     if state == 'failed' or state == 'holding':
         pilot_user = os.environ.get('PILOT_USER', 'generic').lower()
-        user = __import__('pilot.user.%s.diagnose' % pilot_user, globals(), locals(), [pilot_user], 0)  # Python 2/3
+        user = get_user_module('diagnose', pilot_user)
         extracts = user.get_log_extracts(job, state)
         if extracts != "":
             logger.warning('\nXXXXXXXXXXXXXXXXXXXXX[begin log extracts]\n%s\nXXXXXXXXXXXXXXXXXXXXX[end log extracts]' % extracts)
@@ -606,7 +612,7 @@ def add_memory_info(data, workdir, name=""):
     """
 
     pilot_user = os.environ.get('PILOT_USER', 'generic').lower()
-    utilities = __import__('pilot.user.%s.utilities' % pilot_user, globals(), locals(), [pilot_user], 0)  # Python 2/3
+    utilities = get_user_module('utilities', pilot_user)
     try:
         #for key in job.utilities
         utility_node = utilities.get_memory_monitor_info(workdir, name=name)
@@ -671,7 +677,6 @@ def validate(queues, traces, args):
     """
 
     while not args.graceful_stop.is_set():
-        time.sleep(0.5)
         try:
             job = queues.jobs.get(block=True, timeout=1)
         except queue.Empty:
@@ -703,11 +708,19 @@ def validate(queues, traces, args):
                 put_in_queue(job, queues.failed_jobs)
                 break
 
-            log.debug('symlinking pilot log')
-            try:
-                os.symlink('../pilotlog.txt', os.path.join(job_dir, 'pilotlog.txt'))
-            except Exception as e:
-                log.warning('cannot symlink pilot log: %s' % str(e))
+            if args.slots.is_multislot():
+                # several jobs are writing to the main pilot log, so each job gets its own log file
+                log.debug('creating job log file')
+                try:
+                    add_job_log_handler(job)
+                except Exception as e:
+                    log.warning('cannot create job log file: %s' % str(e))
+            else:
+                log.debug('symlinking pilot log')
+                try:
+                    os.symlink('../pilotlog.txt', os.path.join(job_dir, 'pilotlog.txt'))
+                except Exception as e:
+                    log.warning('cannot symlink pilot log: %s' % str(e))
 
             # store the PanDA job id for the wrapper to pick up
             store_jobid(job.jobid, args.sourcedir)
@@ -750,7 +763,6 @@ def create_data_payload(queues, traces, args):
     """
 
     while not args.graceful_stop.is_set():
-        time.sleep(0.5)
         try:
             job = queues.validated_jobs.get(block=True, timeout=1)
         except queue.Empty:
@@ -841,6 +853,11 @@ def get_dispatcher_dictionary(args):
 
     _mem, _cpu, _disk = collect_workernode_info()
 
+    # the available disk space and memory are shared by all job slots
+    if args.slots.is_multislot():
+        _diskspace = int(_diskspace / args.slots.nslots)
+        _mem = _mem / args.slots.nslots
+
     _nodename = get_node_name()
 
     # override for RC dev pilots
@@ -874,6 +891,9 @@ def get_dispatcher_dictionary(args):
 
     if args.resource_type != "":
         data['resourceType'] = args.resource_type
+    elif args.slots.is_multislot():
+        # the slots are filled with single-core jobs (a free slot is a single free core)
+        data['resourceType'] = 'SCORE'
 
     # add harvester fields
     if 'HARVESTER_ID' in os.environ:
@@ -884,11 +904,13 @@ def get_dispatcher_dictionary(args):
     return data
 
 
-def proceed_with_getjob(timefloor, starttime, jobnumber, getjob_requests, harvester, verify_proxy, traces):
+def proceed_with_getjob(timefloor, starttime, jobnumber, getjob_requests, harvester, verify_proxy, traces, nrunning=0,
+                        nslots=1):
     """
     Can we proceed with getjob?
     We may not proceed if we have run out of time (timefloor limit), if the proxy is too short, if disk space is too
-    small or if we have already proceed enough jobs.
+    small or if we have already proceed enough jobs. The timefloor limit only applies once the first job of each job
+    slot has been downloaded.
 
     :param timefloor: timefloor limit (s)
     :param starttime: start time of retrieve() (s)
@@ -897,6 +919,8 @@ def proceed_with_getjob(timefloor, starttime, jobnumber, getjob_requests, harves
     :param harvester: True if Harvester is used, False otherwise. Affects the max number of getjob reads (from file).
     :param verify_proxy: True if the proxy should be verified. False otherwise.
     :param traces: traces object (to be able to propagate a proxy error all the way back to the wrapper).
+    :param nrunning: number of jobs that are still running, e.g. staging out while the next job is prefetched (int).
+    :param nslots: number of job slots (int).
     :return: Boolean.
     """
 
@@ -909,7 +933,7 @@ def proceed_with_getjob(timefloor, starttime, jobnumber, getjob_requests, harves
     # should the proxy be verified?
     if verify_proxy:
         pilot_user = os.environ.get('PILOT_USER', 'generic').lower()
-        userproxy = __import__('pilot.user.%s.proxy' % pilot_user, globals(), locals(), [pilot_user], 0)  # Python 2/3
+        userproxy = get_user_module('proxy', pilot_user)
 
         # is the proxy still valid?
         exit_code, diagnostics = userproxy.verify_proxy()
@@ -934,22 +958,22 @@ def proceed_with_getjob(timefloor, starttime, jobnumber, getjob_requests, harves
         os.environ['PILOT_WRAP_UP'] = 'QUICKLY'
         return False
 
-    if timefloor == 0 and jobnumber > 0:
-        logger.warning("since timefloor is set to 0, pilot was only allowed to run one job")
+    if timefloor == 0 and jobnumber >= nslots:
+        logger.warning("since timefloor is set to 0, pilot was only allowed to run one job per slot")
         # use singleton:
         # instruct the pilot to wrap up quickly
         os.environ['PILOT_WRAP_UP'] = 'QUICKLY'
         return False
 
-    if (currenttime - starttime > timefloor) and jobnumber > 0:
+    if (currenttime - starttime > timefloor) and jobnumber >= nslots:
         logger.warning("the pilot has run out of time (timefloor=%d has been passed)" % timefloor)
         # use singleton:
         # instruct the pilot to wrap up quickly
         os.environ['PILOT_WRAP_UP'] = 'QUICKLY'
         return False
 
-    # timefloor not relevant for the first job
-    if jobnumber > 0:
+    # timefloor not relevant for the first job (of each slot)
+    if jobnumber >= nslots:
         logger.info('since timefloor=%d s and only %d s has passed since launch, pilot can run another job' %
                     (timefloor, currenttime - starttime))
 
@@ -959,6 +983,11 @@ def proceed_with_getjob(timefloor, starttime, jobnumber, getjob_requests, harves
         logger.info('asking Harvester for another job')
         request_new_jobs()
 
+    # the final server update of a running job is followed by check_for_final_server_update() when it has completed
+    if nrunning:
+        logger.info('%d job(s) still running - will ask for a new job' % nrunning)
+        return True
+
     if os.environ.get('SERVER_UPDATE', '') == SERVER_UPDATE_UPDATING:
         logger.info('still updating previous job, will not ask for a new job yet')
         return False
@@ -1308,7 +1337,9 @@ def retrieve(queues, traces, args):
     directory (preplaced) or downloaded from a server specified by `args.url`.
 
     The function retrieves the job definition from the proper source and places
-    it in the `queues.jobs` queue.
+    it in the `queues.jobs` queue. A new job is retrieved as soon as there is a free job slot (see args.slots), i.e.
+    in single-slot mode when the previous job has completed, or when its stage-out has started if the next job is
+    prefetched.
 
     WARNING: this function is nearly too complex. Be careful with adding more lines as flake8 will fail it.
 
@@ -1332,7 +1363,10 @@ def retrieve(queues, traces, args):
         time.sleep(0.5)
         getjob_requests += 1
 
-        if not proceed_with_getjob(timefloor, starttime, jobnumber, getjob_requests, args.harvester, args.verify_proxy, traces):
+        if not proceed_with_getjob(timefloor, starttime, jobnumber, getjob_requests, args.harvester, args.verify_proxy, traces,
+                                   nrunning=args.slots.nbusy, nslots=args.slots.nslots):
+            # let the jobs in the other slots finish
+            wait_for_running_jobs(queues, args)
             # do not set graceful stop if pilot has not finished sending the final job update
             # i.e. wait until SERVER_UPDATE is DONE_FINAL
             check_for_final_server_update(args.update_server)
@@ -1344,10 +1378,12 @@ def retrieve(queues, traces, args):
 
         # get a job definition from a source (file or server)
         res = get_job_definition(args)
+        profiler.mark('first getJob', report=True)  # only with --profile-startup
         logger.info('job definition = %s' % str(res))
 
         if res is None:
             logger.fatal('fatal error in job download loop - cannot continue')
+            wait_for_running_jobs(queues, args)
             # do not set graceful stop if pilot has not finished sending the final job update
             # i.e. wait until SERVER_UPDATE is DONE_FINAL
             check_for_final_server_update(args.update_server)
@@ -1394,30 +1430,50 @@ def retrieve(queues, traces, args):
                 add_to_pilot_timing(job.jobid, PILOT_POST_GETJOB, time.time(), args)
 
                 # add the job definition to the jobs queue and increase the job counter,
-                # and wait until the job has finished
+                # and wait until there is a free slot (i.e. until the job has finished in single-slot mode)
+                args.slots.acquire(job.jobid, ncores=job.corecount)
                 put_in_queue(job, queues.jobs)
 
                 jobnumber += 1
-                while not args.graceful_stop.is_set():
-                    if has_job_completed(queues):
-                        args.job_aborted.clear()
-                        args.abort_job.clear()
-                        logger.info('ready for new job')
-
-                        # re-establish logging
-                        logging.info('pilot has finished for previous job - re-establishing logging')
-                        logging.handlers = []
-                        logging.shutdown()
-                        establish_logging(args)
-                        pilot_version_banner()
-                        getjob_requests = 0
-                        add_to_pilot_timing('1', PILOT_MULTIJOB_START_TIME, time.time(), args)
-                        break
-                    time.sleep(0.5)
+                if wait_for_free_slot(queues, args):
+                    getjob_requests = 0
 
     logger.debug('[job] retrieve thread has finished')
 
 
+def wait_for_free_slot(queues, args):
+    """
+    Wait until there is a free job slot for the next job (i.e. until the job has finished in single-slot mode).
+    The abort flags are only reset when no job is running any longer, since they concern the jobs in all slots.
+
+    :param queues: Pilot queues object.
+    :param args: Pilot arguments object.
+    :return: True if a job has completed in the meantime (Boolean).
+    """
+
+    completed = False
+    while not args.graceful_stop.is_set():
+        if has_job_completed(queues, args):
+            completed = True
+            logger.info('ready for new job')
+            if not args.slots.nbusy:
+                args.job_aborted.clear()
+                args.abort_job.clear()
+
+                # re-establish logging (unless other jobs are still logging, multi-slot mode or prefetched job)
+                if not args.slots.is_multislot():
+                    logging.info('pilot has finished for previous job - re-establishing logging')
+                    logging.handlers = []
+                    logging.shutdown()
+                    establish_logging(args)
+                    pilot_version_banner()
+            add_to_pilot_timing('1', PILOT_MULTIJOB_START_TIME, time.time(), args)
+        if args.slots.has_free_slot():
+            break
+
+    return completed
+
+
 def print_node_info():
     """
     Print information about the local node to the log.
@@ -1459,12 +1515,28 @@ def create_job(dispatcher_response, queue):
     return job
 
 
-def has_job_completed(queues):
+def wait_for_running_jobs(queues, args):
     """
-    Has the current job completed (finished or failed)?
+    Wait until the jobs in all slots have completed (multi-slot mode).
+
+    :param queues: Pilot queues object.
+    :param args: Pilot arguments object.
+    :return:
+    """
+
+    if args.slots.nbusy:
+        logger.info('waiting for %d running job(s) to complete' % args.slots.nbusy)
+    while args.slots.nbusy and not args.graceful_stop.is_set():
+        has_job_completed(queues, args)
+
+
+def has_job_completed(queues, args):
+    """
+    Has one of the current jobs completed (finished or failed)? If so, its job slot is released.
     Note: the job object was extracted from monitored_payloads queue before this function was called.
 
     :param queues: Pilot queues object.
+    :param args: Pilot arguments object.
     :return: True is the payload has finished or failed
     """
 
@@ -1487,6 +1559,9 @@ def has_job_completed(queues):
             job.zombies.append(job.pid)
         cleanup(job)
 
+        remove_job_log_handler(job)
+        args.slots.release(job.jobid)
+
         return True
 
     #jobid = os.environ.get('PandaID')
@@ -1508,30 +1583,24 @@ def has_job_completed(queues):
     return False
 
 
-def get_job_from_queue(queues, state):
+def get_job_from_queue(queues, timeout=1):
     """
     Check if the job has finished or failed and if so return it.
+    The function returns as soon as a job object is put in the finished_jobs or failed_jobs queue.
 
     :param queues: pilot queues.
-    :param state: job state (e.g. finished/failed) (string).
-    :return: job object.
+    :param timeout: maximum waiting time in seconds (int).
+    :return: job object (None if no job has finished or failed), state (finished/failed) (string).
     """
-    try:
-        if state == "finished":
-            job = queues.finished_jobs.get(block=True, timeout=1)
-        elif state == "failed":
-            job = queues.failed_jobs.get(block=True, timeout=1)
-        else:
-            job = None
-    except queue.Empty:
-        # logger.info("(job still running)")
-        job = None
-    else:
+
+    index, job = bus.get([queues.finished_jobs, queues.failed_jobs], timeout=timeout)
+    state = ['finished', 'failed'][index] if job else None
+    if job:
         # make sure that state=failed
         set_pilot_state(job=job, state=state)
         logger.info("job %s has state=%s" % (job.jobid, job.state))
 
-    return job
+    return job, state
 
 
 def is_queue_empty(queues, q):
@@ -1576,6 +1645,9 @@ def order_log_transfer(queues, job):
 
     log.debug('job added to data_out queue')
 
+    def _log_transfer_finished():
+        return queues.data_out.empty() and job.get_status('LOG_TRANSFER') in (LOG_TRANSFER_DONE, LOG_TRANSFER_FAILED)
+
     # wait for the log transfer to finish
     n = 0
     nmax = 60
@@ -1590,7 +1662,7 @@ def order_log_transfer(queues, job):
         else:
             if log_transfer == LOG_TRANSFER_IN_PROGRESS:  # set in data component, job object is singleton
                 log.info('log transfer is in progress')
-            time.sleep(2)
+            bus.wait(_log_transfer_finished, timeout=2)
             n += 1
 
     log.info('proceeding with server update (n=%d)' % n)
@@ -1624,13 +1696,8 @@ def wait_for_aborted_job_stageout(args, queues, job):
     # a hard SIGKILL)
     max_wait_time = 2 * 60 - time_since_kill - 5
     log.debug('using max_wait_time = %d s' % max_wait_time)
-    t0 = time.time()
-    while time.time() - t0 < max_wait_time:
-        if job in queues.finished_data_out.queue or job in queues.failed_data_out.queue:
-            log.info('stage-out has finished, proceed with final server update')
-            break
-        else:
-            time.sleep(0.5)
+    if bus.wait(lambda: job in queues.finished_data_out.queue or job in queues.failed_data_out.queue, timeout=max_wait_time):
+        log.info('stage-out has finished, proceed with final server update')
 
     log.info('proceeding with final server update')
 
@@ -1672,15 +1739,14 @@ def queue_monitor(queues, traces, args):  # noqa: C901
 
     job = None
     while True:  # will abort when graceful_stop has been set or if enough time has passed after kill signal
-        time.sleep(1)
-
         if traces.pilot['command'] == 'abort':
             logger.warning('job queue monitor received an abort instruction')
             args.graceful_stop.set()
 
         # abort in case graceful_stop has been set, and less than 30 s has passed since MAXTIME was reached (if set)
         # (abort at the end of the loop)
-        abort = should_abort(args, label='job:queue_monitor')
+        # (do not wait here, get_finished_or_failed_job() blocks until a job has finished or failed)
+        abort = should_abort(args, label='job:queue_monitor', timeout=0)
         if abort and os.environ.get('PILOT_WRAP_UP', '') == 'NORMAL':
             pause_queue_monitor(20)
 
@@ -1688,10 +1754,12 @@ def queue_monitor(queues, traces, args):  # noqa: C901
         imax = 20
         i = 0
         while i < imax and os.environ.get('PILOT_WRAP_UP', '') == 'NORMAL':
-            job = get_finished_or_failed_job(args, queues)
+            # the job is returned as soon as it has finished or failed (allow for log transfer when aborting)
+            job = get_finished_or_failed_job(args, queues, timeout=1 if not abort else 10)
             if job:
                 logger.debug('returned job has state=%s' % job.state)
-                if job.state == 'failed':
+                # (a prefetched job is still running)
+                if job.state == 'failed' and not args.slots.is_multislot() and args.slots.nbusy <= 1:
                     logger.warning('will abort failed job (should prepare for final server update)')
                     abort = True
                 break
@@ -1700,7 +1768,6 @@ def queue_monitor(queues, traces, args):  # noqa: C901
             if state != 'stage-out':
                 # logger.info("no need to wait since job state=\'%s\'" % state)
                 break
-            pause_queue_monitor(1) if not abort else pause_queue_monitor(10)
 
         # job has not been defined if it's still running
         if not job and not abort:
@@ -1719,20 +1786,24 @@ def queue_monitor(queues, traces, args):  # noqa: C901
             update_server(job, args)
 
             # we can now stop monitoring this job, so remove it from the monitored_payloads queue and add it to the
-            # completed_jobs queue which will tell retrieve() that it can download another job
-            try:
-                _job = queues.monitored_payloads.get(block=True, timeout=1)
-            except queue.Empty:
-                logger.warning('failed to dequeue job: queue is empty (did job fail before job monitor started?)')
-                make_job_report(job)
+            # completed_jobs queue which will tell retrieve() that it can download another job (the other jobs in
+            # the queue are still running in multi-slot mode)
+            if remove_from_queue(job, queues.monitored_payloads):
+                logger.debug('job %s was dequeued from the monitored payloads queue' % job.jobid)
+                completed = True
             else:
-                logger.debug('job %s was dequeued from the monitored payloads queue' % _job.jobid)
+                logger.warning('failed to dequeue job: not in queue (did job fail before job monitor started?)')
+                # release the job slot in multi-slot mode, the other slots are still in use
+                completed = args.slots.is_multislot()
+                if not completed:
+                    make_job_report(job)
+            if completed:
                 # now ready for the next job (or quit)
                 put_in_queue(job.jobid, queues.completed_jobids)
-
                 put_in_queue(job, queues.completed_jobs)
-                del _job
-                logger.debug('tmp job object deleted')
+
+            # wait for the remaining traces of the job to be sent (or spooled)
+            get_trace_sender().flush(timeout=30)
 
         if abort:
             break
@@ -1777,33 +1848,28 @@ def pause_queue_monitor(delay):
     time.sleep(delay)
 
 
-def get_finished_or_failed_job(args, queues):
+def get_finished_or_failed_job(args, queues, timeout=1):
     """
     Check if the job has either finished or failed and if so return it.
     If failed, order a log transfer. If the job is in state 'failed' and abort_job is set, set job_aborted.
 
     :param args: pilot args object.
     :param queues: pilot queues object.
+    :param timeout: maximum waiting time in seconds (int).
     :return: job object.
     """
 
-    job = get_job_from_queue(queues, "finished")
-    if job:
-        # logger.debug('get_finished_or_failed_job: job has finished')
-        pass
-    else:
-        # logger.debug('check_job: job has not finished')
-        job = get_job_from_queue(queues, "failed")
-        if job:
-            logger.debug('get_finished_or_failed_job: job has failed')
-            job.state = 'failed'
-            args.job_aborted.set()
+    job, state = get_job_from_queue(queues, timeout=timeout)
+    if state == 'failed':
+        logger.debug('get_finished_or_failed_job: job has failed')
+        job.state = 'failed'
+        args.job_aborted.set()
 
-            # get the current log transfer status
-            log_transfer = get_job_status(job, 'LOG_TRANSFER')
-            if log_transfer == LOG_TRANSFER_NOT_DONE:
-                # order a log transfer for a failed job
-                order_log_transfer(queues, job)
+        # get the current log transfer status
+        log_transfer = get_job_status(job, 'LOG_TRANSFER')
+        if log_transfer == LOG_TRANSFER_NOT_DONE:
+            # order a log transfer for a failed job
+            order_log_transfer(queues, job)
 
     # check if the job has failed
     if job and job.state == 'failed':
@@ -1835,13 +1901,15 @@ def get_heartbeat_period(debug=False):
         return 1800
 
 
-def job_monitor(queues, traces, args):
+def job_monitor(queues, traces, args):  # noqa: C901
     """
     Monitoring of job parameters.
     This function monitors certain job parameters, such as job looping, at various time intervals. The main loop
     is executed once a minute, while individual verifications may be executed at any time interval (>= 1 minute). E.g.
     looping jobs are checked once per ten minutes (default) and the heartbeat is send once per 30 minutes. Memory
-    usage is checked once a minute.
+    usage is checked once a minute. The verifications are run in parallel by the monitoring scheduler (see
+    get_monitoring_scheduler() in pilot.util.monitoring). Each job has its own `MonitoringTime` object and scheduler,
+    so that the jobs running in the slots of a multi-slot pilot are monitored independently.
 
     :param queues: internal queues for job handling.
     :param traces: tuple containing internal pilot states.
@@ -1849,19 +1917,21 @@ def job_monitor(queues, traces, args):
     :return:
     """
 
-    # initialize the monitoring time object
-    mt = MonitoringTime()
+    # the scheduler for the monitoring tasks of each job (with its own monitoring time object)
+    schedulers = {}  # job id: scheduler
 
-    # peeking and current time; peeking_time gets updated if and when jobs are being monitored, update_time is only
-    # used for sending the heartbeat and is updated after a server update
+    # peeking and current time; peeking_time gets updated if and when jobs are being monitored, the update times are
+    # only used for sending the heartbeat and are updated after a server update
     peeking_time = int(time.time())
-    update_time = peeking_time
+    update_times = {}  # job id: last update time
+
+    # the monitoring rounds are scheduled once a minute, counted from the end of stage-in (the waits are interrupted
+    # by kill signals)
+    next_round = None
 
     # overall loop counter (ignoring the fact that more than one job may be running)
     n = 0
     while not args.graceful_stop.is_set():
-        time.sleep(0.5)
-
         # abort in case graceful_stop has been set, and less than 30 s has passed since MAXTIME was reached (if set)
         # (abort at the end of the loop)
         abort = should_abort(args, label='job:job_monitor')
@@ -1882,43 +1952,40 @@ def job_monitor(queues, traces, args):
                 for i in range(len(jobs)):
                     # send heartbeat if it is time (note that the heartbeat function might update the job object, e.g.
                     # by turning on debug mode, ie we need to get the heartbeat period in case it has changed)
-                    update_time = send_heartbeat_if_time(jobs[i], args, update_time)
+                    update_times[jobs[i].jobid] = send_heartbeat_if_time(jobs[i], args,
+                                                                         update_times.get(jobs[i].jobid, peeking_time))
 
-                # sleep for a while if stage-in has not completed
-                time.sleep(1)
-                continue
+                # wait for a while if stage-in has not completed (unless other jobs are running, multi-slot mode)
+                if queues.monitored_payloads.empty():
+                    bus.wait(lambda: args.abort_job.is_set() or not queues.finished_data_in.empty(), timeout=1)
+                    continue
         elif queues.finished_data_in.empty():
-            # sleep for a while if stage-in has not completed
-            time.sleep(1)
+            # wait for a while if stage-in has not completed
+            bus.wait(lambda: args.abort_job.is_set() or not queues.finished_data_in.empty(), timeout=1)
             continue
 
-        # wait a minute unless we are to abort
+        # wait until the next round unless we are to abort
+        if next_round is None:
+            next_round = time.time() + 60
         if not abort_job:
-            time.sleep(60)
+            bus.wait(args.abort_job.is_set, timeout=next_round - time.time())
+        next_round = max(next_round + 60, time.time())
 
         # peek at the jobs in the validated_jobs queue and send the running ones to the heartbeat function
-        jobs = queues.monitored_payloads.queue
+        jobs = list(queues.monitored_payloads.queue)
+
+        # forget the monitoring state of the jobs that are no longer monitored
+        for jobid in [jobid for jobid in schedulers if jobid not in [job.jobid for job in jobs]]:
+            close_monitoring_scheduler(schedulers.pop(jobid))
+            update_times.pop(jobid, None)
 
         if jobs:
             # update the peeking time
             peeking_time = int(time.time())
-            for i in range(len(jobs)):
-                log = get_logger(jobs[i].jobid)
-
-                log.info('monitor loop #%d: job %d:%s is in state \'%s\'' % (n, i, jobs[i].jobid, jobs[i].state))
-                if jobs[i].state == 'finished' or jobs[i].state == 'failed':
-                    log.info('aborting job monitoring since job state=%s' % jobs[i].state)
-                    break
-
-                # perform the monitoring tasks
-                exit_code, diagnostics = job_monitor_tasks(jobs[i], mt, args)
-                if exit_code != 0:
-                    fail_monitored_job(jobs[i], exit_code, diagnostics, queues, traces)
-                    break
-
-                # send heartbeat if it is time (note that the heartbeat function might update the job object, e.g.
-                # by turning on debug mode, ie we need to get the heartbeat period in case it has changed)
-                update_time = send_heartbeat_if_time(jobs[i], args, update_time)
+            for job in jobs:
+                if job.jobid not in schedulers:
+                    schedulers[job.jobid] = get_monitoring_scheduler(MonitoringTime())
+            monitor_jobs(jobs, schedulers, update_times, peeking_time, n, queues, traces, args)
 
         elif os.environ.get('PILOT_JOB_STATE') == 'stagein':
             logger.info('job monitoring is waiting for stage-in to finish')
@@ -1931,9 +1998,80 @@ def job_monitor(queues, traces, args):
         if abort or abort_job:
             break
 
+    for scheduler in schedulers.values():
+        close_monitoring_scheduler(scheduler)
+
     logger.debug('[job] job monitor thread has finished')
 
 
+def monitor_jobs(jobs, schedulers, update_times, peeking_time, n, queues, traces, args):
+    """
+    Perform one round of monitoring tasks for the given jobs and send their heartbeats if it is time.
+    In multi-slot mode, the jobs are monitored in parallel, so that a slow check of one job does not delay the
+    monitoring of the jobs in the other slots.
+
+    :param jobs: list of monitored job objects.
+    :param schedulers: dictionary of monitoring schedulers (job id: scheduler).
+    :param update_times: dictionary of last update times (job id: time), updated.
+    :param peeking_time: default last update time (int).
+    :param n: monitoring loop counter (int).
+    :param queues: internal queues for job handling.
+    :param traces: tuple containing internal pilot states.
+    :param args: Pilot arguments (e.g. containing queue name, queuedata dictionary, etc).
+    :raise: the first exception raised by the monitoring of a job.
+    :return:
+    """
+
+    exceptions = []
+
+    def monitor(i, job):
+        log = get_logger(job.jobid)
+
+        log.info('monitor loop #%d: job %d:%s is in state \'%s\'' % (n, i, job.jobid, job.state))
+        if job.state == 'finished' or job.state == 'failed':
+            log.info('aborting job monitoring since job state=%s' % job.state)
+            return
+
+        try:
+            # perform the monitoring tasks
+            exit_code, diagnostics = schedulers[job.jobid].run(job, args)
+            if exit_code != 0:
+                fail_monitored_job(job, exit_code, diagnostics, queues, traces)
+                return
+
+            # send heartbeat if it is time (note that the heartbeat function might update the job object, e.g.
+            # by turning on debug mode, ie we need to get the heartbeat period in case it has changed)
+            update_times[job.jobid] = send_heartbeat_if_time(job, args, update_times.get(job.jobid, peeking_time))
+        except Exception as e:  # Python 2/3
+            log.error('job monitoring failed: %s' % e)
+            exceptions.append(e)
+
+    if len(jobs) == 1:
+        monitor(0, jobs[0])
+    else:
+        threads = [threading.Thread(target=monitor, args=(i, job), name='job_monitor-%s' % job.jobid)
+                   for i, job in enumerate(jobs)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    if exceptions:
+        raise exceptions[0]
+
+
+def close_monitoring_scheduler(scheduler):
+    """
+    Report the statistics of the monitoring tasks of a job and stop its scheduler.
+
+    :param scheduler: `MonitoringScheduler` object.
+    :return:
+    """
+
+    scheduler.report()
+    scheduler.close()
+
+
 def send_heartbeat_if_time(job, args, update_time):
     """
     Send a heartbeat to the server if it is time to do so.
@@ -1985,7 +2123,7 @@ def fail_monitored_job(job, exit_code, diagnostics, queues, traces):
     Fail a monitored job.
 
     :param job: job object
-    :param exit_code: exit code from job_monitor_tasks (int).
+    :param exit_code: exit code from the monitoring tasks (int).
     :param diagnostics: pilot error diagnostics (string).
     :param queues: queues object.
     :param traces: traces object.
@@ -25,10 +25,14 @@ from pilot.control.job import send_state
 from pilot.util.auxiliary import get_logger, set_pilot_state
 from pilot.util.processes import get_cpu_consumption_time
 from pilot.util.config import config
+from pilot.util.constants import PILOT_PRE_PAYLOAD_PREPARATION, PILOT_POST_PAYLOAD_PREPARATION, PILOT_POST_STAGEIN
+from pilot.util.eventbus import bus
 from pilot.util.filehandling import read_file, remove
 from pilot.util.queuehandling import put_in_queue
+from pilot.util.timing import add_to_pilot_timing
 from pilot.common.errorcodes import ErrorCodes
 from pilot.common.exception import ExcThread
+from pilot.common.pluginregistry import get_user_module
 
 import logging
 logger = logging.getLogger(__name__)
@@ -48,6 +52,9 @@ def control(queues, traces, args):
 
     targets = {'validate_pre': validate_pre, 'execute_payloads': execute_payloads, 'validate_post': validate_post,
                'failed_post': failed_post}
+    # one payload executor per job slot (multi-slot pilot)
+    for i in range(1, args.slots.nslots):
+        targets['execute_payloads-%d' % i] = execute_payloads
     threads = [ExcThread(bucket=queue.Queue(), target=target, kwargs={'queues': queues, 'traces': traces, 'args': args},
                          name=name) for name, target in list(targets.items())]  # Python 3
 
@@ -97,13 +104,14 @@ def validate_pre(queues, traces, args):
     :return:
     """
     while not args.graceful_stop.is_set():
-        time.sleep(0.5)
         try:
             job = queues.payloads.get(block=True, timeout=1)
         except queue.Empty:
             continue
 
         if _validate_payload(job):
+            # prepare the payload setup while stage-in is running (execute_payloads() waits for both)
+            _prepare_payload(job, args)
             #queues.validated_payloads.put(job)
             put_in_queue(job, queues.validated_payloads)
         else:
@@ -129,7 +137,7 @@ def _validate_payload(job):
 
     # perform user specific validation
     pilot_user = os.environ.get('PILOT_USER', 'generic').lower()
-    user = __import__('pilot.user.%s.common' % pilot_user, globals(), locals(), [pilot_user], 0)  # Python 2/3
+    user = get_user_module('common', pilot_user)
     try:
         status = user.validate(job)
     except Exception as e:
@@ -139,6 +147,33 @@ def _validate_payload(job):
     return status
 
 
+def _prepare_payload(job, args):
+    """
+    Prepare the parts of the payload command that do not depend on the input files (e.g. verify the release setup).
+    This is done while stage-in is running. Failures are not handled here; the user code stores them with the job
+    object and raises them when the payload command is created, after stage-in.
+
+    :param job: job object.
+    :param args: pilot arguments.
+    :return:
+    """
+
+    log = get_logger(job.jobid, logger)
+
+    add_to_pilot_timing(job.jobid, PILOT_PRE_PAYLOAD_PREPARATION, time.time(), args)
+    pilot_user = os.environ.get('PILOT_USER', 'generic').lower()
+    user = get_user_module('common', pilot_user)
+    try:
+        user.prepare_payload(job)
+    except Exception as e:
+        log.warning('failed to prepare payload during stage-in (will be done before payload execution): %s' % e)
+    add_to_pilot_timing(job.jobid, PILOT_POST_PAYLOAD_PREPARATION, time.time(), args)
+
+    log.info('payload preparation finished (stage-in %s)' %
+             ('has already finished' if job.jobid in args.timing and PILOT_POST_STAGEIN in args.timing[job.jobid]
+              else 'is still running'))
+
+
 def get_payload_executor(args, job, out, err, traces):
     """
     Get payload executor function for different payload.
@@ -159,6 +194,18 @@ def get_payload_executor(args, job, out, err, traces):
     return payload_executor
 
 
+def has_finished_stagein(job, queues):
+    """
+    Has stage-in finished for the given job (i.e. is it in the finished_data_in queue)?
+
+    :param job: job object.
+    :param queues: pilot queues object.
+    :return: Boolean.
+    """
+
+    return any(s_job.jobid == job.jobid for s_job in list(queues.finished_data_in.queue))
+
+
 def execute_payloads(queues, traces, args):
     """
     Execute queued payloads.
@@ -171,20 +218,15 @@ def execute_payloads(queues, traces, args):
 
     job = None
     while not args.graceful_stop.is_set():
-        time.sleep(0.5)
         try:
             job = queues.validated_payloads.get(block=True, timeout=1)
             log = get_logger(job.jobid, logger)
 
-            q_snapshot = list(queues.finished_data_in.queue)
-            peek = [s_job for s_job in q_snapshot if job.jobid == s_job.jobid]
-            if len(peek) == 0:
+            if not has_finished_stagein(job, queues):
                 #queues.validated_payloads.put(job)
                 put_in_queue(job, queues.validated_payloads)
-                for i in range(10):  # Python 3
-                    if args.graceful_stop.is_set():
-                        break
-                    time.sleep(1)
+                # wait until stage-in has finished (put_in_queue() wakes us up)
+                bus.wait(lambda: args.graceful_stop.is_set() or has_finished_stagein(job, queues), timeout=10)
                 continue
 
             # this job is now to be monitored, so add it to the monitored_payloads queue
@@ -219,7 +261,7 @@ def execute_payloads(queues, traces, args):
                 exit_code_interpret = 1
             else:
                 pilot_user = os.environ.get('PILOT_USER', 'generic').lower()
-                user = __import__('pilot.user.%s.diagnose' % pilot_user, globals(), locals(), [pilot_user], 0)  # Python 2/3
+                user = get_user_module('diagnose', pilot_user)
                 try:
                     exit_code_interpret = user.interpret(job)
                 except Exception as e:
@@ -364,12 +406,10 @@ def validate_post(queues, traces, args):
     """
 
     while not args.graceful_stop.is_set():
-        time.sleep(0.5)
         # finished payloads
         try:
             job = queues.finished_payloads.get(block=True, timeout=1)
         except queue.Empty:
-            time.sleep(0.1)
             continue
         log = get_logger(job.jobid, logger)
 
@@ -394,12 +434,10 @@ def failed_post(queues, traces, args):
     """
 
     while not args.graceful_stop.is_set():
-        time.sleep(0.5)
         # finished payloads
         try:
             job = queues.failed_payloads.get(block=True, timeout=1)
         except queue.Empty:
-            time.sleep(0.1)
             continue
         log = get_logger(job.jobid, logger)
 
@@ -13,6 +13,7 @@ import os
 import time
 
 from pilot.common import exception
+from pilot.common.pluginregistry import get_user_module
 from pilot.control.payloads import generic
 from pilot.eventservice.workexecutor.workexecutor import WorkExecutor
 from pilot.util.auxiliary import get_logger
@@ -40,7 +41,7 @@ class Executor(generic.Executor):
 
         # get the payload command from the user specific code
         pilot_user = os.environ.get('PILOT_USER', 'atlas').lower()
-        user = __import__('pilot.user.%s.common' % pilot_user, globals(), locals(), [pilot_user], 0)  # Python 2/3
+        user = get_user_module('common', pilot_user)
 
         self.post_setup(job)
 
@@ -24,6 +24,7 @@ from pilot.util.constants import UTILITY_BEFORE_PAYLOAD, UTILITY_WITH_PAYLOAD, U
     UTILITY_AFTER_PAYLOAD_FINISHED, PILOT_PRE_SETUP, PILOT_POST_SETUP, PILOT_PRE_PAYLOAD, PILOT_POST_PAYLOAD
 from pilot.util.timing import add_to_pilot_timing
 from pilot.common.exception import PilotException
+from pilot.common.pluginregistry import get_user_module
 
 import logging
 logger = logging.getLogger(__name__)
@@ -93,7 +94,7 @@ class Executor(object):
 
         # get the payload command from the user specific code
         pilot_user = os.environ.get('PILOT_USER', 'generic').lower()
-        user = __import__('pilot.user.%s.common' % pilot_user, globals(), locals(), [pilot_user], 0)  # Python 2/3
+        user = get_user_module('common', pilot_user)
 
         # should we run any additional commands? (e.g. special monitoring commands)
         cmds = user.get_utility_commands_list(order=UTILITY_BEFORE_PAYLOAD)
@@ -113,7 +114,7 @@ class Executor(object):
 
         # get the payload command from the user specific code
         pilot_user = os.environ.get('PILOT_USER', 'generic').lower()
-        user = __import__('pilot.user.%s.common' % pilot_user, globals(), locals(), [pilot_user], 0)  # Python 2/3
+        user = get_user_module('common', pilot_user)
 
         # should any additional commands be prepended to the payload execution string?
         cmds = user.get_utility_commands_list(order=UTILITY_WITH_PAYLOAD)
@@ -131,7 +132,7 @@ class Executor(object):
 
         # get the payload command from the user specific code
         pilot_user = os.environ.get('PILOT_USER', 'generic').lower()
-        user = __import__('pilot.user.%s.common' % pilot_user, globals(), locals(), [pilot_user], 0)  # Python 2/3
+        user = get_user_module('common', pilot_user)
 
         # should any additional commands be executed after the payload?
         cmds = user.get_utility_commands_list(order=UTILITY_AFTER_PAYLOAD_STARTED)
@@ -164,7 +165,7 @@ class Executor(object):
 
         # get the payload command from the user specific code
         pilot_user = os.environ.get('PILOT_USER', 'generic').lower()
-        user = __import__('pilot.user.%s.common' % pilot_user, globals(), locals(), [pilot_user], 0)  # Python 2/3
+        user = get_user_module('common', pilot_user)
 
         # should any additional commands be prepended to the payload execution string?
         cmds = user.get_utility_commands_list(order=UTILITY_AFTER_PAYLOAD_FINISHED)
@@ -204,7 +205,7 @@ class Executor(object):
 
         # get the payload command from the user specific code
         pilot_user = os.environ.get('PILOT_USER', 'generic').lower()
-        user = __import__('pilot.user.%s.common' % pilot_user, globals(), locals(), [pilot_user], 0)  # Python 2/3
+        user = get_user_module('common', pilot_user)
 
         self.post_setup(job)
 
@@ -326,8 +327,7 @@ class Executor(object):
                     for utcmd in list(self.__job.utilities.keys()):  # Python 2/3
                         utproc = self.__job.utilities[utcmd][0]
                         if utproc:
-                            user = __import__('pilot.user.%s.common' % pilot_user, globals(), locals(), [pilot_user],
-                                              0)  # Python 2/3
+                            user = get_user_module('common', pilot_user)
                             sig = user.get_utility_command_kill_signal(utcmd)
                             log.info("stopping process \'%s\' with signal %d" % (utcmd, sig))
                             try:
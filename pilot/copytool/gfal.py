@@ -23,6 +23,7 @@ from pilot.util.container import execute
 logger = logging.getLogger(__name__)
 
 require_replicas = True  ## indicate if given copytool requires input replicas to be resolved
+allow_concurrent_transfers = True  ## indicate if given copytool supports concurrent per-file transfers
 
 allowed_schemas = ['srm', 'gsiftp', 'https', 'davs', 'root']  # prioritized list of supported schemas for transfers by given copytool
 
@@ -23,10 +23,13 @@ from pilot.common.exception import PilotException, ErrorCodes
 logger = logging.getLogger(__name__)
 
 require_replicas = True  ## indicate if given copytool requires input replicas to be resolved
+allow_concurrent_transfers = True  ## indicate if given copytool supports concurrent per-file transfers
 allowed_schemas = ['root']  # prioritized list of supported schemas for transfers by given copytool
 
 copy_command = 'xrdcp'
 
+_checksum_options = {}  # resolved checksum options per setup (the client does not change during the pilot lifetime)
+
 
 def is_valid_for_copy_in(files):
     return True  ## FIX ME LATER
@@ -38,6 +41,9 @@ def is_valid_for_copy_out(files):
 
 def _resolve_checksum_option(setup, **kwargs):
 
+    if setup in _checksum_options:
+        return _checksum_options[setup]
+
     cmd = "%s --version" % copy_command
     if setup:
         cmd = "source %s; %s" % (setup, cmd)
@@ -75,6 +81,9 @@ def _resolve_checksum_option(setup, **kwargs):
     if coption:
         logger.info("Use %s option to get the checksum for %s command" % (coption, copy_command))
 
+    if not rcode:
+        _checksum_options[setup] = coption
+
     return coption
 
 
@@ -6,6 +6,7 @@
 #
 # Authors:
 # - Wen Guan, wen.guan@cern.ch, 2018
+# - agent, agent@local, 2026
 
 """
 Main classes to manage the messages between ES and harvester/ACT/Panda.
@@ -16,6 +17,7 @@ import logging
 import os
 import threading
 import time
+import traceback
 try:
     import Queue as queue  # noqa: N813
 except Exception:
@@ -112,12 +114,149 @@ class CommunicationRequest(object):
         return json.dumps(json_str)
 
 
+"""
+Communication future
+"""
+
+
+class CommunicationFuture(object):
+    """
+    Handle of a submitted communication request.
+    The future is resolved by the communication manager with the response of the request. Synchronous clients wait for
+    the future, asynchronous clients are called back through the post hook of the request.
+    """
+
+    def __init__(self, req):
+        self.req = req
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    def done(self):
+        """
+        Has the request been completed?
+
+        :returns: True if the response is available, otherwise False
+        """
+        return self._event.is_set()
+
+    def set_response(self, resp):
+        """
+        Complete the request: set the response and call the post hook of the request and the done callbacks.
+        """
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.req.response = resp
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+
+        if self.req.post_hook:
+            callbacks.insert(0, lambda future: future.req.post_hook(future.req.response))
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception as e:  # Python 2/3
+                logger.error("Failed to call back request %s: %s, %s" % (self.req, e, traceback.format_exc()))
+
+    def add_done_callback(self, callback):
+        """
+        Call the given function with the future once the request has been completed.
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def response(self, timeout=None):
+        """
+        Wait for the response.
+
+        :returns: CommunicationResponse, or None if the request was not completed within the timeout
+        """
+        self._event.wait(timeout)
+        return self.req.response
+
+    def result(self, timeout=None):
+        """
+        Wait for the response and return its content.
+
+        :returns: content of the response, or None if the request failed with status False
+        :raise: exception of the response, CommunicationFailure if the request was not completed within the timeout
+        """
+        resp = self.response(timeout)
+        if resp is None:
+            raise exception.CommunicationFailure("Timed out waiting for the response of request: %s" % self.req)
+        if resp.exception:
+            raise resp.exception
+        if resp.status is False:
+            return None
+        else:
+            return resp.content
+
+
+def coalesce_update_events(futures):
+    """
+    Group update_events requests which can be sent to the server in one call, i.e. messages with the same version
+    (and other attributes) and with a list of event ranges. The event ranges of a group are merged in their order.
+
+    :param futures: list of CommunicationFuture objects of update_events requests.
+    :returns: list of (update_events message, list of futures)
+    """
+
+    groups = []
+    index = {}
+    for future in futures:
+        message = future.req.update_events
+        key = None
+        try:
+            event_ranges = message['eventRanges']
+            if not isinstance(event_ranges, list):
+                event_ranges = json.loads(event_ranges)
+            if isinstance(event_ranges, list):
+                key = json.dumps(dict((k, v) for k, v in list(message.items()) if k != 'eventRanges'), sort_keys=True)
+        except Exception:
+            key = None
+
+        if key is None or key not in index:
+            if key is not None:
+                index[key] = len(groups)
+            groups.append({'message': message, 'futures': [future], 'event_ranges': list(event_ranges) if key else None})
+        else:
+            group = groups[index[key]]
+            group['futures'].append(future)
+            group['event_ranges'].extend(event_ranges)
+
+    ret = []
+    for group in groups:
+        message = group['message']
+        if len(group['futures']) > 1:
+            message = dict(message)
+            if isinstance(message['eventRanges'], list):
+                message['eventRanges'] = group['event_ranges']
+            else:
+                message['eventRanges'] = json.dumps(group['event_ranges'])
+        ret.append((message, group['futures']))
+    return ret
+
+
 """
 Communication manager thread
 """
 
 
 class CommunicationManager(threading.Thread, PluginFactory):
+    """
+    Every request type is handled by its own worker thread (lane), so that e.g. a slow update of event ranges does not
+    delay the download of new event ranges. The lanes block on their request queues, i.e. a request is processed as
+    soon as it is submitted. update_events requests submitted within update_events_window seconds are sent to the
+    server in one call of the communicator plugin.
+    """
+
+    update_events_window = 0.5  # time to collect update_events requests for one server call (s)
+    update_events_max_batch = 100  # max number of update_events requests in one server call
+    max_check_interval = 1  # max time between two pre-checks of a request that is not accepted yet (s)
 
     def __init__(self, *args, **kwargs):
         super(CommunicationManager, self).__init__()
@@ -128,20 +267,9 @@ class CommunicationManager(threading.Thread, PluginFactory):
         self.queues = {'request_get_jobs': queue.Queue(),  # Python 2/3
                        'update_jobs': queue.Queue(),
                        'request_get_events': queue.Queue(),
-                       'update_events': queue.Queue(),
-                       'processing_get_jobs': queue.Queue(),
-                       'processing_update_jobs': queue.Queue(),
-                       'processing_get_events': queue.Queue(),
-                       'processing_update_events': queue.Queue()}
-        self.queue_limits = {'request_get_jobs': None,
-                             'update_jobs': None,
-                             'request_get_events': None,
-                             'update_events': None,
-                             'processing_get_jobs': 1,
-                             'processing_update_jobs': 1,
-                             'processing_get_events': 1,
-                             'processing_update_events': 1}
+                       'update_events': queue.Queue()}
         self.stop_event = threading.Event()
+        self.submit_lock = threading.Lock()
         self.args = args
         self.kwargs = kwargs
 
@@ -149,9 +277,12 @@ class CommunicationManager(threading.Thread, PluginFactory):
         """
         Set stop signal(main run process will clean queued requests to release waiting clients and then quit)
         """
-        if not self.is_stop():
-            logger.info("Stopping Communication Manager.")
-            self.stop_event.set()
+        with self.submit_lock:
+            if not self.is_stop():
+                logger.info("Stopping Communication Manager.")
+                self.stop_event.set()
+                for request_queue in list(self.queues.values()):  # Python 2/3
+                    request_queue.put(None)  # wake up the lanes
 
     def is_stop(self):
         """
@@ -159,7 +290,33 @@ class CommunicationManager(threading.Thread, PluginFactory):
 
         :returns: True if the stop signal is set, otherwise False
         """
-        return self.stop_event.isSet()
+        return self.stop_event.is_set()
+
+    def submit(self, req, process_type):
+        """
+        Queue a request for the given lane.
+
+        :returns: CommunicationFuture, or None if the communication manager is stopping
+        """
+
+        with self.submit_lock:
+            if self.is_stop():
+                return None
+            future = CommunicationFuture(req)
+            self.queues[process_type].put(future)
+        return future
+
+    def wait_for_response(self, future):
+        """
+        Wait for the response of a synchronous request.
+
+        :returns: content of the response (None for asynchronous requests or if the manager is stopping)
+        :raise: Exception catched when processing the request
+        """
+
+        if future is None or future.req.post_hook:
+            return None
+        return future.result()
 
     def get_jobs(self, njobs=1, post_hook=None, args=None):
         """
@@ -186,19 +343,7 @@ class CommunicationManager(threading.Thread, PluginFactory):
             req_attrs[key] = value
 
         req = CommunicationRequest(req_attrs)
-        self.queues['request_get_jobs'].put(req)
-
-        if req.post_hook:
-            return
-
-        while req.response is None:
-            time.sleep(1)
-        if req.response.exception:
-            raise req.response.exception
-        if req.response.status is False:
-            return None
-        else:
-            return req.response.content
+        return self.wait_for_response(self.submit(req, 'request_get_jobs'))
 
     def update_jobs(self, jobs, post_hook=None):
         """
@@ -216,19 +361,7 @@ class CommunicationManager(threading.Thread, PluginFactory):
                      'post_hook': post_hook}
 
         req = CommunicationRequest(req_attrs)
-        self.queues['update_jobs'].put(req)
-
-        if req.post_hook:
-            return
-
-        while req.response is None:
-            time.sleep(1)
-        if req.response.exception:
-            raise req.response.exception
-        if req.response.status is False:
-            return None
-        else:
-            return req.response.content
+        return self.wait_for_response(self.submit(req, 'update_jobs'))
 
     def get_event_ranges(self, num_event_ranges=1, post_hook=None, job=None):
         """
@@ -257,19 +390,7 @@ class CommunicationManager(threading.Thread, PluginFactory):
         req_attrs['num_ranges'] = num_event_ranges
 
         req = CommunicationRequest(req_attrs)
-        self.queues['request_get_events'].put(req)
-
-        if req.post_hook:
-            return
-
-        while req.response is None:
-            time.sleep(1)
-        if req.response.exception:
-            raise req.response.exception
-        if req.response.status is False:
-            return None
-        else:
-            return req.response.content
+        return self.wait_for_response(self.submit(req, 'request_get_events'))
 
     def update_events(self, update_events, post_hook=None):
         """
@@ -286,19 +407,7 @@ class CommunicationManager(threading.Thread, PluginFactory):
                      'update_events': update_events,
                      'post_hook': post_hook}
         req = CommunicationRequest(req_attrs)
-        self.queues['update_events'].put(req)
-
-        if req.post_hook:
-            return
-
-        while req.response is None:
-            time.sleep(1)
-        if req.response.exception:
-            raise req.response.exception
-        if req.response.status is False:
-            return None
-        else:
-            return req.response.content
+        return self.wait_for_response(self.submit(req, 'update_events'))
 
     def get_plugin_confs(self):
         """
@@ -322,101 +431,158 @@ class CommunicationManager(threading.Thread, PluginFactory):
                 plugin_confs[key] = value
         return plugin_confs
 
-    def can_process_request(self, processor, process_type):
+    def abort_request(self, future):
         """
-        To check whether it is ready to process request in a type.
-        For request such as HarvesterShareFileCommunicator, it should check whether there are processing requests to avoid overwriting files.
+        Abort a request because the communication manager is stopping.
+        """
+
+        logger.info("Is going to stop, aborting request: %s" % future.req)
+        future.req.abort = True
+        resp_attrs = {'status': None,
+                      'content': None,
+                      'exception': exception.CommunicationFailure("Communication manager is stopping, abort this request")}
+        future.set_response(CommunicationResponse(resp_attrs))
 
-        :returns: True or False
+    def abort_queued_requests(self):
+        """
+        Abort the queued requests to release the waiting clients.
         """
 
-        if self.queues[process_type].empty():
-            return False
+        for request_queue in list(self.queues.values()):  # Python 2/3
+            while not request_queue.empty():
+                future = request_queue.get()
+                if future is not None:
+                    self.abort_request(future)
 
-        next_queue = processor[process_type]['next_queue']
-        if next_queue is None or self.queue_limits[next_queue] is None:
-            return True
+    def wait_for_pre_check(self, pre_check):
+        """
+        Wait until the communicator accepts a request, i.e. until the pre-check returns status 0.
+        For communicators such as HarvesterShareFileCommunicator, a request has to wait until the previous one is done.
 
-        if self.queues[next_queue].qsize() < self.queue_limits[next_queue]:
-            return True
+        :returns: True, or False if the communication manager is stopping
+        """
 
+        interval = 0.01
+        while not self.is_stop():
+            if pre_check().status == 0:
+                return True
+            self.stop_event.wait(interval)
+            interval = min(2 * interval, self.max_check_interval)
         return False
 
+    def process_request(self, req, futures, steps):
+        """
+        Process a request through the steps of the communicator and complete the futures with the response.
+        A step failing (exception or non-zero status) completes the request with its response; the next step is not
+        started, since its pre-check would wait for a request that was never made (e.g. harvester share files).
+
+        :param req: CommunicationRequest sent to the communicator.
+        :param futures: list of CommunicationFuture objects completed by the response.
+        :param steps: list of (pre-check, handler) communicator functions.
+        """
+
+        res = None
+        for pre_check, handler in steps:
+            if not self.wait_for_pre_check(pre_check):
+                for future in futures:
+                    self.abort_request(future)
+                return
+
+            logger.info("Processing %s request: %s" % (req.request_type, req))
+            try:
+                res = handler(req)
+            except Exception as e:  # Python 2/3
+                logger.error("Failed to process %s request: %s, %s" % (req.request_type, e, traceback.format_exc()))
+                res = CommunicationResponse({'status': -1,
+                                             'content': None,
+                                             'exception': exception.UnknownException("Failed to process request: %s" % e)})
+            logger.info("Processing %s response: %s" % (req.request_type, res))
+            if res.status is False or res.status != 0:
+                break
+
+        for future in futures:
+            future.set_response(res)
+
+    def process_update_events(self, future, communicator):
+        """
+        Collect the update_events requests submitted within the update_events window and send them to the server in as
+        few calls as possible.
+        """
+
+        futures = [future]
+        deadline = time.time() + self.update_events_window
+        while len(futures) < self.update_events_max_batch:
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                break
+            try:
+                future = self.queues['update_events'].get(timeout=timeout)
+            except queue.Empty:
+                break
+            if future is None:  # stopping
+                break
+            futures.append(future)
+
+        steps = [(communicator.pre_check_update_events, communicator.update_events)]
+        for message, group in coalesce_update_events(futures):
+            if len(group) == 1:
+                req = group[0].req
+            else:
+                logger.info("Sending %d update_events requests in one call" % len(group))
+                req = CommunicationRequest({'request_type': CommunicationRequest.RequestType.UpdateEvents,
+                                            'update_events': message})
+            self.process_request(req, group, steps)
+
+    def run_lane(self, process_type, handler):
+        """
+        Worker loop of a lane: wait for a request of the given type and process it.
+        """
+
+        while not self.is_stop():
+            future = self.queues[process_type].get()
+            if future is None:
+                continue
+            handler(future)
+
     def run(self):
         """
         Main loop to handle communication requests
         """
 
-        confs = self.get_plugin_confs()
-        logger.info("Communication plugin confs: %s" % confs)
-        communicator = self.get_plugin(confs)
-        logger.info("Communication: %s" % communicator)
-
-        processor = {'request_get_jobs': {'pre_check': communicator.pre_check_get_jobs,
-                                          'handler': communicator.request_get_jobs,
-                                          'next_queue': 'processing_get_jobs',
-                                          'process_req_post_hook': False},
-                     'request_get_events': {'pre_check': communicator.pre_check_get_events,
-                                            'handler': communicator.request_get_events,
-                                            'next_queue': 'processing_get_events',
-                                            'process_req_post_hook': False},
-                     'update_jobs': {'pre_check': communicator.pre_check_update_jobs,
-                                     'handler': communicator.update_jobs,
-                                     'next_queue': None,
-                                     'process_req_post_hook': True},
-                     'update_events': {'pre_check': communicator.pre_check_update_events,
-                                       'handler': communicator.update_events,
-                                       'next_queue': None,
-                                       'process_req_post_hook': True},
-                     'processing_get_jobs': {'pre_check': communicator.check_get_jobs_status,
-                                             'handler': communicator.get_jobs,
-                                             'next_queue': None,
-                                             'process_req_post_hook': True},
-                     'processing_get_events': {'pre_check': communicator.check_get_events_status,
-                                               'handler': communicator.get_events,
-                                               'next_queue': None,
-                                               'process_req_post_hook': True}
-                     }
-
-        while True:
-            has_req = False
-            for process_type in processor:
-                if self.is_stop():
-                    while not self.queues[process_type].empty():
-                        req = self.queues[process_type].get()
-                        logger.info("Is going to stop, aborting request: %s" % req)
-                        req.abort = True
-                        resp_attrs = {'status': None,
-                                      'content': None,
-                                      'exception': exception.CommunicationFailure("Communication manager is stopping, abort this request")}
-                        req.response = CommunicationResponse(resp_attrs)
-                elif self.can_process_request(processor, process_type):
-                    pre_check_resp = processor[process_type]['pre_check']()
-                    if not pre_check_resp.status == 0:
-                        continue
-
-                    logger.info("Processing %s" % process_type)
-
-                    has_req = True
-                    req = self.queues[process_type].get()
-
-                    logger.info("Processing %s request: %s" % (process_type, req))
-                    res = processor[process_type]['handler'](req)
-                    logger.info("Processing %s respone: %s" % (process_type, res))
-
-                    if res.status is False:
-                        req.response = res
-                    else:
-                        next_queue = processor[process_type]['next_queue']
-                        if next_queue:
-                            self.queues[next_queue].put(req)
-                        else:
-                            req.response = res
-                        process_req_post_hook = processor[process_type]['process_req_post_hook']
-                        if process_req_post_hook and req.post_hook:
-                            req.post_hook(res)
-            if not has_req:
-                if self.is_stop():
-                    break
-            time.sleep(1)
+        try:
+            confs = self.get_plugin_confs()
+            logger.info("Communication plugin confs: %s" % confs)
+            communicator = self.get_plugin(confs)
+            logger.info("Communication: %s" % communicator)
+
+            get_jobs_steps = [(communicator.pre_check_get_jobs, communicator.request_get_jobs),
+                              (communicator.check_get_jobs_status, communicator.get_jobs)]
+            get_events_steps = [(communicator.pre_check_get_events, communicator.request_get_events),
+                                (communicator.check_get_events_status, communicator.get_events)]
+            update_jobs_steps = [(communicator.pre_check_update_jobs, communicator.update_jobs)]
+        except Exception as e:  # Python 2/3
+            # new requests are refused once the stop signal is set, the queued ones are aborted
+            logger.error("Failed to set up the communicator: %s, %s" % (e, traceback.format_exc()))
+            self.stop()
+            self.abort_queued_requests()
+            return
+
+        lanes = {'request_get_jobs': lambda future: self.process_request(future.req, [future], get_jobs_steps),
+                 'request_get_events': lambda future: self.process_request(future.req, [future], get_events_steps),
+                 'update_jobs': lambda future: self.process_request(future.req, [future], update_jobs_steps),
+                 'update_events': lambda future: self.process_update_events(future, communicator)}
+
+        threads = []
+        for process_type, handler in list(lanes.items()):  # Python 2/3
+            thread = threading.Thread(target=self.run_lane, name="CommunicationManager-%s" % process_type,
+                                      args=(process_type, handler))
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+
+        self.stop_event.wait()
+        for thread in threads:
+            thread.join()
+
+        self.abort_queued_requests()
         logger.info("Communication manager stopped.")
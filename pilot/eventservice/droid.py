@@ -6,17 +6,230 @@
 #
 # Authors:
 # - Paul Nilsson, paul.nilsson@cern.ch, 2018
+# - agent, agent@local, 2026
 
-import logging
+"""
+Droid: a worker rank of the HPC event service.
+
+A Droid runs the payload with ESProcess on its node. The event ranges are requested from Yoda (rank 0) when the
+payload workers are ready for events, and the out messages of the finished and failed event ranges are sent back to
+Yoda in batches. A heartbeat thread tells Yoda that the Droid is alive while the payload is busy (see yoda.py).
+"""
+
+import threading
+import time
 
+import logging
 logger = logging.getLogger(__name__)
 
 
-def run():
+class Droid(object):
+    """
+    Worker rank running ESProcess.
     """
-    Dummy run function.
 
-    :return:
+    def __init__(self, transport, payload, yoda_rank=0, process_class=None, batch_size=100, update_interval=10,
+                 heartbeat_interval=60, graceful_stop=None, max_time=None, poll_interval=1):
+        """
+        :param transport: Transport object of the Droid rank.
+        :param payload: payload dictionary for ESProcess ({'executable': <cmd string>, 'workdir': <dir>, ...}).
+        :param yoda_rank: rank of Yoda (int).
+        :param process_class: class running the payload with the ESProcess hooks (default: ESProcess).
+        :param batch_size: max number of out messages sent in one message (int).
+        :param update_interval: max time an out message is kept before it is sent (s).
+        :param heartbeat_interval: time between two heartbeats (s).
+        :param graceful_stop: optional threading.Event; no more event ranges are requested once it is set.
+        :param max_time: optional time after which no more event ranges are requested, from the creation of the Droid (s).
+        :param poll_interval: max time between two checks of graceful_stop and max_time while waiting for Yoda (s).
+        """
+
+        self.transport = transport
+        self.payload = payload
+        self.yoda_rank = yoda_rank
+        self.process_class = process_class
+        self.batch_size = batch_size
+        self.update_interval = update_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.graceful_stop = graceful_stop
+        self.deadline = None if max_time is None else time.time() + max_time
+        self.poll_interval = poll_interval
+
+        self._messages = []
+        self._last_update = time.time()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._no_more_events = False
+        self.stats = {'event_ranges': 0, 'finished': 0, 'failed': 0, 'requests': 0, 'wait_time': 0.0}
+
+    def send(self, message):
+        self.transport.send(message, self.yoda_rank)
+
+    def get_event_ranges(self, num_ranges=1):
+        """
+        Hook of ESProcess: request event ranges from Yoda and wait for them.
+
+        :param num_ranges: number of event ranges (int).
+        :return: list of event ranges, an empty list means that there are no more events (or that the Droid has to
+        stop: graceful stop or max time reached).
+        """
+
+        self.flush()
+        if self._no_more_events:
+            return []
+
+        t0 = time.time()
+        self.stats['requests'] += 1
+        self.send({'type': 'request', 'num': num_ranges})
+        event_ranges = []
+        while not self.should_stop():
+            received = self.transport.recv(timeout=self.poll_interval)
+            if received is None:
+                continue
+            source, message = received
+            if message.get('type') == 'event_ranges':
+                event_ranges = message['event_ranges']
+                break
+            if message.get('type') == 'stop':
+                event_ranges = []
+                break
+            logger.warning('unexpected message from rank %s: %s' % (source, message))
+
+        self.stats['wait_time'] += time.time() - t0
+        if not event_ranges:
+            logger.info('no more event ranges')
+            self._no_more_events = True
+        self.stats['event_ranges'] += len(event_ranges)
+        return event_ranges
+
+    def should_stop(self):
+        """
+        Should the Droid stop waiting for event ranges (graceful stop or max time reached)?
+
+        :return: Boolean.
+        """
+
+        if self.graceful_stop and self.graceful_stop.is_set():
+            logger.warning('graceful stop - will not wait for more event ranges')
+            return True
+        if self.deadline is not None and time.time() > self.deadline:
+            logger.warning('max time reached - will not wait for more event ranges')
+            return True
+
+        return False
+
+    def handle_out_message(self, message):
+        """
+        Hook of ESProcess: queue the out message of an event range for Yoda.
+
+        :param message: parsed out message (dictionary with 'id' and 'status').
+        :return:
+        """
+
+        status = 'failed' if message.get('status') in ['failed', 'fatal'] else 'finished'
+        self.stats[status] += 1
+        with self._lock:
+            self._messages.append(message)
+            full = len(self._messages) >= self.batch_size
+        if full or time.time() - self._last_update > self.update_interval:
+            self.flush()
+
+    def flush(self):
+        """
+        Send the queued out messages to Yoda.
+
+        :return:
+        """
+
+        with self._lock:
+            messages, self._messages = self._messages, []
+            self._last_update = time.time()
+        if messages:
+            self.send({'type': 'results', 'messages': messages})
+
+    def heartbeat(self):
+        """
+        Heartbeat thread: send the queued out messages, or a heartbeat, regularly.
+        """
+
+        while not self._stop.wait(self.heartbeat_interval):
+            with self._lock:
+                has_messages = bool(self._messages)
+            if has_messages:
+                self.flush()
+            else:
+                self.send({'type': 'heartbeat'})
+
+    def get_stats(self):
+        """
+        Return the statistics of the Droid.
+
+        :return: dictionary.
+        """
+
+        stats = dict(self.stats)
+        stats['rank'] = self.transport.rank
+        return stats
+
+    def run(self):
+        """
+        Run the payload until there are no more event ranges and report to Yoda.
+
+        :return: exit code of the payload process.
+        """
+
+        process_class = self.process_class
+        if process_class is None:
+            from pilot.eventservice.esprocess.esprocess import ESProcess
+            process_class = ESProcess
+
+        heartbeat = threading.Thread(target=self.heartbeat, name='DroidHeartbeat')
+        heartbeat.daemon = True
+        heartbeat.start()
+
+        exit_code = None
+        t0 = time.time()
+        try:
+            process = process_class(self.payload)
+            process.set_get_event_ranges_hook(self.get_event_ranges)
+            process.set_handle_out_message_hook(self.handle_out_message)
+            process.start()
+            process.join()
+            exit_code = process.poll()
+        except Exception as e:
+            logger.error('droid %d failed to run the payload: %s' % (self.transport.rank, e))
+        finally:
+            self._stop.set()
+            self.flush()
+            stats = self.get_stats()
+            stats['time'] = time.time() - t0
+            stats['exit_code'] = exit_code
+            self.send({'type': 'finished', 'stats': stats})
+            logger.info('droid finished: %s' % stats)
+
+        return exit_code
+
+
+def run(args, transport):
+    """
+    Run a Droid: wait for the job from Yoda and run its payload.
+
+    :param args: pilot arguments.
+    :param transport: Transport object of the Droid rank.
+    :return: exit code of the payload process, None if there was no job.
     """
 
-    pass
+    while True:
+        received = transport.recv(timeout=60)
+        if args.graceful_stop.is_set():
+            return None
+        if received is None:
+            continue
+        source, message = received
+        if message.get('type') == 'job':
+            break
+        if message.get('type') == 'stop':
+            logger.info('no job')
+            return None
+
+    return Droid(transport, message['payload'], graceful_stop=args.graceful_stop,
+                 max_time=args.lifetime).run()
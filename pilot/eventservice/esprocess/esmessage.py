@@ -5,6 +5,7 @@
 #
 # Authors:
 # - Wen Guan, wen.guan@cern.ch, 2017
+# - agent, agent@local, 2026
 
 import logging
 import os
@@ -21,15 +22,25 @@ logger = logging.getLogger(__name__)
 class MessageThread(threading.Thread):
     """
     A thread to receive messages from payload and put recevied messages to the out queues.
+
+    The thread blocks in the receive call of the server socket (yampl try_recv_raw with a timeout) and drains all
+    pending messages per wakeup. If the socket does not support a receive timeout, it is polled with a sleep time that
+    grows while no messages arrive.
     """
 
-    def __init__(self, message_queue, socket_name=None, context='local', **kwds):
+    recv_timeout = 100  # max time a receive call blocks (ms)
+    min_poll_interval = 0.001  # sleep time after a message when polling (s)
+    max_poll_interval = 0.05  # max sleep time when polling an idle socket (s)
+    max_batch = 1000  # max number of messages drained per wakeup
+
+    def __init__(self, message_queue, socket_name=None, context='local', message_server=None, **kwds):
         """
         Initialize yampl server socket.
 
         :param message_queue: a queue to transfer messages between current instance and ESProcess.
         :param socket_name: name of the socket between current process and payload.
         :param context: name of the context between current process and payload, default is 'local'.
+        :param message_server: server socket object to use instead of a yampl server socket (e.g. for a local fake payload).
         :param **kwds: other parameters.
 
         :raises MessageFailure: when failed to setup message socket.
@@ -39,7 +50,14 @@ class MessageThread(threading.Thread):
         self.setName("MessageThread")
         self.__message_queue = message_queue
         self._socket_name = socket_name
-        self._stop = threading.Event()
+        self._stop_event = threading.Event()
+        self._recv_with_timeout = None  # does the socket support a receive timeout (unknown until the first receive)
+        self._poll_interval = self.min_poll_interval
+        self.stats = {'received': 0, 'wakeups': 0, 'start_time': None}
+
+        if message_server is not None:
+            self.__message_server = message_server
+            return
 
         logger.info('try to import yampl')
         try:
@@ -82,7 +100,7 @@ class MessageThread(threading.Thread):
         Set stop event.
         """
         logger.debug('set stop event')
-        self._stop.set()
+        self._stop_event.set()
 
     def is_stopped(self):
         """
@@ -90,7 +108,7 @@ class MessageThread(threading.Thread):
 
         :returns: True if stop event is set, otherwise False.
         """
-        return self._stop.isSet()
+        return self._stop_event.isSet()
 
     def terminate(self):
         """
@@ -101,12 +119,69 @@ class MessageThread(threading.Thread):
             del self.__message_server
             self.__message_server = None
 
+    def try_recv(self, timeout):
+        """
+        Receive a message, waiting up to timeout ms if the socket supports a receive timeout.
+
+        :param timeout: max waiting time (ms).
+        :returns: size, buffer of the message (size is -1 if no message was received).
+        """
+
+        if self._recv_with_timeout is not False:
+            try:
+                ret = self.__message_server.try_recv_raw(timeout)
+            except TypeError:
+                logger.info('message server does not support receive timeouts, will poll it')
+                self._recv_with_timeout = False
+            else:
+                self._recv_with_timeout = True
+                return ret
+
+        return self.__message_server.try_recv_raw()
+
+    def receive(self):
+        """
+        Wait for messages from the payload and return all pending messages.
+
+        :returns: list of messages.
+        """
+
+        size, buf = self.try_recv(self.recv_timeout)
+        if size == -1:
+            if self._recv_with_timeout is False:
+                self._stop_event.wait(self._poll_interval)
+                self._poll_interval = min(2 * self._poll_interval, self.max_poll_interval)
+            return []
+
+        self._poll_interval = self.min_poll_interval
+        messages = [buf]
+        while len(messages) < self.max_batch:
+            size, buf = self.try_recv(0)
+            if size == -1:
+                break
+            messages.append(buf)
+        return messages
+
+    def get_stats(self):
+        """
+        Get the message statistics.
+
+        :returns: dict with the number of received messages, the number of wakeups with messages and the message rate
+                  (messages/s).
+        """
+
+        stats = dict(self.stats)
+        elapsed = time.time() - stats['start_time'] if stats['start_time'] else 0
+        stats['rate'] = stats['received'] / elapsed if elapsed > 0 else 0.0
+        return stats
+
     def run(self):
         """
         Main thread loop to poll messages from payload and
         put received into message queue for other processes to fetch.
         """
         logger.info('Message thread starts to run.')
+        self.stats['start_time'] = time.time()
         try:
             while True:
                 if self.is_stopped():
@@ -115,11 +190,12 @@ class MessageThread(threading.Thread):
                 if not self.__message_server:
                     raise MessageFailure("No message server.")
 
-                size, buf = self.__message_server.try_recv_raw()
-                if size == -1:
-                    time.sleep(0.01)
-                else:
-                    self.__message_queue.put(buf)
+                messages = self.receive()
+                if messages:
+                    self.stats['wakeups'] += 1
+                    self.stats['received'] += len(messages)
+                    for message in messages:
+                        self.__message_queue.put(message)
         except PilotException as e:
             self.terminate()
             logger.error("Pilot Exception: Message thread got an exception, will finish: %s, %s" % (e.get_detail(), traceback.format_exc()))
@@ -129,4 +205,4 @@ class MessageThread(threading.Thread):
             logger.error("Message thread got an exception, will finish: %s" % str(e))
             # raise MessageFailure(e)
         self.terminate()
-        logger.info('Message thread finished.')
+        logger.info('Message thread finished: %s' % self.get_stats())
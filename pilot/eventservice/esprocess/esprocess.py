@@ -6,6 +6,7 @@
 # Authors:
 # - Wen Guan, wen.guan@cern.ch, 2017-2018
 # - Paul Nilsson, paul.nilsson@cern.ch, 2018-2019
+# - agent, agent@local, 2026
 
 import json
 import logging
@@ -15,6 +16,7 @@ import subprocess
 import time
 import threading
 import traceback
+from collections import deque
 
 try:
     import Queue as queue  # noqa: N813
@@ -28,6 +30,11 @@ from pilot.util.processes import kill_child_processes
 
 logger = logging.getLogger(__name__)
 
+# parsers of the payload error messages
+ERR_ATHENAMP_PARSE_PATTERN = re.compile(r"(ERR\_[A-Z\_]+)\ (.+)\:\ ?(.+)")
+EVENT_RANGE_ID_PATTERN = re.compile(r"eventRangeID\'\:\ ?.?\'([0-9\-]+)")
+ERR_PATTERN = re.compile(r"(ERR\_[A-Z\_]+)\ ([0-9\-]+)\:\ ?(.+)")
+
 """
 Main process to handle event service.
 It makes use of two hooks get_event_ranges_hook and handle_out_message_hook to communicate with other processes when
@@ -69,7 +76,8 @@ class ESProcess(threading.Thread):
         self.setName("ESProcess")
         self.corecount = 1
 
-        self.event_ranges_cache = []
+        self.event_ranges_cache = deque()
+        self.max_messages = 1000  # max number of messages handled per wakeup
 
     def __del__(self):
         if self.__message_thread:
@@ -314,17 +322,28 @@ class ESProcess(threading.Thread):
         """
         Get one event range to be sent to payload
         """
+        event_ranges = self.get_event_ranges_to_payload(1)
+        return event_ranges[0] if event_ranges else []
+
+    def get_event_ranges_to_payload(self, num_workers):
+        """
+        Get one event range for each of the given number of payload workers.
+        Missing event ranges are requested with as few get_event_ranges hook calls as possible.
+
+        :param num_workers: number of payload workers ready for events.
+        :returns: list of event ranges (shorter than num_workers if there are no more events).
+        """
         logger.debug("Number of cached event ranges: %s" % len(self.event_ranges_cache))
-        if not self.event_ranges_cache:
-            event_ranges = self.get_event_ranges()
-            if event_ranges:
-                self.event_ranges_cache.extend(event_ranges)
-
-        if self.event_ranges_cache:
-            event_range = self.event_ranges_cache.pop(0)
-            return event_range
-        else:
-            return []
+        while len(self.event_ranges_cache) < num_workers:
+            event_ranges = self.get_event_ranges(max(self.corecount, num_workers - len(self.event_ranges_cache)))
+            if not event_ranges:
+                break
+            self.event_ranges_cache.extend(event_ranges)
+
+        ret = []
+        while self.event_ranges_cache and len(ret) < num_workers:
+            ret.append(self.event_ranges_cache.popleft())
+        return ret
 
     def get_event_ranges(self, num_ranges=None):
         """
@@ -394,20 +413,17 @@ class ESProcess(threading.Thread):
                 return ret
             elif message.startswith('ERR'):
                 if "ERR_ATHENAMP_PARSE" in message:
-                    pattern = re.compile(r"(ERR\_[A-Z\_]+)\ (.+)\:\ ?(.+)")
-                    found = re.findall(pattern, message)
+                    found = ERR_ATHENAMP_PARSE_PATTERN.findall(message)
                     event_range = found[0][1]
                     if "eventRangeID" in event_range:
-                        pattern = re.compile(r"eventRangeID\'\:\ ?.?\'([0-9\-]+)")
-                        found = re.findall(pattern, event_range)
+                        found = EVENT_RANGE_ID_PATTERN.findall(event_range)
                         event_range_id = found[0]
                         ret = {'id': event_range_id, 'status': 'failed', 'message': message}
                         return ret
                     else:
                         raise Exception("Failed to parse %s" % message)
                 else:
-                    pattern = re.compile(r"(ERR\_[A-Z\_]+)\ ([0-9\-]+)\:\ ?(.+)")
-                    found = re.findall(pattern, message)
+                    found = ERR_PATTERN.findall(message)
                     event_range_id = found[0][1]
                     ret = {'id': event_range_id, 'status': 'failed', 'message': message}
                     return ret
@@ -441,24 +457,47 @@ class ESProcess(threading.Thread):
         except Exception as e:
             raise RunPayloadFailure("Failed to handle out message: %s" % e)
 
-    def handle_messages(self):
+    def handle_messages(self, timeout=0.1):
         """
         Monitor the message queue to get output or error messages from payload and response to different messages.
+        Waits up to timeout seconds for a message, then handles all pending messages: output and error messages in
+        order, and the event ranges for all workers ready for events are fetched together.
+
+        :param timeout: max waiting time for a message (s).
+        :raises: RunPayloadFailure: when failed to handle an output or error message (after all messages are handled).
         """
 
         try:
-            message = self.__message_queue.get(False)
+            messages = [self.__message_queue.get(timeout=timeout)]
         except queue.Empty:
-            pass
-        else:
+            return
+        while len(messages) < self.max_messages:
+            try:
+                messages.append(self.__message_queue.get(False))
+            except queue.Empty:
+                break
+
+        ready = 0
+        error = None
+        for message in messages:
             logger.debug('received message from payload: %s' % message)
             if "Ready for events" in message:
-                event_ranges = self.get_event_range_to_payload()
-                if not event_ranges:
-                    event_ranges = "No more events"
-                self.send_event_ranges_to_payload(event_ranges)
+                ready += 1
             else:
-                self.handle_out_message(message)
+                try:
+                    self.handle_out_message(message)
+                except PilotException as e:
+                    error = error or e
+
+        if ready:
+            event_ranges = self.get_event_ranges_to_payload(ready)
+            for event_range in event_ranges:
+                self.send_event_ranges_to_payload(event_range)
+            for _ in range(ready - len(event_ranges)):
+                self.send_event_ranges_to_payload("No more events")
+
+        if error:
+            raise error
 
     def poll(self):
         """
@@ -572,7 +611,6 @@ class ESProcess(threading.Thread):
             try:
                 self.monitor()
                 self.handle_messages()
-                time.sleep(0.01)
             except PilotException as e:
                 logger.error('PilotException caught in the main loop: %s, %s' % (e.get_detail(), traceback.format_exc()))
                 # TODO: define output message exception. If caught 3 output message exception, terminate
@@ -585,4 +623,6 @@ class ESProcess(threading.Thread):
                 break
         self.clean()
         self.stop_message_thread()
+        if self.__message_thread:
+            logger.info('message statistics: %s' % self.__message_thread.get_stats())
         logger.debug('main loop finished')
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+"""
+Message transport between the Yoda and Droid ranks of the HPC event service.
+
+Rank 0 is Yoda, the other ranks are Droids. Messages are python objects (dictionaries) sent to a given rank; a
+receive returns the rank of the sender and the message. On an HPC allocation the ranks are MPI processes (mpi4py);
+on a single Linux box the ranks can be local processes or threads connected by multiprocessing queues.
+"""
+
+import multiprocessing
+import threading
+import time
+try:
+    import Queue as queue  # noqa: N813
+except Exception:
+    import queue  # Python 3
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class Transport(object):
+    """
+    Base class of the Yoda/Droid transports.
+    """
+
+    rank = 0
+    size = 1
+
+    def send(self, message, dest):
+        """
+        Send a message to the given rank.
+
+        :param message: message (dictionary).
+        :param dest: rank of the receiver (int).
+        :return:
+        """
+
+        raise NotImplementedError()
+
+    def recv(self, timeout=None):
+        """
+        Receive a message from any rank.
+
+        :param timeout: max waiting time (s), None means wait until a message arrives.
+        :return: rank of the sender (int), message (dictionary); None if no message arrived within the timeout.
+        """
+
+        raise NotImplementedError()
+
+
+class QueueTransport(Transport):
+    """
+    Transport between local processes or threads with one multiprocessing queue (inbox) per rank.
+    """
+
+    def __init__(self, rank, inboxes):
+        """
+        :param rank: rank of this end (int).
+        :param inboxes: list of multiprocessing queues, one per rank.
+        """
+
+        self.rank = rank
+        self.size = len(inboxes)
+        self.inboxes = inboxes
+
+    def send(self, message, dest):
+        self.inboxes[dest].put((self.rank, message))
+
+    def recv(self, timeout=None):
+        try:
+            return self.inboxes[self.rank].get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+def create_local_transports(size):
+    """
+    Create the transports of size local ranks (rank 0 is Yoda).
+
+    :param size: number of ranks (int).
+    :return: list of QueueTransport objects, one per rank.
+    """
+
+    inboxes = [multiprocessing.Queue() for _ in range(size)]
+    return [QueueTransport(rank, inboxes) for rank in range(size)]
+
+
+class MPITransport(Transport):
+    """
+    Transport between MPI ranks (mpi4py).
+    MPI has no blocking receive with a timeout, so a receive probes for messages with a sleep time that grows while no
+    messages arrive.
+    """
+
+    tag = 23
+    max_probe_interval = 0.05  # s
+
+    def __init__(self, comm=None):
+        """
+        :param comm: MPI communicator (default: COMM_WORLD).
+        """
+
+        from mpi4py import MPI
+        self.mpi = MPI
+        self.comm = comm or MPI.COMM_WORLD
+        self.rank = self.comm.Get_rank()
+        self.size = self.comm.Get_size()
+        self._lock = threading.Lock()  # the Droid heartbeat is sent from another thread
+
+    def send(self, message, dest):
+        with self._lock:
+            self.comm.send(message, dest=dest, tag=self.tag)
+
+    def recv(self, timeout=None):
+        deadline = None if timeout is None else time.time() + timeout
+        interval = 0.001
+        while True:
+            status = self.mpi.Status()
+            with self._lock:
+                if self.comm.Iprobe(source=self.mpi.ANY_SOURCE, tag=self.tag, status=status):
+                    source = status.Get_source()
+                    return source, self.comm.recv(source=source, tag=self.tag)
+            if deadline is not None and time.time() >= deadline:
+                return None
+            time.sleep(interval)
+            interval = min(2 * interval, self.max_probe_interval)
+
+
+def get_transport():
+    """
+    Return the MPI transport if the pilot runs as an MPI job with several ranks.
+
+    :return: MPITransport object, or None if mpi4py is not available or there is only one rank.
+    """
+
+    try:
+        transport = MPITransport()
+    except ImportError:
+        logger.info('mpi4py is not available')
+        return None
+
+    if transport.size < 2:
+        logger.info('only one MPI rank')
+        return None
+
+    return transport
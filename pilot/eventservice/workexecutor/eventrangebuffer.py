@@ -0,0 +1,273 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+"""
+Prefetching buffer of event ranges for the ES executors.
+
+The buffer keeps a lookahead of event ranges, so that a payload worker asking for events does not have to wait for a
+server round trip. The buffer is refilled in the background through asynchronous `CommunicationManager` requests
+(post hook) when it falls below the target lookahead. The target is sized from the measured consumption rate of the
+event ranges (per-event processing time of all workers) and the measured server latency. The time the consumers had
+to wait for an empty buffer (worker idle time) is recorded and reported. When the executor stops, the event ranges
+that were prefetched but not consumed are reported as failed (recoverable), so that the server dispatches them again.
+"""
+
+import json
+import math
+import threading
+import time
+from collections import deque
+
+from pilot.common.errorcodes import ErrorCodes
+from pilot.common.exception import PilotException
+
+import logging
+logger = logging.getLogger(__name__)
+
+errors = ErrorCodes()
+
+
+class EventRangeBuffer(object):
+    """
+    Prefetching event range buffer.
+    """
+
+    def __init__(self, communication_manager, job, min_lookahead=2, max_lookahead=100, safety_factor=2.0,
+                 smoothing=0.3):
+        """
+        :param communication_manager: `CommunicationManager` object.
+        :param job: job object the event ranges are requested for.
+        :param min_lookahead: minimum number of buffered event ranges (int).
+        :param max_lookahead: maximum number of buffered event ranges (int).
+        :param safety_factor: the lookahead covers safety_factor times the server latency (float).
+        :param smoothing: weight of a new measurement in the moving averages (float).
+        """
+
+        self.communication_manager = communication_manager
+        self.job = job
+        self.min_lookahead = max(1, min_lookahead)
+        self.max_lookahead = max(self.min_lookahead, max_lookahead)
+        self.safety_factor = safety_factor
+        self.smoothing = smoothing
+
+        self._event_ranges = deque()
+        self._condition = threading.Condition()
+        self._pending = 0  # number of requested event ranges not yet received
+        self._request_time = None
+        self._exhausted = False  # the server has no more event ranges
+        self._error = None  # exception of the last failed request
+        self._released = False  # no more requests
+        self._returned = False  # the unconsumed event ranges were returned to the server
+
+        self._latency = None  # server round trip time (moving average, s)
+        self._interval = None  # time per consumed event range (moving average, s)
+        self._last_get = None
+
+        self.stats = {'requests': 0, 'received': 0, 'delivered': 0, 'released': 0, 'idle_time': 0.0, 'idle_waits': 0}
+
+    def _update(self, average, value):
+        """
+        Update a moving average.
+
+        :param average: current average (float or None).
+        :param value: new measurement (float).
+        :return: new average (float).
+        """
+
+        return value if average is None else (1 - self.smoothing) * average + self.smoothing * value
+
+    def get_target(self):
+        """
+        Return the target lookahead, i.e. the number of event ranges consumed during the server latency (with a safety
+        factor), within the lookahead limits.
+
+        :return: number of event ranges (int).
+        """
+
+        if self._latency is None or not self._interval:
+            return self.min_lookahead
+        target = int(math.ceil(self.safety_factor * self._latency / self._interval))
+
+        return max(self.min_lookahead, min(self.max_lookahead, target))
+
+    def _refill(self):
+        """
+        Request more event ranges in the background if the buffer (including pending requests) is below the target.
+        Only one request is in flight at a time. Must be called with the lock held.
+
+        :return:
+        """
+
+        if self._pending or self._exhausted or self._released or self.communication_manager.is_stop():
+            return
+
+        num = self.get_target() - len(self._event_ranges)
+        if num <= 0:
+            return
+
+        self._pending = num
+        self._request_time = time.time()
+        self.stats['requests'] += 1
+        logger.debug('requesting %d event ranges (buffered: %d)' % (num, len(self._event_ranges)))
+        try:
+            self.communication_manager.get_event_ranges(num_event_ranges=num, post_hook=self._receive, job=self.job)
+        except PilotException as e:  # e.g. CommunicationFailure if the job is missing
+            logger.warning('failed to request event ranges: %s' % e)
+            self._pending = 0
+            self._error = e
+
+    def _receive(self, response):
+        """
+        Post hook of the event range requests (called by the communication manager thread).
+
+        :param response: `CommunicationResponse` object.
+        :return:
+        """
+
+        with self._condition:
+            self._latency = self._update(self._latency, time.time() - self._request_time)
+            self._pending = 0
+            exc = getattr(response, 'exception', None)
+            status = response.status
+            if exc or status is False or (status is not None and str(status) != '0'):
+                self._error = exc or Exception('failed to get event ranges: status=%s' % status)
+                logger.warning('event range request failed: %s' % self._error)
+            else:
+                event_ranges = response.content or []
+                self._error = None
+                self.stats['received'] += len(event_ranges)
+                if self._returned:
+                    # response of a request that was still in flight when the buffer was released
+                    self.stats['released'] += len(event_ranges)
+                    self._return(event_ranges, post_hook=lambda resp: logger.info('returned event ranges: %s' % resp))
+                elif not event_ranges:
+                    logger.info('no more event ranges from the server')
+                    self._exhausted = True
+                else:
+                    self._event_ranges.extend(event_ranges)
+                    self._refill()
+            self._condition.notify_all()
+
+    def prefetch(self):
+        """
+        Start filling the buffer (e.g. before the payload is started).
+
+        :return:
+        """
+
+        with self._condition:
+            self._refill()
+
+    def get(self, num=1):
+        """
+        Return up to num event ranges. The call only waits if the buffer is empty; an empty list means that there are
+        no more event ranges.
+
+        :param num: number of event ranges (int).
+        :raise: the exception of a failed request if no event ranges could be returned.
+        :return: list of event ranges.
+        """
+
+        with self._condition:
+            if self._last_get is not None:
+                # time per event range as seen by the consumers (all workers), the idle time is not included
+                self._interval = self._update(self._interval, (time.time() - self._last_get) / max(1, num))
+
+            if not self._event_ranges:
+                self._refill()
+                t0 = time.time()
+                while not self._event_ranges and self._pending and not self.communication_manager.is_stop():
+                    self._condition.wait(1)
+                idle = time.time() - t0
+                self.stats['idle_time'] += idle
+                self.stats['idle_waits'] += 1
+                logger.info('waited %.1f s for event ranges (total worker idle time: %.1f s)' %
+                            (idle, self.stats['idle_time']))
+                if not self._event_ranges and self._error and not self._exhausted:
+                    error, self._error = self._error, None
+                    raise error
+
+            ret = []
+            while self._event_ranges and len(ret) < num:
+                ret.append(self._event_ranges.popleft())
+            self.stats['delivered'] += len(ret)
+            self._last_get = time.time()
+
+            # keep the lookahead
+            self._refill()
+
+        return ret
+
+    def _return(self, event_ranges, post_hook=None):
+        """
+        Report the given event ranges as failed with a recoverable error, so that the server dispatches them again.
+
+        :param event_ranges: list of event ranges.
+        :param post_hook: optional post hook (asynchronous update).
+        :return:
+        """
+
+        if not event_ranges:
+            return
+
+        logger.info('returning %d unconsumed event ranges to the server' % len(event_ranges))
+        updates = [{'errorCode': errors.ESRECOVERABLE, 'eventRangeID': event_range['eventRangeID'], 'eventStatus': 'failed'}
+                   for event_range in event_ranges]
+        try:
+            self.communication_manager.update_events({'version': 0, 'eventRanges': json.dumps(updates)},
+                                                     post_hook=post_hook)
+        except PilotException as e:
+            logger.warning('failed to return event ranges: %s' % e)
+
+    def release(self, timeout=60):
+        """
+        Return the event ranges that were prefetched but not consumed (e.g. when the executor stops early) and stop
+        requesting event ranges. A request in flight is waited for (up to timeout seconds), so that its event ranges
+        are returned too.
+
+        :param timeout: maximum waiting time for a request in flight (s).
+        :return: number of returned event ranges (int).
+        """
+
+        with self._condition:
+            self._released = True
+            deadline = time.time() + timeout
+            while self._pending and time.time() < deadline and not self.communication_manager.is_stop():
+                self._condition.wait(1)
+            event_ranges = list(self._event_ranges)
+            self._event_ranges.clear()
+            self._returned = True
+            self.stats['released'] += len(event_ranges)
+
+        self._return(event_ranges)
+
+        return len(event_ranges)
+
+    def get_stats(self):
+        """
+        Return the buffer statistics.
+
+        :return: dictionary.
+        """
+
+        with self._condition:
+            stats = dict(self.stats)
+            stats.update(buffered=len(self._event_ranges), target=self.get_target(), latency=self._latency,
+                         interval=self._interval)
+
+        return stats
+
+    def report(self):
+        """
+        Log the buffer statistics.
+
+        :return:
+        """
+
+        logger.info('event range buffer statistics: %s' % self.get_stats())
@@ -0,0 +1,359 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+"""
+Output pipeline of the ES executors.
+
+The outputs of the finished event ranges are appended in-process (tarfile) to the current premerge archive by a
+packing thread. The archive is closed (rolled) when it reaches a maximum size or age and queued for stage-out. Several
+upload threads stage out the closed archives concurrently and report the event ranges of each archive as finished.
+A failed upload is retried after a delay; it is reported as failed once the retries are used up or when the pipeline
+is closed (end of the payload). Closing the pipeline also stops the threads once all outputs have been processed.
+"""
+
+import os
+import tarfile
+import threading
+import time
+import traceback
+try:
+    import Queue as queue  # noqa: N813
+except Exception:
+    import queue  # Python 3
+
+import logging
+logger = logging.getLogger(__name__)
+
+_STOP = object()  # sentinel stopping the packing and upload threads
+
+
+class Archive(object):
+    """
+    A premerge archive and the out messages of its event ranges.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: archive path (string).
+        """
+
+        self.path = path
+        self.messages = []
+        self.created = time.time()
+        self.size = 0
+        self.retries = 0
+
+
+class ESOutputPipeline(object):
+    """
+    Asynchronous packing and stage-out of the ES outputs.
+    """
+
+    max_pack_retries = 3
+
+    def __init__(self, workdir, stageout, finished, failed, max_size=1024 ** 3, max_age=600, nworkers=2,
+                 max_retries=3, retry_delay=60):
+        """
+        :param workdir: directory of the archives (string).
+        :param stageout: function staging out an archive, stageout(path) returns storage, storage_id, fsize, checksum.
+        :param finished: function reporting finished event ranges, finished(messages, path, fsize, checksum, storage_id).
+        :param failed: function reporting failed event ranges, failed(messages).
+        :param max_size: archive size after which the archive is closed (B).
+        :param max_age: archive age after which the archive is closed (s).
+        :param nworkers: number of concurrent uploads (int).
+        :param max_retries: number of upload retries before the event ranges are reported as failed (int).
+        :param retry_delay: time before an upload is retried (s).
+        """
+
+        self.workdir = workdir
+        self.stageout = stageout
+        self.finished = finished
+        self.failed = failed
+        self.max_size = max_size
+        self.max_age = max_age
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+
+        self._messages = queue.Queue()  # out messages to be packed
+        self._archives = queue.Queue()  # closed archives to be staged out
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._closing = False
+        self._archive = None
+        self._tar = None
+        self._busy = 0  # out messages and archives in the pipeline
+        self._waiting = {}  # archives waiting for an upload retry: timer
+        self._nuploads = 0
+        self._stopped = False
+        self.stats = {'messages': 0, 'archives': 0, 'uploaded': 0, 'uploaded_bytes': 0, 'upload_time': 0.0,
+                      'failed_uploads': 0, 'failed_messages': 0, 'max_pack_queue': 0, 'max_upload_queue': 0}
+
+        self._threads = [threading.Thread(target=self._pack, name='ESOutputPacker')]
+        for i in range(max(1, nworkers)):
+            self._threads.append(threading.Thread(target=self._upload, name='ESOutputUploader-%d' % i))
+        for thread in self._threads:
+            thread.daemon = True
+            thread.start()
+
+    def add(self, message):
+        """
+        Queue the output of a finished event range (called by the message handling of ESProcess).
+
+        :param message: parsed out message with 'id' and 'output'.
+        :return:
+        """
+
+        with self._lock:
+            self._busy += 1
+            self.stats['messages'] += 1
+        self._messages.put(message)
+        self.stats['max_pack_queue'] = max(self.stats['max_pack_queue'], self._messages.qsize())
+
+    def _open(self, message):
+        """
+        Open a new archive named after the first event range.
+        """
+
+        archive = Archive(os.path.join(self.workdir, "EventService_premerge_%s.tar" % message['id']))
+        self._tar = tarfile.open(archive.path, 'w')
+        self._archive = archive
+
+    def _roll(self):
+        """
+        Close the current archive and queue it for stage-out.
+        """
+
+        if not self._archive:
+            return
+
+        archive, self._archive = self._archive, None
+        tar, self._tar = self._tar, None
+        try:
+            tar.close()
+            archive.size = os.path.getsize(archive.path)
+        except (IOError, OSError, tarfile.TarError) as e:
+            logger.error('failed to close archive %s: %s' % (archive.path, e))
+            self._report_failed(archive.messages)
+            return
+        if archive.messages:
+            logger.info('closed archive %s with %d event ranges (%d B)' % (archive.path, len(archive.messages), archive.size))
+            with self._lock:
+                self._busy += 1
+                self.stats['archives'] += 1
+            self._archives.put(archive)
+            self.stats['max_upload_queue'] = max(self.stats['max_upload_queue'], self._archives.qsize())
+        else:
+            os.remove(archive.path)
+
+    def _append(self, message):
+        """
+        Append the output of an event range to the current archive. A failed append is retried a few times (the
+        message is queued again), then the message is discarded.
+        """
+
+        if not self._archive:
+            self._open(message)
+        try:
+            self._tar.add(message['output'], arcname=os.path.basename(message['output']))
+        except (IOError, OSError, tarfile.TarError) as e:
+            retries = message.get('retries', 0)
+            if retries >= self.max_pack_retries:
+                logger.error("discard out message because it has been retried more than %d times: %s" %
+                             (self.max_pack_retries, message))
+                return
+            logger.error("failed to add event output to archive: out_message: %s, error: %s" % (message, e))
+            message['retries'] = retries + 1
+            with self._lock:
+                self._busy += 1
+            self._messages.put(message)
+            return
+
+        self._archive.messages.append(message)
+        if self._tar.offset >= self.max_size:
+            self._roll()
+
+    def _pack(self):
+        """
+        Packing thread: append the outputs to the current archive, close it when it is too big or too old.
+        On the stop sentinel, the upload threads are stopped after the last archive.
+        """
+
+        while True:
+            timeout = None
+            if self._archive:
+                timeout = max(0, self._archive.created + self.max_age - time.time())
+            queued = True
+            try:
+                message = self._messages.get(timeout=timeout)
+            except queue.Empty:  # the archive is too old
+                message, queued = None, False
+
+            if message is _STOP:
+                for _ in range(len(self._threads) - 1):
+                    self._archives.put(_STOP)
+                break
+
+            try:
+                if message is None:  # flush or too old
+                    self._roll()
+                else:
+                    self._append(message)
+            except Exception as e:  # Python 2/3
+                logger.error('failed to pack outputs: %s, %s' % (e, traceback.format_exc()))
+                if message:
+                    self._report_failed([message])
+            if queued:
+                with self._idle:
+                    self._busy -= 1
+                    self._idle.notify_all()
+
+    def _report_failed(self, messages):
+        """
+        Report event ranges as failed.
+        """
+
+        if not messages:
+            return
+
+        with self._lock:
+            self.stats['failed_messages'] += len(messages)
+        try:
+            self.failed(messages)
+        except Exception as e:  # Python 2/3
+            logger.error('failed to report failed event ranges: %s, %s' % (e, traceback.format_exc()))
+
+    def _retry(self, archive):
+        """
+        Queue an archive waiting for a retry for another upload attempt (called by the retry timer).
+        """
+
+        with self._lock:
+            if self._waiting.pop(archive, None) is None:  # already queued by close()
+                return
+        self._archives.put(archive)
+
+    def _upload(self):
+        """
+        Upload thread: stage out the closed archives and report their event ranges.
+        """
+
+        while True:
+            archive = self._archives.get()
+            if archive is _STOP:
+                break
+            with self._lock:
+                self._nuploads += 1
+
+            t0 = time.time()
+            try:
+                storage, storage_id, fsize, checksum = self.stageout(archive.path)
+            except Exception as e:  # Python 2/3
+                logger.error("failed to stage out file(%s): %s, %s" % (archive.path, e, traceback.format_exc()))
+                archive.retries += 1
+                with self._lock:
+                    self.stats['failed_uploads'] += 1
+                    retry = not self._closing and archive.retries <= self.max_retries
+                    if retry:
+                        logger.info("will retry the stage-out of %s in %d s" % (archive.path, self.retry_delay))
+                        timer = threading.Timer(self.retry_delay, self._retry, [archive])
+                        timer.daemon = True
+                        self._waiting[archive] = timer
+                        self._busy += 1  # the archive stays in the pipeline
+                        timer.start()
+                if not retry:
+                    self._report_failed(archive.messages)
+            else:
+                with self._lock:
+                    self.stats['uploaded'] += 1
+                    self.stats['uploaded_bytes'] += archive.size
+                    self.stats['upload_time'] += time.time() - t0
+                logger.info("staged out file (%s) to storage: %s storage_id: %s" % (archive.path, storage, storage_id))
+                try:
+                    self.finished(archive.messages, archive.path, fsize, checksum, storage_id)
+                except Exception as e:  # Python 2/3
+                    logger.error('failed to report finished event ranges: %s, %s' % (e, traceback.format_exc()))
+
+            with self._idle:
+                self._nuploads -= 1
+                self._busy -= 1
+                self._idle.notify_all()
+
+    def flush(self):
+        """
+        Close the current archive, so that it is staged out.
+
+        :return:
+        """
+
+        with self._lock:
+            self._busy += 1
+        self._messages.put(None)
+
+    def close(self, timeout=None):
+        """
+        Stage out all outputs and wait for the uploads (end of the payload). Archives waiting for a retry are uploaded
+        at once, and the event ranges of uploads failing from now on are reported as failed. The threads are stopped
+        once the pipeline is drained; after a timeout, they stop in the background when the remaining outputs have
+        been processed.
+
+        :param timeout: max waiting time (s).
+        :return: True if all outputs have been processed, otherwise False.
+        """
+
+        with self._lock:
+            if self._stopped:
+                return self._busy == 0
+            self._stopped = True
+            self._closing = True
+            waiting, self._waiting = self._waiting, {}
+        for archive, timer in list(waiting.items()):  # Python 2/3
+            timer.cancel()
+            self._archives.put(archive)
+        self.flush()
+
+        deadline = None if timeout is None else time.time() + timeout
+        with self._idle:
+            while self._busy > 0:
+                remaining = 1 if deadline is None else deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._idle.wait(remaining)
+            done = self._busy == 0
+
+        # queued after all outputs, the sentinel stops the packing thread, which then stops the upload threads
+        self._messages.put(_STOP)
+        if done:
+            for thread in self._threads:
+                thread.join(None if deadline is None else max(0, deadline - time.time()))
+
+        self.report()
+        return done
+
+    def get_stats(self):
+        """
+        Return the pipeline statistics: queue depths and upload throughput.
+
+        :return: dictionary.
+        """
+
+        with self._lock:
+            stats = dict(self.stats)
+            stats.update(pack_queue=self._messages.qsize(), upload_queue=self._archives.qsize(), uploading=self._nuploads)
+        stats['throughput'] = stats['uploaded_bytes'] / stats['upload_time'] if stats['upload_time'] else 0.0
+
+        return stats
+
+    def report(self):
+        """
+        Log the pipeline statistics.
+
+        :return:
+        """
+
+        logger.info('ES output pipeline statistics: %s' % self.get_stats())
@@ -12,8 +12,10 @@ import os
 import threading
 
 from pilot.common.pluginfactory import PluginFactory
+from pilot.common.pluginregistry import get_user_module
 from pilot.control.job import create_job
 from pilot.eventservice.communicationmanager.communicationmanager import CommunicationManager
+from pilot.eventservice.workexecutor.eventrangebuffer import EventRangeBuffer
 import logging
 logger = logging.getLogger(__name__)
 
@@ -36,7 +38,7 @@ class BaseExecutor(threading.Thread, PluginFactory):
 
         self.__stop = threading.Event()
 
-        self.__event_ranges = []
+        self.__event_range_buffer = None
         self.__is_set_payload = False
         self.__is_retrieve_payload = False
 
@@ -100,7 +102,7 @@ class BaseExecutor(threading.Thread, PluginFactory):
 
             # get the payload command from the user specific code
             pilot_user = os.environ.get('PILOT_USER', 'atlas').lower()
-            user = __import__('pilot.user.%s.common' % pilot_user, globals(), locals(), [pilot_user], 0)  # Python 2/3
+            user = get_user_module('common', pilot_user)
             cmd = user.get_payload_command(job)
             logger.info("payload execution command: %s" % cmd)
 
@@ -118,21 +120,42 @@ class BaseExecutor(threading.Thread, PluginFactory):
     def get_job(self):
         return self.payload['job'] if self.payload and 'job' in list(self.payload.keys()) else None  # Python 2/3
 
+    def get_event_range_buffer(self, num_event_ranges=1, queue_factor=2):
+        """
+        Return the prefetching event range buffer (created at the first call).
+        The minimum lookahead is num_event_ranges * queue_factor, the lookahead grows with the measured server latency.
+        """
+        if not self.__event_range_buffer:
+            self.__event_range_buffer = EventRangeBuffer(self.communication_manager, self.get_job(),
+                                                         min_lookahead=num_event_ranges * queue_factor)
+        return self.__event_range_buffer
+
+    def prefetch_event_ranges(self, num_event_ranges=1, queue_factor=2):
+        """
+        Start filling the event range buffer in the background (e.g. while the payload is starting up).
+        """
+        self.get_event_range_buffer(num_event_ranges, queue_factor).prefetch()
+
     def get_event_ranges(self, num_event_ranges=1, queue_factor=2):
         logger.info("Getting event ranges: (num_ranges: %s)" % num_event_ranges)
-        if len(self.__event_ranges) < num_event_ranges:
-            ret = self.communication_manager.get_event_ranges(num_event_ranges=num_event_ranges * queue_factor, job=self.get_job())
-            for event_range in ret:
-                self.__event_ranges.append(event_range)
-
-        ret = []
-        for _ in range(num_event_ranges):
-            if len(self.__event_ranges) > 0:
-                event_range = self.__event_ranges.pop(0)
-                ret.append(event_range)
+        ret = self.get_event_range_buffer(num_event_ranges, queue_factor).get(num_event_ranges)
         logger.info("Received event ranges(num:%s): %s" % (len(ret), ret))
         return ret
 
+    def report_event_ranges(self):
+        """
+        Log the statistics of the event range buffer (e.g. the worker idle time caused by an empty buffer).
+        """
+        if self.__event_range_buffer:
+            self.__event_range_buffer.report()
+
+    def release_event_ranges(self):
+        """
+        Return the prefetched event ranges that were not consumed by the payload to the server.
+        """
+        if self.__event_range_buffer:
+            self.__event_range_buffer.release()
+
     def update_events(self, messages):
         logger.info("Updating event ranges: %s" % messages)
         ret = self.communication_manager.update_events(messages)
@@ -7,9 +7,11 @@
 # Authors:
 # - Wen Guan, wen.guan@cern.ch, 2018
 # - Alexey Anisenkov, anisyonk@cern.ch, 2019
+# - agent, agent@local, 2026
 
 import json
 import os
+import threading
 import time
 import traceback
 
@@ -20,8 +22,8 @@ from pilot.eventservice.esprocess.esprocess import ESProcess
 from pilot.info.filespec import FileSpec
 from pilot.info import infosys
 from pilot.util.auxiliary import get_logger
-from pilot.util.container import execute
 
+from ..outputpipeline import ESOutputPipeline
 from .baseexecutor import BaseExecutor
 
 import logging
@@ -33,13 +35,16 @@ Generic Executor with one process to manage EventService
 
 
 class GenericExecutor(BaseExecutor):
+
+    stageout_timeout = 2 * 3600  # max time to stage out the remaining outputs at the end of the payload (s)
+
     def __init__(self, **kwargs):
         super(GenericExecutor, self).__init__(**kwargs)
         self.setName("GenericExecutor")
 
-        self.__queued_out_messages = []
-        self.__last_stageout_time = None
         self.__all_out_messages = []
+        self.__output_pipeline = None
+        self.__nevents_lock = threading.Lock()
 
         self.proc = None
         self.exit_code = None
@@ -81,7 +86,8 @@ class GenericExecutor(BaseExecutor):
         self.update_events(event_range_message)
 
         job = self.get_job()
-        job.nevents += len(event_ranges)
+        with self.__nevents_lock:  # called by the concurrent uploads of the output pipeline
+            job.nevents += len(event_ranges)
 
     def update_failed_event_ranges(self, out_messagess):
         """
@@ -97,8 +103,8 @@ class GenericExecutor(BaseExecutor):
             status = message['status'] if message['status'] in ['failed', 'fatal'] else 'failed'
             # ToBeFixed errorCode
             event_ranges.append({"errorCode": 1220, "eventRangeID": message['id'], "eventStatus": status})
-            event_range_message = {'version': 0, 'eventRanges': json.dumps(event_ranges)}
-            self.update_events(event_range_message)
+        event_range_message = {'version': 0, 'eventRanges': json.dumps(event_ranges)}
+        self.update_events(event_range_message)
 
     def handle_out_message(self, message):
         """
@@ -118,49 +124,7 @@ class GenericExecutor(BaseExecutor):
         if message['status'] in ['failed', 'fatal']:
             self.update_failed_event_ranges([message])
         else:
-            self.__queued_out_messages.append(message)
-
-    def tarzip_output_es(self):
-        """
-        Tar/zip eventservice outputs.
-
-        :return: out_messages, output_file
-        """
-        job = self.get_job()
-        log = get_logger(job.jobid, logger)
-
-        out_messages = []
-        while len(self.__queued_out_messages) > 0:
-            out_messages.append(self.__queued_out_messages.pop())
-
-        output_file = "EventService_premerge_%s.tar" % out_messages[0]['id']
-
-        ret_messages = []
-        try:
-            for out_msg in out_messages:
-                command = "tar -rf " + output_file + " --directory=%s %s" % (os.path.dirname(out_msg['output']), os.path.basename(out_msg['output']))
-                exit_code, stdout, stderr = execute(command)
-                if exit_code == 0:
-                    ret_messages.append(out_msg)
-                else:
-                    log.error("Failed to add event output to tar/zip file: out_message: %s, exit_code: %s, stdout: %s, stderr: %s" % (out_msg,
-                                                                                                                                      exit_code,
-                                                                                                                                      stdout,
-                                                                                                                                      stderr))
-                    if 'retries' in out_msg and out_msg['retries'] >= 3:
-                        log.error("Discard out messages because it has been retried more than 3 times: %s" % out_msg)
-                    else:
-                        if 'retries' in out_msg:
-                            out_msg['retries'] += 1
-                        else:
-                            out_msg['retries'] = 1
-                        self.__queued_out_messages.append(out_msg)
-        except Exception as e:
-            log.error("Failed to tar/zip event ranges: %s" % str(e))
-            self.__queued_out_messages += out_messages
-            return None, None
-
-        return ret_messages, output_file
+            self.__output_pipeline.add(message)
 
     def stageout_es_real(self, output_file):
         """
@@ -242,35 +206,28 @@ class GenericExecutor(BaseExecutor):
 
         return file_spec.ddmendpoint, storage_id, file_spec.filesize, file_spec.checksum
 
-    def stageout_es(self, force=False):
+    def init_output_pipeline(self):
         """
-        Stage out event service outputs.
+        Start the output pipeline: the outputs of the finished event ranges are packed into premerge archives, which are
+        staged out concurrently in the background.
+        """
+        job = self.get_job()
+        queuedata = job.infosys.queuedata
+        self.__output_pipeline = ESOutputPipeline(job.workdir, self.stageout_es_real, self.update_finished_event_ranges,
+                                                  self.update_failed_event_ranges, max_age=queuedata.es_stageout_gap,
+                                                  retry_delay=queuedata.es_stageout_gap)
 
+    def stageout_es(self):
+        """
+        Stage out the remaining event service outputs and wait for the output pipeline.
+        The event ranges of outputs which cannot be staged out are reported as failed.
         """
         job = self.get_job()
         log = get_logger(job.jobid, logger)
-        if len(self.__queued_out_messages):
-            if force or self.__last_stageout_time is None or (time.time() > self.__last_stageout_time + job.infosys.queuedata.es_stageout_gap):
-
-                out_messagess, output_file = self.tarzip_output_es()
-                log.info("tar/zip event ranges: %s, output_file: %s" % (out_messagess, output_file))
-
-                if out_messagess:
-                    self.__last_stageout_time = time.time()
-                    try:
-                        log.info("Staging output file: %s" % output_file)
-                        storage, storage_id, fsize, checksum = self.stageout_es_real(output_file)
-                        log.info("Staged output file (%s) to storage: %s storage_id: %s" % (output_file, storage, storage_id))
-
-                        self.update_finished_event_ranges(out_messagess, output_file, fsize, checksum, storage_id)
-                    except Exception as e:
-                        log.error("Failed to stage out file(%s): %s, %s" % (output_file, str(e), traceback.format_exc()))
-
-                        if force:
-                            self.update_failed_event_ranges(out_messagess)
-                        else:
-                            log.info("Failed to stageout, adding messages back to the queued messages")
-                            self.__queued_out_messages += out_messagess
+        if self.__output_pipeline:
+            log.info("Staging out the remaining ES outputs")
+            if not self.__output_pipeline.close(timeout=self.stageout_timeout):
+                log.warning("ES output pipeline did not finish")
 
     def clean(self):
         """
@@ -288,15 +245,16 @@ class GenericExecutor(BaseExecutor):
                     os.remove(msg['output'])
                 except Exception as e:
                     log.error("Failed to remove file(%s): %s" % (msg['output'], str(e)))
-        self.__queued_out_messages = []
-        self.__last_stageout_time = None
         self.__all_out_messages = []
+        self.__output_pipeline = None
 
         if self.proc:
             self.proc.stop()
             while self.proc.is_alive():
                 time.sleep(0.1)
 
+        # must be done before the communication manager is stopped
+        self.release_event_ranges()
         self.stop_communicator()
 
     def run(self):
@@ -324,6 +282,11 @@ class GenericExecutor(BaseExecutor):
             proc.set_get_event_ranges_hook(self.get_event_ranges)
             proc.set_handle_out_message_hook(self.handle_out_message)
 
+            self.init_output_pipeline()
+
+            # fill the event range buffer while the payload is starting up
+            self.prefetch_event_ranges(num_event_ranges=proc.corecount)
+
             log.info('ESProcess starts to run')
             proc.start()
             log.info('ESProcess started to run')
@@ -339,7 +302,6 @@ class GenericExecutor(BaseExecutor):
                     log.info('Stop is set. breaking -- stop process pid=%s' % proc.pid)
                     proc.stop()
                     break
-                self.stageout_es()
 
                 exit_code = proc.poll()
                 if iteration % 60 == 0:
@@ -350,7 +312,8 @@ class GenericExecutor(BaseExecutor):
                 time.sleep(1)
             log.info("ESProcess finished")
 
-            self.stageout_es(force=True)
+            self.stageout_es()
+            self.report_event_ranges()
             self.clean()
 
             self.exit_code = proc.poll()
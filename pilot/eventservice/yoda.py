@@ -6,16 +6,384 @@
 #
 # Authors:
 # - Paul Nilsson, paul.nilsson@cern.ch, 2018
+# - agent, agent@local, 2026
+
+"""
+Yoda: the event range dispatcher of the HPC event service.
+
+Yoda (rank 0) fetches the event ranges from the server in bulk and hands them out to the Droid ranks on request
+(pull model, i.e. faster Droids get more event ranges). Once the server has no more event ranges, the remaining ones
+are shared out evenly between the requesting Droids. The results of all Droids are aggregated and reported through
+one channel (the handle_results function, e.g. the ES output pipeline and the communication manager of the job).
+
+Stragglers: a Droid that has not sent any message (request, results or heartbeat) within droid_timeout seconds is
+declared lost and its event ranges are handed out again. When there are no new event ranges left, the event ranges
+which have been running for more than straggler_timeout seconds are also given to idle Droids; the first result of
+an event range is kept and later ones are ignored.
+
+Messages (dictionaries with a 'type'):
+  Droid -> Yoda: request (num), results (messages), heartbeat, finished (stats).
+  Yoda -> Droid: job (payload), event_ranges (event_ranges, an empty list means no more events), stop.
+"""
+
+import math
+import os
+import time
+from collections import deque
 
 import logging
 logger = logging.getLogger(__name__)
 
 
-def run():
+class DroidState(object):
+    """
+    Bookkeeping and statistics of a Droid rank.
     """
-    Dummy run function.
 
-    :return:
+    def __init__(self, rank):
+        """
+        :param rank: rank of the Droid (int).
+        """
+
+        self.rank = rank
+        self.last_seen = time.time()
+        self.first_seen = None
+        self.done = False
+        self.lost = False
+        self.event_ranges = set()  # ids of the event ranges assigned to the Droid without result
+        self.stats = {'requests': 0, 'assigned': 0, 'finished': 0, 'failed': 0, 'duplicates': 0}
+
+    def get_stats(self):
+        """
+        Return the statistics of the Droid, including its throughput (event ranges/s).
+
+        :return: dictionary.
+        """
+
+        stats = dict(self.stats)
+        processed = stats['finished'] + stats['failed']
+        elapsed = self.last_seen - self.first_seen if self.first_seen else 0
+        stats.update(rank=self.rank, lost=self.lost, running=len(self.event_ranges),
+                     throughput=processed / elapsed if elapsed > 0 else 0.0)
+        return stats
+
+
+class Yoda(object):
     """
+    Event range dispatcher.
+    """
+
+    def __init__(self, transport, get_event_ranges, handle_results, bulk_size=100, droid_timeout=1800,
+                 straggler_timeout=3600, poll_interval=1, graceful_stop=None, max_time=None):
+        """
+        :param transport: Transport object of rank 0.
+        :param get_event_ranges: function returning up to num event ranges from the server, get_event_ranges(num).
+        :param handle_results: function handling the out messages of the finished/failed event ranges.
+        :param bulk_size: number of event ranges fetched from the server at a time (int).
+        :param droid_timeout: time without message after which a Droid is declared lost (s).
+        :param straggler_timeout: running time after which an event range may be given to another Droid (s).
+        :param poll_interval: max time between two checks of the Droids (s).
+        :param graceful_stop: optional threading.Event; the Droids are stopped once it is set.
+        :param max_time: optional max running time of run(), after which the Droids are stopped (s).
+        """
+
+        self.transport = transport
+        self.get_event_ranges = get_event_ranges
+        self.handle_results = handle_results
+        self.bulk_size = bulk_size
+        self.droid_timeout = droid_timeout
+        self.straggler_timeout = straggler_timeout
+        self.poll_interval = poll_interval
+        self.graceful_stop = graceful_stop
+        self.max_time = max_time
+
+        self.droids = dict((rank, DroidState(rank)) for rank in range(1, transport.size))
+        self.pool = deque()  # event ranges to be handed out
+        self.exhausted = False  # the server has no more event ranges
+        self.running = {}  # event range id: {'event_range', 'time', 'ranks'}
+        self.completed = set()
+        self.pending = {}  # rank: number of event ranges requested by an idle Droid
+        self.results = {'finished': 0, 'failed': 0}
+
+    def send(self, rank, message):
+        try:
+            self.transport.send(message, rank)
+        except Exception as e:
+            logger.warning('failed to send message to droid %d: %s' % (rank, e))
+
+    def broadcast(self, message):
+        """
+        Send a message to all Droids.
+        """
+
+        for rank in self.droids:
+            self.send(rank, message)
+
+    def fill_pool(self, num):
+        """
+        Fetch event ranges from the server in bulk if the pool has less than num event ranges.
+        """
+
+        while len(self.pool) < num and not self.exhausted:
+            try:
+                event_ranges = self.get_event_ranges(max(self.bulk_size, num))
+            except Exception as e:
+                logger.warning('failed to get event ranges: %s' % e)
+                return
+            if not event_ranges:
+                logger.info('no more event ranges from the server')
+                self.exhausted = True
+            else:
+                self.pool.extend(event_ranges)
+
+    def get_stragglers(self, rank, num):
+        """
+        Return up to num event ranges running for longer than straggler_timeout on other Droids.
+        """
+
+        now = time.time()
+        ret = []
+        for event_range_id, running in list(self.running.items()):  # Python 2/3
+            if len(ret) >= num:
+                break
+            if rank not in running['ranks'] and now - running['time'] > self.straggler_timeout:
+                ret.append(running['event_range'])
+        return ret
+
+    def assign(self, rank, num):
+        """
+        Assign up to num event ranges to a Droid.
+
+        :return: list of event ranges.
+        """
+
+        self.fill_pool(num)
+        if self.exhausted and self.pool:
+            # share the remaining event ranges between the Droids asking for them
+            nrequests = max(1, len(self.pending))
+            num = min(num, int(math.ceil(float(len(self.pool)) / nrequests)))
+
+        event_ranges = []
+        while self.pool and len(event_ranges) < num:
+            event_ranges.append(self.pool.popleft())
+        if not event_ranges and self.exhausted:
+            event_ranges = self.get_stragglers(rank, num)
+            if event_ranges:
+                logger.info('giving %d straggling event ranges to droid %d' % (len(event_ranges), rank))
+
+        droid = self.droids[rank]
+        now = time.time()
+        for event_range in event_ranges:
+            event_range_id = event_range['eventRangeID']
+            running = self.running.setdefault(event_range_id, {'event_range': event_range, 'time': now, 'ranks': []})
+            running['ranks'].append(rank)
+            droid.event_ranges.add(event_range_id)
+        droid.stats['assigned'] += len(event_ranges)
+        return event_ranges
+
+    def is_finished(self):
+        """
+        Have all event ranges been processed?
+        """
+
+        return self.exhausted and not self.pool and not self.running
+
+    def serve(self):
+        """
+        Answer the pending requests of the Droids.
+        """
+
+        for rank, num in sorted(self.pending.items()):
+            event_ranges = self.assign(rank, num)
+            if event_ranges or self.is_finished():
+                del self.pending[rank]
+                self.send(rank, {'type': 'event_ranges', 'event_ranges': event_ranges})
+
+    def release(self, droid):
+        """
+        Return the event ranges of a lost or finished Droid to the pool, unless they also run on another Droid.
+        """
+
+        for event_range_id in droid.event_ranges:
+            running = self.running.get(event_range_id)
+            if not running:
+                continue
+            running['ranks'].remove(droid.rank)
+            if not running['ranks']:
+                del self.running[event_range_id]
+                self.pool.appendleft(running['event_range'])
+        droid.event_ranges = set()
+        self.pending.pop(droid.rank, None)
+
+    def handle_results_message(self, droid, messages):
+        """
+        Aggregate the out messages of a Droid; duplicated results of straggling event ranges are ignored.
+        """
+
+        new = []
+        for message in messages:
+            event_range_id = message['id']
+            droid.event_ranges.discard(event_range_id)
+            if event_range_id in self.completed:
+                droid.stats['duplicates'] += 1
+                continue
+            self.completed.add(event_range_id)
+            running = self.running.pop(event_range_id, None)
+            if running:
+                for rank in running['ranks']:
+                    self.droids[rank].event_ranges.discard(event_range_id)
+            else:  # the Droid had been declared lost and the event range was returned to the pool
+                self.pool = deque(e for e in self.pool if e['eventRangeID'] != event_range_id)
+            status = 'failed' if message.get('status') in ['failed', 'fatal'] else 'finished'
+            droid.stats[status] += 1
+            self.results[status] += 1
+            new.append(message)
+
+        if new:
+            try:
+                self.handle_results(new)
+            except Exception as e:
+                logger.error('failed to handle the results of droid %d: %s' % (droid.rank, e))
+
+    def handle(self, rank, message):
+        """
+        Handle a message from a Droid.
+        """
+
+        droid = self.droids.get(rank)
+        if not droid:
+            logger.warning('message from unknown rank %s: %s' % (rank, message))
+            return
+
+        droid.last_seen = time.time()
+        if droid.first_seen is None:
+            droid.first_seen = droid.last_seen
+        if droid.lost:
+            logger.info('droid %d is back' % rank)
+            droid.lost = False
+
+        message_type = message.get('type')
+        if message_type == 'request':
+            droid.stats['requests'] += 1
+            self.pending[rank] = message.get('num', 1)
+        elif message_type == 'results':
+            self.handle_results_message(droid, message.get('messages', []))
+        elif message_type == 'finished':
+            logger.info('droid %d finished: %s' % (rank, message.get('stats')))
+            droid.done = True
+            self.release(droid)
+        elif message_type != 'heartbeat':
+            logger.warning('unknown message from droid %d: %s' % (rank, message))
+
+    def check_droids(self):
+        """
+        Declare the Droids without message within droid_timeout as lost and hand out their event ranges again.
+        """
+
+        now = time.time()
+        for droid in list(self.droids.values()):  # Python 2/3
+            if not droid.done and not droid.lost and now - droid.last_seen > self.droid_timeout:
+                logger.warning('droid %d has not sent a message for %d s, declaring it lost (%d event ranges will be '
+                               'handed out again)' % (droid.rank, now - droid.last_seen, len(droid.event_ranges)))
+                droid.lost = True
+                self.release(droid)
+
+    def is_done(self):
+        """
+        Have all Droids finished (or been lost)?
+        """
+
+        return all(droid.done or droid.lost for droid in list(self.droids.values()))  # Python 2/3
+
+    def run(self):
+        """
+        Dispatch the event ranges until all Droids have finished, or until graceful stop or the max time.
+
+        :return: statistics (dictionary).
+        """
+
+        logger.info('yoda is serving %d droids' % len(self.droids))
+        t0 = time.time()
+        while not self.is_done():
+            if self.graceful_stop and self.graceful_stop.is_set():
+                logger.warning('graceful stop - stopping the droids')
+                break
+            if self.max_time is not None and time.time() - t0 > self.max_time:
+                logger.warning('max time (%d s) reached - stopping the droids' % self.max_time)
+                break
+            received = self.transport.recv(timeout=self.poll_interval)
+            if received:
+                self.handle(*received)
+            self.check_droids()
+            self.serve()
+
+        # stop the droids which are still running and release those which have come back after being declared lost
+        self.broadcast({'type': 'stop'})
+        stats = self.get_stats()
+        stats['time'] = time.time() - t0
+        logger.info('yoda finished: %s' % stats)
+        return stats
+
+    def get_stats(self):
+        """
+        Return the dispatcher statistics and the statistics per Droid rank.
+
+        :return: dictionary.
+        """
+
+        return {'finished': self.results['finished'],
+                'failed': self.results['failed'],
+                'unprocessed': len(self.pool) + len(self.running),
+                'droids': [self.droids[rank].get_stats() for rank in sorted(self.droids)]}
+
+
+def run(args, transport):
+    """
+    Run Yoda for one job: get the job and its event ranges through the communication manager, hand out the event
+    ranges to the Droids and stage out and report their outputs through a GenericExecutor (output pipeline).
+
+    :param args: pilot arguments.
+    :param transport: Transport object of rank 0.
+    :return: Yoda statistics (dictionary), None if there was no job.
+    """
+
+    from pilot.control.monitor import get_max_running_time
+    from pilot.eventservice.workexecutor.plugins.genericexecutor import GenericExecutor
+    from pilot.eventservice.communicationmanager.communicationmanager import CommunicationManager
+
+    communication_manager = CommunicationManager()
+    communication_manager.start()
+    executor = GenericExecutor(args=args, queue=args.queue)
+    executor.communication_manager = communication_manager
+    try:
+        executor.set_retrieve_payload()
+        payload = executor.retrieve_payload()
+        if not payload:
+            logger.warning('no job')
+            return None
+        executor.set_payload(payload)
+        job = payload['job']
+
+        # the droids run the payload in their own directories on the shared file system (not in the current
+        # directory of each droid if the job has no work directory)
+        workdir = job.workdir or args.mainworkdir
+        for rank in range(1, transport.size):
+            transport.send({'type': 'job', 'payload': {'executable': payload['executable'],
+                                                       'workdir': os.path.join(workdir, 'droid_%d' % rank)}}, rank)
+
+        def handle_results(messages):
+            for message in messages:
+                executor.handle_out_message(message)
 
-    pass
+        executor.init_output_pipeline()
+        yoda = Yoda(transport, executor.get_event_ranges, handle_results, bulk_size=max(100, transport.size),
+                    graceful_stop=args.graceful_stop, max_time=get_max_running_time(args.lifetime, job.infosys.queuedata))
+        stats = yoda.run()
+        executor.stageout_es()
+        executor.report_event_ranges()
+        return stats
+    finally:
+        # release the droids (waiting for a job or for event ranges)
+        for rank in range(1, transport.size):
+            transport.send({'type': 'stop'}, rank)
+        communication_manager.stop()
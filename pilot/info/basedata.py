@@ -26,6 +26,10 @@ import copy
 import logging
 logger = logging.getLogger(__name__)
 
+MUTABLE_TYPES = (dict, list, set)  # default values of these types are copied for each object
+
+_schemas = {}  # (class, translation map) -> precompiled loading schema (see BaseData._get_schema())
+
 
 class BaseData(object):
     """
@@ -36,6 +40,69 @@ class BaseData(object):
 
     _keys = {}
 
+    # default values of the fields for classes with a __slots__ based layout, see _set_defaults() (the default values of
+    # other classes are the class attributes)
+    _defaults = None
+
+    # default validators (names of the validation functions)
+    _validators = {int: 'clean_numeric',
+                   str: 'clean_string',
+                   bool: 'clean_boolean',
+                   dict: 'clean_dictdata',
+
+                   None: 'clean_string',  # default validator
+                   }
+
+    @classmethod
+    def _get_schema(cls, kmap):
+        """
+            Return the precompiled loading schema of the class for the given translation map.
+            The schema is built once per class and translation map, so that loading many objects (e.g. the `FileSpec`
+            objects of a job with thousands of files) does not repeat the attribute look-ups.
+
+            :param kmap: the translation map of data attributes from external format to internal schema
+            :return: list of fields [(kname, ext_names, ktype, validator function, custom validator function, default value)]
+        """
+
+        key = (cls, tuple(sorted((k, tuple(v) if isinstance(v, (list, tuple)) else v) for k, v in kmap.items())))
+        schema = _schemas.get(key)
+        if schema is not None:
+            return schema
+
+        defaults = cls._defaults
+        schema = []
+        for ktype, _knames in cls._keys.items():
+            hvalidator = getattr(cls, cls._validators.get(ktype, cls._validators.get(None)), None)
+            for kname in _knames:
+                ext_names = kmap.get(kname) or kname
+                try:
+                    if isinstance(ext_names, basestring):  # Python 2
+                        ext_names = [ext_names]
+                except Exception:
+                    if isinstance(ext_names, str):  # Python 3
+                        ext_names = [ext_names]
+                if defaults is not None:
+                    default = defaults.get(kname)
+                else:
+                    default = getattr(cls, kname, None)
+                schema.append((kname, tuple(ext_names), ktype, hvalidator if callable(hvalidator) else None,
+                               getattr(cls, 'clean__%s' % kname, None), default))
+
+        _schemas[key] = schema
+
+        return schema
+
+    def _set_defaults(self):
+        """
+            Initialize all fields with the default values (required for classes with a __slots__ based layout,
+            to be called before the data is loaded). Mutable default values are copied.
+        """
+
+        for kname, default in self._defaults.items():
+            if type(default) in MUTABLE_TYPES:
+                default = copy.deepcopy(default) if default else type(default)()
+            setattr(self, kname, default)
+
     def _load_data(self, data, kmap={}, validators=None):
         """
             Construct and initialize data from ext source.
@@ -58,48 +125,31 @@ class BaseData(object):
         #    # 'internal_name2':'ext_name3'
         #    }
 
-        if validators is None:
-            # default validators
-            validators = {int: self.clean_numeric,
-                          str: self.clean_string,
-                          bool: self.clean_boolean,
-                          dict: self.clean_dictdata,
+        schema = self._get_schema(kmap)
 
-                          None: self.clean_string,  # default validator
-                          }
+        for kname, ext_names, ktype, hvalidator, hclean, default in schema:
 
-        try:
-            _items = list(self._keys.items())  # Python 3
-        except Exception:
-            _items = self._keys.iteritems()  # Python 2
-        for ktype, knames in _items:
-
-            for kname in knames:
-                raw, value = None, None
+            raw, value = None, None
+            for name in ext_names:
+                raw = data.get(name)
+                if raw is not None:
+                    break
 
-                ext_names = kmap.get(kname) or kname
-                try:
-                    if isinstance(ext_names, basestring):  # Python 2
-                        ext_names = [ext_names]
-                except Exception:
-                    if isinstance(ext_names, str):  # Python 3
-                        ext_names = [ext_names]
-
-                for name in ext_names:
-                    raw = data.get(name)
-                    if raw is not None:
-                        break
-
-                ## cast to required type and apply default validation
+            ## cast to required type and apply default validation
+            defval = getattr(self, kname, default)
+            if validators is not None:
                 hvalidator = validators.get(ktype, validators.get(None))
                 if callable(hvalidator):
-                    value = hvalidator(raw, ktype, kname, defval=copy.deepcopy(getattr(self, kname, None)))
-                ## apply custom validation if defined
-                hvalidator = getattr(self, 'clean__%s' % kname, None)
-                if callable(hvalidator):
-                    value = hvalidator(raw, value)
-
-                setattr(self, kname, value)
+                    value = hvalidator(raw, ktype, kname, defval=defval)
+            elif hvalidator:
+                value = hvalidator(self, raw, ktype, kname, defval=defval)
+            if value is default and type(value) in MUTABLE_TYPES:  # do not share the default value between objects
+                value = copy.deepcopy(value)
+            ## apply custom validation if defined
+            if hclean:
+                value = hclean(self, raw, value)
+
+            setattr(self, kname, value)
 
         self.clean()
 
@@ -24,10 +24,15 @@ try:
     import urllib.parse  # Python 3
 except Exception:
     import urllib2  # Python 2
+try:
+    import http.client as httplib  # Python 3
+except ImportError:
+    import httplib  # Python 2
 
 from datetime import datetime, timedelta
 
-from pilot.util.timer import timeout
+from pilot.util.timer import timeout, TimeoutException
+from .infocache import get_info_cache, CACHE_ERRORS, CLAIM_TIME
 
 import logging
 logger = logging.getLogger(__name__)
@@ -139,18 +144,158 @@ class DataLoader(object):
         return content
 
     @classmethod
-    def load_data(self, sources, priority, cache_time=60, parser=None):
+    def fetch_url_data(self, url, etag=None, last_modified=None):
+        """
+        Conditionally download data from url or file resource.
+        For files, the modification time and size are used as ETag.
+
+        :param url: source of data (string).
+        :param etag: ETag of the cached data (string).
+        :param last_modified: Last-Modified value of the cached data (string).
+        :raise: IOError, OSError, `httplib.HTTPException` or `TimeoutException` in case of failure.
+        :return: content (None if not modified), etag, last_modified.
+        """
+
+        @timeout(seconds=20)
+        def _readfile(url):
+            with open(url, "r") as f:
+                return f.read()
+
+        if '://' not in url:  ## trival check for file access, non accurate.. FIXME later if need
+            st = os.stat(url)
+            _etag = '%s-%s' % (int(st.st_mtime), st.st_size)
+            if _etag == etag:
+                return None, etag, last_modified
+            return _readfile(url), _etag, None
+
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        try:
+            try:
+                response = urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=20)  # Python 3
+            except NameError:
+                response = urllib2.urlopen(urllib2.Request(url, headers=headers), timeout=20)  # Python 2
+        except (IOError, OSError) as e:  # Python 2/3: HTTPError and URLError are IOError subclasses
+            if getattr(e, 'code', None) == 304:  # HTTPError: not modified
+                return None, etag, last_modified
+            raise
+
+        return response.read(), response.headers.get('ETag'), response.headers.get('Last-Modified')
+
+    @classmethod
+    def claim_document(self, cache, url, document, poll_interval=1):
+        """
+        Claim the download of a document of the info cache. If another process is refreshing the document, the cached
+        version is used meanwhile; if it is downloading the document for the first time, wait until it is stored, or
+        until the download can be claimed here (the other process failed or its claim expired).
+
+        :param cache: `InfoCache` object.
+        :param url: source of data (string).
+        :param document: meta data of the cached document (None if not cached).
+        :param poll_interval: time between the checks for a document being downloaded by another process (s).
+        :raise: sqlite3.Error in case of info cache failure.
+        :return: Boolean (True if the download was claimed, False if the cached version is to be used).
+        """
+
+        if cache.claim(url):
+            return True
+
+        if document:
+            logger.info('%s is being refreshed by another process, using cached data (version %s)' %
+                        (url, document['version']))
+            return False
+
+        logger.info('%s is being downloaded by another process, waiting (max %ss)' % (url, CLAIM_TIME))
+        while True:
+            time.sleep(poll_interval)
+            if cache.get_document(url):
+                return False
+            if cache.claim(url):
+                return True
+
+    @classmethod
+    def load_indexed_data(self, url, names=None, cache_time=0, nretry=3, sleep_time=60, parser=json.loads, poll_interval=1):
+        """
+        Load the given entries of a large document (dictionary) through the node-shared info cache.
+        The document is only downloaded (conditionally) and parsed if the cached version is older than cache_time
+        seconds; otherwise only the requested entries are read from the cache. Only one pilot on the node downloads
+        a document at a time: during a refresh the others use the cached version, and during the first download they
+        wait for the stored version (or for the claim to be released or to expire, then they download it themselves).
+
+        :param url: source of data (string).
+        :param names: optional list of entry names (default: all entries).
+        :param cache_time: cache time in seconds.
+        :param nretry: number of retries.
+        :param sleep_time: sleep time between retry attempts (seconds or function returning seconds).
+        :param parser: function converting the content into a dictionary.
+        :param poll_interval: time between the checks for a document being downloaded by another process (s).
+        :return: dictionary {name: data} (None if the data could not be loaded).
+        """
+
+        cache = get_info_cache()
+        try:
+            document = cache.get_document(url)
+            if document and time.time() - document['updated'] < cache_time:
+                return cache.get(url, names) or None
+
+            if not self.claim_document(cache, url, document, poll_interval):
+                return cache.get(url, names) or None
+        except CACHE_ERRORS as e:
+            logger.warning('info cache is not available: %s' % e)
+            return None
+
+        load_errors = (IOError, OSError, ValueError, TypeError, KeyError, TimeoutException, httplib.HTTPException)
+        etag = document['etag'] if document else None
+        last_modified = document['last_modified'] if document else None
+        for trial in range(1, nretry + 1):
+            try:
+                logger.info('[attempt=%s/%s] loading data from %s' % (trial, nretry, url))
+                content, etag, last_modified = self.fetch_url_data(url, etag=etag, last_modified=last_modified)
+                if content is None:
+                    logger.info('%s was not modified, using cached data (version %s)' % (url, document['version']))
+                    cache.touch(url)
+                else:
+                    cache.store(url, parser(content), etag=etag, last_modified=last_modified)
+                break
+            except load_errors + CACHE_ERRORS as e:  # ignore errors, try to use old cache if any
+                logger.warning('failed to load data from url=%s, error: %s' % (url, e))
+                if trial < nretry:
+                    xsleep_time = sleep_time() if callable(sleep_time) else sleep_time
+                    logger.info("will try again after %ss.." % xsleep_time)
+                    time.sleep(xsleep_time)
+        else:
+            try:
+                cache.release(url)  # let another process try
+            except CACHE_ERRORS as e:
+                logger.warning('failed to release the claim of %s: %s' % (url, e))
+
+        try:
+            return cache.get(url, names) or None
+        except CACHE_ERRORS as e:
+            logger.warning('failed to read data from info cache: %s' % e)
+            return None
+
+    @classmethod
+    def load_data(self, sources, priority, cache_time=60, parser=None, names=None):
         """
         Download data from various sources (prioritized).
         Try to get data from sources according to priority values passed
 
         Expected format of source entry:
-        sources = {'NAME':{'url':"source url", 'nretry':int, 'fname':'cache file (optional)', 'cache_time':int (optional), 'sleep_time':opt}}
+        sources = {'NAME':{'url':"source url", 'nretry':int, 'fname':'cache file (optional)', 'cache_time':int (optional), 'sleep_time':opt,
+                           'indexed':bool (optional)}}
+
+        Sources with 'indexed' set are dictionaries that are loaded through the node-shared info cache (if available)
+        instead of the cache file, and only the entries given by `names` are returned.
 
         :param sources: Dict of source configuration
         :param priority: Ordered list of source names
         :param cache_time: Default cache time in seconds. Can be overwritten by cache_time value passed in sources dict
         :param parser: Callback function to interpret/validate data which takes read data from source as input. Default is json.loads
+        :param names: Optional list of the needed entries of indexed sources (default: all entries)
         :return: Data loaded and processed by parser callback
         """
 
@@ -162,22 +307,32 @@ class DataLoader(object):
             if not dat:
                 continue
 
-            accepted_keys = ['url', 'fname', 'cache_time', 'nretry', 'sleep_time']
-            idat = dict([k, dat.get(k)] for k in accepted_keys if k in dat)
-            idat.setdefault('cache_time', cache_time)
-
-            content = self.load_url_data(**idat)
-            if not content:
-                continue
             if dat.get('parser'):
                 parser = dat.get('parser')
             if not parser:
                 def jsonparser(c):
                     dat = json.loads(c)
                     if dat and isinstance(dat, dict) and 'error' in dat:
-                        raise Exception('response contains error, data=%s' % dat)
+                        raise ValueError('response contains error, data=%s' % dat)
                     return dat
                 parser = jsonparser
+
+            if dat.get('indexed') and dat.get('url') and get_info_cache():
+                accepted_keys = ['url', 'cache_time', 'nretry', 'sleep_time']
+                idat = dict([k, dat.get(k)] for k in accepted_keys if k in dat)
+                idat.setdefault('cache_time', cache_time)
+                data = self.load_indexed_data(names=names, parser=parser, **idat)
+                if data:
+                    return data
+                continue
+
+            accepted_keys = ['url', 'fname', 'cache_time', 'nretry', 'sleep_time']
+            idat = dict([k, dat.get(k)] for k in accepted_keys if k in dat)
+            idat.setdefault('cache_time', cache_time)
+
+            content = self.load_url_data(**idat)
+            if not content:
+                continue
             try:
                 data = parser(content)
             except Exception as e:
@@ -60,10 +60,12 @@ class ExtInfoProvider(DataLoader):
 
         sources = {'CVMFS': {'url': '/cvmfs/atlas.cern.ch/repo/sw/local/etc/agis_schedconf.json',
                              'nretry': 1,
+                             'indexed': True,
                              'fname': os.path.join(cache_dir, 'agis_schedconf.cvmfs.json')},
                    'AGIS': {'url': 'http://atlas-agis-api.cern.ch/request/pandaqueue/query/list/?json'
                                    '&preset=schedconf.all&panda_queue=%s' % ','.join(pandaqueues),
                             'nretry': 3,
+                            'indexed': True,
                             'sleep_time': lambda: 15 + random.randint(0, 30),  ## max sleep time 45 seconds between retries
                             'cache_time': 3 * 60 * 60,  # 3 hours
                             'fname': os.path.join(cache_dir, 'agis_schedconf.agis.%s.json' %
@@ -77,7 +79,7 @@ class ExtInfoProvider(DataLoader):
 
         priority = priority or ['LOCAL', 'CVMFS', 'AGIS', 'PANDA']
 
-        return self.load_data(sources, priority, cache_time)
+        return self.load_data(sources, priority, cache_time, names=pandaqueues)
 
     @classmethod
     def load_queuedata(self, pandaqueue, priority=[], cache_time=60):
@@ -104,15 +106,17 @@ class ExtInfoProvider(DataLoader):
         def jsonparser_panda(c):
             dat = json.loads(c)
             if dat and isinstance(dat, dict) and 'error' in dat:
-                raise Exception('response contains error, data=%s' % dat)
+                raise ValueError('response contains error, data=%s' % dat)
             return {pandaqueue: dat}
 
         sources = {'CVMFS': {'url': '/cvmfs/atlas.cern.ch/repo/sw/local/etc/agis_schedconf.json',
                              'nretry': 1,
+                             'indexed': True,
                              'fname': os.path.join(cache_dir, 'agis_schedconf.cvmfs.json')},
                    'AGIS': {'url': 'http://atlas-agis-api.cern.ch/request/pandaqueue/query/list/?json'
                                    '&preset=schedconf.all&panda_queue=%s' % ','.join(pandaqueues),
                             'nretry': 3,
+                            'indexed': True,
                             'sleep_time': lambda: 15 + random.randint(0, 30),  # max sleep time 45 seconds between retries
                             'cache_time': 3 * 60 * 60,  # 3 hours
                             'fname': os.path.join(cache_dir, 'agis_schedconf.agis.%s.json' %
@@ -135,7 +139,7 @@ class ExtInfoProvider(DataLoader):
 
         priority = priority or ['LOCAL', 'PANDA', 'CVMFS', 'AGIS']
 
-        return self.load_data(sources, priority, cache_time)
+        return self.load_data(sources, priority, cache_time, names=pandaqueues)
 
     @classmethod
     def load_storage_data(self, ddmendpoints=[], priority=[], cache_time=60):
@@ -157,10 +161,12 @@ class ExtInfoProvider(DataLoader):
         # list of sources to fetch ddmconf data from
         sources = {'CVMFS': {'url': '/cvmfs/atlas.cern.ch/repo/sw/local/etc/agis_ddmendpoints.json',
                              'nretry': 1,
+                             'indexed': True,
                              'fname': os.path.join(cache_dir, 'agis_ddmendpoints.json')},
                    'AGIS': {'url': 'http://atlas-agis-api.cern.ch/request/ddmendpoint/query/list/?json&'
                                    'state=ACTIVE&preset=dict&ddmendpoint=%s' % ','.join(ddmendpoints),
                             'nretry': 3,
+                            'indexed': True,
                             'sleep_time': lambda: 15 + random.randint(0, 30),  ## max sleep time 45 seconds between retries
                             'cache_time': 3 * 60 * 60,  # 3 hours
                             'fname': os.path.join(cache_dir, 'agis_ddmendpoints.agis.%s.json' %
@@ -174,7 +180,7 @@ class ExtInfoProvider(DataLoader):
 
         priority = priority or ['LOCAL', 'CVMFS', 'AGIS', 'PANDA']
 
-        return self.load_data(sources, priority, cache_time)
+        return self.load_data(sources, priority, cache_time, names=ddmendpoints)
 
     def resolve_queuedata(self, pandaqueue, schedconf_priority=None):
         """
@@ -33,45 +33,52 @@ class FileSpec(BaseData):
 
     ## incomplete list of attributes .. to be extended once becomes used
 
-    lfn = ""
-    guid = ""
-
-    filesize = 0
-    checksum = {}    # file checksum values, allowed keys=['adler32', 'md5'], e.g. `fspec.checksum.get('adler32')`
-    scope = ""       # file scope
-
-    dataset = ""
-    ddmendpoint = ""    ## DDMEndpoint name (input or output depending on FileSpec.filetype)
-
-    accessmode = ""  # preferred access mode
-
-    allow_lan = True
-    allow_wan = False
-
-    direct_access_lan = False
-    direct_access_wan = False
-
-    ## dispatchDblock =  ""       # moved from Pilot1: is it needed? suggest proper internal name?
-    ## dispatchDBlockToken = ""   # moved from Pilot1: is it needed? suggest proper internal name?
-
-    ## prodDBlock = ""           # moved from Pilot1: is it needed? suggest proper internal name?
-    storage_token = ""  # prodDBlockToken = ""      # moved from Pilot1: suggest proper internal name (storage token?)
-
-    ## local keys
-    filetype = ''      # type of File: input, output of log
-    replicas = None    # list of resolved input replicas
-    protocols = None   # list of preferred protocols for requested activity
-    surl = ''          # source url
-    turl = ''          # transfer url
-    domain = ""        # domain of resolved replica
-    mtime = 0          # file modification time
-    status = None      # file transfer status value
-    status_code = 0    # file transfer status code
-    inputddms = []     # list of DDMEndpoint names which will be considered by default (if set) as allowed local (LAN) storage for input replicas
-    workdir = None     # used to declare file-specific work dir (location of given local file when it's used for transfer by copytool)
-    protocol_id = None  # id of the protocol to be used to construct turl
-    is_tar = False     # whether it's a tar file or not
-    ddm_activity = None  # DDM activity names (e.g. [read_lan, read_wan]) which should be used to resolve appropriate protocols from StorageData.arprotocols
+    _defaults = {
+        'lfn': "",
+        'guid': "",
+
+        'filesize': 0,
+        'checksum': {},    # file checksum values, allowed keys=['adler32', 'md5'], e.g. `fspec.checksum.get('adler32')`
+        'scope': "",       # file scope
+
+        'dataset': "",
+        'ddmendpoint': "",    ## DDMEndpoint name (input or output depending on FileSpec.filetype)
+
+        'accessmode': "",  # preferred access mode
+
+        'allow_lan': True,
+        'allow_wan': False,
+
+        'direct_access_lan': False,
+        'direct_access_wan': False,
+
+        ## dispatchDblock =  ""       # moved from Pilot1: is it needed? suggest proper internal name?
+        ## dispatchDBlockToken = ""   # moved from Pilot1: is it needed? suggest proper internal name?
+
+        ## prodDBlock = ""           # moved from Pilot1: is it needed? suggest proper internal name?
+        'storage_token': "",  # prodDBlockToken = ""      # moved from Pilot1: suggest proper internal name (storage token?)
+
+        ## local keys
+        'filetype': '',      # type of File: input, output of log
+        'replicas': None,    # list of resolved input replicas
+        'protocols': None,   # list of preferred protocols for requested activity
+        'surl': '',          # source url
+        'turl': '',          # transfer url
+        'domain': "",        # domain of resolved replica
+        'mtime': 0,          # file modification time
+        'status': None,      # file transfer status value
+        'status_code': 0,    # file transfer status code
+        'inputddms': [],     # list of DDMEndpoint names which will be considered by default (if set) as allowed local (LAN) storage for input replicas
+        'workdir': None,     # used to declare file-specific work dir (location of given local file when it's used for transfer by copytool)
+        'protocol_id': None,  # id of the protocol to be used to construct turl
+        'is_tar': False,     # whether it's a tar file or not
+        'ddm_activity': None,  # DDM activity names (e.g. [read_lan, read_wan]) which should be used to resolve appropriate protocols from
+                               # StorageData.arprotocols
+    }
+
+    # the fields are stored in slots, which saves memory for jobs with thousands of files (other attributes can still
+    # be added, they are stored in the instance dictionary)
+    __slots__ = tuple(_defaults)
 
     # specify the type of attributes for proper data validation and casting
     _keys = {int: ['filesize', 'mtime', 'status_code'],
@@ -87,6 +94,7 @@ class FileSpec(BaseData):
             :param type: type of File: either input, output or log
         """
 
+        self._set_defaults()
         self.filetype = filetype
         self.load(data)
 
@@ -0,0 +1,244 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+"""
+Node-shared, indexed cache for the large information documents (schedconfig, DDM endpoints).
+
+Each document (identified by its source URL or file) is stored in an sqlite database with one row per entry (PanDA
+queue or DDM endpoint), so that only the needed entries are parsed when the queue or storage data is resolved.
+Documents are replaced in a single transaction, so that concurrent pilots on the same node always see a complete
+version. The ETag and Last-Modified values of the source are kept for conditional refreshes.
+"""
+
+import json
+import os
+import tempfile
+import time
+
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None  # the info cache is not used
+
+from pilot.util.config import config
+
+import logging
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+CLAIM_TIME = 120  # a refresh claimed by another process is ignored after this time (s)
+CHUNK_SIZE = 500  # maximum number of names per query (sqlite variable limit)
+CACHE_ERRORS = (sqlite3.Error, ValueError) if sqlite3 else (ValueError,)  # database and entry decoding errors
+
+SCHEMA = ["CREATE TABLE documents (source TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, updated REAL, "
+          "version INTEGER, claimed REAL)",
+          "CREATE TABLE entries (source TEXT, name TEXT, data TEXT, PRIMARY KEY (source, name))"]
+
+
+class InfoCache(object):
+    """
+    sqlite store of information documents, indexed by source and entry name.
+    """
+
+    def __init__(self, path, timeout=30):
+        """
+        :param path: path to the database file (string).
+        :param timeout: maximum waiting time for a locked database in seconds (int).
+        """
+
+        self.path = path
+        self.timeout = timeout
+        self._initialized = False
+
+    def _connect(self):
+        """
+        Open a connection to the database, and create or upgrade the schema if needed.
+        A new connection is used for each operation, so that the object can be shared between threads.
+
+        :raise: sqlite3.Error.
+        :return: connection object.
+        """
+
+        connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)  # explicit transactions
+        if not self._initialized:
+            if connection.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+                connection.execute('BEGIN IMMEDIATE')
+                if connection.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+                    logger.info('creating info cache %s (schema version %d)' % (self.path, SCHEMA_VERSION))
+                    connection.execute('DROP TABLE IF EXISTS documents')
+                    connection.execute('DROP TABLE IF EXISTS entries')
+                    for statement in SCHEMA:
+                        connection.execute(statement)
+                    connection.execute('PRAGMA user_version = %d' % SCHEMA_VERSION)
+                connection.execute('COMMIT')
+            self._initialized = True
+
+        return connection
+
+    def get_document(self, source):
+        """
+        Return the meta data of the given document.
+
+        :param source: source URL or file (string).
+        :return: dictionary with etag, last_modified, updated, version (None if the document is not cached).
+        """
+
+        connection = self._connect()
+        try:
+            row = connection.execute('SELECT etag, last_modified, updated, version FROM documents WHERE source = ?',
+                                     (source,)).fetchone()
+        finally:
+            connection.close()
+
+        if not row or row[3] is None:
+            return None
+
+        return {'etag': row[0], 'last_modified': row[1], 'updated': row[2], 'version': row[3]}
+
+    def get(self, source, names=None):
+        """
+        Return the given entries of the document.
+
+        :param source: source URL or file (string).
+        :param names: optional list of entry names (default: all entries).
+        :return: dictionary {name: data}.
+        """
+
+        data = {}
+        connection = self._connect()
+        try:
+            if not names:
+                rows = connection.execute('SELECT name, data FROM entries WHERE source = ?', (source,)).fetchall()
+            else:
+                names = list(names)
+                rows = []
+                for i in range(0, len(names), CHUNK_SIZE):
+                    chunk = names[i:i + CHUNK_SIZE]
+                    rows += connection.execute('SELECT name, data FROM entries WHERE source = ? AND name IN (%s)' %
+                                               ','.join('?' * len(chunk)), [source] + chunk).fetchall()
+        finally:
+            connection.close()
+
+        for name, _data in rows:
+            data[name] = json.loads(_data)
+
+        return data
+
+    def claim(self, source):
+        """
+        Claim the refresh of the given document, so that concurrent pilots do not download it at the same time.
+
+        :param source: source URL or file (string).
+        :return: Boolean (False if another process is refreshing the document).
+        """
+
+        now = time.time()
+        connection = self._connect()
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute('INSERT OR IGNORE INTO documents (source) VALUES (?)', (source,))
+            cursor = connection.execute('UPDATE documents SET claimed = ? WHERE source = ? AND '
+                                        '(claimed IS NULL OR claimed < ?)', (now, source, now - CLAIM_TIME))
+            connection.execute('COMMIT')
+        finally:
+            connection.close()
+
+        return cursor.rowcount > 0
+
+    def touch(self, source):
+        """
+        Mark the cached document as up to date (e.g. when the source was not modified) and release the claim.
+
+        :param source: source URL or file (string).
+        :return:
+        """
+
+        connection = self._connect()
+        try:
+            connection.execute('UPDATE documents SET updated = ?, claimed = NULL WHERE source = ?', (time.time(), source))
+        finally:
+            connection.close()
+
+    def release(self, source):
+        """
+        Release the claim of the given document (e.g. after a failed refresh).
+
+        :param source: source URL or file (string).
+        :return:
+        """
+
+        connection = self._connect()
+        try:
+            connection.execute('UPDATE documents SET claimed = NULL WHERE source = ?', (source,))
+        finally:
+            connection.close()
+
+    def store(self, source, data, etag=None, last_modified=None):
+        """
+        Replace the cached document (in a single transaction) and release the claim.
+
+        :param source: source URL or file (string).
+        :param data: dictionary {name: data}.
+        :param etag: optional ETag of the source (string).
+        :param last_modified: optional Last-Modified value of the source (string).
+        :raise: TypeError if the data is not a dictionary.
+        :return: version of the document (int).
+        """
+
+        if not isinstance(data, dict):
+            raise TypeError('cannot index data of type %s' % type(data).__name__)
+
+        rows = [(source, name, json.dumps(value)) for name, value in data.items()]
+        connection = self._connect()
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+            row = connection.execute('SELECT version FROM documents WHERE source = ?', (source,)).fetchone()
+            version = (row[0] or 0) + 1 if row else 1
+            connection.execute('DELETE FROM entries WHERE source = ?', (source,))
+            connection.executemany('INSERT INTO entries (source, name, data) VALUES (?, ?, ?)', rows)
+            connection.execute('INSERT OR REPLACE INTO documents (source, etag, last_modified, updated, version, claimed) '
+                               'VALUES (?, ?, ?, ?, ?, NULL)', (source, etag, last_modified, time.time(), version))
+            connection.execute('COMMIT')
+        except sqlite3.Error:
+            connection.execute('ROLLBACK')
+            raise
+        finally:
+            connection.close()
+
+        logger.info('stored %d entries from %s in info cache (version %d)' % (len(rows), source, version))
+
+        return version
+
+
+_cache = None
+
+
+def get_info_cache():
+    """
+    Return the node-shared info cache.
+    The database is located in the configured info_cache path, or in the cache_dir (or the temporary directory) of the
+    [Information] section.
+
+    :return: `InfoCache` object (None if sqlite is not available or the cache is disabled).
+    """
+
+    global _cache
+    if sqlite3 is None:
+        return None
+
+    path = getattr(config.Information, 'info_cache', '')
+    if path is False:
+        return None
+    if not path:
+        directory = config.Information.cache_dir or tempfile.gettempdir()
+        path = os.path.join(directory, 'pilot_infocache_%d.db' % os.getuid())
+
+    if not _cache or _cache.path != path:
+        _cache = InfoCache(path)
+
+    return _cache
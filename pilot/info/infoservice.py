@@ -91,7 +91,12 @@ class InfoService(object):
         if not self.queuedata or not self.queuedata.name:
             raise QueuedataFailure("Failed to resolve queuedata for queue=%s, wrong PandaQueue name?" % self.pandaqueue)
 
-        self.resolve_storage_data()  ## prefetch details for all storages
+        ## prefetch details for the storages of the queue (the other storages are loaded on demand)
+        ddmendpoints = set(ddm for ddms in (self.queuedata.astorages or {}).values() for ddm in ddms)
+        try:
+            self.resolve_storage_data(sorted(ddmendpoints))
+        except PilotException as e:
+            logger.warning('failed to prefetch storage details: %s' % e)
 
     @classmethod
     def whoami(self):
@@ -47,92 +47,96 @@ class JobData(BaseData):
     # ## FIX ME LATER: use proper doc format
     # ## incomplete list of attributes .. to be extended once becomes used
 
-    jobid = None                   # unique Job identifier (forced to be a string)
-    taskid = None                  # unique Task identifier, the task that this job belongs to (forced to be a string)
-    jobparams = ""                 # job parameters defining the execution of the job
-    transformation = ""            # script execution name
-    state = ""                     # current job state
-    # current job status; format = {key: value, ..} e.g. key='LOG_TRANSFER', value='DONE'
-    status = {'LOG_TRANSFER': LOG_TRANSFER_NOT_DONE}
-    corecount = 1                  # Number of cores as requested by the task
-    platform = ""                  # cmtconfig value from the task definition
-    is_eventservice = False        # True for event service jobs
-    is_eventservicemerge = False   # True for event service merge jobs
-    transfertype = ""              # direct access instruction from server
-    accessmode = ""                # direct access instruction from jobparams
-    processingtype = ""            # e.g. nightlies
-    maxcpucount = 0                # defines what is a looping job (seconds)
-    allownooutput = ""             # used to disregard empty files from job report
-
-    # set by the pilot (not from job definition)
-    workdir = ""                   # working directoty for this job
-    workdirsizes = []              # time ordered list of work dir sizes
-    fileinfo = {}                  #
-    piloterrorcode = 0             # current pilot error code
-    piloterrorcodes = []           # ordered list of stored pilot error codes
-    piloterrordiag = ""            # current pilot error diagnostics
-    piloterrordiags = []           # ordered list of stored pilot error diagnostics
-    transexitcode = 0              # payload/trf exit code
-    exeerrorcode = 0               #
-    exeerrordiag = ""              #
-    exitcode = 0                   #
-    exitmsg = ""                   #
-    state = ""                     # internal pilot states; running, failed, finished, holding, stagein, stageout
-    serverstate = ""               # server job states; starting, running, finished, holding, failed
-    stageout = ""                  # stage-out identifier, e.g. log
-    metadata = {}                  # payload metadata (job report)
-    cpuconsumptionunit = ""        #
-    cpuconsumptiontime = -1        #
-    cpuconversionfactor = 1        #
-    nevents = 0                    # number of events
-    neventsw = 0                   # number of events written
-    dbtime = None                  #
-    dbdata = None                  #
-    payload = ""                   # payload name
-    utilities = {}                 # utility processes { <name>: [<process handle>, number of launches, command string], .. }
-    pid = None                     # payload pid
-    pgrp = None                    # payload process group
-    sizes = {}                     # job object sizes { timestamp: size, .. }
-    command = ""                   # full payload command (set for container jobs)
-    zombies = []                   # list of zombie process ids
-    memorymonitor = ""             # memory monitor name, e.g. prmon
-    actualcorecount = 0            # number of cores actually used by the payload
-
-    # time variable used for on-the-fly cpu consumption time measurements done by job monitoring
-    t0 = None                      # payload startup time
-
-    overwrite_queuedata = {}       # custom settings extracted from job parameters (--overwriteQueueData) to be used as master values for `QueueData`
-    overwrite_storagedata = {}     # custom settings extracted from job parameters (--overwriteStorageData) to be used as master values for `StorageData`
-
-    zipmap = ""                    # ZIP MAP values extracted from jobparameters
-    imagename = ""                 # user defined container image name extracted from job parameters
-    usecontainer = False           # boolean, True if a container is to be used for the payload
-
-    # from job definition
-    attemptnr = 0                  # job attempt number
-    destinationdblock = ""         ## to be moved to FileSpec (job.outdata)
-    datasetin = ""                 ## TO BE DEPRECATED: moved to FileSpec (job.indata)
-    debug = False                  #
-    produserid = ""                # the user DN (added to trace report)
-    jobdefinitionid = ""           # the job definition id (added to trace report)
-    infilesguids = ""              #
-    indata = []                    # list of `FileSpec` objects for input files (aggregated inFiles, ddmEndPointIn, scopeIn, filesizeIn, etc)
-    outdata = []                   # list of `FileSpec` objects for output files
-    logdata = []                   # list of `FileSpec` objects for log file(s)
-
-    # home package string with additional payload release information; does not need to be added to
-    # the conversion function since it's already lower case
-    homepackage = ""               #
-    jobsetid = ""                  # job set id
-    noexecstrcnv = None            # server instruction to the pilot if it should take payload setup from job parameters
-    swrelease = ""                 # software release string
-    writetofile = ""               #
-
-    # cmtconfig encoded info
-    alrbuserplatform = ""          # ALRB_USER_PLATFORM encoded in platform/cmtconfig value
-
-    # RAW data to keep backward compatible behavior for a while ## TO BE REMOVED once all job attributes will be covered
-    _rawdata = {}
+    _defaults = {
+        'jobid': None,                   # unique Job identifier (forced to be a string)
+        'taskid': None,                  # unique Task identifier, the task that this job belongs to (forced to be a string)
+        'jobparams': "",                 # job parameters defining the execution of the job
+        'transformation': "",            # script execution name
+        # current job status; format = {key: value, ..} e.g. key='LOG_TRANSFER', value='DONE'
+        'status': {'LOG_TRANSFER': LOG_TRANSFER_NOT_DONE},
+        'corecount': 1,                  # Number of cores as requested by the task
+        'platform': "",                  # cmtconfig value from the task definition
+        'is_eventservice': False,        # True for event service jobs
+        'is_eventservicemerge': False,   # True for event service merge jobs
+        'transfertype': "",              # direct access instruction from server
+        'accessmode': "",                # direct access instruction from jobparams
+        'processingtype': "",            # e.g. nightlies
+        'maxcpucount': 0,                # defines what is a looping job (seconds)
+        'allownooutput': "",             # used to disregard empty files from job report
+
+        # set by the pilot (not from job definition)
+        'workdir': "",                   # working directoty for this job
+        'workdirsizes': [],              # time ordered list of work dir sizes
+        'fileinfo': {},                  #
+        'piloterrorcode': 0,             # current pilot error code
+        'piloterrorcodes': [],           # ordered list of stored pilot error codes
+        'piloterrordiag': "",            # current pilot error diagnostics
+        'piloterrordiags': [],           # ordered list of stored pilot error diagnostics
+        'transexitcode': 0,              # payload/trf exit code
+        'exeerrorcode': 0,               #
+        'exeerrordiag': "",              #
+        'exitcode': 0,                   #
+        'exitmsg': "",                   #
+        'state': "",                     # internal pilot states; running, failed, finished, holding, stagein, stageout
+        'serverstate': "",               # server job states; starting, running, finished, holding, failed
+        'stageout': "",                  # stage-out identifier, e.g. log
+        'metadata': {},                  # payload metadata (job report)
+        'cpuconsumptionunit': "",        #
+        'cpuconsumptiontime': -1,        #
+        'cpuconversionfactor': 1,        #
+        'nevents': 0,                    # number of events
+        'neventsw': 0,                   # number of events written
+        'dbtime': None,                  #
+        'dbdata': None,                  #
+        'payload': "",                   # payload name
+        'utilities': {},                 # utility processes { <name>: [<process handle>, number of launches, command string], .. }
+        'pid': None,                     # payload pid
+        'pgrp': None,                    # payload process group
+        'sizes': {},                     # job object sizes { timestamp: size, .. }
+        'command': "",                   # full payload command (set for container jobs)
+        'payloadsetup': {},              # payload setup prepared during stage-in { <step>: (value, caught exception), .. }
+        'zombies': [],                   # list of zombie process ids
+        'memorymonitor': "",             # memory monitor name, e.g. prmon
+        'actualcorecount': 0,            # number of cores actually used by the payload
+
+        # time variable used for on-the-fly cpu consumption time measurements done by job monitoring
+        't0': None,                      # payload startup time
+
+        'overwrite_queuedata': {},       # custom settings extracted from job parameters (--overwriteQueueData) to be used as master values for `QueueData`
+        'overwrite_storagedata': {},     # custom settings extracted from job parameters (--overwriteStorageData) to be used as master values for `StorageData`
+
+        'zipmap': "",                    # ZIP MAP values extracted from jobparameters
+        'imagename': "",                 # user defined container image name extracted from job parameters
+        'usecontainer': False,           # boolean, True if a container is to be used for the payload
+
+        # from job definition
+        'attemptnr': 0,                  # job attempt number
+        'destinationdblock': "",         ## to be moved to FileSpec (job.outdata)
+        'datasetin': "",                 ## TO BE DEPRECATED: moved to FileSpec (job.indata)
+        'debug': False,                  #
+        'produserid': "",                # the user DN (added to trace report)
+        'jobdefinitionid': "",           # the job definition id (added to trace report)
+        'infilesguids': "",              #
+        'indata': [],                    # list of `FileSpec` objects for input files (aggregated inFiles, ddmEndPointIn, scopeIn, filesizeIn, etc)
+        'outdata': [],                   # list of `FileSpec` objects for output files
+        'logdata': [],                   # list of `FileSpec` objects for log file(s)
+
+        # home package string with additional payload release information; does not need to be added to
+        # the conversion function since it's already lower case
+        'homepackage': "",               #
+        'jobsetid': "",                  # job set id
+        'noexecstrcnv': None,            # server instruction to the pilot if it should take payload setup from job parameters
+        'swrelease': "",                 # software release string
+        'writetofile': "",               #
+
+        # cmtconfig encoded info
+        'alrbuserplatform': "",          # ALRB_USER_PLATFORM encoded in platform/cmtconfig value
+
+        # RAW data to keep backward compatible behavior for a while ## TO BE REMOVED once all job attributes will be covered
+        '_rawdata': {},
+    }
+
+    __slots__ = tuple(_defaults)
 
     # specify the type of attributes for proper data validation and casting
     _keys = {int: ['corecount', 'piloterrorcode', 'transexitcode', 'exitcode', 'cpuconversionfactor', 'exeerrorcode',
@@ -154,6 +158,7 @@ class JobData(BaseData):
             :param data: input dictionary of data settings
         """
 
+        self._set_defaults()
         self.infosys = None  # reference to Job specific InfoService instance
         self._rawdata = data
 
@@ -640,12 +645,14 @@ class JobData(BaseData):
 
         return ret, rawdata
 
-    def add_workdir_size(self, workdir_size):
+    def add_workdir_size(self, workdir_size, file_sizes=None):  # noqa: C901
         """
         Add a measured workdir size to the workdirsizes field.
         The function will deduce any input and output file sizes from the workdir size.
 
         :param workdir_size: workdir size (int).
+        :param file_sizes: optional dictionary of already known file sizes in the workdir, {file name: size in B}
+        (e.g. from the workdir usage tracker); the files will be stat'ed if not set.
         :return:
         """
 
@@ -683,11 +690,17 @@ class JobData(BaseData):
                 if fspec.filetype == 'input' and fspec.status != 'transferred':
                     continue
                 pfn = os.path.join(self.workdir, fspec.lfn)
-                if not os.path.isfile(pfn):
+                if file_sizes is not None:
+                    size = file_sizes.get(fspec.lfn)
+                elif os.path.isfile(pfn):
+                    size = os.path.getsize(pfn)
+                else:
+                    size = None
+                if size is None:
                     msg = "pfn file=%s does not exist (skip from workdir size calculation)" % pfn
                     logger.info(msg)
                 else:
-                    total_size += os.path.getsize(pfn)
+                    total_size += size
 
             logger.info("total size of present input+output files: %d B (workdir size: %d B)" %
                         (total_size, workdir_size))
@@ -76,6 +76,9 @@ class QueueData(BaseData):
 
     use_pcache = False
 
+    transfer_threads = 0  # maximum number of concurrent per-file transfers (0 means use the pilot default)
+    rse_transfer_threads = {}  # maximum number of concurrent transfers per ddmendpoint, e.g. {'CERN-PROD_DATADISK': 4, 'default': 2}
+
     maxwdir = 0    # in MB
     maxrss = 0
 
@@ -89,10 +92,10 @@ class QueueData(BaseData):
 
     # specify the type of attributes for proper data validation and casting
     _keys = {int: ['timefloor', 'maxwdir', 'pledgedcpu', 'es_stageout_gap',
-                   'corecount', 'maxrss', 'maxtime'],
+                   'corecount', 'maxrss', 'maxtime', 'transfer_threads'],
              str: ['name', 'type', 'appdir', 'catchall', 'platform', 'container_options', 'container_type',
                    'resource', 'state', 'status', 'site'],
-             dict: ['copytools', 'acopytools', 'astorages', 'aprotocols', 'acopytools_schemas'],
+             dict: ['copytools', 'acopytools', 'astorages', 'aprotocols', 'acopytools_schemas', 'rse_transfer_threads'],
              bool: ['allow_lan', 'allow_wan', 'direct_access_lan', 'direct_access_wan', 'use_pcache']
              }
 
@@ -9,6 +9,8 @@
 
 import unittest
 import os
+import shutil
+import tempfile
 
 from pilot.api import analytics
 
@@ -74,6 +76,95 @@ class TestAnalytics(unittest.TestCase):
         self.assertEqual(type(slope), float)
         self.assertGreater(slope, 0)
 
+    def test_fitted_data(self):
+        """
+        Make sure that the fit of the incrementally read memory monitor data agrees with the fit of the parsed table.
+
+        :return: (assertion).
+        """
+
+        filename = 'pilot/test/resource/memory_monitor_output.txt'
+        table = self.client.get_table(filename)
+        fit = self.client.fit(table['Time'], table['PSS'])
+
+        data = self.client.get_fitted_data(filename, y_name='PSS', precision=2)
+        self.assertEqual(float(data['slope']), round(fit.slope(), 2))
+
+    def test_running_fit(self):
+        """
+        Make sure that the running fit agrees with the full fit when points are added and removed.
+
+        :return: (assertion).
+        """
+
+        x = [float(i) for i in range(100)]
+        y = [2.0 * _x + 5.0 + (-1) ** i for i, _x in enumerate(x)]
+
+        running = analytics.RunningFit()
+        for _x, _y in zip(x, y):
+            running.add(_x, _y)
+        fit = self.client.fit(x, y)
+        self.assertAlmostEqual(running.slope(), fit.slope())
+        self.assertAlmostEqual(running.intersect(), fit.intersect())
+
+        for _x, _y in zip(x[:40], y[:40]):
+            running.remove(_x, _y)
+        fit = self.client.fit(x[40:], y[40:])
+        self.assertAlmostEqual(running.slope(), fit.slope())
+        self.assertAlmostEqual(running.intersect(), fit.intersect())
+
+    def test_theil_sen(self):
+        """
+        Make sure that the Theil-Sen estimator ignores outliers.
+
+        :return: (assertion).
+        """
+
+        x = [float(i) for i in range(50)]
+        y = [3.0 * _x + 1.0 for _x in x]
+        y[10] = y[30] = 1.0e6  # memory spikes
+
+        slope, intersect = analytics.theil_sen(x, y)
+        self.assertAlmostEqual(slope, 3.0)
+        self.assertAlmostEqual(intersect, 1.0)
+        self.assertNotAlmostEqual(self.client.fit(x, y).slope(), 3.0)
+
+        # subsampled
+        slope, intersect = analytics.theil_sen(x, y, max_points=10)
+        self.assertAlmostEqual(slope, 3.0)
+
+    def test_streaming_fit(self):
+        """
+        Make sure that appended memory monitor rows are included in the fit, and that a window restricts the fit.
+
+        :return: (assertion).
+        """
+
+        workdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(workdir, 'memory_monitor_summary.txt')
+            with open(filename, 'w') as f:
+                f.write('Time\tpss\tswap\n')
+                for t in range(20):
+                    f.write('%d\t%d\t0\n' % (t, 100 + 2 * t))
+
+            data = self.client.get_fitted_data(filename)
+            self.assertEqual(float(data['slope']), 2.0)
+
+            # the memory usage now grows faster
+            with open(filename, 'a') as f:
+                for t in range(20, 40):
+                    f.write('%d\t%d\t%d\n' % (t, 100 + 2 * t, 10 * (t - 20)))
+
+            data = self.client.get_fitted_data(filename)
+            self.assertGreater(float(data['slope']), 2.0)
+            data = self.client.get_fitted_data(filename, window=10)
+            self.assertEqual(float(data['slope']), 12.0)
+            data = self.client.get_fitted_data(filename, estimator='theil-sen', window=10, tails=False)
+            self.assertEqual(float(data['slope']), 12.0)
+        finally:
+            shutil.rmtree(workdir)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+import gzip
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+
+from pilot.util.archive import ParallelGzipFile, create_archive
+from pilot.util.filehandling import tar_files
+
+
+class TestArchive(unittest.TestCase):
+    """
+    Unit tests for the streaming log tarball creation.
+    """
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def test_parallel_gzip(self):
+        """
+        Make sure that the concatenated gzip members decompress to the original data.
+
+        :return: (assertion).
+        """
+
+        data = os.urandom(100000) * 5 + b'pilot' * 100000
+        output = io.BytesIO()
+        gzfile = ParallelGzipFile(output, nthreads=3, blocksize=65536)
+        for i in range(0, len(data), 10240):
+            gzfile.write(data[i:i + 10240])
+        gzfile.close()
+
+        self.assertEqual(gzip.GzipFile(fileobj=io.BytesIO(output.getvalue())).read(), data)
+
+    def test_create_archive(self):
+        """
+        Make sure that excluded directories and files beyond the size limit are skipped.
+
+        :return: (assertion).
+        """
+
+        os.makedirs(os.path.join(self.workdir, 'scratch', 'sub'))
+        os.makedirs(os.path.join(self.workdir, 'athenaMP'))
+        with open(os.path.join(self.workdir, 'scratch', 'sub', 'core'), 'wb') as fp:
+            fp.write(b'0' * 1000)
+        with open(os.path.join(self.workdir, 'athenaMP', 'log.worker'), 'wb') as fp:
+            fp.write(b'1' * 1000)
+        with open(os.path.join(self.workdir, 'payload.stdout'), 'wb') as fp:
+            fp.write(b'2' * 2000)
+
+        filename = os.path.join(self.workdir, 'log.tgz')
+        nfiles, size, skipped = create_archive(filename, self.workdir, arcname='tarball',
+                                               exclude=lambda path: os.path.basename(path) == 'scratch',
+                                               max_size=1500, nthreads=2)
+
+        self.assertEqual((nfiles, size), (1, 1000))
+        self.assertEqual(skipped, [os.path.join(self.workdir, 'payload.stdout')])
+        with tarfile.open(filename) as archive:
+            self.assertEqual(sorted(archive.getnames()), ['tarball', 'tarball/athenaMP', 'tarball/athenaMP/log.worker'])
+
+    def test_tar_files(self):
+        """
+        Make sure that tar_files only excludes files by name and only adds the files to the tarball.
+
+        :return: (assertion).
+        """
+
+        os.makedirs(os.path.join(self.workdir, 'pilot', 'sub'))
+        for name in ['pilot/sub/pilot', 'pilot/payload.stdout', 'pilot/job.xml', 'pilotlog.txt']:
+            with open(os.path.join(self.workdir, name), 'w') as fp:
+                fp.write(name)
+
+        self.assertEqual(tar_files(self.workdir, ['pilot', 'job.xml', 'pilotlog.txt'], 'log.tgz'), 0)
+
+        with tarfile.open(os.path.join(self.workdir, 'log.tgz')) as archive:
+            self.assertEqual(sorted(archive.getnames()), ['./pilot/payload.stdout'])
+        self.assertEqual(sorted(os.listdir(self.workdir)), ['log.tgz', 'pilot', 'pilotlog.txt'])
+        self.assertEqual(sorted(os.listdir(os.path.join(self.workdir, 'pilot'))), ['job.xml', 'sub'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+import zlib
+
+from pilot.util import checksum
+
+
+class TestChecksum(unittest.TestCase):
+    """
+    Unit tests for the single-pass, cached checksum calculation.
+    """
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def _write(self, name, data):
+        path = os.path.join(self.workdir, name)
+        with open(path, 'wb') as fp:
+            fp.write(data)
+        return path
+
+    def test_checksums(self):
+        """
+        Make sure that adler32 and md5 are calculated correctly in a single pass over several read blocks.
+
+        :return: (assertion).
+        """
+
+        data = os.urandom(3 * 1024 * 1024 + 17)
+        path = self._write('file', data)
+        checksums = checksum._read_checksums(path, set(['adler32', 'md5']), blocksize=1024 * 1024)
+
+        self.assertEqual(checksums['adler32'], '%08x' % (zlib.adler32(data) & 0xffffffff))
+        self.assertEqual(checksums['md5'], hashlib.md5(data).hexdigest())
+        self.assertEqual(checksum.get_checksum(self._write('empty', b''), algorithm='ad32'), '00000001')
+        self.assertRaises(ValueError, checksum.get_checksum, path, 'sha1')
+
+    def test_cache(self):
+        """
+        Make sure that a modified file is not served from the cache.
+
+        :return: (assertion).
+        """
+
+        path = self._write('file', b'first version')
+        first = checksum.get_checksum(path)
+        self.assertEqual(checksum.get_checksum(path), first)
+
+        self._write('file', b'second version, different size')
+        self.assertNotEqual(checksum.get_checksum(path), first)
+
+        paths = [self._write('file%d' % i, os.urandom(1000)) for i in range(5)]
+        self.assertEqual(checksum.get_checksums_in_parallel(paths, algorithm='md5', nthreads=3),
+                         [checksum.get_checksum(path, algorithm='md5') for path in paths])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+import json
+import threading
+import time
+import unittest
+
+from pilot.common.exception import CommunicationFailure, UnknownException
+from pilot.eventservice.communicationmanager.communicationmanager import CommunicationManager, CommunicationResponse
+from pilot.eventservice.communicationmanager.plugins.basecommunicator import BaseCommunicator
+
+
+class FakeCommunicator(BaseCommunicator):
+    """
+    Communicator plugin replacement recording the requests.
+    """
+
+    def __init__(self, update_delay=0):
+        super(FakeCommunicator, self).__init__()
+        self.update_delay = update_delay
+        self.accept_events = True
+        self.updates = []
+
+    def ok(self, req=None):
+        return CommunicationResponse({'status': 0})
+
+    pre_check_get_jobs = request_get_jobs = check_get_jobs_status = get_jobs = ok
+    pre_check_update_jobs = update_jobs = pre_check_update_events = request_get_events = check_get_events_status = ok
+
+    def pre_check_get_events(self, req=None):
+        return CommunicationResponse({'status': 0 if self.accept_events else 1})
+
+    def get_events(self, req):
+        content = [{'eventRangeID': str(i)} for i in range(req.num_ranges)]
+        return CommunicationResponse({'status': 0, 'content': content})
+
+    def update_events(self, req):
+        time.sleep(self.update_delay)
+        self.updates.append(req.update_events)
+        return CommunicationResponse({'status': 0, 'content': {'StatusCode': 0}})
+
+
+class TwoStepCommunicator(FakeCommunicator):
+    """
+    Communicator whose event range request fails, so that the request status never becomes ready.
+    """
+
+    def __init__(self):
+        super(TwoStepCommunicator, self).__init__()
+        self.error = IOError('cannot write request file')
+
+    def request_get_events(self, req):
+        if self.error:
+            raise self.error
+        return CommunicationResponse({'status': -1})
+
+    def check_get_events_status(self, req=None):
+        return CommunicationResponse({'status': 1})
+
+
+class FakeCommunicationManager(CommunicationManager):
+    """
+    Communication manager using the fake communicator.
+    """
+
+    def __init__(self, communicator):
+        super(FakeCommunicationManager, self).__init__()
+        self.communicator = communicator
+
+    def get_plugin(self, confs):
+        return self.communicator
+
+
+JOB = {'PandaID': 1, 'jobsetID': 2, 'taskID': 3}
+
+
+class TestESCommunicationManager(unittest.TestCase):
+    """
+    Unit tests for the request lanes of the event service communication manager.
+    """
+
+    def setUp(self):
+        self.communicator = FakeCommunicator()
+        self.manager = FakeCommunicationManager(self.communicator)
+        self.manager.start()
+
+    def tearDown(self):
+        self.manager.stop()
+        self.manager.join(5)
+
+    def test_get_event_ranges(self):
+        """
+        Make sure that a request is processed as soon as it is submitted.
+
+        :return: (assertion).
+        """
+
+        t0 = time.time()
+        event_ranges = self.manager.get_event_ranges(num_event_ranges=2, job=JOB)
+        self.assertEqual(len(event_ranges), 2)
+        self.assertTrue(time.time() - t0 < 0.5)
+
+    def test_lanes(self):
+        """
+        Make sure that a slow event range update does not block the download of event ranges.
+
+        :return: (assertion).
+        """
+
+        self.communicator.update_delay = 2
+        self.manager.update_events_window = 0
+        done = threading.Event()
+        self.manager.update_events({'version': 0, 'eventRanges': '[]'}, post_hook=lambda resp: done.set())
+
+        t0 = time.time()
+        self.assertEqual(len(self.manager.get_event_ranges(num_event_ranges=1, job=JOB)), 1)
+        self.assertTrue(time.time() - t0 < 1)
+        self.assertFalse(done.is_set())
+
+    def test_coalesce_update_events(self):
+        """
+        Make sure that the update_events requests submitted within the window are sent in one call per version.
+
+        :return: (assertion).
+        """
+
+        self.manager.update_events_window = 0.5
+        responses = []
+        messages = [{'version': 0, 'eventRanges': json.dumps([{'eventRangeID': '1', 'eventStatus': 'failed'}])},
+                    {'version': 0, 'eventRanges': json.dumps([{'eventRangeID': '2', 'eventStatus': 'failed'}])},
+                    {'version': 1, 'eventRanges': json.dumps([{'zipFile': {'lfn': 'a'}, 'eventRanges': []}])}]
+        for message in messages[:-1]:
+            self.manager.update_events(message, post_hook=responses.append)
+        self.assertEqual(self.manager.update_events(messages[-1]), {'StatusCode': 0})
+
+        self.assertEqual(len(responses), 2)
+        self.assertEqual(len(self.communicator.updates), 2)
+        self.assertEqual(self.communicator.updates[0]['version'], 0)
+        self.assertEqual([e['eventRangeID'] for e in json.loads(self.communicator.updates[0]['eventRanges'])], ['1', '2'])
+        self.assertEqual(self.communicator.updates[1], messages[2])
+
+    def test_setup_failure(self):
+        """
+        Make sure that the requests are aborted if the communicator cannot be set up.
+
+        :return: (assertion).
+        """
+
+        class FailingCommunicationManager(CommunicationManager):
+            def get_plugin(self, confs):
+                raise ValueError('no plugin')
+
+        manager = FailingCommunicationManager()
+        manager.update_events({'version': 0, 'eventRanges': '[]'}, post_hook=lambda resp: None)
+        manager.start()
+        manager.join(5)
+        self.assertFalse(manager.is_alive())
+        self.assertTrue(manager.is_stop())
+        self.assertEqual(manager.get_event_ranges(num_event_ranges=1, job=JOB), None)
+        self.assertTrue(manager.queues['update_events'].empty())
+
+    def test_failed_step(self):
+        """
+        Make sure that a request is completed if its first step fails, instead of waiting for the second step of a
+        communicator such as the harvester share file one.
+
+        :return: (assertion).
+        """
+
+        communicator = TwoStepCommunicator()
+        manager = FakeCommunicationManager(communicator)
+        manager.start()
+        try:
+            t0 = time.time()
+            self.assertRaises(UnknownException, manager.get_event_ranges, num_event_ranges=1, job=JOB)
+            self.assertTrue(time.time() - t0 < 1)
+
+            communicator.error = None
+            self.assertEqual(manager.get_event_ranges(num_event_ranges=1, job=JOB), None)
+            self.assertTrue(time.time() - t0 < 2)
+        finally:
+            manager.stop()
+            manager.join(5)
+
+    def test_stop(self):
+        """
+        Make sure that a request which is not accepted by the communicator is aborted when the manager stops.
+
+        :return: (assertion).
+        """
+
+        self.communicator.accept_events = False
+        threading.Timer(0.2, self.manager.stop).start()
+        self.assertRaises(CommunicationFailure, self.manager.get_event_ranges, num_event_ranges=1, job=JOB)
+        self.manager.join(5)
+        self.assertFalse(self.manager.is_alive())
+        self.assertEqual(self.manager.get_event_ranges(num_event_ranges=1, job=JOB), None)
+
+
+if __name__ == '__main__':
+    unittest.main()
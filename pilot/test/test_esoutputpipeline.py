@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+import unittest
+
+from pilot.eventservice.workexecutor.outputpipeline import ESOutputPipeline
+
+
+class FakeStageOut(object):
+    """
+    Stage-out replacement recording the archives and the number of concurrent uploads.
+    """
+
+    def __init__(self, delay=0.0, failures=0):
+        self.delay = delay
+        self.failures = failures
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+        self.finished = []
+        self.failed = []
+
+    def stageout(self, path):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+            if self.failures != 0:
+                self.failures -= 1
+                raise Exception('stage-out failed')
+        return 'RSE', 1, os.path.getsize(path), {'adler32': '00000001'}
+
+    def report_finished(self, messages, path, fsize, checksum, storage_id):
+        with tarfile.open(path) as tar:
+            names = tar.getnames()
+        self.finished.append((sorted(message['id'] for message in messages), names))
+
+    def report_failed(self, messages):
+        self.failed.extend(message['id'] for message in messages)
+
+
+class TestESOutputPipeline(unittest.TestCase):
+    """
+    Unit tests for the ES output pipeline.
+    """
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def add_outputs(self, pipeline, num):
+        """
+        Create and queue the outputs of num event ranges.
+        """
+
+        for i in range(num):
+            path = os.path.join(self.workdir, 'HITS.%d.pool.root' % i)
+            with open(path, 'w') as output:
+                output.write('x' * 100)
+            pipeline.add({'id': str(i), 'status': 'finished', 'output': path})
+
+    def create_pipeline(self, stageout, **kwargs):
+        return ESOutputPipeline(self.workdir, stageout.stageout, stageout.report_finished, stageout.report_failed, **kwargs)
+
+    def test_concurrent_uploads(self):
+        """
+        Make sure that the archives are rolled by size and staged out concurrently.
+
+        :return: (assertion).
+        """
+
+        stageout = FakeStageOut(delay=0.2)
+        pipeline = self.create_pipeline(stageout, max_size=1, nworkers=3)
+        self.add_outputs(pipeline, 6)
+        self.assertTrue(pipeline.close(timeout=10))
+
+        self.assertEqual(sorted(ids[0] for ids, _ in stageout.finished), [str(i) for i in range(6)])
+        self.assertEqual(stageout.finished[0][1], ['HITS.%s.pool.root' % stageout.finished[0][0][0]])
+        self.assertTrue(stageout.max_active > 1)
+        self.assertEqual(pipeline.get_stats()['uploaded'], 6)
+        self.assertEqual(stageout.failed, [])
+        self.assertFalse([thread for thread in pipeline._threads if thread.is_alive()])
+
+    def test_roll_by_age(self):
+        """
+        Make sure that an archive is staged out once it is too old.
+
+        :return: (assertion).
+        """
+
+        stageout = FakeStageOut()
+        pipeline = self.create_pipeline(stageout, max_age=0.1)
+        self.add_outputs(pipeline, 3)
+        time.sleep(1)
+
+        self.assertEqual(stageout.finished, [(['0', '1', '2'], ['HITS.0.pool.root', 'HITS.1.pool.root', 'HITS.2.pool.root'])])
+        self.assertTrue(pipeline.close(timeout=10))
+
+    def test_retry(self):
+        """
+        Make sure that a failed upload is retried.
+
+        :return: (assertion).
+        """
+
+        stageout = FakeStageOut(failures=1)
+        pipeline = self.create_pipeline(stageout, max_age=0.1, retry_delay=0.1)
+        self.add_outputs(pipeline, 2)
+        time.sleep(1)
+
+        self.assertEqual(pipeline.get_stats()['failed_uploads'], 1)
+        self.assertEqual([ids for ids, _ in stageout.finished], [['0', '1']])
+        self.assertTrue(pipeline.close(timeout=10))
+        self.assertEqual(stageout.failed, [])
+
+    def test_failure_on_close(self):
+        """
+        Make sure that the event ranges of an archive which cannot be staged out at the end are reported as failed.
+
+        :return: (assertion).
+        """
+
+        stageout = FakeStageOut(failures=-1)
+        pipeline = self.create_pipeline(stageout, retry_delay=3600)
+        self.add_outputs(pipeline, 2)
+        pipeline.flush()
+        time.sleep(0.5)
+        self.assertEqual(stageout.failed, [])  # waiting for a retry
+
+        self.assertTrue(pipeline.close(timeout=10))
+        self.assertEqual(sorted(stageout.failed), ['0', '1'])
+        self.assertEqual(stageout.finished, [])
+
+    def test_roll_failure(self):
+        """
+        Make sure that the event ranges of an archive which cannot be closed after the timeout are reported as failed,
+        and that the packing thread continues.
+
+        :return: (assertion).
+        """
+
+        stageout = FakeStageOut()
+        pipeline = self.create_pipeline(stageout, max_age=0.5)
+        self.add_outputs(pipeline, 2)
+        time.sleep(0.2)
+        os.remove(os.path.join(self.workdir, 'EventService_premerge_0.tar'))
+        time.sleep(1)
+
+        self.assertEqual(sorted(stageout.failed), ['0', '1'])
+        self.assertTrue(pipeline._threads[0].is_alive())
+        self.add_outputs(pipeline, 1)
+        self.assertTrue(pipeline.close(timeout=10))
+        self.assertEqual(stageout.finished, [(['0'], ['HITS.0.pool.root'])])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,6 +6,7 @@
 # Authors:
 # - Wen Guan, wen.guan@cern.ch, 2017-2018
 # - Paul Nilsson, paul.nilsson@cern.ch, 2019
+# - agent, agent@local, 2026
 
 import json
 import logging
@@ -148,6 +149,138 @@ class TestESMessageThread(unittest.TestCase):
         self.assertFalse(msg_thread.is_alive())
 
 
+class FakeServerSocket(object):
+    """
+    Replacement of a yampl server socket, messages are sent by a local fake payload.
+    """
+
+    def __init__(self, with_timeout=True):
+        self.messages = queue.Queue()  # Python 2/3
+        self.sent = []
+        if not with_timeout:
+            self.try_recv_raw = self.try_recv_raw_without_timeout
+
+    def send_raw(self, message):
+        self.sent.append(message)
+
+    def try_recv_raw(self, timeout):
+        try:
+            message = self.messages.get(timeout=timeout / 1000.) if timeout else self.messages.get(False)
+        except queue.Empty:
+            return -1, None
+        return len(message), message
+
+    def try_recv_raw_without_timeout(self):
+        return FakeServerSocket.try_recv_raw(self, 0)
+
+
+def run_fake_payload(server, nmessages):
+    """
+    Send messages from a fake payload.
+
+    :param server: FakeServerSocket object.
+    :param nmessages: number of messages.
+    """
+    for i in range(nmessages):
+        server.messages.put('/tmp/output.%d,ID:%d,CPU:1,WALL:1' % (i, i))
+
+
+class TestESMessagePath(unittest.TestCase):
+    """
+    Unit tests for the message path between the payload and ESProcess with a local fake payload.
+    """
+
+    def receive_all(self, server, nmessages):
+        """
+        Receive all messages of the fake payload with a message thread.
+
+        :returns: message statistics of the message thread.
+        """
+        _queue = queue.Queue()  # Python 2/3
+        msg_thread = MessageThread(_queue, message_server=server)
+        msg_thread.start()
+        payload = threading.Thread(target=run_fake_payload, args=(server, nmessages))
+        payload.start()
+
+        received = [_queue.get(timeout=10) for _ in range(nmessages)]
+        msg_thread.stop()
+        msg_thread.join(5)
+        self.assertFalse(msg_thread.is_alive())
+        self.assertEqual(received[-1], '/tmp/output.%d,ID:%d,CPU:1,WALL:1' % (nmessages - 1, nmessages - 1))
+
+        stats = msg_thread.get_stats()
+        logging.info('message thread statistics: %s' % stats)
+        self.assertEqual(stats['received'], nmessages)
+        return stats
+
+    def test_throughput(self):
+        """
+        Make sure that all messages are received and that pending messages are drained per wakeup.
+        """
+
+        stats = self.receive_all(FakeServerSocket(), 20000)
+        self.assertTrue(stats['wakeups'] <= stats['received'])
+        self.assertTrue(stats['rate'] > 0)
+
+    def test_polling(self):
+        """
+        Make sure that the messages are received from a socket without receive timeout.
+        """
+
+        self.receive_all(FakeServerSocket(with_timeout=False), 100)
+
+    def test_handle_messages(self):
+        """
+        Make sure that the workers ready for events are served together and that all out messages are handled.
+        """
+
+        class FakeMessageThread(object):
+            def __init__(self):
+                self.sent = []
+
+            def send(self, message):
+                self.sent.append(message)
+
+            def stop(self):
+                pass
+
+        event_ranges = [{'eventRangeID': '1'}, {'eventRangeID': '2'}]
+        requests = []
+        outputs = []
+
+        def get_event_ranges(num_ranges):
+            requests.append(num_ranges)
+            ret = event_ranges[:num_ranges]
+            del event_ranges[:num_ranges]
+            return ret
+
+        process = ESProcess({'executable': 'true'})
+        process.set_get_event_ranges_hook(get_event_ranges)
+        process.set_handle_out_message_hook(outputs.append)
+        message_thread = FakeMessageThread()
+        process._ESProcess__message_thread = message_thread
+        for message in ['Ready for events', '/tmp/output.1,ID:1,CPU:1,WALL:1', 'Ready for events',
+                        'ERR_ATHENAMP_PROCESS 2: Failed to process event range', 'Ready for events']:
+            process._ESProcess__message_queue.put(message)
+
+        process.handle_messages()
+        self.assertEqual([output['status'] for output in outputs], ['finished', 'failed'])
+        self.assertEqual(requests, [3, 1])
+        self.assertEqual(message_thread.sent, [json.dumps([{'eventRangeID': '1'}]), json.dumps([{'eventRangeID': '2'}]),
+                                               'No more events'])
+
+    def test_parse_out_message(self):
+        """
+        Make sure to parse messages from payload correctly.
+        """
+
+        process = ESProcess({'executable': 'true'})
+        ret = process.parse_out_message('ERR_ATHENAMP_PROCESS 130-2068634812-21368-1-4: Failed to process event range')
+        self.assertEqual(ret['id'], '130-2068634812-21368-1-4')
+        ret = process.parse_out_message("ERR_ATHENAMP_PARSE \"u'eventRangeID': u'130-2068634812-21368-1-4'\": Wrong format")
+        self.assertEqual(ret['id'], '130-2068634812-21368-1-4')
+
+
 @unittest.skipIf(not check_env(), "No CVMFS")
 class TestESProcess(unittest.TestCase):
     """
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+import threading
+import time
+import unittest
+
+try:
+    import Queue as queue  # noqa: N813
+except Exception:
+    import queue  # Python 3
+
+from pilot.util.eventbus import EventBus
+
+
+class TestEventBus(unittest.TestCase):
+    """
+    Unit tests for the event bus.
+    """
+
+    def setUp(self):
+        self.bus = EventBus()
+
+    def _later(self, delay, function):
+        thread = threading.Timer(delay, function)
+        thread.start()
+        self.addCleanup(thread.join)
+
+    def test_wait_timeout(self):
+        """
+        Make sure that a false predicate returns False after the timeout.
+        """
+
+        t0 = time.time()
+        self.assertFalse(self.bus.wait(lambda: False, timeout=0.2))
+        self.assertTrue(time.time() - t0 >= 0.2)
+        self.assertFalse(self.bus.wait(timeout=0.1))
+
+    def test_wait_notify(self):
+        """
+        Make sure that a notification wakes up the waiting thread immediately.
+        """
+
+        event = threading.Event()
+
+        def _set():
+            event.set()
+            self.bus.notify()
+
+        self._later(0.1, _set)
+        t0 = time.time()
+        self.assertTrue(self.bus.wait(event.is_set, timeout=10))
+        self.assertTrue(time.time() - t0 < 5)
+
+    def test_get(self):
+        """
+        Make sure that objects are returned from the first non-empty queue, and as soon as they are put in a queue.
+        """
+
+        queues = [queue.Queue(), queue.Queue()]
+        self.assertEqual(self.bus.get(queues, timeout=0.1), (None, None))
+
+        queues[0].put('a')
+        queues[1].put('b')
+        self.assertEqual(self.bus.get(queues, timeout=0), (0, 'a'))
+        self.assertEqual(self.bus.get(queues, timeout=0), (1, 'b'))
+
+        def _put():
+            queues[1].put('c')
+            self.bus.notify()
+
+        self._later(0.1, _put)
+        t0 = time.time()
+        self.assertEqual(self.bus.get(queues, timeout=10), (1, 'c'))
+        self.assertTrue(time.time() - t0 < 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
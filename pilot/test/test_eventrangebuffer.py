@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+import json
+import threading
+import time
+import unittest
+
+from pilot.common.errorcodes import ErrorCodes
+from pilot.eventservice.communicationmanager.communicationmanager import CommunicationResponse
+from pilot.eventservice.workexecutor.eventrangebuffer import EventRangeBuffer
+
+
+class FakeCommunicationManager(object):
+    """
+    Communication manager replacement serving a given number of event ranges with a delay.
+    """
+
+    def __init__(self, nevents, delay=0.05):
+        self.nevents = nevents
+        self.delay = delay
+        self.served = 0
+        self.requests = []
+        self.updates = []
+
+    def is_stop(self):
+        return False
+
+    def get_event_ranges(self, num_event_ranges=1, post_hook=None, job=None):
+        self.requests.append(num_event_ranges)
+
+        def respond():
+            time.sleep(self.delay)
+            num = min(num_event_ranges, self.nevents - self.served)
+            content = [{'eventRangeID': str(self.served + i)} for i in range(num)]
+            self.served += num
+            post_hook(CommunicationResponse({'status': 0, 'content': content}))
+
+        thread = threading.Thread(target=respond)
+        thread.daemon = True
+        thread.start()
+
+    def update_events(self, update_events, post_hook=None):
+        self.updates.extend(json.loads(update_events['eventRanges']))
+
+
+class TestEventRangeBuffer(unittest.TestCase):
+    """
+    Unit tests for the prefetching event range buffer.
+    """
+
+    def test_all_event_ranges(self):
+        """
+        Make sure that all event ranges are delivered once, in order, followed by an empty list.
+
+        :return: (assertion).
+        """
+
+        manager = FakeCommunicationManager(10)
+        buf = EventRangeBuffer(manager, job=None, min_lookahead=2)
+        buf.prefetch()
+
+        ids = []
+        while True:
+            event_ranges = buf.get(1)
+            if not event_ranges:
+                break
+            ids.extend(e['eventRangeID'] for e in event_ranges)
+
+        self.assertEqual(ids, [str(i) for i in range(10)])
+        self.assertEqual(buf.get_stats()['delivered'], 10)
+
+    def test_prefetch(self):
+        """
+        Make sure that a consumer does not wait for event ranges that were prefetched.
+
+        :return: (assertion).
+        """
+
+        manager = FakeCommunicationManager(10, delay=0.01)
+        buf = EventRangeBuffer(manager, job=None, min_lookahead=4)
+        buf.prefetch()
+        time.sleep(0.2)
+
+        self.assertEqual(len(buf.get(4)), 4)
+        self.assertEqual(buf.get_stats()['idle_waits'], 0)
+
+    def test_target(self):
+        """
+        Make sure that the lookahead grows with the server latency and the consumption rate.
+
+        :return: (assertion).
+        """
+
+        buf = EventRangeBuffer(FakeCommunicationManager(0), job=None, min_lookahead=2, max_lookahead=100)
+        self.assertEqual(buf.get_target(), 2)
+
+        buf._latency = 10.0
+        buf._interval = 1.0
+        self.assertEqual(buf.get_target(), 20)
+
+        buf._interval = 0.01
+        self.assertEqual(buf.get_target(), 100)
+
+    def test_failure(self):
+        """
+        Make sure that the error of a failed request is raised if no event ranges are available.
+
+        :return: (assertion).
+        """
+
+        class FailingManager(FakeCommunicationManager):
+            def get_event_ranges(self, num_event_ranges=1, post_hook=None, job=None):
+                post_hook(CommunicationResponse({'status': -1, 'exception': ValueError('failed')}))
+
+        buf = EventRangeBuffer(FailingManager(0), job=None)
+        self.assertRaises(ValueError, buf.get, 1)
+
+    def test_release(self):
+        """
+        Make sure that the prefetched event ranges that were not consumed, including the ones of a request in flight,
+        are returned to the server as failed (recoverable), and that no more event ranges are requested afterwards.
+
+        :return: (assertion).
+        """
+
+        manager = FakeCommunicationManager(10, delay=0.3)
+        buf = EventRangeBuffer(manager, job=None, min_lookahead=4)
+        buf.prefetch()
+        self.assertEqual(buf.get(1), [{'eventRangeID': '0'}])  # another event range is requested
+
+        self.assertEqual(buf.release(), 4)
+        self.assertEqual(manager.requests, [4, 1])
+        self.assertEqual([update['eventRangeID'] for update in manager.updates], ['1', '2', '3', '4'])
+        self.assertEqual(set(update['eventStatus'] for update in manager.updates), set(['failed']))
+        self.assertEqual(manager.updates[0]['errorCode'], ErrorCodes.ESRECOVERABLE)
+
+        self.assertEqual(buf.get(1), [])
+        self.assertEqual(manager.requests, [4, 1])
+        self.assertEqual(buf.get_stats()['released'], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+import errno
+import gzip
+import io
+import json
+import socket
+import unittest
+
+from pilot.util import https
+
+
+class FakeResponse(object):
+    """
+    HTTP response replacement.
+    """
+
+    def __init__(self, body, status=200, headers=None):
+        self.body = body.encode('utf-8')
+        self.status = status
+        self.headers = headers or {}
+
+    def read(self):
+        return self.body
+
+    def getheader(self, name, default=None):
+        return self.headers.get(name, default)
+
+
+class FakeConnection(object):
+    """
+    HTTPSConnection replacement answering with the scripted responses of the test.
+    A scripted exception is raised by request() if it is given as ('request', exception), otherwise by getresponse().
+    The socket is one end of a socket pair; closing the other end (peer) is seen as a connection closed by the server.
+    """
+
+    script = []
+    connections = []
+    requests = []
+
+    def __init__(self, host, port, timeout=None, context=None):
+        self.closed = False
+        self.nrequests = 0
+        self.sock, self.peer = socket.socketpair()
+        FakeConnection.connections.append(self)
+
+    def request(self, method, path, body, headers):
+        action = FakeConnection.script.pop(0)
+        if isinstance(action, tuple):
+            raise action[1]
+        self.nrequests += 1
+        FakeConnection.requests.append((path, body))
+        self.action = action
+
+    def getresponse(self):
+        if isinstance(self.action, Exception):
+            raise self.action
+        return self.action
+
+    def close(self):
+        self.closed = True
+        self.sock.close()
+        self.peer.close()
+
+
+class TestHTTPSSession(unittest.TestCase):
+    """
+    Unit tests for the keep-alive HTTPS session with a fake connection.
+    """
+
+    def setUp(self):
+        self.connection_class = https.httplib.HTTPSConnection
+        self.curl_request = https.curl_request
+        https.httplib.HTTPSConnection = FakeConnection
+        FakeConnection.script = []
+        FakeConnection.connections = []
+        FakeConnection.requests = []
+        self.curl_requests = []
+        https.curl_request = lambda url, data=None, plain=False: self.curl_requests.append(data) or {'curl': True}
+        https._session = https.HTTPSSession(None, 'test')
+
+    def tearDown(self):
+        https.httplib.HTTPSConnection = self.connection_class
+        https.curl_request = self.curl_request
+        https._session = None
+        for connection in FakeConnection.connections:
+            connection.close()
+
+    def test_reuse(self):
+        """
+        Make sure that consecutive requests use the same connection.
+
+        :return: (assertion).
+        """
+
+        FakeConnection.script = [FakeResponse('{"n": 1}'), FakeResponse('{"n": 2}')]
+        self.assertEqual(https.request('https://server:25443/server/panda/getJob', {'a': 1}), {'n': 1})
+        self.assertEqual(https.request('https://server:25443/server/panda/updateJob', {'a': 2}), {'n': 2})
+
+        self.assertEqual(len(FakeConnection.connections), 1)
+        self.assertEqual(FakeConnection.connections[0].nrequests, 2)
+        self.assertEqual(FakeConnection.requests, [('/server/panda/getJob', 'a=1'), ('/server/panda/updateJob', 'a=2')])
+
+    def test_reconnect(self):
+        """
+        Make sure that an idle connection closed by the server is replaced, and that a request is sent again on a new
+        connection if writing it to the reused connection failed.
+
+        :return: (assertion).
+        """
+
+        FakeConnection.script = [FakeResponse('{}'), FakeResponse('{"n": 2}')]
+        https.request('https://server/getJob', {'a': 1})
+        FakeConnection.connections[0].peer.close()
+        self.assertEqual(https.request('https://server/updateJob', {'a': 2}), {'n': 2})
+
+        self.assertEqual(len(FakeConnection.connections), 2)
+        self.assertTrue(FakeConnection.connections[0].closed)
+        self.assertEqual(FakeConnection.connections[1].nrequests, 1)
+
+        # a reset of the reused connection while writing the request
+        FakeConnection.script = [('request', socket.error(errno.ECONNRESET, 'reset')), FakeResponse('{"n": 3}')]
+        self.assertEqual(https.request('https://server/updateJob', {'a': 3}), {'n': 3})
+        self.assertEqual(len(FakeConnection.connections), 3)
+        self.assertEqual(len(FakeConnection.requests), 3)
+        self.assertEqual(self.curl_requests, [])
+
+    def test_no_resend(self):
+        """
+        Make sure that a request is neither sent again nor sent with curl once it was written to a reused connection.
+
+        :return: (assertion).
+        """
+
+        for error in [socket.timeout('timed out'), https.httplib.BadStatusLine('')]:
+            FakeConnection.script = [FakeResponse('{}'), error]
+            https.request('https://server/getJob', {'a': 1})
+            self.assertEqual(https.request('https://server/updateJob', {'a': 2}), None)
+
+            self.assertEqual(len(FakeConnection.requests), 2)
+            self.assertEqual(len(FakeConnection.connections), 1)
+            self.assertEqual(self.curl_requests, [])
+            self.assertEqual(FakeConnection.script, [])
+            self.tearDown()
+            self.setUp()
+
+    def test_gzip(self):
+        """
+        Make sure that a gzip encoded response is decoded.
+
+        :return: (assertion).
+        """
+
+        buf = io.BytesIO()
+        with gzip.GzipFile(fileobj=buf, mode='wb') as f:
+            f.write(json.dumps({'n': 1}).encode('utf-8'))
+        response = FakeResponse('', headers={'Content-Encoding': 'gzip'})
+        response.body = buf.getvalue()
+        FakeConnection.script = [response]
+
+        self.assertEqual(https.request('https://server/getJob', {'a': 1}), {'n': 1})
+
+    def test_curl_fallback(self):
+        """
+        Make sure that curl is used if the connection fails before the request was sent.
+
+        :return: (assertion).
+        """
+
+        FakeConnection.script = [('request', socket.error(errno.ECONNREFUSED, 'refused'))]
+        self.assertEqual(https.request('https://server/getJob', {'a': 1}), {'curl': True})
+        self.assertEqual(self.curl_requests, [{'a': 1}])
+        self.assertEqual(FakeConnection.requests, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
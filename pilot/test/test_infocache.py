@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from pilot.info import infocache
+from pilot.info.dataloader import DataLoader
+from pilot.util.config import config
+
+
+class TestInfoCache(unittest.TestCase):
+    """
+    Unit tests for the node-shared info cache.
+    """
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.info_cache = getattr(config.Information, 'info_cache', '')
+        config.Information.info_cache = os.path.join(self.workdir, 'infocache.db')
+        self.cache = infocache.get_info_cache()
+
+    def tearDown(self):
+        config.Information.info_cache = self.info_cache
+        shutil.rmtree(self.workdir)
+
+    def test_store(self):
+        """
+        Make sure that documents are replaced and that only the requested entries are returned.
+
+        :return: (assertion).
+        """
+
+        source = 'http://localhost/ddmendpoints'
+        self.assertEqual(self.cache.get_document(source), None)
+        self.assertEqual(self.cache.store(source, {'A': {'pk': 1}, 'B': {'pk': 2}}, etag='1'), 1)
+        self.assertEqual(self.cache.get(source, ['B', 'C']), {'B': {'pk': 2}})
+        self.assertEqual(sorted(self.cache.get(source)), ['A', 'B'])
+
+        self.assertEqual(self.cache.store(source, {'C': {'pk': 3}}, etag='2'), 2)
+        self.assertEqual(self.cache.get(source), {'C': {'pk': 3}})
+        self.assertEqual(self.cache.get_document(source)['etag'], '2')
+        self.assertRaises(TypeError, self.cache.store, source, [1, 2])
+
+        # only one process can refresh a document
+        self.assertTrue(self.cache.claim(source))
+        self.assertFalse(infocache.InfoCache(self.cache.path).claim(source))
+        self.cache.release(source)
+        self.assertTrue(self.cache.claim(source))
+
+    def test_indexed_data(self):
+        """
+        Make sure that an indexed file source is only parsed again when it was modified.
+
+        :return: (assertion).
+        """
+
+        filename = os.path.join(self.workdir, 'agis_schedconf.json')
+        with open(filename, 'w') as f:
+            json.dump({'QUEUE1': {'name': 'QUEUE1'}, 'QUEUE2': {'name': 'QUEUE2'}}, f)
+
+        parsed = []
+
+        def parser(content):
+            parsed.append(content)
+            return json.loads(content)
+
+        data = DataLoader.load_indexed_data(filename, names=['QUEUE2'], parser=parser)
+        self.assertEqual(data, {'QUEUE2': {'name': 'QUEUE2'}})
+        data = DataLoader.load_indexed_data(filename, names=['QUEUE1'], parser=parser)
+        self.assertEqual(data, {'QUEUE1': {'name': 'QUEUE1'}})
+        self.assertEqual(len(parsed), 1)
+
+        with open(filename, 'w') as f:
+            json.dump({'QUEUE1': {'name': 'QUEUE1', 'state': 'ACTIVE'}}, f)
+        data = DataLoader.load_indexed_data(filename, names=['QUEUE1', 'QUEUE2'], parser=parser)
+        self.assertEqual(data, {'QUEUE1': {'name': 'QUEUE1', 'state': 'ACTIVE'}})
+        self.assertEqual(len(parsed), 2)
+
+    def test_first_download(self):
+        """
+        Make sure that a document downloaded for the first time by another process is waited for instead of being
+        downloaded again, and that the claim of a failed download is released.
+
+        :return: (assertion).
+        """
+
+        filename = os.path.join(self.workdir, 'agis_ddmendpoints.json')
+        with open(filename, 'w') as f:
+            json.dump({'SE1': {'name': 'SE1'}}, f)
+
+        parsed = []
+
+        def parser(content):
+            parsed.append(content)
+            return json.loads(content)
+
+        other = infocache.InfoCache(self.cache.path)
+        self.assertTrue(other.claim(filename))
+        thread = threading.Timer(0.3, other.store, args=(filename, {'SE1': {'name': 'SE1', 'other': True}}))
+        thread.start()
+        data = DataLoader.load_indexed_data(filename, names=['SE1'], parser=parser, poll_interval=0.1)
+        thread.join()
+        self.assertEqual(data, {'SE1': {'name': 'SE1', 'other': True}})
+        self.assertEqual(parsed, [])
+
+        # the other process gave up: the document is downloaded here
+        source = os.path.join(self.workdir, 'agis_schedconf.json')
+        with open(source, 'w') as f:
+            json.dump({'QUEUE1': {'name': 'QUEUE1'}}, f)
+        self.assertTrue(other.claim(source))
+        thread = threading.Timer(0.3, other.release, args=(source,))
+        thread.start()
+        data = DataLoader.load_indexed_data(source, parser=parser, poll_interval=0.1)
+        thread.join()
+        self.assertEqual(data, {'QUEUE1': {'name': 'QUEUE1'}})
+        self.assertEqual(len(parsed), 1)
+
+        # a failed first download does not block the other processes
+        missing = os.path.join(self.workdir, 'missing.json')
+        self.assertEqual(DataLoader.load_indexed_data(missing, nretry=1, parser=parser), None)
+        self.assertTrue(other.claim(missing))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+import os
+import threading
+import time
+import unittest
+
+from pilot.control.job import monitor_jobs, proceed_with_getjob
+
+
+class Traces(object):
+    pilot = {'error_code': 0}
+
+
+class TestProceedWithGetjob(unittest.TestCase):
+    """
+    Unit tests for the getjob decision with several job slots.
+    """
+
+    def setUp(self):
+        self.environ = dict(os.environ)
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self.environ)
+
+    def proceed(self, timefloor, starttime, jobnumber, nslots):
+        return proceed_with_getjob(timefloor, starttime, jobnumber, 1, False, False, Traces(), nrunning=jobnumber,
+                                   nslots=nslots)
+
+    def test_timefloor_zero(self):
+        """
+        Make sure that a pilot with timefloor=0 downloads one job per slot.
+
+        :return: (assertion).
+        """
+
+        now = time.time()
+        self.assertTrue(self.proceed(0, now, 0, 1))
+        self.assertFalse(self.proceed(0, now, 1, 1))
+        self.assertTrue(self.proceed(0, now, 3, 4))
+        self.assertFalse(self.proceed(0, now, 4, 4))
+        self.assertEqual(os.environ.get('PILOT_WRAP_UP'), 'QUICKLY')
+
+    def test_timefloor(self):
+        """
+        Make sure that the timefloor limit only applies once all slots have received a job.
+
+        :return: (assertion).
+        """
+
+        starttime = time.time() - 700
+        self.assertTrue(self.proceed(600, starttime, 3, 4))
+        self.assertFalse(self.proceed(600, starttime, 4, 4))
+        self.assertTrue(self.proceed(600, time.time(), 4, 4))
+
+
+class FakeJob(object):
+    def __init__(self, jobid):
+        self.jobid = jobid
+        self.state = 'running'
+        self.debug = False
+
+
+class SlowScheduler(object):
+    """
+    Monitoring scheduler replacement whose checks take some time.
+    """
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.threads = []
+
+    def run(self, job, args):
+        self.threads.append(threading.current_thread().name)
+        time.sleep(self.delay)
+        return 0, ""
+
+
+class TestMonitorJobs(unittest.TestCase):
+    """
+    Unit tests for the monitoring round of the jobs in several slots.
+    """
+
+    def test_parallel(self):
+        """
+        Make sure that a slow check of one job does not delay the monitoring of the other jobs.
+
+        :return: (assertion).
+        """
+
+        jobs = [FakeJob('1'), FakeJob('2'), FakeJob('3')]
+        schedulers = {'1': SlowScheduler(1), '2': SlowScheduler(1), '3': SlowScheduler(1)}
+        now = int(time.time())
+        update_times = {'1': now, '2': now, '3': now}
+
+        t0 = time.time()
+        monitor_jobs(jobs, schedulers, update_times, now, 0, None, Traces(), None)
+        self.assertTrue(time.time() - t0 < 2)
+        self.assertEqual(sorted(schedulers[jobid].threads[0] for jobid in schedulers),
+                         ['job_monitor-1', 'job_monitor-2', 'job_monitor-3'])
+
+    def test_exception(self):
+        """
+        Make sure that an exception raised by the monitoring of a job is passed on.
+
+        :return: (assertion).
+        """
+
+        scheduler = SlowScheduler(None)
+        jobs = [FakeJob('1'), FakeJob('2')]
+        self.assertRaises(TypeError, monitor_jobs, jobs, {'1': scheduler, '2': scheduler}, {}, int(time.time()), 0,
+                          None, Traces(), None)
+
+
+if __name__ == '__main__':
+    unittest.main()
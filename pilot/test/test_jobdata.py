@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+import gc
+import time
+import unittest
+
+from pilot.info.filespec import FileSpec
+from pilot.info.jobdata import JobData
+
+
+def get_job_definition(nfiles):
+    """
+    Return a job definition with the given number of input files (as e.g. for a merge job).
+
+    :param nfiles: number of input files (int).
+    :return: job definition (dictionary).
+    """
+
+    lfns = ['EVNT.01234567._%06d.pool.root.1' % i for i in range(nfiles)]
+
+    return {'PandaID': '1234567890', 'taskID': '12345', 'jobPars': '--inputEVNTFile=%s' % ','.join(lfns),
+            'transformation': 'Merge_tf.py', 'coreCount': '8', 'cmtConfig': 'x86_64-centos7-gcc8-opt',
+            'attemptNr': '1', 'swRelease': 'Atlas-21.0.20', 'prodSourceLabel': 'managed',
+            'inFiles': ','.join(lfns),
+            'GUID': ','.join('%08d-0000-0000-0000-000000000000' % i for i in range(nfiles)),
+            'fsize': ','.join(str(1000000 + i) for i in range(nfiles)),
+            'checksum': ','.join('ad:%08x' % i for i in range(nfiles)),
+            'scopeIn': ','.join(['mc16_13TeV'] * nfiles),
+            'realDatasetsIn': ','.join(['mc16_13TeV.123456.EVNT.e1234_tid01234567_00'] * nfiles),
+            'prodDBlockToken': ','.join(['NULL'] * nfiles),
+            'ddmEndPointIn': ','.join(['CERN-PROD_DATADISK'] * nfiles),
+            'outFiles': 'EVNT.01234567._000001.pool.root.1,log.01234567._000001.job.log.tgz.1',
+            'realDatasets': 'mc16_13TeV.123456.EVNT.e1234_tid01234567_00,mc16_13TeV.123456.EVNT.e1234_tid01234567_00.log',
+            'scopeOut': 'mc16_13TeV', 'scopeLog': 'mc16_13TeV', 'logFile': 'log.01234567._000001.job.log.tgz.1',
+            'logGUID': '00000000-0000-0000-0000-000000000001',
+            'ddmEndPointOut': 'CERN-PROD_DATADISK,CERN-PROD_DATADISK'}
+
+
+def get_rss():
+    """
+    Return the resident set size of the current process.
+
+    :return: RSS in kB (int, 0 if unknown).
+    """
+
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except (IOError, OSError, ValueError):
+        pass
+
+    return 0
+
+
+class TestJobData(unittest.TestCase):
+    """
+    Unit tests and loading benchmark for the job definition.
+    """
+
+    def test_filespec(self):
+        """
+        Make sure that the FileSpec fields are loaded and cleaned, and that mutable defaults are not shared.
+        """
+
+        fspec = FileSpec(filetype='output', lfn='zip://file.root', filesize='123', checksum='ad:01234567')
+        self.assertEqual(fspec.filetype, 'output')
+        self.assertEqual(fspec.lfn, 'file.root')
+        self.assertTrue(fspec.is_tar)
+        self.assertEqual(fspec.filesize, 123)
+        self.assertEqual(fspec.checksum, {'adler32': '01234567'})
+        self.assertEqual(fspec.inputddms, [])
+        self.assertIsNone(fspec.protocols)
+        self.assertTrue(fspec.allow_lan)
+
+        other = FileSpec(lfn='other.root')
+        other.inputddms.append('RSE')
+        self.assertEqual(fspec.inputddms, [])
+        self.assertEqual(FileSpec._defaults['inputddms'], [])
+
+        fspec.activity = 'pw'  # attributes outside of the schema are still allowed
+        self.assertEqual(fspec.activity, 'pw')
+
+    def test_jobdata(self):
+        """
+        Make sure that the job definition and the files are loaded.
+        """
+
+        job = JobData(get_job_definition(10))
+        job.init(None)
+
+        self.assertEqual(job.jobid, '1234567890')
+        self.assertEqual(job.corecount, 8)
+        self.assertEqual(job.attemptnr, 1)
+        self.assertEqual(job.piloterrorcodes, [])
+        self.assertEqual(len(job.indata), 10)
+        self.assertEqual(job.indata[3].filesize, 1000003)
+        self.assertEqual(job.indata[3].checksum, {'adler32': '00000003'})
+        self.assertEqual(job.indata[3].ddmendpoint, 'CERN-PROD_DATADISK')
+        self.assertEqual([fspec.lfn for fspec in job.outdata], ['EVNT.01234567._000001.pool.root.1'])
+        self.assertEqual(job.logdata[0].guid, '00000000-0000-0000-0000-000000000001')
+
+        job.piloterrorcodes.append(1)
+        self.assertEqual(JobData(get_job_definition(1)).piloterrorcodes, [])
+
+    def test_load_benchmark(self):
+        """
+        Measure the loading time and the memory usage for a job definition with 10k input files.
+        """
+
+        nfiles = 10000
+        data = get_job_definition(nfiles)
+        gc.collect()
+        rss = get_rss()
+
+        t0 = time.time()
+        job = JobData(data)  # job parameters (the full list of input files is parsed here)
+        t1 = time.time()
+        job.init(None)  # FileSpec objects
+        t2 = time.time()
+
+        gc.collect()
+        print('\nloaded job definition with %d files: %.3f s for the job data, %.3f s for the files (%.1f us per file), '
+              'RSS increase: %d kB' % (nfiles, t1 - t0, t2 - t1, 1e6 * (t2 - t1) / nfiles, get_rss() - rss))
+
+        self.assertEqual(len(job.indata), nfiles)
+
+
+if __name__ == '__main__':
+    unittest.main()
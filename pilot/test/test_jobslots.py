@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+import unittest
+
+from pilot.util.jobslots import JobSlots, SharedCheck, get_number_of_slots
+
+
+class TestJobSlots(unittest.TestCase):
+    """
+    Unit tests for the job slots of a multi-slot pilot.
+    """
+
+    def test_slots(self):
+        """
+        Make sure that the slots are occupied and released.
+
+        :return: (assertion).
+        """
+
+        slots = JobSlots(2)
+        self.assertTrue(slots.is_multislot())
+        slots.acquire('1')
+        self.assertTrue(slots.has_free_slot())
+        slots.acquire('2')
+        self.assertFalse(slots.has_free_slot())
+        self.assertEqual(slots.get_jobids(), ['1', '2'])
+
+        slots.release('1')
+        slots.release('unknown')
+        self.assertTrue(slots.has_free_slot())
+        self.assertEqual(slots.nbusy, 1)
+
+        self.assertFalse(JobSlots().is_multislot())
+
+    def test_multicore(self):
+        """
+        Make sure that a multi-core job occupies one slot per core.
+
+        :return: (assertion).
+        """
+
+        slots = JobSlots(8)
+        slots.acquire('1', ncores=6)
+        self.assertTrue(slots.has_free_slot())
+        slots.acquire('2', ncores=2)
+        self.assertFalse(slots.has_free_slot())
+        self.assertEqual(slots.nbusy, 2)
+
+        slots.release('2')
+        slots.acquire('3', ncores=None)
+        self.assertTrue(slots.has_free_slot())
+        slots.release('1')
+        slots.acquire('4', ncores=16)
+        self.assertFalse(slots.has_free_slot())
+
+    def test_prefetch(self):
+        """
+        Make sure that the slot of a job in stage-out is only free with prefetching.
+
+        :return: (assertion).
+        """
+
+        for prefetch in (True, False):
+            slots = JobSlots(1, prefetch=prefetch)
+            slots.acquire('1')
+            slots.start_stageout('1')
+            self.assertEqual(slots.has_free_slot(), prefetch)
+            if prefetch:
+                slots.acquire('2')
+                self.assertFalse(slots.has_free_slot())
+                self.assertEqual(slots.nbusy, 2)
+            slots.release('1')
+            self.assertEqual(slots.has_free_slot(), not prefetch)
+
+    def test_number_of_slots(self):
+        """
+        Make sure that the number of slots is given by the pilot option or the corecount.
+
+        :return: (assertion).
+        """
+
+        self.assertEqual(get_number_of_slots(4, 8), 4)
+        self.assertEqual(get_number_of_slots(0, 8), 8)
+        self.assertEqual(get_number_of_slots(0, None), 1)
+        self.assertEqual(get_number_of_slots('bad', 8), 1)
+
+    def test_shared_check(self):
+        """
+        Make sure that the result of a shared check is reused within its period.
+
+        :return: (assertion).
+        """
+
+        calls = []
+
+        def check():
+            calls.append(1)
+            return len(calls), ""
+
+        shared = SharedCheck(check, period=60)
+        self.assertEqual(shared(), (1, ""))
+        self.assertEqual(shared(), (1, ""))
+
+        shared.period = -1
+        self.assertEqual(shared(), (2, ""))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from pilot.user.atlas import loopingjob_definitions as atlas_definitions
+from pilot.user.generic import loopingjob_definitions as generic_definitions
+from pilot.util.loopingjob import LastTouchScanner, get_last_touch_scanner
+
+
+class CountingScanner(LastTouchScanner):
+    """
+    Scanner recording the directories that are listed.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(CountingScanner, self).__init__(*args, **kwargs)
+        self.listed = []
+
+    def _list(self, path, mtime, latest):
+        self.listed.append(os.path.basename(path))
+        return super(CountingScanner, self)._list(path, mtime, latest)
+
+
+class TestLastTouchScanner(unittest.TestCase):
+    """
+    Unit tests for the looping job scanner of the work directory.
+    """
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='workdir_')
+        self.now = 1500000000
+        os.mkdir(os.path.join(self.workdir, 'sub'))
+        self.touch('output.root', self.now - 100)
+        self.touch('sub/log.txt', self.now - 50)
+        self.touch('pilotlog.txt', self.now)
+        self.touch('sub/script.py', self.now)
+        self.set_mtime('sub', self.now - 1000)
+        self.set_mtime('', self.now - 1000)
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def path(self, name):
+        return os.path.join(self.workdir, name) if name else self.workdir
+
+    def set_mtime(self, name, mtime):
+        os.utime(self.path(name), (mtime, mtime))
+
+    def touch(self, name, mtime):
+        with open(self.path(name), 'w') as f:
+            f.write('x')
+        self.set_mtime(name, mtime)
+
+    def test_last_touch(self):
+        """
+        Make sure that the most recently modified file is found, skipping the unwanted files.
+
+        :return: (assertion).
+        """
+
+        scanner = CountingScanner(self.workdir, generic_definitions.is_unwanted_file)
+        self.assertEqual(scanner.scan(), (self.path('sub/log.txt'), self.now - 50))
+        self.assertEqual(sorted(scanner.listed), sorted([os.path.basename(self.workdir), 'sub']))
+
+        # a file updated in place does not change the directory mtime
+        self.set_mtime('output.root', self.now + 10)
+        self.assertEqual(scanner.scan(), (self.path('output.root'), self.now + 10))
+
+        # new file in the sub directory
+        self.touch('sub/new.log', self.now + 20)
+        self.set_mtime('sub', self.now + 15)
+        self.assertEqual(scanner.scan(), (self.path('sub/new.log'), self.now + 20))
+
+        # nothing changed, the same time is returned
+        self.assertEqual(scanner.scan(), (self.path('sub/new.log'), self.now + 20))
+
+    def test_cached_records(self):
+        """
+        Make sure that only the directories with a new mtime are listed again and that removed ones are forgotten.
+
+        :return: (assertion).
+        """
+
+        scanner = CountingScanner(self.workdir, generic_definitions.is_unwanted_file)
+        scanner.scan()
+        self.assertEqual(sorted(scanner._records), [self.workdir, self.path('sub')])
+        self.assertEqual(scanner._records[self.path('sub')].files, ['log.txt'])
+        self.assertEqual(scanner._ncached, 3)  # output.root, sub and sub/log.txt
+
+        scanner.listed = []
+        scanner.scan()
+        self.assertEqual(scanner.listed, [])
+
+        self.set_mtime('sub', self.now + 30)
+        scanner.scan()
+        self.assertEqual(scanner.listed, ['sub'])
+
+        shutil.rmtree(self.path('sub'))
+        self.set_mtime('', self.now + 40)
+        self.assertEqual(scanner.scan(), (self.path('output.root'), self.now - 100))
+        self.assertEqual(list(scanner._records), [self.workdir])
+        self.assertEqual(scanner._ncached, 1)
+
+    def test_cache_limit(self):
+        """
+        Make sure that directories beyond the cache size limit are listed at every scan.
+
+        :return: (assertion).
+        """
+
+        scanner = CountingScanner(self.workdir, generic_definitions.is_unwanted_file, max_cached_names=2)
+        self.assertEqual(scanner.scan(), (self.path('sub/log.txt'), self.now - 50))
+        self.assertEqual(list(scanner._records), [self.workdir])
+
+        scanner.listed = []
+        self.assertEqual(scanner.scan(), (self.path('sub/log.txt'), self.now - 50))
+        self.assertEqual(scanner.listed, ['sub'])
+
+    def test_unwanted_directory(self):
+        """
+        Make sure that the content of an unwanted directory is skipped.
+
+        :return: (assertion).
+        """
+
+        os.mkdir(self.path('pandaJob_dir'))
+        self.touch('pandaJob_dir/data.txt', self.now + 100)
+        scanner = CountingScanner(self.workdir, generic_definitions.is_unwanted_file)
+        self.assertEqual(scanner.scan(), (self.path('sub/log.txt'), self.now - 50))
+        self.assertFalse('pandaJob_dir' in scanner.listed)
+
+    def test_get_last_touch_scanner(self):
+        """
+        Make sure that the scanner of a work directory is kept between the checks and dropped with the directory.
+
+        :return: (assertion).
+        """
+
+        scanner = get_last_touch_scanner(self.workdir, generic_definitions.is_unwanted_file)
+        self.assertTrue(get_last_touch_scanner(self.workdir, generic_definitions.is_unwanted_file) is scanner)
+
+        workdir = self.workdir
+        self.tearDown()
+        self.setUp()
+        self.assertFalse(get_last_touch_scanner(self.workdir, generic_definitions.is_unwanted_file) is scanner)
+        from pilot.util.loopingjob import _scanners
+        self.assertFalse(workdir in _scanners)
+
+
+class TestIsUnwantedFile(unittest.TestCase):
+    """
+    Unit tests for the file filters of the looping job algorithm.
+    """
+
+    workdir = '/scratch/PanDA_Pilot-1234'
+
+    def test_generic(self):
+        """
+        Make sure that the generic filter ignores the workdir, pilot, python and job definition files.
+
+        :return: (assertion).
+        """
+
+        for path in [self.workdir, self.workdir + '/pilotlog.txt', self.workdir + '/lib.lib.tgz',
+                     self.workdir + '/run.py', self.workdir + '/run.pyc', self.workdir + '/pandaJobData.out']:
+            self.assertTrue(generic_definitions.is_unwanted_file(self.workdir, path), path)
+        for path in [self.workdir + '/HITS.pool.root', self.workdir + '/log.EVNTtoHITS', self.workdir + '/memory_monitor.txt']:
+            self.assertFalse(generic_definitions.is_unwanted_file(self.workdir, path), path)
+
+        files = [self.workdir + '/run.py', self.workdir + '/HITS.pool.root']
+        self.assertEqual(generic_definitions.remove_unwanted_files(self.workdir, files), [self.workdir + '/HITS.pool.root'])
+
+    def test_atlas(self):
+        """
+        Make sure that the ATLAS filter also ignores the setup, catalog, memory monitor and DBRelease files.
+
+        :return: (assertion).
+        """
+
+        for path in [self.workdir, self.workdir + '/run.py', self.workdir + '/PoolFileCatalog.xml', self.workdir + '/setup.sh',
+                     self.workdir + '/runjob.sh', self.workdir + '/memory_monitor.txt', self.workdir + '/mem.summary.json',
+                     self.workdir + '/DBRelease-31.8.1.tar.gz', self.workdir + '/DBRelease-31.8.1/data.db']:
+            self.assertTrue(atlas_definitions.is_unwanted_file(self.workdir, path), path)
+        for path in [self.workdir + '/HITS.pool.root', self.workdir + '/log.EVNTtoHITS']:
+            self.assertFalse(atlas_definitions.is_unwanted_file(self.workdir, path), path)
+
+
+if __name__ == '__main__':
+    unittest.main()
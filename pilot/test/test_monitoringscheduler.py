@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+import threading
+import time
+import unittest
+
+from pilot.util.monitoringscheduler import MonitoringScheduler
+from pilot.util.monitoringtime import MonitoringTime
+
+
+class TestMonitoringScheduler(unittest.TestCase):
+    """
+    Unit tests for the monitoring task scheduler.
+    """
+
+    def setUp(self):
+        self.mt = MonitoringTime()
+        self.scheduler = MonitoringScheduler(self.mt, nthreads=3)
+        self.job = object()
+        self.calls = []
+
+    def tearDown(self):
+        self.scheduler.close()
+
+    def _task(self, name, exit_code=0, delay=0, event=None):
+        def function(job, mt, args):
+            self.calls.append(name)
+            if event:
+                event.wait(delay)
+            elif delay:
+                time.sleep(delay)
+            return exit_code, 'diagnostics from %s' % name
+        return function
+
+    def test_periods(self):
+        """
+        Make sure that tasks are only executed when due, and that the MonitoringTime key is updated.
+        """
+
+        self.scheduler.register('always', self._task('always'))
+        self.scheduler.register('proxy', self._task('proxy'), period=600, key='ct_proxy')
+        self.assertEqual(self.scheduler.run(self.job, None), (0, ''))
+        self.assertEqual(self.calls, ['always'])
+
+        self.mt.update('ct_proxy', modtime=int(time.time()) - 601)
+        self.assertEqual(self.scheduler.run(self.job, None), (0, ''))
+        self.assertEqual(sorted(self.calls), ['always', 'always', 'proxy'])
+        self.assertTrue(self.mt.get('ct_proxy') >= int(time.time()) - 1)
+
+        stats = self.scheduler.get_stats()
+        self.assertEqual(stats['always']['runs'], 2)
+        self.assertEqual(stats['proxy']['runs'], 1)
+
+    def test_errors(self):
+        """
+        Make sure that the error of a failed task is returned and that exceptions are ignored.
+        """
+
+        def broken(job, mt, args):
+            raise RuntimeError('broken task')
+
+        self.scheduler.register('broken', broken)
+        self.scheduler.register('ok', self._task('ok'))
+        self.scheduler.register('failed', self._task('failed', exit_code=1234))
+        self.assertEqual(self.scheduler.run(self.job, None), (1234, 'diagnostics from failed'))
+
+        stats = self.scheduler.get_stats()
+        self.assertEqual(stats['broken']['failures'], 1)
+        self.assertEqual(stats['failed']['failures'], 1)
+        self.assertEqual(stats['ok']['failures'], 0)
+
+    def test_overrun(self):
+        """
+        Make sure that a slow task does not block the others, is not started twice and is collected later.
+        """
+
+        event = threading.Event()
+        self.scheduler.register('slow', self._task('slow', exit_code=1111, delay=10, event=event), timeout=0.2)
+        self.scheduler.register('fast', self._task('fast'))
+
+        t0 = time.time()
+        self.assertEqual(self.scheduler.run(self.job, None), (0, ''))
+        self.assertTrue(time.time() - t0 < 5)
+        self.assertEqual(self.scheduler.run(self.job, None), (0, ''))
+        self.assertEqual(self.calls.count('slow'), 1)
+        self.assertEqual(self.calls.count('fast'), 2)
+
+        stats = self.scheduler.get_stats()
+        self.assertEqual(stats['slow']['overruns'], 1)
+        self.assertEqual(stats['slow']['skipped'], 1)
+        self.assertTrue(stats['slow']['running'])
+
+        # the result of the overrunning task is returned when it has finished
+        event.set()
+        time.sleep(0.1)
+        self.assertEqual(self.scheduler.run(self.job, None), (1111, 'diagnostics from slow'))
+        self.scheduler.report()
+
+    def test_queued_task(self):
+        """
+        Make sure that the timeout of a task queued behind another one is measured from the start of its execution.
+        """
+
+        scheduler = MonitoringScheduler(self.mt, nthreads=1)
+        scheduler.register('first', self._task('first', delay=0.3), timeout=1)
+        scheduler.register('queued', self._task('queued', exit_code=2222, delay=0.2), timeout=0.4)
+        try:
+            self.assertEqual(scheduler.run(self.job, None), (2222, 'diagnostics from queued'))
+            self.assertEqual(scheduler.get_stats()['queued']['overruns'], 0)
+            self.assertTrue(scheduler.get_stats()['queued']['last_time'] < 0.4)
+        finally:
+            scheduler.close()
+
+    def test_exclusive_tasks(self):
+        """
+        Make sure that two exclusive tasks failing at the same time do not both update the job.
+        """
+
+        class Job(object):
+            state = 'running'
+            piloterrorcodes = []
+
+        def fail_job(exit_code):
+            def function(job, mt, args):
+                codes = list(job.piloterrorcodes)
+                time.sleep(0.2)  # concurrent tasks would both see the running job
+                job.piloterrorcodes = codes + [exit_code]
+                job.state = 'failed'
+                return exit_code, 'killed by task %d' % exit_code
+            return function
+
+        job = Job()
+        self.scheduler.register('memory_usage', fail_job(1111), exclusive=True)
+        self.scheduler.register('looping_job', fail_job(2222), exclusive=True)
+        self.scheduler.register('ok', self._task('ok', delay=0.2))
+
+        t0 = time.time()
+        self.assertEqual(self.scheduler.run(job, None), (1111, 'killed by task 1111'))
+        self.assertTrue(time.time() - t0 < 0.6)
+        self.assertEqual(job.piloterrorcodes, [1111])
+        stats = self.scheduler.get_stats()
+        self.assertEqual(stats['looping_job']['runs'], 1)
+        self.assertEqual(stats['looping_job']['failures'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+import unittest
+
+from pilot.common.errorcodes import ErrorCodes
+from pilot.common.exception import PilotException, TrfDownloadFailure
+from pilot.user.atlas import common
+
+errors = ErrorCodes()
+
+
+class FakeJob(object):
+    """
+    Job replacement with the fields used by the payload preparation.
+    """
+
+    def __init__(self, analysis=False):
+        self.jobid = '1'
+        self.noexecstrcnv = False
+        self.jobparams = '--maxEvents 10'
+        self.transformation = 'Sim_tf.py'
+        self.workdir = '.'
+        self.payloadsetup = {}
+        self.analysis = analysis
+
+    def is_analysis(self):
+        return self.analysis
+
+
+class FakeResource(object):
+    """
+    Resource module replacement recording the setup command calls.
+    """
+
+    calls = []
+    exit_code = 0
+
+    @classmethod
+    def get_setup_command(cls, job, prepareasetup):
+        cls.calls.append(('get_setup_command', prepareasetup))
+        return 'source asetup.sh'
+
+    @classmethod
+    def verify_setup_command(cls, cmd):
+        cls.calls.append(('verify_setup_command', cmd))
+        if cls.exit_code:
+            return cls.exit_code, 'no release candidates found'
+        return 0, ''
+
+
+class TestPayloadPreparation(unittest.TestCase):
+    """
+    Unit tests for the payload setup prepared while stage-in is running.
+    """
+
+    def setUp(self):
+        self.get_user_module = common.get_user_module
+        self.get_analysis_trf = common.get_analysis_trf
+        common.get_user_module = lambda name, user: FakeResource
+        self.trfs = []
+        common.get_analysis_trf = lambda transformation, workdir: self.trfs.append(transformation) or (0, '', 'runGen')
+        FakeResource.calls = []
+        FakeResource.exit_code = 0
+
+    def tearDown(self):
+        common.get_user_module = self.get_user_module
+        common.get_analysis_trf = self.get_analysis_trf
+
+    def test_prepared(self):
+        """
+        Make sure that the prepared values are used without calling the setup and download functions again.
+
+        :return: (assertion).
+        """
+
+        job = FakeJob(analysis=True)
+        common.prepare_payload(job)
+        self.assertEqual(job.payloadsetup, {'setup': ('source asetup.sh', None), 'trf': ('runGen', None)})
+        self.assertEqual(FakeResource.calls, [('get_setup_command', True), ('verify_setup_command', 'source asetup.sh')])
+        self.assertEqual(self.trfs, ['Sim_tf.py'])
+
+        self.assertEqual(common.get_prepared_value(job, 'setup', common.get_verified_setup_command, job, True),
+                         'source asetup.sh')
+        self.assertEqual(common.get_prepared_value(job, 'trf', common.get_analysis_trf_name, job), 'runGen')
+        self.assertEqual(len(FakeResource.calls), 2)
+        self.assertEqual(len(self.trfs), 1)
+
+        # no transform is downloaded for production jobs
+        job = FakeJob()
+        common.prepare_payload(job)
+        self.assertEqual(sorted(job.payloadsetup), ['setup'])
+
+    def test_fallback(self):
+        """
+        Make sure that the values are computed if they were not prepared.
+
+        :return: (assertion).
+        """
+
+        job = FakeJob(analysis=True)
+        self.assertEqual(common.get_prepared_value(job, 'setup', common.get_verified_setup_command, job, False),
+                         'source asetup.sh')
+        self.assertEqual(FakeResource.calls[0], ('get_setup_command', False))
+        self.assertEqual(common.get_prepared_value(job, 'trf', common.get_analysis_trf_name, job), 'runGen')
+        self.assertEqual(job.payloadsetup, {})
+
+    def test_failure(self):
+        """
+        Make sure that an error caught during the preparation is raised when the payload command is built.
+
+        :return: (assertion).
+        """
+
+        FakeResource.exit_code = errors.NORELEASEFOUND
+        self.assertRaises(PilotException, common.get_verified_setup_command, FakeJob(), True)
+
+        common.get_analysis_trf = lambda transformation, workdir: (errors.TRFDOWNLOADFAILURE, 'download failed', '')
+        job = FakeJob(analysis=True)
+        common.prepare_payload(job)
+        self.assertEqual(job.payloadsetup['setup'][0], None)
+        self.assertEqual(job.payloadsetup['setup'][1].get_error_code(), errors.NORELEASEFOUND)
+        self.assertTrue(isinstance(job.payloadsetup['trf'][1], TrfDownloadFailure))
+
+        try:
+            common.get_payload_command(job)
+        except PilotException as error:
+            self.assertEqual(error.get_error_code(), errors.NORELEASEFOUND)
+        else:
+            self.fail('the preparation error was not raised')
+        self.assertRaises(TrfDownloadFailure, common.get_prepared_value, job, 'trf', common.get_analysis_trf_name, job)
+        self.assertEqual(len(FakeResource.calls), 4)  # the setup is not verified again
+
+
+if __name__ == '__main__':
+    unittest.main()
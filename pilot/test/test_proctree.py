@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+import os
+import subprocess
+import unittest
+
+from pilot.util.proctree import ProcessTree, parse_stat
+
+
+class TestProcessTree(unittest.TestCase):
+    """
+    Unit tests for the /proc based process tree.
+    """
+
+    def setUp(self):
+        # skip tests if running on a Mac -- Macs don't have /proc
+        self.mac = False
+        if os.environ.get('MACOSX') == 'true' or not os.path.exists('/proc/self/stat'):
+            self.mac = True
+
+    def test_parse_stat(self):
+        """
+        Make sure that command names with spaces and parentheses are handled.
+
+        :return: (assertion).
+        """
+
+        data = '1234 (a (weird) name) S 1 1234 1234 0 -1 4194560 100 0 0 0 250 50 10 5 20 0 1 0 100 1000 100 ' \
+               '18446744073709551615 1 1 0 0 0 0 0 0 0 0 0 0 17 3 0 0 0 0 0\n'
+        info = parse_stat(1234, data, uid=0, hz=100)
+
+        self.assertEqual(info.comm, 'a (weird) name')
+        self.assertEqual(info.state, 'S')
+        self.assertEqual(info.ppid, 1)
+        self.assertEqual(info.pgrp, 1234)
+        self.assertEqual(info.get_cpu_time(), 3.15)
+        self.assertEqual(info.processor, 3)
+
+        self.assertEqual(parse_stat(1, 'garbage'), None)
+
+    def test_descendants(self):
+        """
+        Make sure that child processes are found.
+
+        :return: (assertion).
+        """
+
+        if self.mac:
+            return True
+
+        process = subprocess.Popen(['sleep', '10'])
+        try:
+            tree = ProcessTree()
+            self.assertEqual(tree.get_descendants(os.getpid())[0], os.getpid())
+            self.assertIn(process.pid, tree.get_descendants(os.getpid()))
+            self.assertIn(process.pid, tree.get_children(os.getpid()))
+            self.assertFalse(tree.is_zombie(process.pid))
+            self.assertIn('sleep', tree.get_cmdline(process.pid))
+            self.assertTrue(tree.get_cpu_consumption_time(os.getpid()) >= 0.0)
+        finally:
+            process.kill()
+            process.wait()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from pilot.api.replicas import ReplicaResolver, get_rse_priorities, sort_replicas
+
+
+class Client(object):
+    """
+    Rucio client replacement that records the queried files.
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def list_replicas(self, dids=None, **kwargs):
+        self.queries.append([did['name'] for did in dids])
+        for did in dids:
+            yield {'scope': did['scope'], 'name': did['name'], 'bytes': 1, 'adler32': None, 'md5': None,
+                   'pfns': {'root://%s' % did['name']: {'rse': 'RSE', 'type': 'DISK', 'priority': 1}}}
+
+
+class TestReplicas(unittest.TestCase):
+    """
+    Unit tests for the replica resolver.
+    """
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.workdir, 'replica_cache.json')
+        self.location = {'ip': '127.0.0.1', 'ip6': '::', 'fqdn': 'localhost', 'site': 'SITE'}
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def get_resolver(self, ttl=1800):
+        resolver = ReplicaResolver(ttl=ttl, path=self.path)
+        resolver._client = Client()
+        return resolver
+
+    def test_sort_replicas(self):
+        """
+        Make sure that replicas from the preferred ddmendpoints come first, in the order of the preference.
+
+        :return: (assertion).
+        """
+
+        replicas = [('pfn%d' % i, {'rse': rse}) for i, rse in enumerate(['A', 'B', 'C', 'D', 'B'])]
+        priorities = get_rse_priorities(['C', 'B'])
+        self.assertEqual([pfn for pfn, _ in sort_replicas(replicas, priorities)], ['pfn2', 'pfn1', 'pfn4', 'pfn0', 'pfn3'])
+        self.assertEqual(sort_replicas(replicas, {}), replicas)
+
+    def test_cache(self):
+        """
+        Make sure that only unresolved files are queried, also by another resolver (process) using the cache file.
+
+        :return: (assertion).
+        """
+
+        resolver = self.get_resolver()
+        replicas = resolver.list_replicas([('scope', 'a'), ('scope', 'b')], ['root'], self.location)
+        self.assertEqual(len(replicas), 2)
+        replicas = resolver.list_replicas([('scope', 'b'), ('scope', 'c')], ['root'], self.location)
+        self.assertEqual(sorted(r['name'] for r in replicas), ['b', 'c'])
+        self.assertEqual(resolver._client.queries, [['a', 'b'], ['c']])
+
+        resolver = self.get_resolver()
+        resolver.list_replicas([('scope', 'a'), ('scope', 'c')], ['root'], self.location)
+        self.assertEqual(resolver._client.queries, [])
+
+        # invalidated files, other schemes
+        resolver.invalidate([('scope', 'a')])
+        resolver.list_replicas([('scope', 'a'), ('scope', 'c')], ['root'], self.location)
+        self.assertEqual(resolver._client.queries, [['a']])
+        resolver.list_replicas([('scope', 'c')], ['root', 'davs'], self.location)
+        self.assertEqual(resolver._client.queries, [['a'], ['c']])
+
+    def test_concurrent_save(self):
+        """
+        Make sure that resolvers writing the cache file at the same time leave a complete file and no temporary files.
+
+        :return: (assertion).
+        """
+
+        resolvers = [self.get_resolver() for _ in range(4)]
+        for i, resolver in enumerate(resolvers):
+            resolver.list_replicas([('scope', str(i))], ['root'], self.location)
+
+        def save(resolver):
+            for _ in range(20):
+                with resolver._lock:
+                    resolver._save()
+
+        threads = [threading.Thread(target=save, args=(resolver,)) for resolver in resolvers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(os.listdir(self.workdir), ['replica_cache.json'])
+        with open(self.path) as f:
+            self.assertTrue(json.load(f)['replicas'])
+
+    def test_expired(self):
+        """
+        Make sure that expired replicas are resolved again.
+
+        :return: (assertion).
+        """
+
+        resolver = self.get_resolver(ttl=60)
+        resolver.list_replicas([('scope', 'a')], ['root'], self.location)
+        resolver._cache[('scope', 'a')] = (0, resolver._cache[('scope', 'a')][1])  # resolved long ago
+        resolver.list_replicas([('scope', 'a')], ['root'], self.location)
+        self.assertEqual(resolver._client.queries, [['a'], ['a']])
+
+
+if __name__ == '__main__':
+    unittest.main()
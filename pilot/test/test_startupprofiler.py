@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+import sys
+import unittest
+
+try:
+    import __builtin__ as builtins  # Python 2
+except Exception:
+    import builtins  # Python 3
+
+from pilot.common import pluginregistry
+from pilot.util.startupprofiler import StartupProfiler, get_module_name
+
+
+class TestStartupProfiler(unittest.TestCase):
+    """
+    Unit tests for the startup profiler and the plugin registry.
+    """
+
+    def test_import_times(self):
+        """
+        Make sure that a new import is recorded and that the original import function is restored.
+        """
+
+        original = builtins.__import__
+        sys.modules.pop('wave', None)
+
+        profiler = StartupProfiler()
+        profiler.start()
+        try:
+            import wave  # noqa: F401
+        finally:
+            profiler.stop()
+
+        self.assertIs(builtins.__import__, original)
+        self.assertIn('wave', profiler.imports)
+        inclusive, _self = profiler.imports['wave']
+        self.assertGreaterEqual(inclusive, _self)
+
+    def test_module_name(self):
+        """
+        Make sure that only a positive level is a relative import, with or without __package__.
+        """
+
+        module = {'__name__': 'pilot.util.https', '__package__': None}
+        package = {'__name__': 'pilot.util', '__path__': ['pilot/util'], '__package__': None}
+
+        self.assertEqual(get_module_name('filehandling', module, -1), 'filehandling')  # Python 2 default
+        self.assertEqual(get_module_name('os', module, 0), 'os')
+        self.assertEqual(get_module_name('filehandling', module, 1), 'pilot.util.filehandling')
+        self.assertEqual(get_module_name('filehandling', package, 1), 'pilot.util.filehandling')
+        self.assertEqual(get_module_name('common', module, 2), 'pilot.common')
+        self.assertEqual(get_module_name('', dict(module, __package__='pilot.util'), 1), 'pilot.util')
+
+    def test_mark(self):
+        """
+        Make sure that milestones are only recorded once, and that a report stops the profiler.
+        """
+
+        original = builtins.__import__
+        profiler = StartupProfiler()
+        profiler.mark('ignored')  # not started
+        self.assertEqual(len(profiler.milestones), 0)
+
+        profiler.start()
+        profiler.mark('first')
+        t = profiler.milestones['first']
+        profiler.mark('first')
+        self.assertEqual(profiler.milestones['first'], t)
+        profiler.mark('second', report=True)
+
+        self.assertFalse(profiler.enabled)
+        self.assertIs(builtins.__import__, original)
+        self.assertEqual(list(profiler.milestones.keys()), ['first', 'second'])
+
+    def test_get_module(self):
+        """
+        Make sure that the plugin registry returns the cached module.
+        """
+
+        module = pluginregistry.get_module('pilot.util.math')
+        self.assertIs(module, sys.modules['pilot.util.math'])
+        self.assertIs(pluginregistry.get_module('pilot.util.math'), module)
+        self.assertRaises(ImportError, pluginregistry.get_copytool_module, 'no_such_copytool')
+
+
+if __name__ == '__main__':
+    unittest.main()
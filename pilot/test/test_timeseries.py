@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from pilot.util.timeseries import TimeSeries, get_time_series
+
+
+class TestTimeSeries(unittest.TestCase):
+    """
+    Unit tests for the incremental time-series reader.
+    """
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.workdir, 'memory_monitor_output.txt')
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def _append(self, data):
+        with open(self.path, 'a') as f:
+            f.write(data)
+
+    def test_incremental(self):
+        """
+        Make sure that only new, complete rows are parsed and that the aggregates are updated.
+        """
+
+        self._append('Time\tpss\t\tswap\n1000\t10\t\t1\n1060\t30\t3\n1120\t2')
+        series = TimeSeries(self.path)
+        self.assertEqual(series.update(), 2)
+        self.assertEqual(series.get_keys(), ['Time', 'pss', 'swap'])
+        self.assertEqual(series.get_max('pss'), 30)
+        self.assertEqual(series.get_average('pss'), 20.0)
+        self.assertEqual(series.get_last('swap'), 3)
+        self.assertEqual(series.update(), 0)
+
+        # complete the partial row and add another one
+        self._append('0\t2\n1180\t40\tN/A\n')
+        self.assertEqual(series.update(), 2)
+        self.assertEqual(series.get_max('pss'), 40)
+        self.assertEqual(series.get_average('pss'), 25.0)
+        self.assertEqual(series.get_last('swap'), 2)  # N/A is ignored
+        self.assertEqual(series.get_max('unknown'), None)
+
+        table = series.get_table(['Time', 'swap'])
+        self.assertEqual(list(table['Time']), [1000, 1060, 1120])
+        self.assertEqual(list(table['swap']), [1, 3, 2])
+        self.assertEqual(len(series.get_table()['pss']), 3)
+        self.assertEqual(len(series.get_table(['pss'])['pss']), 4)
+
+    def test_replaced(self):
+        """
+        Make sure that a truncated file is read from the beginning, and that the objects are cached.
+        """
+
+        self._append('Time\tpss\n1000\t10\n1060\t30\n')
+        series = get_time_series(self.path)
+        self.assertEqual(series.get_max('pss'), 30)
+        self.assertTrue(get_time_series(self.path) is series)
+
+        with open(self.path, 'w') as f:
+            f.write('Time\tpss\n1000\t5\n')
+        self.assertEqual(get_time_series(self.path).get_max('pss'), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+import unittest
+
+from pilot.util.constants import PILOT_PRE_STAGEIN, PILOT_POST_STAGEIN, PILOT_PRE_PAYLOAD_PREPARATION, \
+    PILOT_POST_PAYLOAD_PREPARATION
+from pilot.util.timing import add_to_pilot_timing, get_payload_preparation_overlap, get_payload_preparation_time
+
+
+class Args(object):
+    """
+    Pilot arguments replacement.
+    """
+
+    def __init__(self):
+        self.timing = {}
+
+
+class TestTiming(unittest.TestCase):
+    """
+    Unit tests for the payload preparation timing.
+    """
+
+    def setUp(self):
+        self.args = Args()
+
+    def add(self, stagein, preparation):
+        add_to_pilot_timing('1', PILOT_PRE_STAGEIN, stagein[0], self.args)
+        add_to_pilot_timing('1', PILOT_POST_STAGEIN, stagein[1], self.args)
+        add_to_pilot_timing('1', PILOT_PRE_PAYLOAD_PREPARATION, preparation[0], self.args)
+        add_to_pilot_timing('1', PILOT_POST_PAYLOAD_PREPARATION, preparation[1], self.args)
+
+    def test_overlap(self):
+        """
+        Make sure that the time saved by preparing the payload during stage-in is the overlap of the intervals.
+        """
+
+        self.add((100, 200), (101, 150))
+        self.assertEqual(get_payload_preparation_time('1', self.args), 49)
+        self.assertEqual(get_payload_preparation_overlap('1', self.args), 49)
+
+        self.add((100, 120), (101, 150))  # preparation took longer than stage-in
+        self.assertEqual(get_payload_preparation_overlap('1', self.args), 19)
+
+        self.add((100, 120), (130, 150))  # no input files to stage-in
+        self.assertEqual(get_payload_preparation_overlap('1', self.args), 0)
+
+    def test_no_stagein(self):
+        """
+        Make sure that the overlap is zero if a time measurement is missing.
+        """
+
+        add_to_pilot_timing('2', PILOT_PRE_PAYLOAD_PREPARATION, 100, self.args)
+        add_to_pilot_timing('2', PILOT_POST_PAYLOAD_PREPARATION, 110, self.args)
+        self.assertEqual(get_payload_preparation_overlap('2', self.args), 0)
+        self.assertEqual(get_payload_preparation_overlap('3', self.args), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from pilot.util.tracesender import TraceSender
+
+
+class RecordingSender(TraceSender):
+    """
+    Trace sender that records the batches instead of sending them.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(RecordingSender, self).__init__('https://localhost/traces/', *args, **kwargs)
+        self.batches = []
+        self.available = True  # is the tracing server reachable?
+        self.blocked = threading.Event()
+        self.blocked.set()
+        self.delay = 0  # duration of a request
+
+    def _post(self, batch):
+        self.blocked.wait()
+        time.sleep(self.delay)
+        if not self.available:
+            return False
+        self.batches.append(batch)
+        return True
+
+
+class TestTraceSender(unittest.TestCase):
+    """
+    Unit tests for the trace sender.
+    """
+
+    def setUp(self):
+        self.spool_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.spool_dir)
+
+    def test_batches(self):
+        """
+        Make sure that queued traces are sent in batches.
+
+        :return: (assertion).
+        """
+
+        sender = RecordingSender(batch_size=4)
+        sender.blocked.clear()  # the traces are queued while the first request is on its way
+        for i in range(9):
+            self.assertTrue(sender.put({'filename': 'file%d' % i}))
+        sender.blocked.set()
+
+        self.assertTrue(sender.close(timeout=10))
+        self.assertEqual([trace['filename'] for batch in sender.batches for trace in batch],
+                         ['file%d' % i for i in range(9)])
+        self.assertLess(len(sender.batches), 9)
+        self.assertEqual(sender.get_stats(), {'sent': 9, 'dropped': 0, 'spooled': 0, 'queued': 0})
+
+    def test_dropped(self):
+        """
+        Make sure that traces are dropped when the queue is full.
+
+        :return: (assertion).
+        """
+
+        sender = RecordingSender(maxsize=2)
+        sender.blocked.clear()
+        results = [sender.put({'filename': 'file%d' % i}) for i in range(5)]
+        sender.blocked.set()
+        sender.close(timeout=10)
+
+        self.assertIn(False, results)
+        self.assertEqual(sender.dropped, results.count(False))
+        self.assertEqual(sender.sent, results.count(True))
+
+    def test_spool(self):
+        """
+        Make sure that traces are spooled when the server is unreachable, and resent when it is back.
+
+        :return: (assertion).
+        """
+
+        sender = RecordingSender(retries=1, backoff=0, spool_dir=self.spool_dir)
+        sender.available = False
+        sender.put({'filename': 'file0'})
+        sender.put({'filename': 'file1'})
+
+        self.assertFalse(sender.flush(timeout=10))
+        self.assertEqual(sender.spooled, 2)
+        self.assertEqual(sender.sent, 0)
+        self.assertTrue(os.listdir(self.spool_dir))
+
+        sender.available = True
+        self.assertTrue(sender.flush(timeout=10))
+        self.assertEqual(sender.spooled, 0)
+        self.assertEqual(sender.sent, 2)
+        self.assertEqual(os.listdir(self.spool_dir), [])
+        sender.close()
+
+    def test_flush_timeout(self):
+        """
+        Make sure that resending the spooled traces does not exceed the flush timeout.
+
+        :return: (assertion).
+        """
+
+        sender = RecordingSender(batch_size=1, retries=0, spool_dir=self.spool_dir)
+        sender.available = False
+        for i in range(5):
+            sender.put({'filename': 'file%d' % i})
+        self.assertFalse(sender.flush(timeout=10))
+        self.assertEqual(sender.spooled, 5)
+
+        sender.available = True
+        sender.delay = 0.2
+        t0 = time.time()
+        self.assertFalse(sender.flush(timeout=0.3))
+        self.assertLess(time.time() - t0, 0.7)
+        self.assertTrue(0 < sender.spooled < 5)
+        sender.close(timeout=10)
+
+
+if __name__ == '__main__':
+    unittest.main()
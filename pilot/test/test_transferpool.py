@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+import threading
+import time
+import unittest
+
+from pilot.api.transferpool import TransferPool
+from pilot.util.tracereport import TraceReport
+
+
+class FakeFileSpec(object):
+    """
+    Minimal FileSpec replacement.
+    """
+
+    def __init__(self, lfn, ddmendpoint):
+        self.lfn = lfn
+        self.ddmendpoint = ddmendpoint
+        self.status = None
+        self.status_code = 0
+
+
+class TestTransferPool(unittest.TestCase):
+    """
+    Unit tests for the concurrent transfer pool.
+    """
+
+    def setUp(self):
+
+        self.lock = threading.Lock()
+        self.running = {}
+        self.max_running = {}
+        self.traces = []
+
+    def copy_in(self, files, **kwargs):
+        """
+        Fake copytool transfer function that keeps track of the number of concurrent transfers per ddmendpoint.
+        """
+
+        fspec = files[0]
+        with self.lock:
+            self.running[fspec.ddmendpoint] = self.running.get(fspec.ddmendpoint, 0) + 1
+            self.max_running[fspec.ddmendpoint] = max(self.max_running.get(fspec.ddmendpoint, 0),
+                                                      self.running[fspec.ddmendpoint])
+        time.sleep(0.05)
+        kwargs['trace_report'].update(filename=fspec.lfn)
+        with self.lock:
+            self.running[fspec.ddmendpoint] -= 1
+            self.traces.append(kwargs['trace_report'])
+        if fspec.lfn == 'bad':
+            fspec.status = 'failed'
+            raise ValueError('failed to transfer %s' % fspec.lfn)
+        fspec.status = 'transferred'
+
+        return files
+
+    def test_rse_limits(self):
+        """
+        Make sure that all files are transferred within the global and per-RSE limits.
+
+        :return: (assertion).
+        """
+
+        files = [FakeFileSpec('a%d' % i, 'RSE_A') for i in range(6)] + [FakeFileSpec('b%d' % i, 'RSE_B') for i in range(6)]
+        pool = TransferPool(4, rse_limits={'RSE_A': 1})
+        trace_report = TraceReport(pq='SITE', eventType='get_sm')
+        pool.run(self.copy_in, files, trace_report=trace_report)
+
+        self.assertEqual([f.status for f in files], ['transferred'] * len(files))
+        self.assertEqual(self.max_running['RSE_A'], 1)
+        self.assertTrue(self.max_running['RSE_B'] <= 4)
+        self.assertEqual(sorted(t['filename'] for t in self.traces), sorted(f.lfn for f in files))
+        self.assertTrue(all(isinstance(t, TraceReport) and t['eventType'] == 'get_sm' for t in self.traces))
+        self.assertEqual(trace_report['filename'], None)
+
+    def test_shared_rse_limits(self):
+        """
+        Make sure that concurrent pools (e.g. output and log stage-out) share the per-RSE limits.
+
+        :return: (assertion).
+        """
+
+        outputs = [FakeFileSpec('a%d' % i, 'RSE_A') for i in range(4)]
+        logs = [FakeFileSpec('log', 'RSE_A')]
+        thread = threading.Thread(target=TransferPool(4, rse_limits={'RSE_A': 2}).run, args=(self.copy_in, outputs),
+                                  kwargs={'trace_report': {}})
+        thread.start()
+        TransferPool(1, rse_limits={'RSE_A': 2}).run(self.copy_in, logs, trace_report={})
+        thread.join()
+
+        self.assertEqual([f.status for f in outputs + logs], ['transferred'] * 5)
+        self.assertEqual(self.max_running['RSE_A'], 2)
+
+    def test_failure(self):
+        """
+        Make sure that the error of a failed transfer is propagated.
+
+        :return: (assertion).
+        """
+
+        files = [FakeFileSpec('good', 'RSE_A'), FakeFileSpec('bad', 'RSE_A')]
+        pool = TransferPool(2)
+
+        self.assertRaises(ValueError, pool.run, self.copy_in, files, trace_report={})
+        self.assertEqual(files[0].status, 'transferred')
+        self.assertEqual(files[1].status, 'failed')
+
+
+if __name__ == '__main__':
+    unittest.main()
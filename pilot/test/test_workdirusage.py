@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from pilot.util.workdirusage import WorkdirUsage
+
+
+def write_file(path, size):
+    with open(path, 'wb') as fp:
+        fp.write(b'x' * size)
+
+
+class TestWorkdirUsage(unittest.TestCase):
+    """
+    Unit tests for the incremental workdir usage tracker.
+    """
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.workdir, 'sub'))
+        write_file(os.path.join(self.workdir, 'input.root'), 100000)
+        write_file(os.path.join(self.workdir, 'sub', 'log.txt'), 20000)
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def _check(self, use_inotify):
+        """
+        Follow additions, growth and removals of files.
+
+        :param use_inotify: Boolean.
+        :return: (assertion).
+        """
+
+        tracker = WorkdirUsage(self.workdir, use_inotify=use_inotify, full_scan_interval=100)
+        size = tracker.refresh()
+        self.assertTrue(size >= 120000)
+        self.assertEqual(tracker.get_file_sizes(), {'input.root': 100000})
+        self.assertEqual(tracker.get_largest_files(1)[0][0], 'input.root')
+
+        # the mtime resolution of some file systems is coarse
+        time.sleep(0.01)
+
+        # new directory, new file and a growing file
+        os.mkdir(os.path.join(self.workdir, 'sub', 'new'))
+        write_file(os.path.join(self.workdir, 'sub', 'new', 'big.data'), 500000)
+        write_file(os.path.join(self.workdir, 'sub', 'log.txt'), 60000)
+        size = tracker.refresh()
+        self.assertTrue(size >= 660000)
+        self.assertEqual(tracker.get_largest_files(2)[0][0], os.path.join('sub', 'new', 'big.data'))
+        self.assertIn((os.path.join('sub', 'log.txt'), 60000), [(item[0], item[1]) for item in tracker.iter_files()])
+
+        # removed files and directories
+        shutil.rmtree(os.path.join(self.workdir, 'sub'))
+        os.remove(os.path.join(self.workdir, 'input.root'))
+        size = tracker.refresh()
+        self.assertTrue(size < 100000)
+        self.assertEqual(tracker.get_file_sizes(), {})
+        self.assertEqual(list(tracker.iter_files()), [])
+
+        tracker.close()
+
+    def test_polling(self):
+        """
+        Make sure that changes are found from directory and file mtimes.
+
+        :return: (assertion).
+        """
+
+        self._check(False)
+
+    def test_inotify(self):
+        """
+        Make sure that changes are found from inotify events (falls back to polling where not available).
+
+        :return: (assertion).
+        """
+
+        self._check(True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+import multiprocessing
+import threading
+import time
+import unittest
+
+from pilot.eventservice.droid import Droid
+from pilot.eventservice.transport import create_local_transports
+from pilot.eventservice.yoda import Yoda
+
+
+class FakeESProcess(threading.Thread):
+    """
+    ESProcess replacement processing the event ranges with a given delay per event range.
+    """
+
+    def __init__(self, payload):
+        super(FakeESProcess, self).__init__()
+        self.daemon = True
+        self.delay = payload.get('delay', 0)
+        self.hang = payload.get('hang', False)
+        self.get_event_ranges_hook = None
+        self.handle_out_message_hook = None
+
+    def set_get_event_ranges_hook(self, hook):
+        self.get_event_ranges_hook = hook
+
+    def set_handle_out_message_hook(self, hook):
+        self.handle_out_message_hook = hook
+
+    def run(self):
+        while True:
+            event_ranges = self.get_event_ranges_hook(2)
+            if not event_ranges:
+                break
+            if self.hang:
+                time.sleep(3600)
+            for event_range in event_ranges:
+                time.sleep(self.delay)
+                self.handle_out_message_hook({'id': event_range['eventRangeID'], 'status': 'finished',
+                                              'output': '/tmp/%s' % event_range['eventRangeID']})
+
+    def poll(self):
+        return 0
+
+
+class EventRangeSource(object):
+    """
+    Server replacement with a given number of event ranges, recording the results.
+    """
+
+    def __init__(self, nevents):
+        self.event_ranges = [{'eventRangeID': str(i)} for i in range(nevents)]
+        self.results = []
+        self.done_time = None
+
+    def get_event_ranges(self, num):
+        ret, self.event_ranges = self.event_ranges[:num], self.event_ranges[num:]
+        return ret
+
+    def handle_results(self, messages):
+        self.results.extend(message['id'] for message in messages)
+        self.done_time = time.time()
+
+
+def start_droid(transport, payload, **kwargs):
+    """
+    Run a Droid with the fake process in a thread.
+    """
+
+    droid = Droid(transport, payload, process_class=FakeESProcess, batch_size=5, update_interval=0.1, **kwargs)
+    thread = threading.Thread(target=droid.run)
+    thread.daemon = True
+    thread.start()
+    return thread
+
+
+def run_droid_process(transport, payload):
+    Droid(transport, payload, process_class=FakeESProcess).run()
+
+
+class TestYodaDroid(unittest.TestCase):
+    """
+    Unit tests for the Yoda/Droid event service with local transports.
+    """
+
+    def test_load_balancing(self):
+        """
+        Make sure that all event ranges are processed once and that faster Droids process more event ranges.
+
+        :return: (assertion).
+        """
+
+        source = EventRangeSource(100)
+        transports = create_local_transports(4)
+        for transport, delay in zip(transports[1:], [0.001, 0.001, 0.05]):
+            start_droid(transport, {'delay': delay})
+        stats = Yoda(transports[0], source.get_event_ranges, source.handle_results, bulk_size=10, poll_interval=0.1).run()
+
+        self.assertEqual(sorted(source.results, key=int), [str(i) for i in range(100)])
+        self.assertEqual(stats['finished'], 100)
+        self.assertEqual(stats['unprocessed'], 0)
+        finished = [droid['finished'] for droid in stats['droids']]
+        self.assertEqual(sum(finished), 100)
+        self.assertTrue(finished[0] > finished[2] and finished[1] > finished[2])
+        self.assertTrue(all(droid['throughput'] > 0 for droid in stats['droids']))
+
+    def test_lost_droid(self):
+        """
+        Make sure that the event ranges of a Droid without messages are processed by the other Droids.
+
+        :return: (assertion).
+        """
+
+        source = EventRangeSource(20)
+        transports = create_local_transports(3)
+        start_droid(transports[1], {'hang': True}, heartbeat_interval=3600)
+        time.sleep(0.1)  # the hanging droid gets the first event ranges
+        start_droid(transports[2], {'delay': 0.01})
+        stats = Yoda(transports[0], source.get_event_ranges, source.handle_results, bulk_size=5, droid_timeout=0.5,
+                     poll_interval=0.1).run()
+
+        self.assertEqual(sorted(source.results, key=int), [str(i) for i in range(20)])
+        self.assertTrue(stats['droids'][0]['lost'])
+        self.assertEqual(stats['droids'][1]['finished'], 20)
+
+    def test_stragglers(self):
+        """
+        Make sure that straggling event ranges are given to idle Droids and reported once.
+
+        :return: (assertion).
+        """
+
+        source = EventRangeSource(4)
+        transports = create_local_transports(3)
+        t0 = time.time()
+        start_droid(transports[1], {'delay': 2})
+        time.sleep(0.1)
+        start_droid(transports[2], {'delay': 0.01})
+        stats = Yoda(transports[0], source.get_event_ranges, source.handle_results, bulk_size=2, straggler_timeout=0.3,
+                     poll_interval=0.1).run()
+
+        self.assertEqual(sorted(source.results), ['0', '1', '2', '3'])
+        self.assertTrue(source.done_time - t0 < 2)
+        self.assertEqual(stats['finished'], 4)
+
+    def test_processes(self):
+        """
+        Make sure that Droids run as local processes.
+
+        :return: (assertion).
+        """
+
+        source = EventRangeSource(10)
+        transports = create_local_transports(3)
+        processes = [multiprocessing.Process(target=run_droid_process, args=(transport, {'delay': 0.01}))
+                     for transport in transports[1:]]
+        for process in processes:
+            process.start()
+        stats = Yoda(transports[0], source.get_event_ranges, source.handle_results, bulk_size=4, poll_interval=0.1).run()
+        for process in processes:
+            process.join(10)
+
+        self.assertEqual(sorted(source.results, key=int), [str(i) for i in range(10)])
+        self.assertEqual(sum(droid['finished'] for droid in stats['droids']), 10)
+
+    def test_droid_graceful_stop(self):
+        """
+        Make sure that a Droid waiting for event ranges stops on graceful stop or when its max time has passed.
+
+        :return: (assertion).
+        """
+
+        transports = create_local_transports(2)  # nobody answers on rank 0
+        graceful_stop = threading.Event()
+        droid = Droid(transports[1], {}, graceful_stop=graceful_stop, poll_interval=0.1)
+        threading.Timer(0.3, graceful_stop.set).start()
+        self.assertEqual(droid.get_event_ranges(2), [])
+        self.assertEqual(droid.get_event_ranges(2), [])  # no more requests
+
+        t0 = time.time()
+        droid = Droid(transports[1], {}, max_time=0.3, poll_interval=0.1)
+        self.assertEqual(droid.get_event_ranges(2), [])
+        self.assertTrue(time.time() - t0 < 2)
+
+    def test_yoda_graceful_stop(self):
+        """
+        Make sure that Yoda stops the Droids on graceful stop, and when its max time has passed.
+
+        :return: (assertion).
+        """
+
+        for kwargs in [{'graceful_stop': threading.Event()}, {'max_time': 0.3}]:
+            source = EventRangeSource(100)
+            transports = create_local_transports(2)
+            thread = start_droid(transports[1], {'delay': 0.05})
+            if 'graceful_stop' in kwargs:
+                threading.Timer(0.3, kwargs['graceful_stop'].set).start()
+            stats = Yoda(transports[0], source.get_event_ranges, source.handle_results, bulk_size=10, poll_interval=0.1,
+                         **kwargs).run()
+            thread.join(5)
+
+            self.assertFalse(thread.is_alive())
+            self.assertTrue(stats['unprocessed'] > 0)
+            self.assertTrue(len(source.results) < 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -28,6 +28,7 @@ from .utilities import get_memory_monitor_setup, get_network_monitor_setup, post
 
 from pilot.common.errorcodes import ErrorCodes
 from pilot.common.exception import TrfDownloadFailure, PilotException
+from pilot.common.pluginregistry import get_user_module
 from pilot.util.auxiliary import get_logger, is_python3
 from pilot.util.config import config
 from pilot.util.constants import UTILITY_BEFORE_PAYLOAD, UTILITY_WITH_PAYLOAD, UTILITY_AFTER_PAYLOAD_STARTED,\
@@ -113,6 +114,93 @@ def get_resource_name():
     return resource_name
 
 
+def prepare_payload(job):
+    """
+    Prepare the parts of the payload command that do not depend on the input files, i.e. verify the setup command
+    (asetup) and download the user analysis transform.
+    The function is called by the payload control while stage-in is running. The results (or the caught exceptions)
+    are stored in job.payloadsetup and are used (or raised) by get_payload_command().
+
+    :param job: job object.
+    :return:
+    """
+
+    log = get_logger(job.jobid)
+
+    prepareasetup = should_pilot_prepare_asetup(job.noexecstrcnv, job.jobparams)
+    steps = [('setup', get_verified_setup_command, (job, prepareasetup))]
+    if job.is_analysis():
+        steps.append(('trf', get_analysis_trf_name, (job,)))
+
+    for name, function, args in steps:
+        try:
+            job.payloadsetup[name] = (function(*args), None)
+        except Exception as error:
+            log.warning('payload preparation step \'%s\' failed: %s' % (name, error))
+            job.payloadsetup[name] = (None, error)
+
+
+def get_prepared_value(job, name, function, *args):
+    """
+    Return the value prepared by prepare_payload(), or call the given function if the value has not been prepared.
+    An exception that was caught during the preparation is raised.
+
+    :param job: job object.
+    :param name: name of the preparation step (string).
+    :param function: function that returns the value.
+    :param args: arguments of the function.
+    :raises: the exception caught by prepare_payload().
+    :return: value.
+    """
+
+    if name in job.payloadsetup:
+        value, error = job.payloadsetup[name]
+        if error:
+            raise error
+        return value
+
+    return function(*args)
+
+
+def get_verified_setup_command(job, prepareasetup):
+    """
+    Return the general setup command of the resource, after verifying it.
+
+    :param job: job object.
+    :param prepareasetup: should the pilot prepare the asetup command itself? boolean.
+    :raises PilotException: if the verification failed (e.g. NORELEASEFOUND).
+    :return: setup command (string).
+    """
+
+    resource_name = get_resource_name()  # 'grid' if no hpc_resource is set
+    resource = get_user_module('resource.%s' % resource_name, 'atlas')
+
+    cmd = resource.get_setup_command(job, prepareasetup)
+    ec, diagnostics = resource.verify_setup_command(cmd)
+    if ec != 0:
+        raise PilotException(diagnostics, code=ec)
+
+    return cmd
+
+
+def get_analysis_trf_name(job):
+    """
+    Download the user analysis transform to the job work directory.
+
+    :param job: job object.
+    :raises TrfDownloadFailure: if the download failed.
+    :return: transform name (string).
+    """
+
+    ec, diagnostics, trf_name = get_analysis_trf(job.transformation, job.workdir)
+    if ec != 0:
+        raise TrfDownloadFailure(diagnostics)
+
+    get_logger(job.jobid).debug('user analysis trf: %s' % trf_name)
+
+    return trf_name
+
+
 def get_payload_command(job):
     """
     Return the full command for execuring the payload, including the sourcing of all setup files and setting of
@@ -134,14 +222,8 @@ def get_payload_command(job):
     # Is it a user job or not?
     userjob = job.is_analysis()
 
-    resource_name = get_resource_name()  # 'grid' if no hpc_resource is set
-    resource = __import__('pilot.user.atlas.resource.%s' % resource_name, globals(), locals(), [resource_name], 0)  # Python 3, -1 -> 0
-
-    # get the general setup command and then verify it if required
-    cmd = resource.get_setup_command(job, prepareasetup)
-    ec, diagnostics = resource.verify_setup_command(cmd)
-    if ec != 0:
-        raise PilotException(diagnostics, code=ec)
+    # get the general setup command and then verify it if required (normally already done by prepare_payload())
+    cmd = get_prepared_value(job, 'setup', get_verified_setup_command, job, prepareasetup)
 
     if is_standard_atlas_job(job.swrelease):
 
@@ -208,11 +290,7 @@ def get_normal_payload_command(cmd, job, prepareasetup, userjob):
         #if job.imagename != "" or "--containerImage" in job.jobparams:
         #    job.transformation = os.path.join(os.path.dirname(job.transformation), "runcontainer")
         #    log.warning('overwrote job.transformation, now set to: %s' % job.transformation)
-        ec, diagnostics, trf_name = get_analysis_trf(job.transformation, job.workdir)
-        if ec != 0:
-            raise TrfDownloadFailure(diagnostics)
-        else:
-            log.debug('user analysis trf: %s' % trf_name)
+        trf_name = get_prepared_value(job, 'trf', get_analysis_trf_name, job)
 
         if prepareasetup:
             _cmd = get_analysis_run_command(job, trf_name)
@@ -255,18 +333,12 @@ def get_generic_payload_command(cmd, job, prepareasetup, userjob):
     :return: generic job command (string).
     """
 
-    log = get_logger(job.jobid)
-
     if userjob:
         # Try to download the trf
         #if job.imagename != "" or "--containerImage" in job.jobparams:
         #    job.transformation = os.path.join(os.path.dirname(job.transformation), "runcontainer")
         #    log.warning('overwrote job.transformation, now set to: %s' % job.transformation)
-        ec, diagnostics, trf_name = get_analysis_trf(job.transformation, job.workdir)
-        if ec != 0:
-            raise TrfDownloadFailure(diagnostics)
-        else:
-            log.debug('user analysis trf: %s' % trf_name)
+        trf_name = get_prepared_value(job, 'trf', get_analysis_trf_name, job)
 
         if prepareasetup:
             _cmd = get_analysis_run_command(job, trf_name)
@@ -1355,31 +1427,51 @@ def cleanup_broken_links(workdir):
             remove(p)
 
 
-def remove_redundant_files(workdir, outputfiles=[]):
+def get_redundant_filter(workdir, outputfiles=[]):
     """
-    Remove redundant files and directories prior to creating the log file.
+    Return a function that identifies the redundant files and directories (see get_redundants()) in the given workdir.
+    The selection is the same as in remove_redundant_files(), but can be applied while walking the workdir, e.g. when
+    creating the log file (a path is matched like glob(os.path.join(workdir, pattern)) would match it).
 
     :param workdir: working directory (string).
     :param outputfiles: list of output files.
-    :return:
+    :return: function (path) returning True for redundant paths.
     """
 
-    logger.debug("removing redundant files prior to log creation")
-
     workdir = os.path.abspath(workdir)
+    patterns = [pattern.strip('/').split('/') for pattern in get_redundants() if pattern.strip('/')]
 
-    # get list of redundant files and directories (to be removed)
-    dir_list = get_redundants()
+    # note: these should be partial file/dir names, not containing any wildcards
+    exceptions_list = ["runargs", "runwrapper", "jobReport", "log."]
+    exclude_files = [os.path.join(workdir, of) for of in outputfiles]
 
-    # remove core and pool.root files from AthenaMP sub directories
-    try:
-        cleanup_payload(workdir, outputfiles)
-    except Exception as e:
-        logger.warning("failed to execute cleanup_payload(): %s" % e)
+    def match(parts, pattern):
+        # as with glob, wildcards do not match hidden files
+        return all(fnmatch.fnmatch(part, _pattern) and (_pattern.startswith('.') or not part.startswith('.'))
+                   for part, _pattern in zip(parts, pattern))
 
-    # explicitly remove any soft linked archives (.a files) since they will be dereferenced by the tar command
-    # (--dereference option)
-    remove_archives(workdir)
+    def is_redundant(path):
+        path = os.path.abspath(path)
+        parts = os.path.relpath(path, workdir).split(os.sep)
+        if not any(len(pattern) == len(parts) and match(parts, pattern) for pattern in patterns):
+            return False
+
+        return not any(exc in path for exc in exceptions_list) and path not in exclude_files
+
+    return is_redundant
+
+
+def remove_redundants(workdir, outputfiles=[]):
+    """
+    Remove the redundant files and directories listed by get_redundants().
+
+    :param workdir: working directory (string).
+    :param outputfiles: list of output files.
+    :return:
+    """
+
+    # get list of redundant files and directories (to be removed)
+    dir_list = get_redundants()
 
     # note: these should be partial file/dir names, not containing any wildcards
     exceptions_list = ["runargs", "runwrapper", "jobReport", "log."]
@@ -1411,6 +1503,35 @@ def remove_redundant_files(workdir, outputfiles=[]):
             else:
                 remove_dir_tree(f)
 
+
+def remove_redundant_files(workdir, outputfiles=[], redundants=True):
+    """
+    Remove redundant files and directories prior to creating the log file.
+
+    :param workdir: working directory (string).
+    :param outputfiles: list of output files.
+    :param redundants: remove the files and directories listed by get_redundants() (Boolean). Set to False if they
+    are instead skipped while creating the log file (see get_redundant_filter()).
+    :return:
+    """
+
+    logger.debug("removing redundant files prior to log creation")
+
+    workdir = os.path.abspath(workdir)
+
+    # remove core and pool.root files from AthenaMP sub directories
+    try:
+        cleanup_payload(workdir, outputfiles)
+    except Exception as e:
+        logger.warning("failed to execute cleanup_payload(): %s" % e)
+
+    # explicitly remove any soft linked archives (.a files) since they will be dereferenced by the tar command
+    # (--dereference option)
+    remove_archives(workdir)
+
+    if redundants:
+        remove_redundants(workdir, outputfiles)
+
     # run a second pass to clean up any broken links
     cleanup_broken_links(workdir)
 
@@ -9,7 +9,9 @@
 
 from pilot.api import analytics
 from pilot.util.auxiliary import get_logger
+from pilot.util.config import config
 from pilot.util.jobmetrics import get_job_metrics_entry
+from pilot.util.parameters import convert_to_int
 from pilot.util.processes import get_core_count
 
 from .common import get_db_info
@@ -106,7 +108,9 @@ def get_job_metrics(job):  # noqa: C901
         client = analytics.Analytics()
         # do not include tails on final update
         tails = False if (job.state == "finished" or job.state == "failed" or job.state == "holding") else True
-        data = client.get_fitted_data(path, tails=tails)
+        estimator = getattr(config.Pilot, 'memory_leak_estimator', 'linear')
+        window = convert_to_int(getattr(config.Pilot, 'memory_leak_window', 0), default=0)
+        data = client.get_fitted_data(path, tails=tails, estimator=estimator, window=window or None)
         slope = data.get("slope", "")
         chi2 = data.get("chi2", "")
         if slope != "":
@@ -8,7 +8,6 @@
 # - Paul Nilsson, paul.nilsson@cern.ch, 2018-2019
 
 import os
-from xml.dom import minidom
 from xml.etree import ElementTree
 
 from pilot.util.filehandling import write_file
@@ -55,6 +54,7 @@ def create_input_file_metadata(file_dictionary, workdir, filename="PoolFileCatal
 
     # create a new XML file with the results
     xml = ElementTree.tostring(data, encoding='utf8')
+    from xml.dom import minidom  # only needed here, not imported at pilot startup
     xml = minidom.parseString(xml).toprettyxml(indent="  ")
 
     # add escape character for & (needed for google turls)
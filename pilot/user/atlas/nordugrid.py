@@ -8,7 +8,6 @@
 # - Paul Nilsson, paul.nilsson@cern.ch, 2018-2019
 
 import re
-from xml.dom import minidom
 from xml.etree import ElementTree
 
 import logging
@@ -135,6 +134,7 @@ def convert_to_xml(dictionary):
         return None
 
     # generate pretty print
+    from xml.dom import minidom  # imported on first use, keeps it out of the pilot startup
     return minidom.parseString(ElementTree.tostring(root)).toprettyxml(indent="   ")
 
 
@@ -14,11 +14,11 @@ from re import search
 
 # from pilot.info import infosys
 from .setup import get_asetup
-from pilot.util.auxiliary import get_logger, is_python3
+from pilot.util.auxiliary import get_logger
 from pilot.util.container import execute
 from pilot.util.filehandling import read_json, copy
-from pilot.util.parameters import convert_to_int
 from pilot.util.processes import is_process_running
+from pilot.util.timeseries import get_time_series
 
 import logging
 logger = logging.getLogger(__name__)
@@ -500,111 +500,34 @@ def get_memory_monitor_info(workdir, allowtxtfile=False, name=""):  # noqa: C901
     return node
 
 
-def get_max_memory_monitor_value(value, maxvalue, totalvalue):  # noqa: C90
-    """
-    Return the max and total value (used by memory monitoring).
-    Return an error code, 1, in case of value error.
-
-    :param value: value to be tested (integer).
-    :param maxvalue: current maximum value (integer).
-    :param totalvalue: total value (integer).
-    :return: exit code, maximum and total value (tuple of integers).
-    """
-
-    ec = 0
-    try:
-        value_int = int(value)
-    except Exception as e:
-        logger.warning("exception caught: %s" % e)
-        ec = 1
-    else:
-        totalvalue += value_int
-        if value_int > maxvalue:
-            maxvalue = value_int
-
-    return ec, maxvalue, totalvalue
-
-
-def convert_unicode_string(unicode_string):
-    """
-    Convert a unicode string into str.
-
-    :param unicode_string:
-    :return: string.
-    """
-
-    if unicode_string is not None:
-        return str(unicode_string)
-    return None
-
-
 def get_average_summary_dictionary_prmon(path):
     """
-    Loop over the memory monitor output file and create the averaged summary dictionary.
+    Create the averaged summary dictionary from the memory monitor output file.
 
     prmon keys:
     'Time', 'nprocs', 'nthreads', 'pss', 'rchar', 'read_bytes', 'rss', 'rx_bytes',
     'rx_packets', 'stime', 'swap', 'tx_bytes', 'tx_packets', 'utime', 'vmem', 'wchar',
     'write_bytes', 'wtime'
 
-    The function uses the first line in the output file to define the dictionary keys used
-    later in the function. This means that any change in the format such as new columns
-    will be handled automatically.
+    The first line in the output file defines the column names. This means that any change in the format such as new
+    columns will be handled automatically. The file is read incrementally (only the rows that were added since the
+    previous call are parsed, see pilot.util.timeseries).
 
     :param path: path to memory monitor txt output file (string).
     :return: summary dictionary.
     """
 
-    dictionary = {}
     summary_dictionary = {}
-    summary_keys = []  # to keep track of content
-    header_locked = False
-    with open(path) as f:
-        for line in f:
-            line = convert_unicode_string(line)
-            if line != "":
-                try:
-                    # Remove empty entries from list (caused by multiple \t)
-                    _l = line.replace('\n', '')
-                    if is_python3():
-                        _l = [_f for _f in _l.split('\t') if _f]  # Python 3
-                    else:
-                        _l = filter(None, _l.split('\t'))  # Python 2
-
-                    # define dictionary keys
-                    if type(_l[0]) == str and not header_locked:
-                        summary_keys = _l
-                        for key in _l:
-                            dictionary[key] = []
-                        header_locked = True
-                    else:  # sort the memory measurements in the correct columns
-                        for i, key in enumerate(_l):
-                            # for key in _l:
-                            key_entry = summary_keys[i]  # e.g. Time
-                            value = convert_to_int(key)
-                            dictionary[key_entry].append(value)
-                except Exception:
-                    logger.warning("unexpected format of utility output: %s" % line)
-    #
-    if dictionary:
+    series = get_time_series(path)
+    if series.get_keys():
         # Calculate averages and store all values
         summary_dictionary = {"Max": {}, "Avg": {}, "Other": {}}
 
-        def filter_value(value):
-            """ Inline function used to remove any string or None values from data. """
-            if type(value) == str or value is None:
-                return False
-            else:
-                return True
-
         keys = ['vmem', 'pss', 'rss', 'swap']
         values = {}
         for key in keys:
-            value_list = list(filter(filter_value, dictionary.get(key, 0)))  # Python 2/3
-            n = len(value_list)
-            average = int(float(sum(value_list)) / float(n)) if n > 0 else 0
-            maximum = max(value_list)
-            values[key] = {'avg': average, 'max': maximum}
+            average = series.get_average(key)
+            values[key] = {'avg': int(average) if average is not None else 0, 'max': series.get_max(key)}
 
         summary_dictionary["Max"] = {"maxVMEM": values['vmem'].get('max'), "maxPSS": values['pss'].get('max'),
                                      "maxRSS": values['rss'].get('max'), "maxSwap": values['swap'].get('max')}
@@ -615,110 +538,45 @@ def get_average_summary_dictionary_prmon(path):
         keys = ['rchar', 'wchar', 'read_bytes', 'write_bytes']
         # warning: should read_bytes/write_bytes be reported as rbytes/wbytes?
         for key in keys:
-            value = get_last_value(dictionary.get(key, None))
+            value = series.get_last(key)
             if value:
                 summary_dictionary["Other"][key] = value
 
     return summary_dictionary
 
 
-def get_last_value(value_list):
-    value = None
-    if value_list:
-        value = value_list[-1]
-    return value
-
-
 def get_average_summary_dictionary(path):
     """
-    Loop over the memory monitor output file and create the averaged summary dictionary.
+    Create the averaged summary dictionary from the (old) memory monitor output file.
+    The columns are: Time, VMEM, PSS, RSS, Swap [, RCHAR, WCHAR, RBYTES, WBYTES]. The first line is the header.
+    The file is read incrementally (see pilot.util.timeseries).
 
     :param path: path to memory monitor txt output file (string).
     :return: summary dictionary.
     """
 
-    maxvmem = -1
-    maxrss = -1
-    maxpss = -1
-    maxswap = -1
-    avgvmem = 0
-    avgrss = 0
-    avgpss = 0
-    avgswap = 0
-    totalvmem = 0
-    totalrss = 0
-    totalpss = 0
-    totalswap = 0
-    n = 0
-    summary_dictionary = {}
-
-    rchar = None
-    wchar = None
-    rbytes = None
-    wbytes = None
-
-    first = True
-    with open(path) as f:
-        for line in f:
-            # Skip the first line
-            if first:
-                first = False
-                continue
-            line = convert_unicode_string(line)
-            if line != "":
-                try:
-                    # Remove empty entries from list (caused by multiple \t)
-                    if is_python3():
-                        _l = [_f for _f in line.split('\t') if _f]  # Python 3
-                    else:
-                        _l = filter(None, line.split('\t'))  # Python 2
-                    # _time = _l[0]  # 'Time' not user
-                    vmem = _l[1]
-                    pss = _l[2]
-                    rss = _l[3]
-                    swap = _l[4]
-                    # note: the last rchar etc values will be reported
-                    if len(_l) == 9:
-                        rchar = int(_l[5])
-                        wchar = int(_l[6])
-                        rbytes = int(_l[7])
-                        wbytes = int(_l[8])
-                    else:
-                        rchar = None
-                        wchar = None
-                        rbytes = None
-                        wbytes = None
-                except Exception:
-                    logger.warning("unexpected format of utility output: %s (expected format: Time, VMEM,"
-                                   " PSS, RSS, Swap [, RCHAR, WCHAR, RBYTES, WBYTES])" % (line))
-                else:
-                    # Convert to int
-                    ec1, maxvmem, totalvmem = get_max_memory_monitor_value(vmem, maxvmem, totalvmem)
-                    ec2, maxpss, totalpss = get_max_memory_monitor_value(pss, maxpss, totalpss)
-                    ec3, maxrss, totalrss = get_max_memory_monitor_value(rss, maxrss, totalrss)
-                    ec4, maxswap, totalswap = get_max_memory_monitor_value(swap, maxswap, totalswap)
-                    if ec1 or ec2 or ec3 or ec4:
-                        logger.warning("will skip this row of numbers due to value exception: %s" % (line))
-                    else:
-                        n += 1
-
-        # Calculate averages and store all values
-        summary_dictionary = {"Max": {}, "Avg": {}, "Other": {}}
-        summary_dictionary["Max"] = {"maxVMEM": maxvmem, "maxPSS": maxpss, "maxRSS": maxrss, "maxSwap": maxswap}
-        if rchar:
-            summary_dictionary["Other"]["rchar"] = rchar
-        if wchar:
-            summary_dictionary["Other"]["wchar"] = wchar
-        if rbytes:
-            summary_dictionary["Other"]["rbytes"] = rbytes
-        if wbytes:
-            summary_dictionary["Other"]["wbytes"] = wbytes
-        if n > 0:
-            avgvmem = int(float(totalvmem) / float(n))
-            avgpss = int(float(totalpss) / float(n))
-            avgrss = int(float(totalrss) / float(n))
-            avgswap = int(float(totalswap) / float(n))
-        summary_dictionary["Avg"] = {"avgVMEM": avgvmem, "avgPSS": avgpss, "avgRSS": avgrss, "avgSwap": avgswap}
+    series = get_time_series(path)
+    keys = series.get_keys()
+    if len(keys) < 5:
+        logger.warning("unexpected format of utility output: %s (expected format: Time, VMEM,"
+                       " PSS, RSS, Swap [, RCHAR, WCHAR, RBYTES, WBYTES])" % keys)
+        keys += [None] * (5 - len(keys))
+
+    # Calculate averages and store all values
+    summary_dictionary = {"Max": {}, "Avg": {}, "Other": {}}
+    maxima = [series.get_max(key) for key in keys[1:5]]
+    summary_dictionary["Max"] = dict(zip(["maxVMEM", "maxPSS", "maxRSS", "maxSwap"],
+                                         [-1 if value is None else value for value in maxima]))
+    averages = [series.get_average(key) for key in keys[1:5]]
+    summary_dictionary["Avg"] = dict(zip(["avgVMEM", "avgPSS", "avgRSS", "avgSwap"],
+                                         [0 if value is None else int(value) for value in averages]))
+
+    # note: the last rchar etc values will be reported
+    if len(keys) == 9:
+        for name, key in zip(["rchar", "wchar", "rbytes", "wbytes"], keys[5:]):
+            value = series.get_last(key)
+            if value:
+                summary_dictionary["Other"][name] = value
 
     return summary_dictionary
 
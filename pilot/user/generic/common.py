@@ -38,6 +38,19 @@ def validate(job):
     return True
 
 
+def prepare_payload(job):
+    """
+    Prepare the parts of the payload command that do not depend on the input files (e.g. verify the setup).
+    The function is called while stage-in is running; results should be stored in job.payloadsetup for
+    get_payload_command().
+
+    :param job: job object.
+    :return:
+    """
+
+    pass
+
+
 def get_payload_command(job):
     """
     Return the full command for execuring the payload, including the sourcing of all setup files and setting of
@@ -63,12 +76,26 @@ def update_job_data(job):
     pass
 
 
-def remove_redundant_files(workdir, outputfiles=[]):
+def get_redundant_filter(workdir, outputfiles=[]):
+    """
+    Return a function that identifies the redundant files and directories in the given workdir.
+
+    :param workdir: working directory (string).
+    :param outputfiles: list of output files.
+    :return: function (path) returning True for redundant paths (None if there are no redundant files).
+    """
+
+    return None
+
+
+def remove_redundant_files(workdir, outputfiles=[], redundants=True):
     """
     Remove redundant files and directories prior to creating the log file.
 
     :param workdir: working directory (string).
     :param outputfiles: list of output files.
+    :param redundants: remove the redundant files and directories (Boolean). Set to False if they are instead skipped
+    while creating the log file (see get_redundant_filter()).
     :return:
     """
 
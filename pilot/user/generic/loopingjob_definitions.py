@@ -6,6 +6,7 @@
 #
 # Authors:
 # - Paul Nilsson, paul.nilsson@cern.ch, 2018
+# - agent, agent@local, 2026
 
 
 def allow_loopingjob_detection():
@@ -21,6 +22,24 @@ def allow_loopingjob_detection():
     return True
 
 
+def is_unwanted_file(workdir, path):
+    """
+    Should the given file be ignored by the looping job algorithm?
+    The check is made on the full path while walking the workdir; since a directory path is a prefix of the paths of
+    all files below it, an unwanted directory is skipped together with its content.
+
+    :param workdir: working directory (string).
+    :param path: path to a file or directory (string).
+    :return: boolean.
+    """
+
+    return (workdir == path or
+            "pilotlog" in path or
+            ".lib.tgz" in path or
+            ".py" in path or
+            "pandaJob" in path)
+
+
 def remove_unwanted_files(workdir, files):
     """
     Remove files from the list that are to be ignored by the looping job algorithm.
@@ -31,13 +50,4 @@ def remove_unwanted_files(workdir, files):
     :return: filtered files list.
     """
 
-    _files = []
-    for _file in files:
-        if not (workdir == _file or
-                "pilotlog" in _file or
-                ".lib.tgz" in _file or
-                ".py" in _file or
-                "pandaJob" in _file):
-            _files.append(_file)
-
-    return _files
+    return [_file for _file in files if not is_unwanted_file(workdir, _file)]
@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+"""
+Streaming creation of gzipped tarballs (e.g. the job log file).
+
+The directory tree is walked and each entry is streamed directly into the tar file, with exclusions applied during
+the walk. The tar stream is cut into blocks that are compressed in parallel (zlib releases the GIL) and written in
+order as consecutive gzip members, which is a valid gzip file (RFC 1952) for gzip, tar and the Python gzip module.
+"""
+
+import os
+import tarfile
+import time
+import zlib
+from collections import deque
+from multiprocessing.pool import ThreadPool
+
+from pilot.util.workdirusage import scan_directory
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def _compress_block(data, level):
+    """
+    Compress a block into a complete gzip member.
+
+    :param data: uncompressed data (bytes).
+    :param level: compression level (int).
+    :return: gzip member (bytes).
+    """
+
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+class ParallelGzipFile(object):
+    """
+    Write-only file object that compresses blocks of data in parallel.
+    """
+
+    def __init__(self, fileobj, nthreads=4, level=6, blocksize=1024 * 1024):
+        """
+        :param fileobj: file object for the compressed output (opened in binary mode).
+        :param nthreads: number of compression threads (int).
+        :param level: gzip compression level (int).
+        :param blocksize: size of the independently compressed blocks in B (int).
+        """
+
+        self.fileobj = fileobj
+        self.nthreads = max(1, nthreads)
+        self.level = level
+        self.blocksize = blocksize
+        self.size = 0  # uncompressed bytes written
+        self._buffer = []
+        self._buffered = 0
+        self._pending = deque()  # compression results, in output order
+        self._pool = ThreadPool(self.nthreads) if self.nthreads > 1 else None
+        self._nblocks = 0
+
+    def write(self, data):
+        """
+        Buffer the data; full blocks are handed over to the compression threads.
+
+        :param data: bytes.
+        :return:
+        """
+
+        self._buffer.append(data)
+        self._buffered += len(data)
+        self.size += len(data)
+        if self._buffered >= self.blocksize:
+            self._submit()
+
+    def _submit(self):
+        """
+        Compress the buffered data as one block.
+
+        :return:
+        """
+
+        data = b''.join(self._buffer)
+        self._buffer = []
+        self._buffered = 0
+        self._nblocks += 1
+
+        if self._pool:
+            self._pending.append(self._pool.apply_async(_compress_block, (data, self.level)))
+            # keep a bounded number of blocks in memory
+            while len(self._pending) > 2 * self.nthreads:
+                self.fileobj.write(self._pending.popleft().get())
+        else:
+            self.fileobj.write(_compress_block(data, self.level))
+
+    def close(self):
+        """
+        Compress the remaining data and write all pending blocks.
+
+        :return:
+        """
+
+        if self._buffered or not self._nblocks:  # an empty input still gives a valid gzip file
+            self._submit()
+        try:
+            while self._pending:
+                self.fileobj.write(self._pending.popleft().get())
+        finally:
+            if self._pool:
+                self._pool.close()
+                self._pool.join()
+                self._pool = None
+
+
+def walk(top, exclude=None, dereference=True, one_file_system=True):
+    """
+    Walk the directory tree and apply the exclusions on the way (the content of an excluded directory is not visited).
+
+    :param top: top directory (string).
+    :param exclude: optional function returning True for paths that should be skipped.
+    :param dereference: follow symbolic links to directories (Boolean).
+    :param one_file_system: do not descend into directories on other file systems (Boolean).
+    :return: generator of (path, is directory).
+    """
+
+    try:
+        device = os.stat(top).st_dev
+    except OSError as e:
+        logger.warning('cannot access %s: %s' % (top, e))
+        return
+
+    visited = set()  # protection against symbolic link loops
+    stack = [top]
+    while stack:
+        path = stack.pop()
+        try:
+            st = os.stat(path)
+            entries = sorted(scan_directory(path))
+        except OSError as e:
+            logger.warning('failed to list %s: %s' % (path, e))
+            continue
+        if (st.st_dev, st.st_ino) in visited:
+            continue
+        visited.add((st.st_dev, st.st_ino))
+
+        subdirs = []
+        for name, is_dir, _ in entries:
+            _path = os.path.join(path, name)
+            if exclude and exclude(_path):
+                continue
+            if not is_dir and dereference and os.path.islink(_path):
+                is_dir = os.path.isdir(_path)
+            yield _path, is_dir
+            if is_dir:
+                if one_file_system:
+                    try:
+                        if os.stat(_path).st_dev != device:
+                            continue
+                    except OSError:
+                        continue
+                subdirs.append(_path)
+        stack.extend(reversed(subdirs))
+
+
+def create_archive(filename, top, arcname=None, exclude=None, max_size=None, nthreads=4, level=6, added=None,
+                   directories=True):
+    """
+    Create a gzipped tarball of the given directory.
+    Symbolic links are dereferenced (as with tar --dereference) and other file systems are not entered. Files that
+    would bring the total (uncompressed) size above max_size are skipped (each one is reported).
+
+    :param filename: name of the tarball (string). The tarball is never added to itself.
+    :param top: directory to archive (string).
+    :param arcname: name of the top directory in the archive (string, default: basename of top).
+    :param exclude: optional function returning True for paths that should be skipped.
+    :param max_size: optional size limit in B for the content (int).
+    :param nthreads: number of compression threads (int).
+    :param level: gzip compression level (int).
+    :param added: optional list, the paths of all archived files are appended.
+    :param directories: add the directory entries, including the top directory (Boolean). Otherwise the archive only
+    contains the files (as with the old log tarball of the HPC workflow).
+    :raise: IOError, OSError, tarfile.TarError in case of failure.
+    :return: number of archived files (int), archived size in B (int), list of skipped files.
+    """
+
+    t0 = time.time()
+    top = os.path.abspath(top)
+    filename = os.path.abspath(filename)
+    arcname = arcname or os.path.basename(top)
+    nfiles = 0
+    size = 0
+    skipped = []
+
+    with open(filename, 'wb') as fileobj:
+        gzfile = ParallelGzipFile(fileobj, nthreads=nthreads, level=level)
+        try:
+            archive = tarfile.open(fileobj=gzfile, mode='w|', dereference=True)
+            if directories:
+                archive.add(top, arcname=arcname, recursive=False)
+            for path, is_dir in walk(top, exclude=exclude):
+                if path == filename:
+                    continue
+                name = os.path.join(arcname, os.path.relpath(path, top))
+                try:
+                    tarinfo = archive.gettarinfo(path, arcname=name)
+                except (IOError, OSError) as e:  # e.g. broken link
+                    logger.warning('skipping %s: %s' % (path, e))
+                    continue
+                if is_dir or tarinfo.isdir():
+                    if directories:
+                        archive.addfile(tarinfo)
+                    continue
+                if not tarinfo.isreg():
+                    archive.addfile(tarinfo)
+                    continue
+                if max_size is not None and size + tarinfo.size > max_size:
+                    logger.warning('size limit of %d B reached: skipping %s (%d B)' % (max_size, path, tarinfo.size))
+                    skipped.append(path)
+                    continue
+                try:
+                    _fileobj = open(path, 'rb')
+                except (IOError, OSError) as e:
+                    logger.warning('skipping %s: %s' % (path, e))
+                    continue
+                with _fileobj:
+                    archive.addfile(tarinfo, _fileobj)
+                nfiles += 1
+                size += tarinfo.size
+                if added is not None:
+                    added.append(path)
+            archive.close()
+        finally:
+            gzfile.close()
+
+    if skipped:
+        logger.warning('skipped %d file(s) in total because of the size limit' % len(skipped))
+    logger.info('created %s with %d files (%d B, compressed to %d B) in %.1f s' %
+                (filename, nfiles, size, os.path.getsize(filename), time.time() - t0))
+
+    return nfiles, size, skipped
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+"""
+Local file checksums.
+
+All requested algorithms (adler32, md5) are calculated in a single pass over the file, reading into a reused buffer.
+The results are cached with the path, size, mtime and inode of the file as key, so that a file that is verified
+several times (e.g. before and after stage-out) is only read once as long as it is not modified.
+"""
+
+import hashlib
+import io
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+
+try:
+    _buffer = buffer  # Python 2: zlib.adler32() does not accept memoryview objects
+except NameError:
+    _buffer = None  # Python 3
+
+import logging
+logger = logging.getLogger(__name__)
+
+BLOCKSIZE = 16 * 1024 * 1024  # read buffer size, 16 MB
+CACHE_SIZE = 1000  # maximum number of cached files
+THREADS = 4  # default number of threads for calculating checksums of several files
+
+ALGORITHMS = {'adler32': 'adler32', 'adler': 'adler32', 'ad32': 'adler32', 'ad': 'adler32',
+              'md5': 'md5', 'md5sum': 'md5', 'md': 'md5'}
+
+_lock = threading.Lock()
+_cache = OrderedDict()  # (path, size, mtime, inode) -> {algorithm: checksum}
+
+
+def get_algorithm(algorithm):
+    """
+    Return the standard name of the given checksum algorithm.
+
+    :param algorithm: algorithm name, e.g. ad32 or md5sum (string).
+    :return: 'adler32' or 'md5' (None for unknown algorithms).
+    """
+
+    return ALGORITHMS.get(algorithm)
+
+
+def _get_key(path):
+    """
+    Return the cache key for the given file.
+
+    :param path: file path (string).
+    :raise: OSError if the file does not exist.
+    :return: tuple.
+    """
+
+    st = os.stat(path)
+    return os.path.abspath(path), st.st_size, st.st_mtime, st.st_ino
+
+
+def _read_checksums(path, algorithms, blocksize=BLOCKSIZE):
+    """
+    Calculate the given checksums in a single pass over the file.
+
+    :param path: file path (string).
+    :param algorithms: set of standard algorithm names.
+    :param blocksize: read buffer size (int).
+    :return: dictionary {algorithm: checksum}.
+    """
+
+    asum = 1 if 'adler32' in algorithms else None  # default adler32 starting value
+    md5 = hashlib.md5() if 'md5' in algorithms else None
+
+    buf = bytearray(blocksize)
+    view = memoryview(buf)
+    with io.open(path, mode='rb', buffering=0) as fp:
+        while True:
+            n = fp.readinto(buf)
+            if not n:
+                break
+            data = _buffer(buf, 0, n) if _buffer else view[:n]
+            if asum is not None:
+                asum = zlib.adler32(data, asum)
+            if md5:
+                md5.update(data)
+
+    checksums = {}
+    if asum is not None:
+        checksums['adler32'] = "{0:08x}".format(asum & 0xffffffff)  # convert to hex
+    if md5:
+        checksums['md5'] = md5.hexdigest()
+
+    return checksums
+
+
+def get_checksums(path, algorithms=('adler32',)):
+    """
+    Return the checksums of the given file, using cached values for unmodified files.
+
+    :param path: file path (string).
+    :param algorithms: list of algorithm names (see ALGORITHMS).
+    :raise: OSError/IOError if the file cannot be read, ValueError for unknown algorithms.
+    :return: dictionary {standard algorithm name: checksum}.
+    """
+
+    _algorithms = set()
+    for algorithm in algorithms:
+        if not get_algorithm(algorithm):
+            raise ValueError('unknown checksum algorithm: %s' % algorithm)
+        _algorithms.add(get_algorithm(algorithm))
+
+    key = _get_key(path)
+    with _lock:
+        checksums = dict(_cache.get(key, {}))
+    missing = _algorithms - set(checksums)
+    if not missing:
+        logger.debug('using cached checksum(s) for %s' % path)
+        return dict((algorithm, checksums[algorithm]) for algorithm in _algorithms)
+
+    checksums.update(_read_checksums(path, missing))
+
+    # only cache the result if the file was not modified in the meantime
+    if _get_key(path) == key:
+        with _lock:
+            _cache.pop(key, None)
+            _cache[key] = checksums
+            while len(_cache) > CACHE_SIZE:
+                _cache.popitem(last=False)
+
+    return dict((algorithm, checksums[algorithm]) for algorithm in _algorithms)
+
+
+def get_checksum(path, algorithm='adler32'):
+    """
+    Return the checksum of the given file.
+
+    :param path: file path (string).
+    :param algorithm: algorithm name (string).
+    :raise: OSError/IOError if the file cannot be read, ValueError for unknown algorithms.
+    :return: checksum (string).
+    """
+
+    return get_checksums(path, [algorithm])[get_algorithm(algorithm)]
+
+
+def get_checksums_in_parallel(paths, algorithm='adler32', nthreads=THREADS):
+    """
+    Return the checksums of several files, calculated in parallel (zlib and hashlib release the GIL).
+
+    :param paths: list of file paths.
+    :param algorithm: algorithm name (string).
+    :param nthreads: maximum number of threads (int).
+    :raise: OSError/IOError if a file cannot be read, ValueError for unknown algorithms.
+    :return: list of checksums (same order as paths).
+    """
+
+    nthreads = min(nthreads, len(paths))
+    if nthreads <= 1:
+        return [get_checksum(path, algorithm=algorithm) for path in paths]
+
+    pool = ThreadPool(nthreads)
+    try:
+        results = [pool.apply_async(get_checksum, (path, algorithm)) for path in paths]
+        return [result.get() for result in results]
+    finally:
+        pool.close()
+        pool.join()
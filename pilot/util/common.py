@@ -17,18 +17,19 @@ import logging
 logger = logging.getLogger(__name__)
 
 
-def should_abort(args, limit=30, label=''):
+def should_abort(args, limit=30, label='', timeout=1):
     """
     Abort in case graceful_stop has been set, and less than 30 s has passed since MAXTIME was reached (if set).
 
     :param args: pilot arguments object.
     :param limit: optional time limit (int).
     :param label: optional label prepending log messages (string).
+    :param timeout: time to wait for graceful_stop (int). Loops that block on queues use 0.
     :return: True if graceful_stop has been set (and less than optional time limit has passed since maxtime) or False
     """
 
     abort = False
-    if args.graceful_stop.wait(1) or args.graceful_stop.is_set():  # 'or' added for 2.6 compatibility reasons
+    if args.graceful_stop.wait(timeout) or args.graceful_stop.is_set():  # 'or' added for 2.6 compatibility reasons
         if os.environ.get('REACHED_MAXTIME', None) and limit:
             time_since = get_time_since('0', PILOT_KILL_SIGNAL, args)
             if time_since < limit:
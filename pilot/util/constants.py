@@ -38,10 +38,14 @@ PILOT_PRE_SETUP = 'PILOT_PRE_SETUP'
 PILOT_POST_SETUP = 'PILOT_POST_SETUP'
 PILOT_PRE_STAGEIN = 'PILOT_PRE_STAGEIN'
 PILOT_POST_STAGEIN = 'PILOT_POST_STAGEIN'
+PILOT_PRE_PAYLOAD_PREPARATION = 'PILOT_PRE_PAYLOAD_PREPARATION'  # payload preparation during stage-in
+PILOT_POST_PAYLOAD_PREPARATION = 'PILOT_POST_PAYLOAD_PREPARATION'
 PILOT_PRE_PAYLOAD = 'PILOT_PRE_PAYLOAD'
 PILOT_POST_PAYLOAD = 'PILOT_POST_PAYLOAD'
 PILOT_PRE_STAGEOUT = 'PILOT_PRE_STAGEOUT'
 PILOT_POST_STAGEOUT = 'PILOT_POST_STAGEOUT'
+PILOT_PRE_LOG_TAR = 'PILOT_PRE_LOG_TAR'
+PILOT_POST_LOG_TAR = 'PILOT_POST_LOG_TAR'
 PILOT_PRE_FINAL_UPDATE = 'PILOT_PRE_FINAL_UPDATE'
 PILOT_POST_FINAL_UPDATE = 'PILOT_POST_FINAL_UPDATE'
 PILOT_END_TIME = 'PILOT_END_TIME'
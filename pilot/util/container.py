@@ -11,6 +11,8 @@ import subprocess
 from os import environ, getcwd, setpgrp  #, getpgid  #setsid
 from sys import version_info
 
+from pilot.common.pluginregistry import get_user_module
+
 import logging
 logger = logging.getLogger(__name__)
 
@@ -59,7 +61,7 @@ def execute(executable, **kwargs):  # noqa: C901
     # Note: the container.wrapper() function must at least be declared
     if usecontainer:
         user = environ.get('PILOT_USER', 'generic').lower()  # TODO: replace with singleton
-        container = __import__('pilot.user.%s.container' % user, globals(), locals(), [user], 0)  # Python 2/3
+        container = get_user_module('container', user)
         if container:
             # should a container really be used?
             do_use_container = job.usecontainer if job else container.do_use_container(**kwargs)
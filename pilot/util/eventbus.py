@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+"""
+Pilot-wide event bus.
+
+Threads that need to react to changes in the pilot queues (or to kill signals) wait on a single condition variable
+instead of polling. Any change is announced with notify() (put_in_queue() does this for all queue transfers), which
+wakes up all waiting threads so that they can re-evaluate what they are waiting for.
+"""
+
+import threading
+import time
+
+try:
+    import Queue as queue  # noqa: N813
+except Exception:
+    import queue  # Python 3
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class EventBus(object):
+    """
+    Condition variable with deadline-based waiting on arbitrary predicates.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._generation = 0  # number of notifications so far
+
+    def notify(self):
+        """
+        Announce a change to all waiting threads.
+
+        :return:
+        """
+
+        with self._condition:
+            self._generation += 1
+            self._condition.notify_all()
+
+    def wait(self, predicate=None, timeout=None):
+        """
+        Wait until the predicate is true or until the timeout has passed.
+        The predicate is evaluated while holding the internal lock, initially and after each notification, so it
+        should be fast and must not block. Without a predicate, the function waits for the next notification.
+
+        :param predicate: optional function without arguments.
+        :param timeout: optional maximum waiting time in seconds (float). None means wait forever.
+        :return: the last value of the predicate (True/False when waiting for a notification).
+        """
+
+        deadline = None if timeout is None else time.time() + timeout
+        with self._condition:
+            generation = self._generation
+            while True:
+                if predicate:
+                    result = predicate()
+                    if result:
+                        return result
+                elif self._generation != generation:
+                    return True
+
+                if deadline is None:
+                    self._condition.wait()
+                else:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        return result if predicate else False
+                    self._condition.wait(remaining)
+
+    def get(self, queues, timeout=None):
+        """
+        Get an object from the first non-empty queue among the given queues.
+        Unlike queue.get(), this waits on several queues at the same time and returns as soon as an object was put in
+        any of them (with put_in_queue()).
+
+        :param queues: list of queue objects.
+        :param timeout: optional maximum waiting time in seconds (float).
+        :return: index of the queue in the list (int), object (None, None if the timeout passed).
+        """
+
+        found = []
+
+        def _get():
+            for index, _queue in enumerate(queues):
+                try:
+                    found.append((index, _queue.get(block=False)))
+                except queue.Empty:
+                    continue
+                return True
+            return False
+
+        if self.wait(_get, timeout=timeout):
+            return found[0]
+
+        return None, None
+
+
+# shared by all pilot threads
+bus = EventBus()
@@ -8,21 +8,19 @@
 # - Paul Nilsson, paul.nilsson@cern.ch, 2017-2018
 
 import collections
-import hashlib
-import io
 import os
 import re
-import tarfile
 import time
 import uuid
 from json import load
 from json import dump as dumpjson
 from shutil import copy2, rmtree
 import sys
-from zlib import adler32
 
 from pilot.common.exception import ConversionFailure, FileHandlingFailure, MKDirFailure, NoSuchFile, \
     NotImplemented
+from pilot.util.archive import create_archive
+from pilot.util.checksum import get_algorithm, get_checksum
 from pilot.util.config import config
 from pilot.util.mpi import get_ranks_info
 from .container import execute
@@ -465,32 +463,25 @@ def tar_files(wkdir, excludedfiles, logfile_name, attempt=0):
 
     to_pack = []
     pack_start = time.time()
-    for path, subdir, files in os.walk(wkdir):
-        for file in files:
-            if file not in excludedfiles:
-                rel_dir = os.path.relpath(path, wkdir)
-                file_rel_path = os.path.join(rel_dir, file)
-                file_path = os.path.join(path, file)
-                to_pack.append((file_path, file_rel_path))
-    if to_pack:
-        try:
-            logfile_name = os.path.join(wkdir, logfile_name)
-            log_pack = tarfile.open(logfile_name, 'w:gz')
-            for f in to_pack:
-                log_pack.add(f[0], arcname=f[1])
-            log_pack.close()
-        except IOError:
-            if attempt == 0:
-                safe_delay = 15
-                logger.warning('i/o error - will retry in {0} seconds'.format(safe_delay))
-                time.sleep(safe_delay)
-                tar_files(wkdir, excludedfiles, logfile_name, attempt=1)
-            else:
-                logger.warning("continues i/o errors during packing of logs - job will fail")
-                return 1
+    logfile_path = os.path.join(wkdir, logfile_name)
+    try:
+        # only files are excluded by name and the archive only contains files, as before
+        nfiles, size, skipped = create_archive(logfile_path, wkdir, arcname='.', added=to_pack, directories=False,
+                                               exclude=lambda path: os.path.basename(path) in excludedfiles and not os.path.isdir(path))
+    except IOError:
+        if attempt == 0:
+            safe_delay = 15
+            logger.warning('i/o error - will retry in {0} seconds'.format(safe_delay))
+            time.sleep(safe_delay)
+            return tar_files(wkdir, excludedfiles, logfile_name, attempt=1)
+        else:
+            logger.warning("continues i/o errors during packing of logs - job will fail")
+            return 1
 
+    if not to_pack:
+        remove(logfile_path)
     for f in to_pack:
-        remove(f[0])
+        remove(f)
 
     remove_empty_directories(wkdir)
     pack_time = time.time() - pack_start
@@ -707,7 +698,7 @@ def _define_tabledict_keys(header, fields, separator):
 
 def calculate_checksum(filename, algorithm='adler32'):
     """
-    Calculate the checksum value for the given file.
+    Calculate the checksum value for the given file (cached as long as the file is not modified).
     The default algorithm is adler32. Md5 is also be supported.
     Valid algorithms are 1) adler32/adler/ad32/ad, 2) md5/md5sum/md.
 
@@ -720,15 +711,13 @@ def calculate_checksum(filename, algorithm='adler32'):
     if not os.path.exists(filename):
         raise FileHandlingFailure('file does not exist: %s' % filename)
 
-    if algorithm == 'adler32' or algorithm == 'adler' or algorithm == 'ad' or algorithm == 'ad32':
-        return calculate_adler32_checksum(filename)
-    elif algorithm == 'md5' or algorithm == 'md5sum' or algorithm == 'md':
-        return calculate_md5_checksum(filename)
-    else:
+    if not get_algorithm(algorithm):
         msg = 'unknown checksum algorithm: %s' % algorithm
         logger.warning(msg)
         raise NotImplemented(msg)
 
+    return get_checksum(filename, algorithm=algorithm)
+
 
 def calculate_adler32_checksum(filename):
     """
@@ -739,20 +728,7 @@ def calculate_adler32_checksum(filename):
     :return: checksum value (string).
     """
 
-    asum = 1  # default adler32 starting value
-    blocksize = 64 * 1024 * 1024  # read buffer size, 64 Mb
-
-    with open(filename, 'rb') as f:
-        while True:
-            data = f.read(blocksize)
-            if not data:
-                break
-            asum = adler32(data, asum)
-            if asum < 0:
-                asum += 2**32
-
-    # convert to hex
-    return "{0:08x}".format(asum)
+    return get_checksum(filename, algorithm='adler32')
 
 
 def calculate_md5_checksum(filename):
@@ -764,14 +740,7 @@ def calculate_md5_checksum(filename):
     :return: checksum value (string).
     """
 
-    length = io.DEFAULT_BUFFER_SIZE
-    md5 = hashlib.md5()
-
-    with io.open(filename, mode="rb") as fd:
-        for chunk in iter(lambda: fd.read(length), b''):
-            md5.update(chunk)
-
-    return md5.hexdigest()
+    return get_checksum(filename, algorithm='md5')
 
 
 def get_checksum_value(checksum):
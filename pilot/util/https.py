@@ -8,8 +8,10 @@
 # - Daniel Drizhuk, d.drizhuk@gmail.com, 2017
 # - Mario Lassnig, mario.lassnig@cern.ch, 2017
 # - Paul Nilsson, paul.nilsson@cern.ch, 2017
+# - agent, agent@local, 2026
 
 import collections
+import errno
 import subprocess  # Python 2/3
 try:
     import commands  # Python 2
@@ -18,24 +20,231 @@ except Exception:
 import json
 import os
 import platform
+import select
+import socket
 import ssl
 import sys
+import threading
+import zlib
 try:
     import urllib.request  # Python 3
     import urllib.error  # Python 3
     import urllib.parse  # Python 3
 except Exception:
     import urllib  # Python 2
-    import urllib2  # Python 2
+try:
+    import http.client as httplib  # Python 3
+    from urllib.parse import urlsplit, urlencode  # Python 3
+except Exception:
+    import httplib  # Python 2
+    from urlparse import urlsplit  # Python 2
+    from urllib import urlencode  # Python 2
 import pipes
 
 from .filehandling import write_file
-from .auxiliary import is_python3
 
 import logging
 logger = logging.getLogger(__name__)
 
 _ctx = collections.namedtuple('_ctx', 'ssl_context user_agent capath cacert')
+_session = None  # HTTPSSession object, created by https_setup() when an SSL context is available
+
+
+class RequestSentError(Exception):
+    """
+    The connection failed after the request was sent, i.e. the server may have processed the request.
+    Such a request must not be sent again (e.g. with curl), since it could e.g. update a job twice.
+    """
+
+    pass
+
+
+def is_stale_connection(e):
+    """
+    Was the error caused by a reused connection that the server had closed or reset?
+    Only meaningful for errors raised while the request was written.
+
+    :param e: exception.
+    :return: Boolean.
+    """
+
+    if isinstance(e, socket.timeout):
+        return False
+
+    return isinstance(e, socket.error) and getattr(e, 'errno', None) in (errno.ECONNRESET, errno.EPIPE, errno.ECONNABORTED)
+
+
+def is_connection_dropped(connection):
+    """
+    Has the server closed an idle keep-alive connection?
+    An idle connection has nothing to read, unless the server closed it (end of file or SSL close notification).
+
+    :param connection: connection object.
+    :return: Boolean.
+    """
+
+    sock = getattr(connection, 'sock', None)
+    if sock is None:
+        return True
+
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+    except (select.error, socket.error, ValueError):
+        return True
+
+    return bool(readable)
+
+
+class HTTPSSession(object):
+    """
+    Keep-alive HTTPS client that reuses connections to the same host.
+    The certificates selected by `https_setup` are used, with the X509 proxy as client certificate and key (as for curl).
+    Idle connections are kept in a small pool per (host, port) so that consecutive server calls (getJob, updateJob,
+    heartbeats) skip the TCP and TLS handshakes. The session is thread-safe; each request uses its own connection.
+    """
+
+    def __init__(self, context, user_agent, timeout=120, maxsize=4):
+        """
+        :param context: `ssl.SSLContext` object.
+        :param user_agent: User-Agent header value (string).
+        :param timeout: socket time-out in seconds (int).
+        :param maxsize: maximum number of idle connections kept per host (int).
+        """
+
+        self.context = context
+        self.user_agent = user_agent
+        self.timeout = timeout
+        self.maxsize = maxsize
+        self._pool = {}  # (host, port) -> list of idle connections
+        self._lock = threading.Lock()
+
+    def _get_connection(self, host, port):
+        """
+        Return an idle connection from the pool, or a new one.
+        Idle connections that were closed by the server are discarded.
+
+        :param host: host name (string).
+        :param port: port number (int).
+        :return: connection object, reused (Boolean).
+        """
+
+        with self._lock:
+            idle = self._pool.get((host, port), [])
+            while idle:
+                connection = idle.pop()
+                if not is_connection_dropped(connection):
+                    return connection, True
+                logger.debug('idle connection to %s:%s was closed by server' % (host, port))
+                connection.close()
+
+        return httplib.HTTPSConnection(host, port, timeout=self.timeout, context=self.context), False
+
+    def _release_connection(self, host, port, connection):
+        """
+        Return a connection to the pool (or close it if the pool is full).
+
+        :param host: host name (string).
+        :param port: port number (int).
+        :param connection: connection object.
+        :return:
+        """
+
+        with self._lock:
+            idle = self._pool.setdefault((host, port), [])
+            if len(idle) < self.maxsize:
+                idle.append(connection)
+                return
+
+        connection.close()
+
+    def close(self):
+        """
+        Close all idle connections.
+
+        :return:
+        """
+
+        with self._lock:
+            for idle in self._pool.values():
+                for connection in idle:
+                    connection.close()
+            self._pool = {}
+
+    def post(self, url, data=None, plain=False, body=None, content_type='application/x-www-form-urlencoded'):
+        """
+        Send the data as URL encoded form data to the given URL (or the given body with the given content type).
+        Idle connections that were closed by the server are not reused. The request is only sent again (once, on a new
+        connection) if writing it to a reused connection failed because the server had closed or reset the connection.
+        Once the request has been written it is never sent again, e.g. after a time-out or a connection closed without
+        response, since the server might have processed it (server calls such as updateJob are not idempotent).
+
+        :param url: URL of the resource (string).
+        :param data: data to send (dict).
+        :param plain: if True, do not send the ``Accept: application/json`` header (Boolean).
+        :param body: optional request body, sent instead of data (string).
+        :param content_type: content type of the body (string).
+        :raise: `RequestSentError` if the connection failed after the request was sent, otherwise
+                `httplib.HTTPException`, `socket.error` or `ssl.SSLError` in case of connection problems.
+        :return: HTTP status (int), response body (string).
+        """
+
+        parts = urlsplit(url)
+        host = parts.hostname
+        port = parts.port or 443
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+
+        if body is None:
+            body = urlencode(data) if data else ''
+        headers = {'User-Agent': self.user_agent,
+                   'Content-Type': content_type,
+                   'Accept-Encoding': 'gzip',
+                   'Connection': 'keep-alive'}
+        if not plain:
+            headers['Accept'] = 'application/json'
+
+        for attempt in range(2):
+            connection, reused = self._get_connection(host, port)
+            sent = False
+            try:
+                connection.request('POST', path, body, headers)
+                sent = True
+                response = connection.getresponse()
+                content = response.read()
+            except (httplib.HTTPException, socket.error, ssl.SSLError) as e:
+                connection.close()
+                if reused and attempt == 0 and not sent and is_stale_connection(e):
+                    logger.debug('connection to %s:%s was closed by server (%s) -- reconnecting' % (host, port, e))
+                    continue
+                if sent:
+                    raise RequestSentError('connection to %s:%s failed after the request was sent: %s' % (host, port, e))
+                raise
+
+            if response.getheader('Connection', '').lower() == 'close':
+                connection.close()
+            else:
+                self._release_connection(host, port, connection)
+
+            if response.getheader('Content-Encoding', '').lower() == 'gzip':
+                content = zlib.decompress(content, 16 + zlib.MAX_WBITS)
+
+            try:
+                content = content.decode('utf-8')  # Python 3
+            except (AttributeError, UnicodeDecodeError):
+                pass
+
+            return response.status, content
+
+
+def get_session():
+    """
+    Return the HTTPS session object (None if SSL contexts are not available and curl should be used).
+
+    :return: `HTTPSSession` object or None.
+    """
+
+    return _session
 
 
 def _tester(func, *args):
@@ -119,10 +328,13 @@ def https_setup(args, version):
     1. Selects the certificate paths
     2. Sets up :mailheader:`User-Agent`
     3. Tries to create `ssl.SSLContext` for future use (falls back to :command:`curl` if fails)
+    4. Creates the keep-alive `HTTPSSession` used by `request`
 
     :param args: arguments, parsed by `argparse`
     :param str version: pilot version string (for :mailheader:`User-Agent`)
     """
+
+    global _session
     _ctx.user_agent = 'pilot/%s (Python %s; %s %s)' % (version,
                                                        sys.version.split()[0],
                                                        platform.system(),
@@ -139,16 +351,23 @@ def https_setup(args, version):
         try:
             _ctx.ssl_context = ssl.create_default_context(capath=_ctx.capath,
                                                           cafile=_ctx.cacert)
+            if _ctx.cacert:
+                _ctx.ssl_context.load_cert_chain(certfile=_ctx.cacert, keyfile=_ctx.cacert)
         except Exception as e:
             logger.warn('SSL communication is impossible due to SSL error: %s -- falling back to curl' % str(e))
             _ctx.ssl_context = None
 
+    if _session:
+        _session.close()
+    _session = HTTPSSession(_ctx.ssl_context, _ctx.user_agent) if _ctx.ssl_context else None
+
 
-def request(url, data=None, plain=False, secure=True):  # noqa: C901
+def request(url, data=None, plain=False, secure=True):
     """
     This function sends a request using HTTPS.
     Sends :mailheader:`User-Agent` and certificates previously being set up by `https_setup`.
-    If `ssl.SSLContext` is available, uses `urllib2` as a request processor. Otherwise uses :command:`curl`.
+    If `ssl.SSLContext` is available, the request is sent through the keep-alive `HTTPSSession`. Otherwise (or if the
+    connection fails before the request was sent) uses :command:`curl`.
 
     If ``data`` is provided, encodes it as a URL form data and sends it to the server.
 
@@ -173,10 +392,59 @@ def request(url, data=None, plain=False, secure=True):  # noqa: C901
         - `None` -- if something went wrong
     """
 
-    _ctx.ssl_context = None  # certificates are not available on the grid, use curl
-
     logger.debug('server update dictionary = \n%s' % str(data))
 
+    session = get_session() if secure else None
+    if session:
+        try:
+            status, output = session.post(url, data=data, plain=plain)
+        except RequestSentError as e:
+            # the server may have processed the request, do not send it again
+            logger.warning('https request failed: %s' % e)
+            return None
+        except Exception as e:
+            logger.warning('https request failed: %s -- falling back to curl' % e)
+        else:
+            if status != 200:
+                logger.warn('server error (%s): %s' % (status, output))
+                return None
+            return parse_output(output, plain)
+
+    return curl_request(url, data=data, plain=plain)
+
+
+def parse_output(output, plain):
+    """
+    Convert the server response.
+
+    :param output: response body (string).
+    :param plain: if true, return the response as plain text.
+    :return: dict (or string if ``plain`` is True), or None if the JSON could not be parsed.
+    """
+
+    if plain:
+        return output
+
+    try:
+        ret = json.loads(output)
+    except Exception as e:
+        logger.warning('json.loads() failed to parse output=%s: %s' % (output, e))
+        return None
+    else:
+        return ret
+
+
+def curl_request(url, data=None, plain=False):
+    """
+    Send the request using :command:`curl` (fall-back when no SSL context is available).
+    The data is passed to curl via a temporary config file in PILOT_HOME.
+
+    :param string url: the URL of the resource
+    :param dict data: data to send
+    :param boolean plain: if true, treats the response as a plain text.
+    :return: dict (or string if ``plain`` is True), or None if something went wrong.
+    """
+
     strdata = ""
     for key in data:
         try:
@@ -198,68 +466,26 @@ def request(url, data=None, plain=False, secure=True):  # noqa: C901
     else:
         dat = '--config %s %s' % (tmpname, url)
 
-    if _ctx.ssl_context is None and secure:
-        req = 'curl -sS --compressed --connect-timeout %s --max-time %s '\
-              '--capath %s --cert %s --cacert %s --key %s '\
-              '-H %s %s %s' % (100, 120,
-                               pipes.quote(_ctx.capath or ''), pipes.quote(_ctx.cacert or ''),
-                               pipes.quote(_ctx.cacert or ''), pipes.quote(_ctx.cacert or ''),
-                               pipes.quote('User-Agent: %s' % _ctx.user_agent),
-                               "-H " + pipes.quote('Accept: application/json') if not plain else '',
-                               dat)
-        logger.info('request: %s' % req)
-        try:
-            try:
-                status, output = subprocess.getstatusoutput(req)  # Python 3
-            except Exception:
-                status, output = commands.getstatusoutput(req)  # Python 2
-        except Exception as e:
-            logger.warning('exception: %s' % e)
-            return None
-        else:
-            if status != 0:
-                logger.warn('request failed (%s): %s' % (status, output))
-                return None
-
-        if plain:
-            return output
-        else:
-            try:
-                ret = json.loads(output)
-            except Exception as e:
-                logger.warning('json.loads() failed to parse output=%s: %s' % (output, e))
-                return None
-            else:
-                return ret
-        # return output if plain else json.loads(output)
-    else:
+    req = 'curl -sS --compressed --connect-timeout %s --max-time %s '\
+          '--capath %s --cert %s --cacert %s --key %s '\
+          '-H %s %s %s' % (100, 120,
+                           pipes.quote(_ctx.capath or ''), pipes.quote(_ctx.cacert or ''),
+                           pipes.quote(_ctx.cacert or ''), pipes.quote(_ctx.cacert or ''),
+                           pipes.quote('User-Agent: %s' % _ctx.user_agent),
+                           "-H " + pipes.quote('Accept: application/json') if not plain else '',
+                           dat)
+    logger.info('request: %s' % req)
+    try:
         try:
-            req = urllib.request.Request(url, urllib.parse.urlencode(data))  # Python 3
+            status, output = subprocess.getstatusoutput(req)  # Python 3
         except Exception:
-            req = urllib2.Request(url, urllib.urlencode(data))  # Python 2
-        if not plain:
-            req.add_header('Accept', 'application/json')
-        if secure:
-            req.add_header('User-Agent', _ctx.user_agent)
-        context = _ctx.ssl_context if secure else None
-
-        if is_python3():  # Python 3
-            try:
-                output = urllib.request.urlopen(req, context=context)
-            except urllib.error.HTTPError as e:
-                logger.warn('server error (%s): %s' % (e.code, e.read()))
-                return None
-            except urllib.error.URLError as e:
-                logger.warn('connection error: %s' % e.reason)
-                return None
-        else:  # Python 2
-            try:
-                output = urllib2.urlopen(req, context=context)
-            except urllib2.HTTPError as e:
-                logger.warn('server error (%s): %s' % (e.code, e.read()))
-                return None
-            except urllib2.URLError as e:
-                logger.warn('connection error: %s' % e.reason)
-                return None
+            status, output = commands.getstatusoutput(req)  # Python 2
+    except Exception as e:
+        logger.warning('exception: %s' % e)
+        return None
+    else:
+        if status != 0:
+            logger.warn('request failed (%s): %s' % (status, output))
+            return None
 
-        return output.read() if plain else json.load(output)
+    return parse_output(output, plain)
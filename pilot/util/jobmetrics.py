@@ -11,6 +11,7 @@
 
 from os import environ
 
+from pilot.common.pluginregistry import get_user_module
 from pilot.util.auxiliary import get_logger
 
 import logging
@@ -54,7 +55,7 @@ def get_job_metrics(job):
 
     user = environ.get('PILOT_USER', 'generic').lower()  # TODO: replace with singleton
     try:
-        job_metrics_module = __import__('pilot.user.%s.jobmetrics' % user, globals(), locals(), [user], 0)  # Python 2/3
+        job_metrics_module = get_user_module('jobmetrics', user)
     except AttributeError as e:
         job_metrics = None
         log.warning('function not implemented in jobmetrics module: %s' % e)
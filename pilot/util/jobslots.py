@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+"""
+Job slots of a multi-slot pilot.
+
+A multi-slot pilot runs several (single-core) jobs at the same time, e.g. eight jobs on an eight-core slot, instead
+of one job per pilot. A `JobSlots` object (args.slots) keeps track of the jobs in flight; the job retrieval downloads
+a new job as long as there is a free slot. A slot corresponds to a core: a multi-core job occupies one slot per core,
+and a multi-slot pilot asks for single-core jobs (unless a resource type is given). Each job has its own work
+directory, monitoring time state and log file (see add_job_log_handler()), while node-wide resource checks (e.g. the
+local disk space) are shared by all slots (see `SharedCheck`).
+
+With prefetching, the slot of a job is already considered free when its payload has finished and the stage-out has
+started, i.e. the next job is downloaded, validated and staged in while the output and log files of the previous job
+are transferred (also in single-slot mode).
+"""
+
+import logging
+import os
+import threading
+import time
+
+from pilot.util.config import config
+
+logger = logging.getLogger(__name__)
+
+
+class JobSlots(object):
+    """
+    Bookkeeping of the jobs running in the slots of the pilot.
+    """
+
+    def __init__(self, nslots=1, prefetch=False):
+        """
+        :param nslots: number of job slots (int).
+        :param prefetch: free the slot of a job once its stage-out has started (Boolean).
+        """
+
+        self.nslots = max(1, nslots)
+        self.prefetch = prefetch
+        self._jobids = []
+        self._cores = {}  # job id: number of occupied slots
+        self._stageout = []  # jobs in stage-out after a successful payload
+        self._condition = threading.Condition()
+
+    def acquire(self, jobid, ncores=1):
+        """
+        Occupy the slots of the given job, one per core (at most all slots).
+
+        :param jobid: PanDA job id (string).
+        :param ncores: number of cores of the job (int).
+        :return:
+        """
+
+        try:
+            ncores = min(max(1, int(ncores)), self.nslots)
+        except (TypeError, ValueError):
+            ncores = 1
+
+        with self._condition:
+            self._jobids.append(jobid)
+            self._cores[jobid] = ncores
+            logger.info('job %s is running in %d slot(s) (%d/%d slots in use)' %
+                        (jobid, ncores, self._used(), self.nslots))
+
+    def release(self, jobid):
+        """
+        Free the slot of the given job.
+
+        :param jobid: PanDA job id (string).
+        :return:
+        """
+
+        with self._condition:
+            if jobid in self._stageout:
+                self._stageout.remove(jobid)
+            if jobid in self._jobids:
+                self._jobids.remove(jobid)
+                self._cores.pop(jobid, None)
+                logger.info('job %s has released its slot(s) (%d/%d slots in use)' %
+                            (jobid, self._used(), self.nslots))
+            self._condition.notify_all()
+
+    def start_stageout(self, jobid):
+        """
+        Declare that the payload of the given job has finished and that its stage-out has started.
+        With prefetching, the slot of the job can then be used by the next job.
+
+        :param jobid: PanDA job id (string).
+        :return:
+        """
+
+        with self._condition:
+            if jobid in self._jobids and jobid not in self._stageout:
+                self._stageout.append(jobid)
+                if self.prefetch:
+                    logger.info('stage-out of job %s has started - its slot can be used by the next job' % jobid)
+            self._condition.notify_all()
+
+    def _used(self, jobids=None):
+        """
+        Number of slots occupied by the given jobs (default: all jobs). To be called with the lock held.
+
+        :param jobids: optional list of job ids.
+        :return: int.
+        """
+
+        return sum(self._cores.get(jobid, 1) for jobid in (self._jobids if jobids is None else jobids))
+
+    def has_free_slot(self):
+        """
+        Is there a free slot for another job?
+
+        :return: Boolean.
+        """
+
+        with self._condition:
+            nbusy = self._used()
+            if self.prefetch:
+                nbusy -= self._used(self._stageout)
+
+            return nbusy < self.nslots
+
+    def get_jobids(self):
+        """
+        Return the ids of the jobs occupying the slots.
+
+        :return: list of job ids.
+        """
+
+        with self._condition:
+            return list(self._jobids)
+
+    @property
+    def nbusy(self):
+        """
+        Number of occupied slots.
+
+        :return: int.
+        """
+
+        with self._condition:
+            return len(self._jobids)
+
+    def is_multislot(self):
+        """
+        Is the pilot running more than one job at the same time?
+
+        :return: Boolean.
+        """
+
+        return self.nslots > 1
+
+
+def get_number_of_slots(job_slots, corecount):
+    """
+    Return the number of job slots.
+    A positive job_slots value (--job-slots pilot option) is used as it is, 0 means that the number of slots is given
+    by the number of cores of the queue (corecount), i.e. one single-core job per core.
+
+    :param job_slots: requested number of slots (int).
+    :param corecount: number of cores of the queue (int).
+    :return: number of slots (int).
+    """
+
+    try:
+        job_slots = int(job_slots)
+    except (TypeError, ValueError):
+        logger.warning('bad number of job slots: %s (will use 1)' % job_slots)
+        return 1
+
+    if job_slots > 0:
+        return job_slots
+
+    try:
+        return max(1, int(corecount))
+    except (TypeError, ValueError):
+        return 1
+
+
+class SharedCheck(object):
+    """
+    A node-wide resource check shared by all job slots.
+    The check function is executed at most once per period; the result is reused by the other slots in the meantime.
+    """
+
+    def __init__(self, function, period=60):
+        """
+        :param function: check function without arguments returning exit code (int), diagnostics (string).
+        :param period: time during which the result is reused in seconds (int).
+        """
+
+        self.function = function
+        self.period = period
+        self._lock = threading.Lock()
+        self._result = None
+        self._time = 0
+
+    def __call__(self):
+        """
+        Return the result of the check, execute it if the previous result is too old.
+
+        :return: exit code (int), diagnostics (string).
+        """
+
+        with self._lock:
+            if self._result is None or time.time() - self._time > self.period:
+                self._result = self.function()
+                self._time = time.time()
+
+            return self._result
+
+
+class JobLogFilter(logging.Filter):
+    """
+    Select the log records of a given job (see pilot.util.auxiliary.get_logger()).
+    """
+
+    def __init__(self, jobid):
+        """
+        :param jobid: PanDA job id (string).
+        """
+
+        super(JobLogFilter, self).__init__()
+        self.suffix = '.%s' % jobid
+
+    def filter(self, record):
+        return record.name.endswith(self.suffix)
+
+
+_job_handlers = {}  # job id: log handler
+
+
+def add_job_log_handler(job):
+    """
+    Write the log messages of the given job to its own log file in the job work directory (the pilot log file).
+    In single-slot mode, the job work directory instead contains a link to the main pilot log.
+
+    :param job: job object.
+    :return:
+    """
+
+    path = os.path.join(job.workdir, config.Pilot.pilotlog)
+    handler = logging.FileHandler(path, mode='w')
+    handler.addFilter(JobLogFilter(job.jobid))
+    root = logging.getLogger()
+    if root.handlers:
+        handler.setFormatter(root.handlers[0].formatter)
+    handler.setLevel(root.level)
+    root.addHandler(handler)
+    _job_handlers[job.jobid] = handler
+
+
+def remove_job_log_handler(job):
+    """
+    Close the job log file of the given job.
+
+    :param job: job object.
+    :return:
+    """
+
+    handler = _job_handlers.pop(job.jobid, None)
+    if handler:
+        logging.getLogger().removeHandler(handler)
+        handler.close()
@@ -8,13 +8,15 @@
 # - Paul Nilsson, paul.nilsson@cern.ch, 2018-2019
 
 from pilot.common.errorcodes import ErrorCodes
+from pilot.common.pluginregistry import get_user_module
 from pilot.util.auxiliary import whoami, get_logger, set_pilot_state
 from pilot.util.config import config
 from pilot.util.container import execute
-from pilot.util.filehandling import remove_files, find_latest_modified_file, verify_file_list
+from pilot.util.filehandling import remove_files
 from pilot.util.parameters import convert_to_int
 from pilot.util.processes import kill_processes
 from pilot.util.timing import time_stamp
+from pilot.util.workdirusage import scan_directory
 
 import os
 import time
@@ -23,6 +25,8 @@ logger = logging.getLogger(__name__)
 
 errors = ErrorCodes()
 
+_scanners = {}  # workdir -> LastTouchScanner
+
 
 def looping_job(job, mt):
     """
@@ -88,43 +92,187 @@ def get_time_for_last_touch(job, mt, looping_limit):
     log = get_logger(job.jobid)
 
     pilot_user = os.environ.get('PILOT_USER', 'generic').lower()
-    loopingjob_definitions = __import__('pilot.user.%s.loopingjob_definitions' % pilot_user,
-                                        globals(), locals(), [pilot_user], 0)  # Python 2/3
-
-    # locate all files that were modified the last N minutes
-    cmd = "find %s -mmin -%d" % (job.workdir, int(looping_limit / 60))
-    exit_code, stdout, stderr = execute(cmd)
-    if exit_code == 0:
-        if stdout != "":
-            files = stdout.split("\n")  # find might add a \n even for single entries
-
-            # remove unwanted list items (*.py, *.pyc, workdir, ...)
-            files = loopingjob_definitions.remove_unwanted_files(job.workdir, files)
-            if files:
-                log.info('found %d files that were recently updated' % len(files))
-
-                updated_files = verify_file_list(files)
-
-                # now get the mod times for these file, and identify the most recently update file
-                latest_modified_file, mtime = find_latest_modified_file(updated_files)
-                if latest_modified_file:
-                    log.info("file %s is the most recently updated file (at time=%d)" % (latest_modified_file, mtime))
-                else:
-                    log.warning('looping job algorithm failed to identify latest updated file')
-                    return mt.ct_looping_last_touched
-
-                # store the time of the last file modification
-                mt.update('ct_looping_last_touched', modtime=mtime)
-            else:
-                log.warning("found no recently updated files!")
-        else:
-            log.warning('found no recently updated files')
+    loopingjob_definitions = get_user_module('loopingjob_definitions', pilot_user)
+
+    # locate the most recently modified file, skipping unwanted files (*.py, *.pyc, workdir, ...) during the walk
+    scanner = get_last_touch_scanner(job.workdir, loopingjob_definitions.is_unwanted_file)
+    latest_modified_file, mtime = scanner.scan()
+    if latest_modified_file is None:
+        log.warning('looping job algorithm failed to identify latest updated file')
+    elif mtime < time.time() - looping_limit:
+        log.warning('found no recently updated files (latest update of %s at time=%d)' % (latest_modified_file, mtime))
     else:
-        log.warning('find command failed: %d, %s, %s' % (exit_code, stdout, stderr))
+        log.info("file %s is the most recently updated file (at time=%d)" % (latest_modified_file, mtime))
+
+        # store the time of the last file modification
+        mt.update('ct_looping_last_touched', modtime=mtime)
 
     return mt.ct_looping_last_touched
 
 
+class DirRecord(object):
+    """
+    Cached listing of a directory (names that passed the exclusion check).
+    """
+
+    __slots__ = ('mtime', 'files', 'subdirs')
+
+    def __init__(self, mtime, files, subdirs):
+        self.mtime = mtime
+        self.files = files
+        self.subdirs = subdirs
+
+
+class LastTouchScanner(object):
+    """
+    Find the most recently modified file in a work directory.
+    Unwanted files and directories are skipped during the walk. Directories whose mtime has not changed since the
+    previous scan are not listed again (their cached file names are only re-stat'ed, since files can be updated
+    without changing the directory mtime). The number of cached names is limited; directories beyond the limit are
+    listed at every scan.
+    """
+
+    def __init__(self, workdir, is_unwanted=None, max_cached_names=100000):
+        """
+        :param workdir: work directory (string).
+        :param is_unwanted: function (workdir, path) returning True for paths that should be ignored.
+        :param max_cached_names: maximum number of cached file and directory names (int).
+        """
+
+        self.workdir = workdir
+        self.is_unwanted = is_unwanted or (lambda workdir, path: False)
+        self.max_cached_names = max_cached_names
+        self._records = {}  # path -> DirRecord
+        self._ncached = 0
+
+    def _cache(self, path, record):
+        """
+        Store (or drop) the directory record, respecting the cache size limit.
+
+        :param path: directory path (string).
+        :param record: DirRecord object (None to drop the record).
+        :return:
+        """
+
+        old = self._records.pop(path, None)
+        if old:
+            self._ncached -= len(old.files) + len(old.subdirs)
+        if record and self._ncached + len(record.files) + len(record.subdirs) <= self.max_cached_names:
+            self._records[path] = record
+            self._ncached += len(record.files) + len(record.subdirs)
+
+    def _list(self, path, mtime, latest):
+        """
+        List a changed (or not yet cached) directory and update its record.
+
+        :param path: directory path (string).
+        :param mtime: mtime of the directory.
+        :param latest: most recently modified path and its mtime found so far (tuple).
+        :return: DirRecord object (None if the directory could not be listed), updated latest tuple.
+        """
+
+        files = []
+        subdirs = []
+        try:
+            for name, is_dir, get_stat in scan_directory(path):
+                _path = os.path.join(path, name)
+                if self.is_unwanted(self.workdir, _path):
+                    continue
+                if is_dir:
+                    subdirs.append(name)
+                    continue
+                try:
+                    _mtime = get_stat().st_mtime
+                except OSError:
+                    continue
+                files.append(name)
+                if _mtime > latest[1]:
+                    latest = (_path, _mtime)
+        except OSError as e:
+            logger.warning('failed to list %s: %s' % (path, e))
+            self._cache(path, None)
+            return None, latest
+
+        record = DirRecord(mtime, files, subdirs)
+        self._cache(path, record)
+
+        return record, latest
+
+    def _scan(self, path, seen):
+        """
+        Find the most recently modified entry below the given directory.
+
+        :param path: directory path (string).
+        :param seen: set of visited directory paths (updated).
+        :return: most recently modified path in the subtree (None if no entry was found), mtime.
+        """
+
+        try:
+            st = os.lstat(path)
+        except OSError:
+            return None, 0
+        seen.add(path)
+
+        latest = (None, 0) if path == self.workdir else (path, st.st_mtime)
+        record = self._records.get(path)
+        if record and record.mtime == st.st_mtime:
+            # same entries as during the last scan
+            for name in record.files:
+                _path = os.path.join(path, name)
+                try:
+                    mtime = os.lstat(_path).st_mtime
+                except OSError:
+                    continue
+                if mtime > latest[1]:
+                    latest = (_path, mtime)
+            subdirs = record.subdirs
+        else:
+            record, latest = self._list(path, st.st_mtime, latest)
+            subdirs = record.subdirs if record else []
+
+        for name in subdirs:
+            _latest = self._scan(os.path.join(path, name), seen)
+            if _latest[1] > latest[1]:
+                latest = _latest
+
+        return latest
+
+    def scan(self):
+        """
+        Walk the work directory.
+
+        :return: most recently modified file or directory (string, None if not found), mtime (int, None if not found).
+        """
+
+        seen = set()
+        path, mtime = self._scan(self.workdir, seen)
+
+        # forget directories that no longer exist
+        for _path in [_path for _path in self._records if _path not in seen]:
+            self._cache(_path, None)
+
+        return path, int(mtime) if path else None
+
+
+def get_last_touch_scanner(workdir, is_unwanted):
+    """
+    Return the scanner for the given work directory (kept between the looping job checks).
+    Scanners for work directories that no longer exist are removed.
+
+    :param workdir: work directory (string).
+    :param is_unwanted: function (workdir, path) returning True for paths that should be ignored.
+    :return: LastTouchScanner object.
+    """
+
+    for _workdir in [_workdir for _workdir in _scanners if not os.path.exists(_workdir)]:
+        del _scanners[_workdir]
+
+    if workdir not in _scanners:
+        _scanners[workdir] = LastTouchScanner(workdir, is_unwanted)
+
+    return _scanners[workdir]
+
+
 def kill_looping_job(job):
     """
     Kill the looping process.
@@ -87,6 +87,25 @@ def chi2(observed, expected):
     return sum((_o - _e) ** 2 / _e for _o, _e in zip(observed, expected))
 
 
+def median(data):
+    """
+    Return the median of data.
+
+    :param data: list of floats or ints.
+    :return: median value (float).
+    """
+
+    n = len(data)
+    if n < 1:
+        raise ValueError('median requires at least one data point')
+
+    data = sorted(data)
+    if n % 2:
+        return float(data[n // 2])
+
+    return (data[n // 2 - 1] + data[n // 2]) / 2.0
+
+
 def float_to_rounded_string(num, precision=3):
     """
     Convert float to a string with a desired number of digits (the precision).
@@ -10,19 +10,23 @@
 # This module contains implementations of job monitoring tasks
 
 import os
-import time
 from subprocess import PIPE
 from glob import glob
 
 from pilot.common.errorcodes import ErrorCodes
+from pilot.common.pluginregistry import get_user_module
 from pilot.util.auxiliary import get_logger
 from pilot.util.config import config
 from pilot.util.container import execute
-from pilot.util.filehandling import get_directory_size, remove_files, get_local_file_size
+from pilot.util.filehandling import remove_files, get_local_file_size
+from pilot.util.jobslots import SharedCheck
 from pilot.util.loopingjob import looping_job
 from pilot.util.math import convert_mb_to_b, human2bytes
+from pilot.util.monitoringscheduler import MonitoringScheduler
 from pilot.util.parameters import convert_to_int, get_maximum_input_sizes
 from pilot.util.processes import get_current_cpu_consumption_time, kill_processes, get_number_of_child_processes
+from pilot.util.proctree import get_process_tree
+from pilot.util.workdirusage import get_workdir_usage
 from pilot.util.workernode import get_local_disk_space, check_hz
 
 import logging
@@ -31,11 +35,47 @@ logger = logging.getLogger(__name__)
 errors = ErrorCodes()
 
 
-def job_monitor_tasks(job, mt, args):
+def get_monitoring_scheduler(mt):
     """
-    Perform the tasks for the job monitoring.
-    The function is called once a minute. Individual checks will be performed at any desired time interval (>= 1
-    minute).
+    Return a scheduler with the job monitoring tasks.
+    The scheduler is run by the job monitor once a minute. Each task is executed at its own time interval (as given
+    in the config file), in parallel with the other tasks. The checks that can kill the payload and fail the job are
+    exclusive, i.e. they are not executed at the same time.
+
+    :param mt: `MonitoringTime` object.
+    :return: `MonitoringScheduler` object.
+    """
+
+    scheduler = MonitoringScheduler(mt, nthreads=convert_to_int(config.Pilot.monitoring_threads, default=3))
+
+    # update timing info for running jobs (to avoid an update after the job has finished)
+    scheduler.register('cpu_consumption_time', verify_cpu_consumption_time, timeout=30)
+    # check how many cores the payload is using
+    scheduler.register('used_cores', verify_used_cores, timeout=30)
+    # check memory usage (optional) for jobs in running state
+    scheduler.register('memory_usage', verify_memory_usage, timeout=30, key='ct_memory', exclusive=True,
+                       period=convert_to_int(config.Pilot.memory_usage_verification_time, default=60))
+    # should the proxy be verified?
+    scheduler.register('user_proxy', verify_user_proxy, timeout=60, key='ct_proxy',
+                       period=convert_to_int(config.Pilot.proxy_verification_time, default=600))
+    # is the job looping?
+    scheduler.register('looping_job', verify_looping_job, timeout=60, key='ct_looping', exclusive=True,
+                       period=convert_to_int(config.Pilot.looping_verification_time, default=600))
+    # is the job using too much space?
+    scheduler.register('disk_usage', verify_disk_usage, timeout=60, key='ct_diskspace', exclusive=True,
+                       period=convert_to_int(config.Pilot.disk_space_verification_time, default=300))
+    # check the number of running processes
+    scheduler.register('running_processes', verify_running_processes, timeout=30, key='ct_process',
+                       period=convert_to_int(config.Pilot.process_verification_time, default=300))
+    # make sure that any utility commands are still running
+    scheduler.register('utilities', verify_utilities, timeout=30)
+
+    return scheduler
+
+
+def verify_cpu_consumption_time(job, mt, args):
+    """
+    Update the CPU consumption time of a running job.
 
     :param job: job object.
     :param mt: `MonitoringTime` object.
@@ -43,78 +83,52 @@ def job_monitor_tasks(job, mt, args):
     :return: exit code (int), diagnostics (string).
     """
 
-    exit_code = 0
-    diagnostics = ""
+    if job.state != 'running':
+        return 0, ""
 
     log = get_logger(job.jobid)
-    current_time = int(time.time())
 
-    # update timing info for running jobs (to avoid an update after the job has finished)
-    if job.state == 'running':
-        # confirm that the worker node has a proper SC_CLK_TCK (problems seen on MPPMU)
-        check_hz()
-        try:
-            cpuconsumptiontime = get_current_cpu_consumption_time(job.pid)
-        except Exception as e:
-            diagnostics = "Exception caught: %s" % e
-            log.warning(diagnostics)
-            import traceback
-            log.warning(traceback.format_exc())
-            if "Resource temporarily unavailable" in diagnostics:
-                exit_code = errors.RESOURCEUNAVAILABLE
-            elif "No such file or directory" in diagnostics:
-                exit_code = errors.STATFILEPROBLEM
-            elif "No such process" in diagnostics:
-                exit_code = errors.NOSUCHPROCESS
-            else:
-                exit_code = errors.GENERALCPUCALCPROBLEM
-            return exit_code, diagnostics
+    # confirm that the worker node has a proper SC_CLK_TCK (problems seen on MPPMU)
+    check_hz()
+    try:
+        cpuconsumptiontime = get_current_cpu_consumption_time(job.pid)
+    except Exception as e:
+        diagnostics = "Exception caught: %s" % e
+        log.warning(diagnostics)
+        import traceback
+        log.warning(traceback.format_exc())
+        if "Resource temporarily unavailable" in diagnostics:
+            exit_code = errors.RESOURCEUNAVAILABLE
+        elif "No such file or directory" in diagnostics:
+            exit_code = errors.STATFILEPROBLEM
+        elif "No such process" in diagnostics:
+            exit_code = errors.NOSUCHPROCESS
         else:
-            job.cpuconsumptiontime = int(round(cpuconsumptiontime))
-            job.cpuconsumptionunit = "s"
-            job.cpuconversionfactor = 1.0
-            log.info('CPU consumption time for pid=%d: %f (rounded to %d)' % (job.pid, cpuconsumptiontime, job.cpuconsumptiontime))
-
-        # check how many cores the payload is using
-        check_number_used_cores(job)
-
-        # check memory usage (optional) for jobs in running state
-        exit_code, diagnostics = verify_memory_usage(current_time, mt, job)
-        if exit_code != 0:
-            return exit_code, diagnostics
+            exit_code = errors.GENERALCPUCALCPROBLEM
+        return exit_code, diagnostics
+    else:
+        job.cpuconsumptiontime = int(round(cpuconsumptiontime))
+        job.cpuconsumptionunit = "s"
+        job.cpuconversionfactor = 1.0
+        log.info('CPU consumption time for pid=%d: %f (rounded to %d)' % (job.pid, cpuconsumptiontime, job.cpuconsumptiontime))
 
-    # is it time to verify the pilot running time?
-#    exit_code, diagnostics = verify_pilot_running_time(current_time, mt, job)
-#    if exit_code != 0:
-#        return exit_code, diagnostics
+    return 0, ""
 
-    # should the proxy be verified?
-    if args.verify_proxy:
-        exit_code, diagnostics = verify_user_proxy(current_time, mt)
-        if exit_code != 0:
-            return exit_code, diagnostics
 
-    # is it time to check for looping jobs?
-    exit_code, diagnostics = verify_looping_job(current_time, mt, job)
-    if exit_code != 0:
-        return exit_code, diagnostics
-
-    # is the job using too much space?
-    exit_code, diagnostics = verify_disk_usage(current_time, mt, job)
-    if exit_code != 0:
-        return exit_code, diagnostics
+def verify_used_cores(job, mt, args):
+    """
+    Check the number of cores used by a running job.
 
-    # is it time to verify the number of running processes?
-    if job.pid:
-        exit_code, diagnostics = verify_running_processes(current_time, mt, job.pid)
-        if exit_code != 0:
-            return exit_code, diagnostics
+    :param job: job object.
+    :param mt: `MonitoringTime` object.
+    :param args: Pilot arguments (e.g. containing queue name, queuedata dictionary, etc).
+    :return: exit code (int), diagnostics (string).
+    """
 
-    # make sure that any utility commands are still running
-    if job.utilities != {}:
-        utility_monitor(job)
+    if job.state == 'running':
+        check_number_used_cores(job)
 
-    return exit_code, diagnostics
+    return 0, ""
 
 
 def check_number_used_cores(job):
@@ -127,188 +141,161 @@ def check_number_used_cores(job):
     """
 
     if job.pgrp:
-        cmd = "ps axo pgid,psr | sort | grep %d | uniq | wc -l" % job.pgrp
-        exit_code, stdout, stderr = execute(cmd, mute=True)
-        logger.debug('%s:\n%s' % (cmd, stdout))
-        try:
-            job.actualcorecount = int(stdout)
-        except Exception as e:
-            logger.warning('failed to convert number of actual cores to int: %s' % e)
-        else:
-            logger.debug('set number of actual cores to: %d' % job.actualcorecount)
+        job.actualcorecount = get_process_tree().get_number_of_used_processors(job.pgrp)
+        logger.debug('set number of actual cores to: %d' % job.actualcorecount)
     else:
         logger.debug('payload process group not set - cannot check number of cores used by payload')
 
 
-def verify_memory_usage(current_time, mt, job):
+def verify_memory_usage(job, mt, args):
     """
-    Verify the memory usage (optional).
+    Verify the memory usage (optional) for jobs in running state.
     Note: this function relies on a stand-alone memory monitor tool that may be executed by the Pilot.
 
-    :param current_time: current time at the start of the monitoring loop (int).
-    :param mt: measured time object.
     :param job: job object.
+    :param mt: measured time object.
+    :param args: Pilot arguments (e.g. containing queue name, queuedata dictionary, etc).
     :return: exit code (int), error diagnostics (string).
     """
 
     pilot_user = os.environ.get('PILOT_USER', 'generic').lower()
-    memory = __import__('pilot.user.%s.memory' % pilot_user, globals(), locals(), [pilot_user], 0)  # Python 2/3
+    memory = get_user_module('memory', pilot_user)
 
-    if not memory.allow_memory_usage_verifications():
+    if job.state != 'running' or not memory.allow_memory_usage_verifications():
         return 0, ""
 
-    # is it time to verify the memory usage?
-    memory_verification_time = convert_to_int(config.Pilot.memory_usage_verification_time, default=60)
-    if current_time - mt.get('ct_memory') > memory_verification_time:
-        # is the used memory within the allowed limit?
-        try:
-            exit_code, diagnostics = memory.memory_usage(job)
-        except Exception as e:
-            logger.warning('caught exception: %s' % e)
-            exit_code = -1
-        if exit_code != 0:
-            logger.warning('ignoring failure to parse memory monitor output')
-            #return exit_code, diagnostics
-        else:
-            # update the ct_proxy with the current time
-            mt.update('ct_memory')
+    # is the used memory within the allowed limit?
+    try:
+        exit_code, diagnostics = memory.memory_usage(job)
+    except Exception as e:
+        logger.warning('caught exception: %s' % e)
+        exit_code = -1
+    if exit_code != 0:
+        logger.warning('ignoring failure to parse memory monitor output')
+        #return exit_code, diagnostics
 
     return 0, ""
 
 
-def verify_user_proxy(current_time, mt):
+def verify_user_proxy(job, mt, args):
     """
-    Verify the user proxy.
-    This function is called by the job_monitor_tasks() function.
+    Verify the user proxy (if requested with the pilot arguments).
+    This function is run by the monitoring scheduler (see get_monitoring_scheduler()).
 
-    :param current_time: current time at the start of the monitoring loop (int).
+    :param job: job object.
     :param mt: measured time object.
+    :param args: Pilot arguments (e.g. containing queue name, queuedata dictionary, etc).
     :return: exit code (int), error diagnostics (string).
     """
 
-    pilot_user = os.environ.get('PILOT_USER', 'generic').lower()
-    userproxy = __import__('pilot.user.%s.proxy' % pilot_user, globals(), locals(), [pilot_user], 0)  # Python 2/3
-
-    # is it time to verify the proxy?
-    proxy_verification_time = convert_to_int(config.Pilot.proxy_verification_time, default=600)
-    if current_time - mt.get('ct_proxy') > proxy_verification_time:
-        # is the proxy still valid?
-        exit_code, diagnostics = userproxy.verify_proxy()
-        if exit_code != 0:
-            return exit_code, diagnostics
-        else:
-            # update the ct_proxy with the current time
-            mt.update('ct_proxy')
+    if not args.verify_proxy:
+        return 0, ""
 
-    return 0, ""
+    # is the proxy still valid? (the check is shared by all job slots)
+    return shared_user_proxy_check()
 
 
-def verify_looping_job(current_time, mt, job):
+def verify_looping_job(job, mt, args):
     """
     Verify that the job is not looping.
 
-    :param current_time: current time at the start of the monitoring loop (int).
-    :param mt: measured time object.
     :param job: job object.
+    :param mt: measured time object.
+    :param args: Pilot arguments (e.g. containing queue name, queuedata dictionary, etc).
     :return: exit code (int), error diagnostics (string).
     """
 
     log = get_logger(job.jobid)
 
-    looping_verification_time = convert_to_int(config.Pilot.looping_verification_time, default=600)
-    if current_time - mt.get('ct_looping') > looping_verification_time:
-        # is the job looping?
-        try:
-            exit_code, diagnostics = looping_job(job, mt)
-        except Exception as e:
-            diagnostics = 'exception caught in looping job algorithm: %s' % e
-            log.warning(diagnostics)
-            if "No module named" in diagnostics:
-                exit_code = errors.BLACKHOLE
-            else:
-                exit_code = errors.UNKNOWNEXCEPTION
-            return exit_code, diagnostics
+    # is the job looping?
+    try:
+        exit_code, diagnostics = looping_job(job, mt)
+    except Exception as e:
+        diagnostics = 'exception caught in looping job algorithm: %s' % e
+        log.warning(diagnostics)
+        if "No module named" in diagnostics:
+            exit_code = errors.BLACKHOLE
         else:
-            if exit_code != 0:
-                return exit_code, diagnostics
+            exit_code = errors.UNKNOWNEXCEPTION
 
-        # update the ct_proxy with the current time
-        mt.update('ct_looping')
-
-    return 0, ""
+    return exit_code, diagnostics
 
 
-def verify_disk_usage(current_time, mt, job):
+def verify_disk_usage(job, mt, args):
     """
     Verify the disk usage.
     The function checks 1) payload stdout size, 2) local space, 3) work directory size, 4) output file sizes.
 
-    :param current_time: current time at the start of the monitoring loop (int).
-    :param mt: measured time object.
     :param job: job object.
+    :param mt: measured time object.
+    :param args: Pilot arguments (e.g. containing queue name, queuedata dictionary, etc).
     :return: exit code (int), error diagnostics (string).
     """
 
-    disk_space_verification_time = convert_to_int(config.Pilot.disk_space_verification_time, default=300)
-    if current_time - mt.get('ct_diskspace') > disk_space_verification_time:
-        # time to check the disk space
-
-        # check the size of the payload stdout
-        exit_code, diagnostics = check_payload_stdout(job)
-        if exit_code != 0:
-            return exit_code, diagnostics
-
-        # check the local space, if it's enough left to keep running the job
-        exit_code, diagnostics = check_local_space()
-        if exit_code != 0:
-            return exit_code, diagnostics
-
-        # check the size of the workdir
-        exit_code, diagnostics = check_work_dir(job)
-        if exit_code != 0:
-            return exit_code, diagnostics
+    # check the size of the payload stdout
+    exit_code, diagnostics = check_payload_stdout(job)
+    if exit_code != 0:
+        return exit_code, diagnostics
 
-        # check the output file sizes
-        exit_code, diagnostics = check_output_file_sizes(job)
-        if exit_code != 0:
-            return exit_code, diagnostics
+    # check the local space, if it's enough left to keep running the job (the check is shared by all job slots)
+    exit_code, diagnostics = shared_local_space_check()
+    if exit_code != 0:
+        return exit_code, diagnostics
 
-        # update the ct_diskspace with the current time
-        mt.update('ct_diskspace')
+    # check the size of the workdir
+    exit_code, diagnostics = check_work_dir(job)
+    if exit_code != 0:
+        return exit_code, diagnostics
 
-    return 0, ""
+    # check the output file sizes
+    return check_output_file_sizes(job)
 
 
-def verify_running_processes(current_time, mt, pid):
+def verify_running_processes(job, mt, args):
     """
     Verify the number of running processes.
     The function sets the environmental variable PILOT_MAXNPROC to the maximum number of found (child) processes
     corresponding to the main payload process id.
     The function does not return an error code (always returns exit code 0).
 
-    :param current_time: current time at the start of the monitoring loop (int).
+    :param job: job object.
     :param mt: measured time object.
-    :param pid: payload process id (int).
+    :param args: Pilot arguments (e.g. containing queue name, queuedata dictionary, etc).
     :return: exit code (int), error diagnostics (string).
     """
 
+    if not job.pid:
+        return 0, ""
+
     nproc_env = 0
+    nproc = get_number_of_child_processes(job.pid)
+    try:
+        nproc_env = int(os.environ.get('PILOT_MAXNPROC', 0))
+    except Exception as e:
+        logger.warning('failed to convert PILOT_MAXNPROC to int: %s' % e)
+    else:
+        if nproc > nproc_env:
+            # set the maximum number of found processes
+            os.environ['PILOT_MAXNPROC'] = str(nproc)
 
-    process_verification_time = convert_to_int(config.Pilot.process_verification_time, default=300)
-    if current_time - mt.get('ct_process') > process_verification_time:
-        # time to check the number of processes
-        nproc = get_number_of_child_processes(pid)
-        try:
-            nproc_env = int(os.environ.get('PILOT_MAXNPROC', 0))
-        except Exception as e:
-            logger.warning('failed to convert PILOT_MAXNPROC to int: %s' % e)
-        else:
-            if nproc > nproc_env:
-                # set the maximum number of found processes
-                os.environ['PILOT_MAXNPROC'] = str(nproc)
+    if nproc_env > 0:
+        logger.info('maximum number of monitored processes: %d' % nproc_env)
+
+    return 0, ""
 
-        if nproc_env > 0:
-            logger.info('maximum number of monitored processes: %d' % nproc_env)
+
+def verify_utilities(job, mt, args):
+    """
+    Make sure that any utility commands are still running (see utility_monitor()).
+
+    :param job: job object.
+    :param mt: measured time object.
+    :param args: Pilot arguments (e.g. containing queue name, queuedata dictionary, etc).
+    :return: exit code (int), error diagnostics (string).
+    """
+
+    if job.utilities != {}:
+        utility_monitor(job)
 
     return 0, ""
 
@@ -324,7 +311,7 @@ def utility_monitor(job):
     """
 
     pilot_user = os.environ.get('PILOT_USER', 'generic').lower()
-    usercommon = __import__('pilot.user.%s.common' % pilot_user, globals(), locals(), [pilot_user], 0)  # Python 2/3
+    usercommon = get_user_module('common', pilot_user)
 
     log = get_logger(job.jobid)
 
@@ -365,9 +352,6 @@ def utility_monitor(job):
             else:
                 log.warning('file: %s does not exist' % path)
 
-            # rest
-            time.sleep(10)
-
 
 def get_local_size_limit_stdout(bytes=True):
     """
@@ -485,6 +469,24 @@ def check_local_space():
     return ec, diagnostics
 
 
+def verify_proxy():
+    """
+    Verify the user proxy with the proxy module of the pilot user.
+
+    :return: exit code (int), error diagnostics (string).
+    """
+
+    pilot_user = os.environ.get('PILOT_USER', 'generic').lower()
+    userproxy = get_user_module('proxy', pilot_user)
+
+    return userproxy.verify_proxy()
+
+
+# node-wide checks, executed once per monitoring round for all job slots of a multi-slot pilot
+shared_local_space_check = SharedCheck(check_local_space, period=60)
+shared_user_proxy_check = SharedCheck(verify_proxy, period=60)
+
+
 def check_work_dir(job):
     """
     Check the size of the work directory.
@@ -504,7 +506,8 @@ def check_work_dir(job):
         maxwdirsize = get_max_allowed_work_dir_size(job.infosys.queuedata)
 
         if os.path.exists(job.workdir):
-            workdirsize = get_directory_size(directory=job.workdir)
+            tracker = get_workdir_usage(job.workdir, use_inotify=config.Pilot.workdir_inotify)
+            workdirsize = tracker.refresh()
 
             # is user dir within allowed size limit?
             if workdirsize > maxwdirsize:
@@ -513,9 +516,8 @@ def check_work_dir(job):
                               (job.workdir, workdirsize, maxwdirsize)
                 log.fatal("%s" % diagnostics)
 
-                cmd = 'ls -altrR %s' % job.workdir
-                exit_code, stdout, stderr = execute(cmd, mute=True)
-                log.info("%s: %s" % (cmd + '\n', stdout))
+                log.info('largest files in work directory %s:\n%s' %
+                         (job.workdir, '\n'.join(['%d B: %s' % (usage, path) for path, usage in tracker.get_largest_files(20)])))
 
                 # kill the job
                 # pUtil.createLockFile(True, self.__env['jobDic'][k][1].workdir, lockfile="JOBWILLBEKILLED")
@@ -527,14 +529,14 @@ def check_work_dir(job):
                     remove_files(job.workdir, lfns)
 
                     # remeasure the size of the workdir at this point since the value is stored below
-                    workdirsize = get_directory_size(directory=job.workdir)
+                    workdirsize = tracker.refresh(full=True)
             else:
                 log.info("size of work directory %s: %d B (within %d B limit)" %
                          (job.workdir, workdirsize, maxwdirsize))
 
             # Store the measured disk space (the max value will later be sent with the job metrics)
             if workdirsize > 0:
-                job.add_workdir_size(workdirsize)
+                job.add_workdir_size(workdirsize, file_sizes=tracker.get_file_sizes())
         else:
             log.warning('job work dir does not exist: %s' % job.workdir)
     else:
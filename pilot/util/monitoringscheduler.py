@@ -0,0 +1,306 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+"""
+Scheduler for the job monitoring tasks.
+
+Each monitoring task (check) is registered with a period and a timeout. When the job monitor calls run(), the tasks
+that are due (according to the `MonitoringTime` object) are executed in parallel on a small worker pool, and run()
+returns when all of them have finished or when their timeouts have passed. The timeout of a task is measured from the
+start of its execution, not from the time it was queued for a worker. A task that overruns its timeout keeps
+running in the background; it is not started again until it has finished, and its result is collected in a later
+call. The run time and overrun counters of each task are available with get_stats() and report().
+
+Tasks that can fail the job (set its error codes and state, or kill the payload) are registered as exclusive: they
+are executed one at a time, and they are skipped once the job has failed, so that two checks failing at the same time
+do not both update the job.
+"""
+
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class MonitoringTask(object):
+    """
+    A registered monitoring task and its statistics.
+    """
+
+    def __init__(self, name, function, period=0, timeout=60, key=None, lock=None):
+        """
+        :param name: task name (string).
+        :param function: function(job, mt, args) returning exit code (int), diagnostics (string).
+        :param period: minimum time between two executions in seconds (int). 0 means every call to run().
+        :param timeout: maximum time run() waits for the task in seconds (int).
+        :param key: optional `MonitoringTime` key holding the time of the last successful execution (string).
+        :param lock: lock held during the execution of an exclusive task (threading.Lock, None otherwise).
+        """
+
+        self.name = name
+        self.function = function
+        self.period = period
+        self.timeout = timeout
+        self.key = key
+        self.lock = lock
+        self.last = int(time.time())  # time of the last execution, when no key is used
+
+        self.result = None  # result of the current execution (while running or not yet collected)
+        self.job = None  # job object of the current execution
+        self.submitted = None  # time when the current execution was queued
+        self.started = None  # time when the current execution started in a worker thread (None while queued)
+        self.started_event = threading.Event()
+        self.overrun = False  # has the current execution exceeded its timeout?
+
+        self.runs = 0
+        self.failures = 0  # executions that returned an error code or raised an exception
+        self.overruns = 0
+        self.skipped = 0  # executions that were due while the previous one was still running
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.last_time = 0.0
+
+    def is_running(self):
+        """
+        Is the current execution still running?
+
+        :return: Boolean.
+        """
+
+        return self.result is not None and not self.result.ready()
+
+    def get_stats(self):
+        """
+        Return the statistics of the task.
+
+        :return: dictionary.
+        """
+
+        return {'runs': self.runs, 'failures': self.failures, 'overruns': self.overruns, 'skipped': self.skipped,
+                'total_time': self.total_time, 'max_time': self.max_time, 'last_time': self.last_time,
+                'running': self.is_running()}
+
+
+def _execute(task, job, mt, args):
+    """
+    Execute the task in a worker thread.
+    An exclusive task is executed with the lock held (its timeout starts when the lock is acquired), and skipped if
+    the job has already failed.
+
+    :param task: `MonitoringTask` object.
+    :param job: job object.
+    :param mt: `MonitoringTime` object.
+    :param args: pilot args object.
+    :return: exit code (int), diagnostics (string), run time in seconds (float).
+    """
+
+    if task.lock:
+        task.lock.acquire()
+    try:
+        t0 = time.time()
+        task.started = t0
+        task.started_event.set()
+        if task.lock and job.state == 'failed':
+            logger.info('job has failed - skipping monitoring task %s' % task.name)
+            return 0, "", 0.0
+        try:
+            exit_code, diagnostics = task.function(job, mt, args)
+        except Exception as e:  # Python 2/3
+            logger.warning('monitoring task %s failed: %s\n%s' % (task.name, e, traceback.format_exc()))
+            exit_code, diagnostics = None, str(e)
+    finally:
+        if task.lock:
+            task.lock.release()
+
+    return exit_code, diagnostics, time.time() - t0
+
+
+class MonitoringScheduler(object):
+    """
+    Run the registered monitoring tasks when they are due, in parallel.
+    """
+
+    def __init__(self, mt, nthreads=3):
+        """
+        :param mt: `MonitoringTime` object.
+        :param nthreads: number of worker threads (int).
+        """
+
+        self.mt = mt
+        self.nthreads = max(1, nthreads)
+        self.tasks = OrderedDict()
+        self._pool = None
+        self._lock = threading.Lock()  # held by the exclusive tasks
+
+    def register(self, name, function, period=0, timeout=60, key=None, exclusive=False):
+        """
+        Register a monitoring task (see `MonitoringTask`). Tasks are started in registration order.
+
+        :param name: task name (string).
+        :param function: function(job, mt, args) returning exit code (int), diagnostics (string).
+        :param period: minimum time between two executions in seconds (int).
+        :param timeout: maximum time run() waits for the task in seconds (int).
+        :param key: optional `MonitoringTime` key (string).
+        :param exclusive: the task can fail the job and is not run at the same time as the other exclusive tasks
+        (Boolean).
+        :return:
+        """
+
+        self.tasks[name] = MonitoringTask(name, function, period=period, timeout=timeout, key=key,
+                                          lock=self._lock if exclusive else None)
+
+    def is_due(self, task, current_time):
+        """
+        Is it time to execute the given task?
+
+        :param task: `MonitoringTask` object.
+        :param current_time: current time (int).
+        :return: Boolean.
+        """
+
+        if task.period <= 0:
+            return True
+        last = self.mt.get(task.key) if task.key else task.last
+
+        return current_time - last > task.period
+
+    def run(self, job, args):
+        """
+        Execute the due tasks for the given job and wait for them until their timeouts.
+
+        :param job: job object.
+        :param args: pilot args object.
+        :return: exit code of the first failed task (int), diagnostics (string).
+        """
+
+        if not self._pool:
+            self._pool = ThreadPool(self.nthreads)
+
+        current_time = int(time.time())
+        started = []
+        for task in self.tasks.values():
+            if task.result is not None:
+                if task.is_running() and self.is_due(task, current_time):
+                    task.skipped += 1
+                    logger.warning('monitoring task %s has been running for %d s - will not start it again' %
+                                   (task.name, time.time() - (task.started or task.submitted)))
+                started.append(task)  # collect the result when it is ready
+            elif self.is_due(task, current_time):
+                task.job = job
+                task.submitted = time.time()
+                task.started = None
+                task.started_event.clear()
+                task.overrun = False
+                task.result = self._pool.apply_async(_execute, (task, job, self.mt, args))
+                started.append(task)
+
+        exit_code = 0
+        diagnostics = ""
+        for task in started:
+            self._wait(task)
+            if not task.result.ready():
+                if task.started is None:
+                    logger.warning('monitoring task %s has not started within %d s (all workers or the job are busy)' %
+                                   (task.name, task.timeout))
+                elif not task.overrun:
+                    task.overrun = True
+                    task.overruns += 1
+                    logger.warning('monitoring task %s exceeded its timeout (%d s) - will collect the result later' %
+                                   (task.name, task.timeout))
+                continue
+
+            _exit_code, _diagnostics = self._collect(task, job)
+            if _exit_code and not exit_code:
+                exit_code, diagnostics = _exit_code, _diagnostics
+
+        return exit_code, diagnostics
+
+    def _wait(self, task):
+        """
+        Wait for a task until its timeout has passed since the start of its execution.
+        A task that is still queued for a worker (e.g. because the workers are busy with overrunning tasks) is waited
+        for at most its timeout before it starts.
+
+        :param task: `MonitoringTask` object.
+        :return:
+        """
+
+        if task.started_event.wait(max(0, task.submitted + task.timeout - time.time())):
+            task.result.wait(max(0, task.started + task.timeout - time.time()))
+
+    def _collect(self, task, job):
+        """
+        Collect the result of a finished task and update its statistics.
+        The result is ignored if the task was started for another job.
+
+        :param task: `MonitoringTask` object.
+        :param job: current job object.
+        :return: exit code (int), diagnostics (string).
+        """
+
+        exit_code, diagnostics, runtime = task.result.get()
+        _job = task.job
+        task.result = None
+        task.job = None
+
+        task.runs += 1
+        task.total_time += runtime
+        task.max_time = max(task.max_time, runtime)
+        task.last_time = runtime
+        if exit_code is None or exit_code != 0:
+            task.failures += 1
+        elif task.key:
+            self.mt.update(task.key)
+        task.last = int(time.time())
+
+        if _job is not job or exit_code is None:
+            return 0, ""
+
+        return exit_code, diagnostics
+
+    def get_stats(self):
+        """
+        Return the statistics of all tasks.
+
+        :return: dictionary {task name: statistics dictionary}.
+        """
+
+        return OrderedDict((name, task.get_stats()) for name, task in self.tasks.items())
+
+    def report(self):
+        """
+        Log the statistics of all tasks, most time consuming task first.
+
+        :return:
+        """
+
+        header = ('task', 'runs', 'failures', 'overruns', 'skipped', 'total [s]', 'max [s]', 'last [s]')
+        lines = ['%-24s %6s %8s %8s %8s %11s %9s %9s' % header]
+        for task in sorted(self.tasks.values(), key=lambda t: t.total_time, reverse=True):
+            values = (task.name, task.runs, task.failures, task.overruns, task.skipped, task.total_time, task.max_time,
+                      task.last_time)
+            lines.append('%-24s %6d %8d %8d %8d %11.1f %9.1f %9.1f' % values)
+        logger.info('monitoring task statistics:\n%s' % '\n'.join(lines))
+
+    def close(self):
+        """
+        Stop the worker pool. Tasks that are still running are not waited for.
+
+        :return:
+        """
+
+        if self._pool:
+            self._pool.close()
+            if not any(task.is_running() for task in self.tasks.values()):
+                self._pool.join()
+            self._pool = None
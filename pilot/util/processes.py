@@ -10,101 +10,67 @@
 import os
 import time
 import signal
-import re
 
 from pilot.util.auxiliary import get_logger
 from pilot.util.container import execute
-from pilot.util.auxiliary import whoami
 from pilot.util.filehandling import read_file, remove_dir_tree
+from pilot.util.proctree import get_process_tree
+from pilot.util.workdirusage import release_workdir_usage
 
 import logging
 logger = logging.getLogger(__name__)
 
 
-def find_processes_in_group(cpids, pid):
+def find_processes_in_group(cpids, pid, tree=None):
     """
     Find all processes that belong to the same group.
-    Recursively search for the children processes belonging to pid and return their pid's.
+    Search for the children processes belonging to pid and return their pid's.
     pid is the parent pid and cpids is a list that has to be initialized before calling this function and it contains
     the pids of the children AND the parent.
 
     :param cpids: list of pid's for all child processes to the parent pid, as well as the parent pid itself (int).
     :param pid: parent process id (int).
+    :param tree: optional ProcessTree snapshot (a shared snapshot is used if not set).
     :return: (updated cpids input parameter list).
     """
 
     if not pid:
         return
 
-    cpids.append(pid)
+    tree = tree or get_process_tree()
+    cpids.extend(tree.get_descendants(pid))
 
-    cmd = "ps -eo pid,ppid -m | grep %d" % pid
-    exit_code, psout, stderr = execute(cmd, mute=True)
 
-    lines = psout.split("\n")
-    if lines != ['']:
-        for i in range(0, len(lines)):
-            try:
-                thispid = int(lines[i].split()[0])
-                thisppid = int(lines[i].split()[1])
-            except Exception as e:
-                logger.warning('exception caught: %s' % e)
-            if thisppid == pid:
-                find_processes_in_group(cpids, thispid)
-
-
-def is_zombie(pid):
+def is_zombie(pid, tree=None):
     """
     Is the given process a zombie?
     :param pid: process id (int).
+    :param tree: optional ProcessTree snapshot (a shared snapshot is used if not set).
     :return: boolean.
     """
 
-    status = False
+    tree = tree or get_process_tree()
 
-    cmd = "ps aux | grep %d" % (pid)
-    exit_code, stdout, stderr = execute(cmd, mute=True)
-    if "<defunct>" in stdout:
-        status = True
+    return tree.is_zombie(pid)
 
-    return status
 
-
-def get_process_commands(euid, pids):
+def get_process_commands(euid, pids, tree=None):
     """
     Return a list of process commands corresponding to a pid list for user euid.
+    The first item in the list is a header line.
 
     :param euid: user id (int).
     :param pids: list of process id's.
+    :param tree: optional ProcessTree snapshot (a new snapshot is taken if not set).
     :return: list of process commands.
     """
 
-    cmd = 'ps u -u %d' % euid
-    process_commands = []
-    exit_code, stdout, stderr = execute(cmd, mute=True)
-
-    if exit_code != 0 or stdout == '':
-        logger.warning('ps command failed: %d, \"%s\", \"%s\"' % (exit_code, stdout, stderr))
-    else:
-        # extract the relevant processes
-        p_commands = stdout.split('\n')
-        first = True
-        for p_command in p_commands:
-            if first:
-                # get the header info line
-                process_commands.append(p_command)
-                first = False
-            else:
-                # remove extra spaces
-                _p_command = p_command
-                while "  " in _p_command:
-                    _p_command = _p_command.replace("  ", " ")
-                items = _p_command.split(" ")
-                for pid in pids:
-                    # items = username pid ...
-                    if items[1] == str(pid):
-                        process_commands.append(p_command)
-                        break
+    tree = tree or get_process_tree(max_age=0)
+    process_commands = ['PID PPID STAT COMMAND']
+    for pid in pids:
+        info = tree.get(pid)
+        if info and info.uid == euid:
+            process_commands.append('%d %d %s %s' % (pid, info.ppid, info.state, tree.get_cmdline(pid)))
 
     return process_commands
 
@@ -145,8 +111,9 @@ def kill_processes(pid):
 
     if not status:
         # firstly find all the children process IDs to be killed
+        tree = get_process_tree(max_age=0)
         children = []
-        find_processes_in_group(children, pid)
+        find_processes_in_group(children, pid, tree=tree)
 
         # reverse the process order so that the athena process is killed first (otherwise the stdout will be truncated)
         if not children:
@@ -157,7 +124,7 @@ def kill_processes(pid):
 
         # find which commands are still running
         try:
-            cmds = get_process_commands(os.geteuid(), children)
+            cmds = get_process_commands(os.geteuid(), children, tree=tree)
         except Exception as e:
             logger.warning("get_process_commands() threw an exception: %s" % e)
         else:
@@ -188,8 +155,9 @@ def kill_child_processes(pid):
     :return:
     """
     # firstly find all the children process IDs to be killed
+    tree = get_process_tree(max_age=0)
     children = []
-    find_processes_in_group(children, pid)
+    find_processes_in_group(children, pid, tree=tree)
 
     # reverse the process order so that the athena process is killed first (otherwise the stdout will be truncated)
     children.reverse()
@@ -197,7 +165,7 @@ def kill_child_processes(pid):
 
     # find which commands are still running
     try:
-        cmds = get_process_commands(os.geteuid(), children)
+        cmds = get_process_commands(os.geteuid(), children, tree=tree)
     except Exception as e:
         logger.warning("get_process_commands() threw an exception: %s" % e)
     else:
@@ -329,42 +297,37 @@ def kill_orphans():
 
     logger.info("searching for orphan processes")
 
-    cmd = "ps -o pid,ppid,args -u %s" % whoami()
-    exit_code, _processes, stderr = execute(cmd)
-    #pattern = re.compile(r'(\d+)\s+(\d+)\s+(\S+)')  # Python 3 (added r)
-    pattern = re.compile(r'(\d+)\s+(\d+)\s+([\S\s]+)')  # Python 3 (added r)
+    tree = get_process_tree(max_age=0)
 
     count = 0
-    for line in _processes.split('\n'):
-        ids = pattern.search(line)
-        if ids:
-            pid = ids.group(1)
-            ppid = ids.group(2)
-            args = ids.group(3)
-            if 'cvmfs2' in args:
-                logger.info("ignoring possible orphan process running cvmfs2: pid=%s, ppid=%s, args=\'%s\'" %
-                            (pid, ppid, args))
-            elif 'pilots_starter.py' in args:
-                logger.info("ignoring pilot launcher: pid=%s, ppid=%s, args='%s'" % (pid, ppid, args))
-            elif ppid == '1':
-                count += 1
-                logger.info("found orphan process: pid=%s, ppid=%s, args='%s'" % (pid, ppid, args))
-                #if args.endswith('bash'):
-                if 'bash' in args:
-                    logger.info("will not kill bash process")
-                else:
+    for info in tree.get_orphans(os.geteuid()):
+        pid = info.pid
+        ppid = info.ppid
+        args = tree.get_cmdline(pid)
+        if 'cvmfs2' in args:
+            logger.info("ignoring possible orphan process running cvmfs2: pid=%s, ppid=%s, args=\'%s\'" %
+                        (pid, ppid, args))
+        elif 'pilots_starter.py' in args:
+            logger.info("ignoring pilot launcher: pid=%s, ppid=%s, args='%s'" % (pid, ppid, args))
+        else:
+            count += 1
+            logger.info("found orphan process: pid=%s, ppid=%s, args='%s'" % (pid, ppid, args))
+            #if args.endswith('bash'):
+            if 'bash' in args:
+                logger.info("will not kill bash process")
+            else:
+                try:
+                    os.killpg(pid, signal.SIGKILL)
+                except Exception as e:
+                    logger.warning("failed to execute killpg(): %s" % e)
                     try:
-                        os.killpg(int(pid), signal.SIGKILL)
+                        os.kill(pid, signal.SIGKILL)
                     except Exception as e:
-                        logger.warning("failed to execute killpg(): %s" % e)
-                        cmd = 'kill -9 %s' % (pid)
-                        exit_code, rs, stderr = execute(cmd)
-                        if exit_code != 0:
-                            logger.warning(rs)
-                        else:
-                            logger.info("killed orphaned process %s (%s)" % (pid, args))
+                        logger.warning("failed to kill orphaned process %s: %s" % (pid, e))
                     else:
-                        logger.info("killed orphaned process group %s (%s)" % (pid, args))
+                        logger.info("killed orphaned process %s (%s)" % (pid, args))
+                else:
+                    logger.info("killed orphaned process group %s (%s)" % (pid, args))
 
     if count == 0:
         logger.info("did not find any orphan processes")
@@ -486,17 +449,10 @@ def get_current_cpu_consumption_time(pid):
     :return: system+user time for a given pid (float).
     """
 
-    # get all the child processes
-    children = []
-    find_processes_in_group(children, pid)
-
-    cpuconsumptiontime = 0
-    for _pid in children:
-        _cpuconsumptiontime = get_instant_cpu_consumption_time(_pid)
-        if _cpuconsumptiontime:
-            cpuconsumptiontime += _cpuconsumptiontime
+    if not pid:
+        return 0.0
 
-    return cpuconsumptiontime
+    return get_process_tree().get_cpu_consumption_time(pid)
 
 
 def get_core_count(job):
@@ -554,6 +510,9 @@ def cleanup(job):
 
     logger.info("overall cleanup function is called")
 
+    # forget the workdir usage records
+    release_workdir_usage(job.workdir)
+
     # make sure the workdir is deleted
     if remove_dir_tree(job.workdir):
         logger.info('removed %s' % job.workdir)
@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+"""
+Process tree snapshot built from a single sweep over /proc.
+
+The snapshot replaces repeated 'ps | grep' calls: the full pid -> children map and the interesting fields of
+/proc/<pid>/stat are read once and can be shared by the monitoring, kill and orphan clean-up functions.
+"""
+
+import io
+import os
+import threading
+import time
+
+import logging
+logger = logging.getLogger(__name__)
+
+PROC = '/proc'
+
+_lock = threading.Lock()
+_snapshot = None
+
+
+class ProcessInfo(object):
+    """
+    Fields of /proc/<pid>/stat for a single process (CPU times in seconds).
+    """
+
+    __slots__ = ('pid', 'ppid', 'pgrp', 'state', 'comm', 'uid', 'utime', 'stime', 'cutime', 'cstime', 'processor')
+
+    def __init__(self, pid, ppid, pgrp, state, comm, uid, utime, stime, cutime, cstime, processor=None):
+        self.pid = pid
+        self.ppid = ppid
+        self.pgrp = pgrp
+        self.state = state
+        self.comm = comm
+        self.uid = uid
+        self.utime = utime
+        self.stime = stime
+        self.cutime = cutime
+        self.cstime = cstime
+        self.processor = processor  # CPU number last executed on
+
+    def get_cpu_time(self):
+        """
+        Return the system+user time for the process and its waited-for children.
+
+        :return: cpu time in seconds (float).
+        """
+
+        return self.utime + self.stime + self.cutime + self.cstime
+
+    def __repr__(self):
+        return 'ProcessInfo(pid=%d, ppid=%d, state=%s, comm=%s)' % (self.pid, self.ppid, self.state, self.comm)
+
+
+def parse_stat(pid, data, uid=None, hz=100):
+    """
+    Parse the content of /proc/<pid>/stat.
+    The command name is enclosed in parentheses and may itself contain spaces and parentheses, so the remaining
+    fields are located from the last closing parenthesis.
+
+    :param pid: process id (int).
+    :param data: content of the stat file (string).
+    :param uid: process owner (int).
+    :param hz: clock ticks per second, SC_CLK_TCK (int).
+    :return: ProcessInfo object (None if the content could not be parsed).
+    """
+
+    start = data.find('(')
+    end = data.rfind(')')
+    if start < 0 or end < 0:
+        return None
+
+    fields = data[end + 2:].split()
+    # fields[0] is the state (field 3 in proc(5)), utime..cstime are fields 14-17, processor is field 39
+    try:
+        return ProcessInfo(pid, int(fields[1]), int(fields[2]), fields[0], data[start + 1:end], uid,
+                           float(fields[11]) / hz, float(fields[12]) / hz, float(fields[13]) / hz, float(fields[14]) / hz,
+                           processor=int(fields[36]) if len(fields) > 36 else None)
+    except (IndexError, ValueError):
+        return None
+
+
+class ProcessTree(object):
+    """
+    Snapshot of all processes on the node, read from /proc in one pass.
+    """
+
+    def __init__(self, proc=PROC):
+        """
+        Scan the proc file system.
+
+        :param proc: mount point of the proc file system (string).
+        """
+
+        self.proc = proc
+        self.timestamp = time.time()
+        self.processes = {}  # pid -> ProcessInfo
+        self.children = {}  # ppid -> [pids]
+
+        try:
+            hz = os.sysconf(os.sysconf_names['SC_CLK_TCK'])
+        except (ValueError, KeyError, OSError):
+            hz = 100
+        self.scan(hz if hz and hz > 0 else 100)
+
+    def scan(self, hz):
+        """
+        Read /proc/<pid>/stat for all processes and build the pid -> children map.
+
+        :param hz: clock ticks per second (int).
+        :return:
+        """
+
+        try:
+            entries = os.listdir(self.proc)
+        except OSError as e:
+            logger.warning('failed to list %s: %s' % (self.proc, e))
+            return
+
+        for entry in entries:
+            if not entry.isdigit():
+                continue
+            pid = int(entry)
+            path = os.path.join(self.proc, entry)
+            try:
+                uid = os.stat(path).st_uid
+                with io.open(os.path.join(path, 'stat'), 'rb') as fp:
+                    data = fp.read().decode('utf-8', 'replace')
+            except (IOError, OSError):  # the process has finished in the meantime
+                continue
+            info = parse_stat(pid, data, uid=uid, hz=hz)
+            if info:
+                self.processes[pid] = info
+
+        for pid in sorted(self.processes):
+            self.children.setdefault(self.processes[pid].ppid, []).append(pid)
+
+    def get_age(self):
+        """
+        Return the age of the snapshot.
+
+        :return: age in seconds (float).
+        """
+
+        return time.time() - self.timestamp
+
+    def get(self, pid):
+        """
+        Return the process info for the given pid.
+
+        :param pid: process id (int).
+        :return: ProcessInfo object (None if the process does not exist).
+        """
+
+        return self.processes.get(pid)
+
+    def get_children(self, pid):
+        """
+        Return the direct children of the given process.
+
+        :param pid: process id (int).
+        :return: list of process ids.
+        """
+
+        return list(self.children.get(pid, []))
+
+    def get_descendants(self, pid):
+        """
+        Return the given pid followed by all its descendants (depth-first, same order as the old recursive ps scan).
+
+        :param pid: parent process id (int).
+        :return: list of process ids.
+        """
+
+        if not pid:
+            return []
+
+        pids = []
+        stack = [pid]
+        while stack:
+            _pid = stack.pop()
+            pids.append(_pid)
+            stack.extend(reversed(self.children.get(_pid, [])))
+
+        return pids
+
+    def get_cpu_consumption_time(self, pid):
+        """
+        Return the summed system+user time for the given process and all its descendants.
+
+        :param pid: process id (int).
+        :return: cpu consumption time in seconds (float).
+        """
+
+        cpu = 0.0
+        for _pid in self.get_descendants(pid):
+            info = self.processes.get(_pid)
+            if info:
+                cpu += info.get_cpu_time()
+
+        return cpu
+
+    def is_zombie(self, pid):
+        """
+        Is the given process a zombie?
+
+        :param pid: process id (int).
+        :return: boolean.
+        """
+
+        info = self.processes.get(pid)
+        return info is not None and info.state == 'Z'
+
+    def get_number_of_used_processors(self, pgrp):
+        """
+        Return the number of distinct CPUs that the processes of the given process group last executed on.
+
+        :param pgrp: process group id (int).
+        :return: number of processors (int).
+        """
+
+        return len(set(info.processor for info in self.processes.values() if info.pgrp == pgrp and info.processor is not None))
+
+    def get_cmdline(self, pid):
+        """
+        Return the full command line of the given process (falls back to the command name for kernel threads
+        and zombies).
+
+        :param pid: process id (int).
+        :return: command line (string).
+        """
+
+        try:
+            with io.open(os.path.join(self.proc, str(pid), 'cmdline'), 'rb') as fp:
+                cmdline = fp.read().decode('utf-8', 'replace').replace('\x00', ' ').strip()
+        except (IOError, OSError):
+            cmdline = ''
+
+        if not cmdline:
+            info = self.processes.get(pid)
+            cmdline = '[%s]' % info.comm if info else ''
+
+        return cmdline
+
+    def get_user_processes(self, uid):
+        """
+        Return all processes belonging to the given user.
+
+        :param uid: user id (int).
+        :return: list of ProcessInfo objects.
+        """
+
+        return [self.processes[pid] for pid in sorted(self.processes) if self.processes[pid].uid == uid]
+
+    def get_orphans(self, uid):
+        """
+        Return all processes belonging to the given user that have been re-parented to init.
+
+        :param uid: user id (int).
+        :return: list of ProcessInfo objects.
+        """
+
+        return [info for info in self.get_user_processes(uid) if info.ppid == 1]
+
+
+def get_process_tree(max_age=2):
+    """
+    Return a process tree snapshot, shared between callers.
+    A new snapshot is taken if the cached one is older than max_age seconds; use max_age=0 to force a new scan
+    (e.g. before killing processes).
+
+    :param max_age: maximum age of a cached snapshot in seconds (int).
+    :return: ProcessTree object.
+    """
+
+    global _snapshot
+
+    with _lock:
+        if _snapshot is None or _snapshot.get_age() >= max_age:
+            _snapshot = ProcessTree()
+        return _snapshot
@@ -11,6 +11,7 @@ import time
 
 from pilot.common.errorcodes import ErrorCodes
 from pilot.util.auxiliary import get_logger, set_pilot_state  #, get_size
+from pilot.util.eventbus import bus
 
 import logging
 logger = logging.getLogger(__name__)
@@ -46,24 +47,24 @@ def scan_for_jobs(queues):
     """
 
     t0 = time.time()
-    found_job = False
-    jobs = None
+    found = []
 
-    while time.time() - t0 < 30:
+    def _scan():
         for q in queues._fields:
-            _q = getattr(queues, q)
-            jobs = list(_q.queue)
-            if len(jobs) > 0:
-                logger.info('found %d job(s) in queue %s after %d s - will begin queue monitoring' %
-                            (len(jobs), q, time.time() - t0))
-                found_job = True
-                break
-        if found_job:
-            break
-        else:
-            time.sleep(0.1)
+            jobs = list(getattr(queues, q).queue)
+            if jobs:
+                found.append((q, jobs))
+                return True
+        return False
+
+    # put_in_queue() wakes us up as soon as a job is added to any queue
+    if bus.wait(_scan, timeout=30):
+        q, jobs = found[0]
+        logger.info('found %d job(s) in queue %s after %d s - will begin queue monitoring' %
+                    (len(jobs), q, time.time() - t0))
+        return jobs
 
-    return jobs
+    return []
 
 
 def get_queuedata_from_job(queues):
@@ -147,3 +148,27 @@ def put_in_queue(obj, queue):
     #except Exception:
     #pass
     queue.put(obj)
+
+    # wake up the threads waiting for queue changes
+    bus.notify()
+
+
+def remove_from_queue(obj, queue):
+    """
+    Remove the given object from the given queue (wherever it is in the queue).
+
+    :param obj: object.
+    :param queue: queue object.
+    :return: True if the object was removed, False if it was not in the queue.
+    """
+
+    with queue.mutex:
+        try:
+            queue.queue.remove(obj)
+        except ValueError:
+            return False
+
+    # wake up the threads waiting for queue changes
+    bus.notify()
+
+    return True
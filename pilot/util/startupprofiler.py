@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+"""
+Startup profiler for the pilot (--profile-startup).
+
+The profiler replaces the built-in __import__ function with a timing wrapper, which records the inclusive and self
+time of each module import, and keeps a list of milestones (e.g. the first getJob request). The report is logged at
+the first getJob request, after which the original import function is restored.
+
+The profiler is started when this module is imported with --profile-startup in the command line arguments, so that
+pilot.py can import it before all other pilot modules.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import __builtin__ as builtins  # Python 2
+except Exception:
+    import builtins  # Python 3
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def get_module_name(name, globals, level):  # noqa: A002
+    """
+    Return the full name of an imported module.
+    Only a positive level is a relative import; level -1 (implicit relative import of Python 2) is treated as an
+    absolute import. The package of a relative import is taken from __package__, or from __name__ (and __path__ for a
+    package) since __package__ is not always set with Python 2.
+
+    :param name: module name as given to __import__ (string).
+    :param globals: globals of the importing module (dictionary).
+    :param level: import level (int).
+    :return: module name (string).
+    """
+
+    if level <= 0 or not globals:
+        return name
+
+    package = globals.get('__package__')
+    if not package:
+        package = globals.get('__name__', '')
+        if '__path__' not in globals:
+            package = package.rpartition('.')[0]
+    if level > 1:
+        package = package.rsplit('.', level - 1)[0]
+
+    return '%s.%s' % (package, name) if name else package
+
+
+class StartupProfiler(object):
+    """
+    Record module import times and startup milestones.
+    """
+
+    def __init__(self):
+        self.t0 = time.time()
+        self.enabled = False
+        self.imports = {}  # module name -> [inclusive time, self time]
+        self.milestones = OrderedDict()  # name -> time since start
+        self._import = None  # original import function
+        self._local = threading.local()
+
+    def start(self):
+        """
+        Start recording the import times.
+
+        :return:
+        """
+
+        if self.enabled:
+            return
+        self.enabled = True
+        self._import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def stop(self):
+        """
+        Stop recording the import times.
+
+        :return:
+        """
+
+        if self.enabled and builtins.__import__ == self._timed_import:
+            builtins.__import__ = self._import
+        self.enabled = False
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):  # noqa: A002
+        """
+        Timing wrapper for __import__.
+        Only the first import of a module is timed; the time spent in nested imports is subtracted from the self time.
+
+        :return: module.
+        """
+
+        key = get_module_name(name, globals, level)
+        if sys.modules.get(key) is not None:  # already imported (py2 also stores None for failed relative imports)
+            return self._import(name, globals, locals, fromlist, level)
+
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+
+        t0 = time.time()
+        stack.append(0.0)
+        try:
+            return self._import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.time() - t0
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            record = self.imports.setdefault(key, [0.0, 0.0])
+            record[0] += elapsed
+            record[1] += elapsed - nested
+
+    def mark(self, name, report=False):
+        """
+        Record a milestone (only the first occurrence of each name).
+
+        :param name: milestone name (string).
+        :param report: log the report and stop recording the import times (Boolean).
+        :return:
+        """
+
+        if not self.enabled or name in self.milestones:
+            return
+
+        self.milestones[name] = time.time() - self.t0
+        if report:
+            self.stop()
+            self.report()
+
+    def report(self, n=25):
+        """
+        Log the milestones and the slowest imports.
+
+        :param n: number of imports to report (int).
+        :return:
+        """
+
+        lines = ['%-40s %9.3f s' % (name, t) for name, t in self.milestones.items()]
+        lines.append('%-40s %9.3f s (%d modules)' % ('total import time', sum(r[1] for r in self.imports.values()),
+                                                     len(self.imports)))
+        lines.append('%-60s %9s %9s' % ('slowest imports', 'self [s]', 'incl. [s]'))
+        for name, (inclusive, _self) in sorted(self.imports.items(), key=lambda item: item[1][1], reverse=True)[:n]:
+            lines.append('%-60s %9.3f %9.3f' % (name, _self, inclusive))
+        logger.info('startup profile (times since pilot start):\n%s' % '\n'.join(lines))
+
+
+# shared by all pilot modules
+profiler = StartupProfiler()
+if '--profile-startup' in sys.argv:
+    profiler.start()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+"""
+Incremental reader for tabular time-series files, such as the memory monitor (prmon) output.
+
+The file is followed like 'tail -f': the reader remembers its file offset and only parses rows that were appended
+since the previous update. The values are stored in typed arrays (one per column) and the maximum, average and last
+value of each column are updated incrementally, so that the memory checks and the memory leak fit can share the same
+in-memory data instead of re-reading the whole file.
+"""
+
+from __future__ import absolute_import  # Python 2 (otherwise pilot/util/math.py is imported as math)
+
+import io
+import math
+import os
+import threading
+from array import array
+from collections import OrderedDict
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def convert_value(field):
+    """
+    Convert a field to an int or a float.
+
+    :param field: field (string).
+    :return: int or float (NaN if the field cannot be converted).
+    """
+
+    try:
+        return int(field)
+    except ValueError:
+        try:
+            return float(field)
+        except ValueError:
+            return float('nan')
+
+
+class Column(object):
+    """
+    Values and running aggregates of a column.
+    """
+
+    def __init__(self, name):
+        """
+        :param name: column name (string).
+        """
+
+        self.name = name
+        self.values = array('d')  # NaN for missing or invalid values
+        self.n = 0  # number of valid values
+        self.total = 0
+        self.max = None
+        self.last = None
+
+    def append(self, value):
+        """
+        Append a value and update the aggregates.
+
+        :param value: int or float (NaN values are not included in the aggregates).
+        :return:
+        """
+
+        self.values.append(value)
+        if isinstance(value, float) and math.isnan(value):
+            return
+        self.n += 1
+        self.total += value
+        self.last = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def get_average(self):
+        """
+        Return the average of the valid values.
+
+        :return: average (float, None if there are no valid values).
+        """
+
+        return float(self.total) / self.n if self.n else None
+
+
+class TimeSeries(object):
+    """
+    Array-backed store for a tabular text file that is being appended to.
+    The first non-empty line is the header, unless the header is given. Empty fields (e.g. from multiple tabs) are
+    ignored, as are rows that have not been completely written yet.
+    """
+
+    def __init__(self, path, header=None, separator='\t'):
+        """
+        :param path: path to the file (string).
+        :param header: optional list of column names (the first line is then treated as data).
+        :param separator: field separator (string).
+        """
+
+        self.path = path
+        self.separator = separator
+        self._header = header
+        self._lock = threading.Lock()
+        self.generation = 0  # incremented when the file was replaced or truncated
+        self._reset()
+
+    def _reset(self):
+        """
+        Forget all data (e.g. when the file was replaced).
+
+        :return:
+        """
+
+        self._offset = 0
+        self._inode = None
+        self.nrows = 0
+        self.columns = OrderedDict()
+        if self._header:
+            self._set_keys(self._header)
+
+    def _set_keys(self, keys):
+        """
+        Define the columns.
+
+        :param keys: list of column names.
+        :return:
+        """
+
+        self.columns = OrderedDict((key, Column(key)) for key in keys)
+
+    def update(self):
+        """
+        Read and parse the rows appended to the file since the last update.
+
+        :return: number of new rows (int).
+        """
+
+        with self._lock:
+            try:
+                st = os.stat(self.path)
+            except OSError as e:
+                logger.debug('cannot access %s: %s' % (self.path, e))
+                return 0
+
+            if st.st_ino != self._inode or st.st_size < self._offset:
+                if self._inode is not None:
+                    logger.info('%s was replaced or truncated - will read it from the beginning' % self.path)
+                    self.generation += 1
+                self._reset()
+                self._inode = st.st_ino
+            if st.st_size == self._offset:
+                return 0
+
+            with io.open(self.path, 'rb') as f:
+                f.seek(self._offset)
+                data = f.read(st.st_size - self._offset)
+
+            # only use complete lines
+            end = data.rfind(b'\n') + 1
+            self._offset += end
+            nrows = self.nrows
+            for line in data[:end].split(b'\n'):
+                self._add_line(line.decode('utf-8', 'replace').rstrip('\r'))
+
+            return self.nrows - nrows
+
+    def _add_line(self, line):
+        """
+        Parse a line and add its values to the columns.
+
+        :param line: line without newline (string).
+        :return:
+        """
+
+        fields = [_f for _f in line.split(self.separator) if _f.strip()]
+        if not fields:
+            return
+
+        if not self.columns:
+            self._set_keys([_f.strip() for _f in fields])
+            return
+
+        if len(fields) > len(self.columns):
+            logger.warning('unexpected format of row in %s: %s' % (self.path, line))
+        for i, column in enumerate(self.columns.values()):
+            column.append(convert_value(fields[i]) if i < len(fields) else float('nan'))
+        self.nrows += 1
+
+    def get_keys(self):
+        """
+        Return the column names.
+
+        :return: list of column names.
+        """
+
+        return list(self.columns.keys())
+
+    def get_max(self, key):
+        """
+        Return the maximum value of the given column.
+
+        :param key: column name (string).
+        :return: maximum value (None if the column does not exist or has no valid values).
+        """
+
+        return self.columns[key].max if key in self.columns else None
+
+    def get_average(self, key):
+        """
+        Return the average value of the given column.
+
+        :param key: column name (string).
+        :return: average (float, None if the column does not exist or has no valid values).
+        """
+
+        return self.columns[key].get_average() if key in self.columns else None
+
+    def get_last(self, key):
+        """
+        Return the last valid value of the given column.
+
+        :param key: column name (string).
+        :return: last value (None if the column does not exist or has no valid values).
+        """
+
+        return self.columns[key].last if key in self.columns else None
+
+    def get_table(self, keys=None, start=0, stop=None):
+        """
+        Return (a copy of) the values of the given columns.
+        Rows with invalid values in any of the requested columns are left out.
+
+        :param keys: optional list of column names (default: all columns).
+        :param start: optional index of the first row (int), e.g. to only get the rows added since a previous call.
+        :param stop: optional index after the last row (int).
+        :return: dictionary {column name: array of values}.
+        """
+
+        with self._lock:
+            columns = [self.columns[key] for key in keys or self.columns if key in self.columns]
+            table = OrderedDict((column.name, column.values[start:stop]) for column in columns)
+            complete = all(column.n == self.nrows for column in columns)
+
+        if not complete:
+            nrows = len(table[columns[0].name]) if columns else 0
+            rows = [i for i in range(nrows) if not any(math.isnan(values[i]) for values in table.values())]
+            table = OrderedDict((key, array('d', (values[i] for i in rows))) for key, values in table.items())
+
+        return table
+
+
+_series = {}  # path -> TimeSeries
+_series_lock = threading.Lock()
+
+
+def get_time_series(path, header=None, separator='\t'):
+    """
+    Return the up-to-date time series for the given file.
+    The object is cached, so that only new rows are read on subsequent calls. Objects for files that no longer exist
+    are dropped.
+
+    :param path: path to the file (string).
+    :param header: optional list of column names (the first line is then treated as data).
+    :param separator: field separator (string).
+    :return: `TimeSeries` object.
+    """
+
+    path = os.path.abspath(path)
+    with _series_lock:
+        for _path in [_path for _path in _series if _path != path and not os.path.exists(_path)]:
+            del _series[_path]
+        series = _series.get(path)
+        if not series:
+            series = TimeSeries(path, header=header, separator=separator)
+            _series[path] = series
+
+    series.update()
+
+    return series
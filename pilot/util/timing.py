@@ -6,6 +6,7 @@
 #
 # Authors:
 # - Paul Nilsson, paul.nilsson@cern.ch, 2018
+# - agent, agent@local, 2026
 
 # Note: The Pilot 2 modules that need to record timing measurements, can do so using the add_to_pilot_timing() function.
 # When the timing measurements need to be recorded, the high-level functions, e.g. get_getjob_time(), can be used.
@@ -22,7 +23,8 @@ from pilot.util.auxiliary import get_logger
 from pilot.util.config import config
 from pilot.util.constants import PILOT_START_TIME, PILOT_PRE_GETJOB, PILOT_POST_GETJOB, PILOT_PRE_SETUP, \
     PILOT_POST_SETUP, PILOT_PRE_STAGEIN, PILOT_POST_STAGEIN, PILOT_PRE_PAYLOAD, PILOT_POST_PAYLOAD, PILOT_PRE_STAGEOUT,\
-    PILOT_POST_STAGEOUT, PILOT_PRE_FINAL_UPDATE, PILOT_POST_FINAL_UPDATE, PILOT_END_TIME, PILOT_MULTIJOB_START_TIME
+    PILOT_POST_STAGEOUT, PILOT_PRE_FINAL_UPDATE, PILOT_POST_FINAL_UPDATE, PILOT_END_TIME, PILOT_MULTIJOB_START_TIME, \
+    PILOT_PRE_LOG_TAR, PILOT_POST_LOG_TAR, PILOT_PRE_PAYLOAD_PREPARATION, PILOT_POST_PAYLOAD_PREPARATION
 from pilot.util.filehandling import read_json, write_json
 from pilot.util.mpi import get_ranks_info
 
@@ -137,6 +139,37 @@ def get_stagein_time(job_id, args):
     return get_time_difference(job_id, PILOT_PRE_STAGEIN, PILOT_POST_STAGEIN, args)
 
 
+def get_payload_preparation_time(job_id, args):
+    """
+    High level function that returns the time for the payload preparation (done during stage-in) for the given job_id.
+
+    :param job_id: PanDA job id (string).
+    :param args: pilot arguments.
+    :return: time in seconds (int).
+    """
+
+    return get_time_difference(job_id, PILOT_PRE_PAYLOAD_PREPARATION, PILOT_POST_PAYLOAD_PREPARATION, args)
+
+
+def get_payload_preparation_overlap(job_id, args):
+    """
+    Return the part of the payload preparation time that overlapped with stage-in for the given job_id, i.e. the time
+    that was saved compared to preparing the payload after stage-in.
+
+    :param job_id: PanDA job id (string).
+    :param args: pilot arguments.
+    :return: time in seconds (int).
+    """
+
+    time_measurement_dictionary = args.timing.get(job_id, {})
+    t = [time_measurement_dictionary.get(timing_constant) for timing_constant in
+         (PILOT_PRE_PAYLOAD_PREPARATION, PILOT_POST_PAYLOAD_PREPARATION, PILOT_PRE_STAGEIN, PILOT_POST_STAGEIN)]
+    if None in t:  # no stage-in or no payload preparation
+        return 0
+
+    return int(max(0, min(t[1], t[3]) - max(t[0], t[2])))
+
+
 def get_stageout_time(job_id, args):
     """
     High level function that returns the time for the stage-out operation for the given job_id.
@@ -149,6 +182,18 @@ def get_stageout_time(job_id, args):
     return get_time_difference(job_id, PILOT_PRE_STAGEOUT, PILOT_POST_STAGEOUT, args)
 
 
+def get_log_creation_time(job_id, args):
+    """
+    High level function that returns the time for creating the log tarball for the given job_id.
+
+    :param job_id: PanDA job id (string).
+    :param args: pilot arguments.
+    :return: time in seconds (int).
+    """
+
+    return get_time_difference(job_id, PILOT_PRE_LOG_TAR, PILOT_POST_LOG_TAR, args)
+
+
 def get_payload_execution_time(job_id, args):
     """
     High level function that returns the time for the payload execution for the given job_id.
@@ -362,8 +407,11 @@ def timing_report(job_id, args):
     time_setup = get_setup_time(job_id, args)
     time_total_setup = time_initial_setup + time_setup
     time_stagein = get_stagein_time(job_id, args)
+    time_preparation = get_payload_preparation_time(job_id, args)
+    time_overlap = get_payload_preparation_overlap(job_id, args)
     time_payload = get_payload_execution_time(job_id, args)
     time_stageout = get_stageout_time(job_id, args)
+    time_log_creation = get_log_creation_time(job_id, args)
     log.info('.' * 30)
     log.info('. Timing measurements:')
     log.info('. get job = %d s' % time_getjob)
@@ -371,8 +419,10 @@ def timing_report(job_id, args):
     log.info('. payload setup = %d s' % time_setup)
     log.info('. total setup = %d s' % time_total_setup)
     log.info('. stage-in = %d s' % time_stagein)
+    log.info('. payload preparation = %d s (%d s during stage-in)' % (time_preparation, time_overlap))
     log.info('. payload execution = %d s' % time_payload)
     log.info('. stage-out = %d s' % time_stageout)
+    log.info('. log creation = %d s' % time_log_creation)
     log.info('.' * 30)
 
     return time_getjob, time_stagein, time_payload, time_stageout, time_total_setup
@@ -13,12 +13,10 @@ import socket
 import time
 from sys import exc_info
 from json import dumps  #, loads
-from os import environ, getuid
 
-from pilot.util.config import config
 from pilot.util.constants import get_pilot_version, get_rucio_client_version
 from pilot.util.container import execute
-#from pilot.util.https import request
+from pilot.util.tracesender import get_ssl_certificate, get_trace_sender
 
 import logging
 logger = logging.getLogger(__name__)
@@ -120,13 +118,13 @@ class TraceReport(dict):
 
     def send(self):
         """
-        Send trace to rucio server using curl.
+        Send trace to rucio server.
+        The trace is queued and sent in the background by the trace sender (see pilot.util.tracesender), so a copy of
+        the current state is sent and the object can be updated right away.
 
         :return: Boolean.
         """
 
-        url = config.Rucio.url
-        logger.info("tracing server: %s" % url)
         logger.info("sending tracing report: %s" % str(self))
 
         if not self.verify_trace():
@@ -135,28 +133,12 @@ class TraceReport(dict):
 
         try:
             # take care of the encoding
-            #data = {'API': '0_3_0', 'operation': 'addReport', 'report': self}
-            data = dumps(self).replace('"', '\\"')
-            #loaded = loads(data)
-            #logger.debug('self object converted to json dictionary: %s' % loaded)
-
-            ssl_certificate = self.get_ssl_certificate()
-
-            # create the command
-            cmd = 'curl --connect-timeout 20 --max-time 120 --cacert %s -v -k -d \"%s\" %s' % \
-                  (ssl_certificate, data, url)
-            exit_code, stdout, stderr = execute(cmd)
-            if exit_code:
-                logger.warning('failed to send traces to rucio: %s' % stdout)
-            #request(url, loaded)
-            #if status is not None:
-            #    logger.warning('failed to send traces to rucio: %s' % status)
-            #    raise Exception(status)
+            dumps(self)
         except Exception:
             # if something fails, log it but ignore
             logger.error('tracing failed: %s' % str(exc_info()))
         else:
-            logger.info("tracing report sent")
+            get_trace_sender().put(self)
 
         return True
 
@@ -167,4 +149,4 @@ class TraceReport(dict):
         :return: path (string).
         """
 
-        return environ.get('X509_USER_PROXY', '/tmp/x509up_u%s' % getuid())
+        return get_ssl_certificate()
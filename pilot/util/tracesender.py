@@ -0,0 +1,357 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+"""
+Background sender for Rucio traces.
+
+Trace reports are put in a bounded in-memory queue and returned to the caller immediately (the copytools send several
+traces per file). A worker thread sends the queued traces in batches (as a JSON list) through the keep-alive HTTPS
+session, or with curl when no SSL context is available. Failed batches are retried with exponential backoff and are
+then written to a spool directory, from which they are resent once the tracing server can be reached again. flush()
+is called at the end of each job and before the pilot exits.
+"""
+
+import io
+import os
+import tempfile
+import threading
+import time
+from json import dumps, loads
+
+try:
+    import Queue as queue  # noqa: N813
+except Exception:
+    import queue  # Python 3
+
+from pilot.util.config import config
+from pilot.util.container import execute
+from pilot.util.https import get_session, RequestSentError
+from pilot.util.parameters import convert_to_int
+
+import logging
+logger = logging.getLogger(__name__)
+
+_stop = object()  # queue sentinel for the worker thread
+
+
+def get_ssl_certificate():
+    """
+    Return the path to the SSL certificate
+
+    :return: path (string).
+    """
+
+    return os.environ.get('X509_USER_PROXY', '/tmp/x509up_u%s' % os.getuid())
+
+
+class TraceSender(object):
+    """
+    Send trace reports in batches from a worker thread, with retries and a disk spool.
+    """
+
+    def __init__(self, url, maxsize=1000, batch_size=50, retries=3, backoff=2, spool_dir=None):
+        """
+        :param url: URL of the tracing server (string).
+        :param maxsize: maximum number of queued traces (int). Traces are dropped when the queue is full.
+        :param batch_size: maximum number of traces per request (int).
+        :param retries: number of retries before a batch is spooled (int).
+        :param backoff: initial waiting time before a retry in seconds, doubled for each retry (float).
+        :param spool_dir: directory for batches that could not be sent (string). Failed batches are dropped if None.
+        """
+
+        self.url = url
+        self.batch_size = max(1, batch_size)
+        self.retries = retries
+        self.backoff = backoff
+        self.spool_dir = spool_dir
+
+        self.sent = 0
+        self.dropped = 0
+        self.spooled = 0  # traces currently in the spool
+
+        self._queue = queue.Queue(maxsize)
+        self._pending = 0  # queued traces and traces being sent
+        self._condition = threading.Condition()
+        self._send_lock = threading.Lock()  # serializes requests and spool access
+        self._closing = threading.Event()
+        self._thread = None
+        self._counter = 0
+
+    def put(self, trace):
+        """
+        Queue a trace report. The function does not block; the trace is dropped if the queue is full.
+
+        :param trace: trace report (dictionary, copied).
+        :return: Boolean (False if the trace was dropped).
+        """
+
+        with self._condition:
+            if self._closing.is_set():
+                self.dropped += 1
+                logger.warning('trace sender has been closed - dropped trace')
+                return False
+            try:
+                self._queue.put(dict(trace), block=False)
+            except queue.Full:
+                self.dropped += 1
+                logger.warning('trace queue is full - dropped trace (%d traces dropped so far)' % self.dropped)
+                return False
+            self._pending += 1
+            if not self._thread:
+                self._thread = threading.Thread(target=self._run, name='tracesender')
+                self._thread.daemon = True
+                self._thread.start()
+
+        return True
+
+    def _run(self):
+        """
+        Worker thread: send the queued traces in batches.
+
+        :return:
+        """
+
+        stop = False
+        while not stop:
+            trace = self._queue.get()
+            if trace is _stop:
+                break
+
+            batch = [trace]
+            while len(batch) < self.batch_size:
+                try:
+                    trace = self._queue.get(block=False)
+                except queue.Empty:
+                    break
+                if trace is _stop:
+                    stop = True  # stop after this batch
+                    break
+                batch.append(trace)
+
+            with self._send_lock:
+                if self._send_with_retries(batch):
+                    self._send_spool()
+                else:
+                    self._spool(batch)
+
+            with self._condition:
+                self._pending -= len(batch)
+                self._condition.notify_all()
+
+    def _post(self, batch):
+        """
+        Send a batch of traces in one request.
+
+        :param batch: list of trace dictionaries.
+        :return: Boolean (True if the server accepted the traces).
+        """
+
+        data = dumps(batch if len(batch) > 1 else batch[0])
+        session = get_session()
+        if session:
+            try:
+                status, output = session.post(self.url, body=data, content_type='application/json', plain=True)
+            except RequestSentError as e:
+                logger.warning('failed to send traces: %s' % e)
+                return False
+            except Exception as e:
+                logger.warning('failed to send traces: %s -- falling back to curl' % e)
+            else:
+                if status // 100 == 2:
+                    return True
+                logger.warning('failed to send traces: server error (%s): %s' % (status, output))
+                return False
+
+        # send the data from a file, which avoids escaping the JSON string for the shell
+        directory = self.spool_dir if self.spool_dir and os.path.isdir(self.spool_dir) else None
+        fd, path = tempfile.mkstemp(prefix='curl_traces_', suffix='.json', dir=directory)
+        try:
+            with io.open(fd, 'w', encoding='utf-8') as f:
+                f.write(u'%s' % data)
+            cmd = 'curl --connect-timeout 20 --max-time 120 --cacert %s -k -f -s -S ' \
+                  '-H "Content-Type: application/json" -d @%s %s' % (get_ssl_certificate(), path, self.url)
+            exit_code, stdout, stderr = execute(cmd)
+        finally:
+            os.remove(path)
+        if exit_code:
+            logger.warning('failed to send traces to rucio: %s' % (stderr or stdout))
+            return False
+
+        return True
+
+    def _send_with_retries(self, batch):
+        """
+        Send a batch, with exponential backoff between the attempts.
+
+        :param batch: list of trace dictionaries.
+        :return: Boolean (True if the batch was sent).
+        """
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                delay = self.backoff * 2 ** (attempt - 1)
+                logger.info('will retry sending %d trace(s) in %d s' % (len(batch), delay))
+                if self._closing.wait(delay):  # do not delay the pilot exit
+                    break
+            if self._post(batch):
+                self.sent += len(batch)
+                logger.info('sent %d trace(s) to %s' % (len(batch), self.url))
+                return True
+
+        return False
+
+    def _spool(self, batch):
+        """
+        Write a batch that could not be sent to the spool directory.
+
+        :param batch: list of trace dictionaries.
+        :return:
+        """
+
+        if not self.spool_dir:
+            self.dropped += len(batch)
+            logger.warning('could not send %d trace(s) - dropped' % len(batch))
+            return
+
+        self._counter += 1
+        path = os.path.join(self.spool_dir, 'traces_%d_%d_%d.json' % (os.getpid(), time.time(), self._counter))
+        try:
+            if not os.path.exists(self.spool_dir):
+                os.makedirs(self.spool_dir)
+            with io.open(path + '.tmp', 'w', encoding='utf-8') as f:
+                f.write(u'%s' % dumps(batch))
+            os.rename(path + '.tmp', path)  # complete files only
+        except (IOError, OSError) as e:
+            self.dropped += len(batch)
+            logger.warning('could not send or spool %d trace(s) - dropped: %s' % (len(batch), e))
+        else:
+            self.spooled += len(batch)
+            logger.warning('could not send %d trace(s) - spooled to %s' % (len(batch), path))
+
+    def _send_spool(self, deadline=None):
+        """
+        Resend the spooled batches, oldest first. Stops at the first failure.
+        Must be called with the send lock.
+
+        :param deadline: no batch is sent after this time (seconds since epoch, None for no limit).
+        :return:
+        """
+
+        if not self.spooled or not self.spool_dir:
+            return
+
+        try:
+            filenames = sorted(_f for _f in os.listdir(self.spool_dir) if _f.startswith('traces_') and _f.endswith('.json'))
+        except OSError as e:
+            logger.warning('failed to read trace spool: %s' % e)
+            return
+
+        for filename in filenames:
+            if deadline is not None and time.time() >= deadline:
+                logger.info('no time left to resend the spooled traces')
+                break
+            path = os.path.join(self.spool_dir, filename)
+            try:
+                with io.open(path, 'r', encoding='utf-8') as f:
+                    batch = loads(f.read())
+            except (IOError, OSError, ValueError) as e:
+                logger.warning('removing unreadable trace spool file %s: %s' % (path, e))
+                os.remove(path)
+                continue
+            if not self._post(batch):
+                break
+            os.remove(path)
+            self.sent += len(batch)
+            self.spooled = max(0, self.spooled - len(batch))
+            logger.info('sent %d spooled trace(s)' % len(batch))
+
+    def flush(self, timeout=60):
+        """
+        Wait until all queued traces have been sent (or spooled), then try to resend the spooled traces within the
+        remaining time (unless the worker thread is sending).
+
+        :param timeout: maximum waiting time in seconds (float).
+        :return: Boolean (True if all traces were sent).
+        """
+
+        deadline = time.time() + timeout
+        with self._condition:
+            while self._pending:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    logger.warning('timeout while flushing traces (%d trace(s) still queued)' % self._pending)
+                    return False
+                self._condition.wait(remaining)
+
+        if self._send_lock.acquire(False):
+            try:
+                self._send_spool(deadline=deadline)
+            finally:
+                self._send_lock.release()
+
+        logger.info('trace sender: %s' % ', '.join('%s=%d' % item for item in sorted(self.get_stats().items())))
+
+        return not self.spooled
+
+    def close(self, timeout=60):
+        """
+        Flush the traces and stop the worker thread. Traces that are put afterwards are dropped.
+
+        :param timeout: maximum waiting time in seconds (float).
+        :return: Boolean (True if all traces were sent).
+        """
+
+        status = self.flush(timeout=timeout)
+        with self._condition:
+            self._closing.set()
+        if self._thread:
+            try:
+                self._queue.put(_stop, timeout=max(1, timeout))
+            except queue.Full:
+                logger.warning('trace queue is still full - will not wait for the trace sender')
+            self._thread.join(max(1, timeout))
+            self._thread = None
+        if self.spooled:
+            logger.warning('%d trace(s) could not be sent and remain in %s' % (self.spooled, self.spool_dir))
+
+        return status
+
+    def get_stats(self):
+        """
+        Return the counters.
+
+        :return: dictionary {'sent': int, 'dropped': int, 'spooled': int, 'queued': int}.
+        """
+
+        return {'sent': self.sent, 'dropped': self.dropped, 'spooled': self.spooled, 'queued': self._pending}
+
+
+_sender = None
+_sender_lock = threading.Lock()
+
+
+def get_trace_sender():
+    """
+    Return the pilot trace sender (created with the [Rucio] settings on first use).
+    The spool directory is located in PILOT_HOME (or the current directory).
+
+    :return: `TraceSender` object.
+    """
+
+    global _sender
+    with _sender_lock:
+        if not _sender:
+            spool_dir = os.path.join(os.environ.get('PILOT_HOME', os.getcwd()), 'trace_spool')
+            _sender = TraceSender(config.Rucio.url,
+                                  maxsize=convert_to_int(getattr(config.Rucio, 'trace_queue_size', 1000), default=1000),
+                                  batch_size=convert_to_int(getattr(config.Rucio, 'trace_batch_size', 50), default=50),
+                                  retries=convert_to_int(getattr(config.Rucio, 'trace_retries', 3), default=3),
+                                  spool_dir=spool_dir)
+
+    return _sender
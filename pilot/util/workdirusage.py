@@ -0,0 +1,507 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Authors:
+# - agent, agent@local, 2026
+
+"""
+Incremental disk usage accounting for job work directories.
+
+The first refresh walks the whole tree (os.scandir where available) and keeps a record (size, disk usage, mtime) of
+every file. Later refreshes only re-list directories whose mtime has changed and only re-stat files that were
+modified recently ("hot" files); a full walk is made every few refreshes to catch anything else. If inotify is
+enabled (Linux), only the directories and files reported by the kernel are looked at between full walks.
+
+Disk usage is counted in allocated blocks (as du does); symbolic links are not followed.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import heapq
+import os
+import stat
+import struct
+import threading
+import time
+
+import logging
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_trackers = {}  # workdir -> WorkdirUsage
+
+
+def _get_usage(st):
+    """
+    Return the allocated disk space for a stat result.
+
+    :param st: os.stat_result.
+    :return: usage in B (int).
+    """
+
+    blocks = getattr(st, 'st_blocks', None)
+    return blocks * 512 if blocks is not None else st.st_size
+
+
+def scan_directory(path):
+    """
+    List a directory.
+    Yields (name, is directory, lstat function) for each entry; uses os.scandir when available (Python 3.5+) so that
+    the entry type is known without an extra stat call.
+
+    :param path: directory path (string).
+    :raise: OSError if the directory cannot be listed.
+    :return: generator.
+    """
+
+    scandir = getattr(os, 'scandir', None)
+    if scandir:
+        for entry in scandir(path):
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                is_dir = False
+            yield entry.name, is_dir, lambda entry=entry: entry.stat(follow_symlinks=False)
+    else:  # Python 2
+        for name in os.listdir(path):
+            _path = os.path.join(path, name)
+            try:
+                st = os.lstat(_path)
+            except OSError:
+                continue
+            yield name, stat.S_ISDIR(st.st_mode), lambda st=st: st
+
+
+class Inotify(object):
+    """
+    Minimal non-blocking inotify interface (Linux only, via ctypes).
+    """
+
+    IN_MODIFY = 0x00000002
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ONLYDIR = 0x01000000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    WATCH_MASK = IN_MODIFY | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+
+    _header = struct.Struct('iIII')
+
+    def __init__(self):
+        """
+        :raise: OSError if inotify is not available.
+        """
+
+        libname = ctypes.util.find_library('c')
+        if not libname:
+            raise OSError(errno.ENOSYS, 'libc not found')
+        self._libc = ctypes.CDLL(libname, use_errno=True)
+        if not hasattr(self._libc, 'inotify_init1'):
+            raise OSError(errno.ENOSYS, 'inotify is not supported')
+
+        self.fd = self._libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            _errno = ctypes.get_errno()
+            raise OSError(_errno, os.strerror(_errno))
+
+    def add_watch(self, path):
+        """
+        Watch the given directory.
+
+        :param path: directory path (string).
+        :raise: OSError (e.g. ENOSPC when the max_user_watches limit is reached).
+        :return: watch descriptor (int).
+        """
+
+        _path = path if isinstance(path, bytes) else path.encode('utf-8', 'surrogateescape')
+        wd = self._libc.inotify_add_watch(self.fd, ctypes.c_char_p(_path), self.WATCH_MASK)
+        if wd < 0:
+            _errno = ctypes.get_errno()
+            raise OSError(_errno, os.strerror(_errno))
+
+        return wd
+
+    def read_events(self):
+        """
+        Read all pending events.
+
+        :return: list of (watch descriptor, mask, name).
+        """
+
+        events = []
+        while True:
+            try:
+                buf = os.read(self.fd, 65536)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    break
+                raise
+            if not buf:
+                break
+
+            pos = 0
+            while pos + self._header.size <= len(buf):
+                wd, mask, cookie, length = self._header.unpack_from(buf, pos)
+                pos += self._header.size
+                name = buf[pos:pos + length].rstrip(b'\0')
+                pos += length
+                if not isinstance(name, str):  # Python 3
+                    name = name.decode('utf-8', 'surrogateescape')
+                events.append((wd, mask, name))
+
+        return events
+
+    def close(self):
+        """
+        Close the inotify file descriptor (removes all watches).
+
+        :return:
+        """
+
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class DirNode(object):
+    """
+    Usage record for a single directory.
+    """
+
+    __slots__ = ('path', 'mtime', 'usage', 'files', 'subdirs')
+
+    def __init__(self, path):
+        self.path = path
+        self.mtime = None
+        self.usage = 0  # disk usage of the directory itself
+        self.files = {}  # name -> (size, usage, mtime)
+        self.subdirs = {}  # name -> DirNode
+
+
+class WorkdirUsage(object):
+    """
+    Incrementally updated disk usage of a directory tree.
+    """
+
+    def __init__(self, path, use_inotify=False, hot_period=3600, full_scan_interval=10):
+        """
+        :param path: top directory (string).
+        :param use_inotify: follow changes with inotify if available (Boolean).
+        :param hot_period: files modified within this period (s) before the last refresh are re-stat'ed at every
+        refresh even if their directory did not change (int).
+        :param full_scan_interval: make a full walk every N refreshes (int).
+        """
+
+        self.path = os.path.abspath(path)
+        self.hot_period = hot_period
+        self.full_scan_interval = max(1, full_scan_interval)
+        self.root = None
+        self.size = 0
+        self.nrefresh = 0
+        self.last_refresh = 0
+        self._hot_since = 0
+        self._lock = threading.Lock()
+
+        self.inotify = None
+        self._watches = {}  # watch descriptor -> DirNode
+        self._use_inotify = use_inotify
+
+    def _start_inotify(self):
+        """
+        (Re-)create the inotify instance; watches are added during the following full walk.
+
+        :return:
+        """
+
+        self._stop_inotify()
+        if self._use_inotify:
+            try:
+                self.inotify = Inotify()
+            except (OSError, AttributeError) as e:
+                logger.info('inotify is not available (%s) -- will use directory mtimes instead' % e)
+                self._use_inotify = False
+
+    def _stop_inotify(self):
+        """
+        Close the inotify instance.
+
+        :return:
+        """
+
+        if self.inotify:
+            self.inotify.close()
+        self.inotify = None
+        self._watches = {}
+
+    def _watch(self, node):
+        """
+        Add an inotify watch for the given directory (switch to mtime polling if the watch cannot be added).
+
+        :param node: DirNode object.
+        :return:
+        """
+
+        if not self.inotify:
+            return
+        try:
+            self._watches[self.inotify.add_watch(node.path)] = node
+        except OSError as e:
+            logger.warning('failed to add inotify watch for %s: %s -- will use directory mtimes instead' % (node.path, e))
+            self._use_inotify = False
+            self._stop_inotify()
+
+    def _stat_file(self, node, name):
+        """
+        Update the record of a single file.
+
+        :param node: DirNode object of the parent directory.
+        :param name: file name (string).
+        :return:
+        """
+
+        try:
+            st = os.lstat(os.path.join(node.path, name))
+        except OSError:
+            node.files.pop(name, None)
+            return
+
+        if stat.S_ISDIR(st.st_mode):
+            return
+        node.files[name] = (st.st_size, _get_usage(st), st.st_mtime)
+
+    def _update_node(self, node, full):  # noqa: C901
+        """
+        Update a directory record and all its subdirectories.
+
+        :param node: DirNode object.
+        :param full: re-list and re-stat everything (Boolean).
+        :return: False if the directory no longer exists.
+        """
+
+        try:
+            st = os.lstat(node.path)
+        except OSError:
+            return False
+
+        node.usage = _get_usage(st)
+        if full and self.inotify is not None:
+            self._watch(node)  # add the watch before listing so that no change is missed
+
+        if full or st.st_mtime != node.mtime:
+            # entries were added or removed: re-list the directory
+            node.mtime = st.st_mtime
+            files = {}
+            subdirs = {}
+            try:
+                for name, is_dir, get_stat in scan_directory(node.path):
+                    if is_dir:
+                        subdirs[name] = node.subdirs.get(name) or DirNode(os.path.join(node.path, name))
+                        continue
+                    try:
+                        _st = get_stat()
+                    except OSError:
+                        continue
+                    files[name] = (_st.st_size, _get_usage(_st), _st.st_mtime)
+            except OSError as e:
+                logger.warning('failed to list %s: %s' % (node.path, e))
+                return False
+            node.files = files
+            node.subdirs = subdirs
+        else:
+            # same entries: only files that were modified recently may still be growing
+            for name, record in list(node.files.items()):
+                if record[2] >= self._hot_since:
+                    self._stat_file(node, name)
+
+        for name, subnode in list(node.subdirs.items()):
+            new = subnode.mtime is None
+            if not self._update_node(subnode, full or new):
+                del node.subdirs[name]
+
+        return True
+
+    def _process_events(self):
+        """
+        Apply the pending inotify events.
+
+        :return: False if a full walk is needed (queue overflow, moved directories).
+        """
+
+        for wd, mask, name in self.inotify.read_events():
+            if mask & Inotify.IN_Q_OVERFLOW:
+                logger.info('inotify queue overflow -- will rescan %s' % self.path)
+                return False
+            node = self._watches.get(wd)
+            if mask & Inotify.IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            if node is None:
+                continue
+            if mask & (Inotify.IN_DELETE_SELF | Inotify.IN_MOVE_SELF):
+                if node is self.root:
+                    return False
+                continue
+            if mask & Inotify.IN_ISDIR:
+                if mask & (Inotify.IN_MOVED_FROM | Inotify.IN_MOVED_TO):
+                    return False
+                if mask & Inotify.IN_DELETE:
+                    node.subdirs.pop(name, None)
+                elif mask & Inotify.IN_CREATE:
+                    subnode = DirNode(os.path.join(node.path, name))
+                    node.subdirs[name] = subnode
+                    if not self._update_node(subnode, True):
+                        node.subdirs.pop(name, None)
+            elif mask & (Inotify.IN_DELETE | Inotify.IN_MOVED_FROM):
+                node.files.pop(name, None)
+            else:
+                self._stat_file(node, name)
+
+        return self.inotify is not None
+
+    def _get_node_usage(self, node):
+        """
+        Return the summed disk usage of a directory tree.
+
+        :param node: DirNode object.
+        :return: usage in B (int).
+        """
+
+        usage = node.usage + sum(record[1] for record in node.files.values())
+        for subnode in node.subdirs.values():
+            usage += self._get_node_usage(subnode)
+
+        return usage
+
+    def refresh(self, full=False):
+        """
+        Update the usage records.
+
+        :param full: force a full walk (Boolean).
+        :return: total disk usage in B (int).
+        """
+
+        with self._lock:
+            full = full or self.root is None or self.nrefresh % self.full_scan_interval == 0
+            t0 = time.time()
+
+            if not full and self.inotify is not None:
+                full = not self._process_events()
+            if full:
+                self._start_inotify()
+                self.root = DirNode(self.path)
+                if not self._update_node(self.root, True):
+                    self.root = None
+            elif self.inotify is None:
+                if not self._update_node(self.root, False):
+                    self.root = None
+
+            self.size = self._get_node_usage(self.root) if self.root else 0
+            self.nrefresh += 1
+            self._hot_since = t0 - self.hot_period
+            self.last_refresh = t0
+            logger.debug('%s usage of %s: %d B (%.2f s)' % ('full walk' if full else 'incremental', self.path,
+                                                            self.size, time.time() - t0))
+
+            return self.size
+
+    def get_size(self):
+        """
+        Return the disk usage measured by the last refresh.
+
+        :return: usage in B (int).
+        """
+
+        return self.size
+
+    def get_file_sizes(self):
+        """
+        Return the sizes of the files in the top directory (e.g. input and output files).
+
+        :return: dictionary {file name: size in B}.
+        """
+
+        if not self.root:
+            return {}
+
+        return dict((name, record[0]) for name, record in self.root.files.items())
+
+    def iter_files(self, node=None):
+        """
+        Iterate over all known files.
+
+        :param node: start directory (default: top directory).
+        :return: generator of (path relative to the top directory, size, usage, mtime).
+        """
+
+        node = node or self.root
+        if not node:
+            return
+
+        prefix = os.path.relpath(node.path, self.path)
+        for name, record in node.files.items():
+            yield (name if prefix == '.' else os.path.join(prefix, name),) + record
+        for subnode in list(node.subdirs.values()):
+            for item in self.iter_files(subnode):
+                yield item
+
+    def get_largest_files(self, n=10):
+        """
+        Return the largest files.
+
+        :param n: number of files (int).
+        :return: list of (relative path, usage in B), largest first.
+        """
+
+        return [(item[0], item[2]) for item in heapq.nlargest(n, self.iter_files(), key=lambda item: item[2])]
+
+    def close(self):
+        """
+        Release the inotify resources.
+
+        :return:
+        """
+
+        with self._lock:
+            self._stop_inotify()
+
+
+def get_workdir_usage(workdir, use_inotify=False):
+    """
+    Return the shared usage tracker for the given work directory (created on first use).
+
+    :param workdir: work directory (string).
+    :param use_inotify: follow changes with inotify if available (Boolean, only used when creating the tracker).
+    :return: WorkdirUsage object.
+    """
+
+    workdir = os.path.abspath(workdir)
+    with _lock:
+        if workdir not in _trackers:
+            _trackers[workdir] = WorkdirUsage(workdir, use_inotify=use_inotify)
+        return _trackers[workdir]
+
+
+def release_workdir_usage(workdir):
+    """
+    Forget the usage tracker for the given work directory.
+
+    :param workdir: work directory (string).
+    :return:
+    """
+
+    with _lock:
+        tracker = _trackers.pop(os.path.abspath(workdir), None)
+    if tracker:
+        tracker.close()
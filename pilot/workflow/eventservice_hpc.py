@@ -7,12 +7,16 @@
 # Authors:
 # - Mario Lassnig, mario.lassnig@cern.ch, 2016
 # - Paul Nilsson, paul.nilsson@cern.ch, 2018-2019
+# - agent, agent@local, 2026
 
 import functools
+import multiprocessing
 import signal
 from collections import namedtuple
 from os import environ
 
+from pilot.eventservice import droid, yoda
+from pilot.eventservice.transport import create_local_transports, get_transport
 from pilot.util.constants import SUCCESS, FAILURE
 
 import logging
@@ -27,6 +31,28 @@ def interrupt(args, signum, frame):
     args.graceful_stop.set()
 
 
+def run_local(args):
+    """
+    Run Yoda and the Droids as local processes (e.g. without MPI, on a single node).
+    The number of Droids is given by the PILOT_LOCAL_DROIDS environment variable (default: 1).
+
+    :param args: pilot arguments.
+    :return:
+    """
+
+    ndroids = int(environ.get('PILOT_LOCAL_DROIDS', '1'))
+    logger.info('running yoda with %d local droids' % ndroids)
+    transports = create_local_transports(ndroids + 1)
+    processes = [multiprocessing.Process(target=droid.run, args=(args, transport)) for transport in transports[1:]]
+    for process in processes:
+        process.start()
+    try:
+        yoda.run(args, transports[0])
+    finally:
+        for process in processes:
+            process.join()
+
+
 def run(args):
     """
     Main execution function for the event service workflow on HPCs (Yoda-Droid).
@@ -55,12 +81,14 @@ def run(args):
         # example usage:
         logger.info('setup for resource %s: %s' % (args.hpc_resource, str(resource.get_setup())))
 
-        # are we Yoda or Droid?
-        if environ.get('SOME_ENV_VARIABLE', '') == 'YODA':
-            yodadroid = __import__('pilot.eventservice.yoda')
+        # are we Yoda (rank 0) or Droid?
+        transport = get_transport()
+        if transport is None:
+            run_local(args)
+        elif transport.rank == 0:
+            yoda.run(args, transport)
         else:
-            yodadroid = __import__('pilot.eventservice.droid')
-        yodadroid.run()
+            droid.run(args, transport)
 
     except Exception as e:
         logger.fatal('exception caught: %s' % e)
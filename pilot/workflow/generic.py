@@ -31,6 +31,7 @@ from collections import namedtuple
 from pilot.common.exception import ExcThread
 from pilot.control import job, payload, data, monitor
 from pilot.util.constants import SUCCESS, PILOT_KILL_SIGNAL, MAX_KILL_WAIT_TIME
+from pilot.util.eventbus import bus
 from pilot.util.processes import kill_processes
 from pilot.util.timing import add_to_pilot_timing
 
@@ -79,6 +80,7 @@ def interrupt(args, signum, frame):
     args.signal = sig
     logger.warning('will instruct threads to abort and update the server')
     args.abort_job.set()
+    bus.notify()
     logger.warning('waiting for threads to finish')
     args.job_aborted.wait()
     logger.warning('setting graceful stop (in case it was not set already), pilot will abort')